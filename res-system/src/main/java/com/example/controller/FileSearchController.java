@@ -251,6 +251,61 @@ public class FileSearchController {
         }
     }
 
+    // overlay_mode=data: skeleton 비디오 대신 crop 비디오 + keypoint track을 받아 프론트 canvas에 그림
+    // crop 비디오 (resPy/crop_video/<base>_crop.mp4, h264/faststart라 그대로 재생)
+    @GetMapping("/search_crop_video")
+    public ResponseEntity<Resource> serveCropVideo(@RequestParam String filename) {
+        try {
+            String onlyName = new File(filename).getName();
+            if (!onlyName.toLowerCase().endsWith(".mp4")) {
+                log.warn("search_crop_video: mp4가 아닌 요청 {}", onlyName);
+                return ResponseEntity.badRequest().build();
+            }
+            log.info("search_crop_video 요청: {}", onlyName);
+            File f = new File("D:/golf_evaluation_system-web-/resPy/crop_video", onlyName);
+            if (!f.isFile()) {
+                log.warn("crop_video 폴더에서 {} 파일을 찾을 수 없음", onlyName);
+                return ResponseEntity.notFound().build();
+            }
+            Resource resource = new UrlResource(f.toURI());
+            return ResponseEntity.ok()
+                .contentType(MediaType.parseMediaType("video/mp4"))
+                .header(HttpHeaders.CONTENT_DISPOSITION, "inline; filename=\"" + resource.getFilename() + "\"")
+                .body(resource);
+        } catch (MalformedURLException e) {
+            log.error("잘못된 파일 경로(crop video): {}", filename, e);
+            return ResponseEntity.badRequest().build();
+        }
+    }
+
+    // overlay keypoint track (resPy/skeleton_video/<base>_crop_overlay.kpt.gz, resPy/overlay_track.py 형식)
+    // 파일 자체가 gzip이라 Content-Encoding: gzip으로 보내면 브라우저가 풀어서 원본 바이트(GKPT...)를 넘김
+    @GetMapping("/search_overlay_track")
+    public ResponseEntity<Resource> serveOverlayTrack(@RequestParam String filename) {
+        try {
+            String onlyName = new File(filename).getName();
+            if (!onlyName.endsWith("_overlay.kpt.gz")) {
+                log.warn("search_overlay_track: overlay track이 아닌 요청 {}", onlyName);
+                return ResponseEntity.badRequest().build();
+            }
+            log.info("search_overlay_track 요청: {}", onlyName);
+            File f = new File("D:/golf_evaluation_system-web-/resPy/skeleton_video", onlyName);
+            if (!f.isFile()) {
+                log.warn("skeleton_video 폴더에서 {} 파일을 찾을 수 없음", onlyName);
+                return ResponseEntity.notFound().build();
+            }
+            Resource resource = new UrlResource(f.toURI());
+            return ResponseEntity.ok()
+                .contentType(MediaType.APPLICATION_OCTET_STREAM)
+                .header(HttpHeaders.CONTENT_ENCODING, "gzip")
+                .header(HttpHeaders.CACHE_CONTROL, "no-cache")
+                .body(resource);
+        } catch (MalformedURLException e) {
+            log.error("잘못된 파일 경로(overlay track): {}", filename, e);
+            return ResponseEntity.badRequest().build();
+        }
+    }
+
     @GetMapping("/search_json")
     public ResponseEntity<Resource> serveJson(@RequestParam String filename) {
         try {
@@ -313,5 +368,37 @@ public class FileSearchController {
         }
     }
 
+    // 분석 진행 이벤트 (resPy/result/<결과 이름>.progress.ndjson, 한 줄에 이벤트 하나)
+    // filename: 결과 JSON 이름 (result_X.mp4.json) 또는 progress 파일 이름
+    @GetMapping("/search_progress")
+    public ResponseEntity<Resource> serveProgress(@RequestParam String filename) {
+        try {
+            String onlyName = new File(filename).getName();
+            if (onlyName.endsWith(".json")) {
+                onlyName = onlyName.substring(0, onlyName.length() - ".json".length());
+            }
+            if (!onlyName.endsWith(".progress.ndjson")) {
+                onlyName = onlyName + ".progress.ndjson";
+            }
+            File resultDir = new File("D:/golf_evaluation_system-web-/resPy/result");
+            File[] files = resultDir.isDirectory() ? resultDir.listFiles() : null;
+            if (files != null) {
+                for (File f : files) {
+                    if (f.getName().equals(onlyName)) {
+                        Resource resource = new UrlResource(f.toURI());
+                        return ResponseEntity.ok()
+                            .contentType(MediaType.parseMediaType("application/x-ndjson"))
+                            .header(HttpHeaders.CACHE_CONTROL, "no-cache")
+                            .body(resource);
+                    }
+                }
+            }
+            return ResponseEntity.notFound().build();
+        } catch (MalformedURLException e) {
+            log.error("잘못된 파일 경로(progress): {}", filename, e);
+            return ResponseEntity.badRequest().build();
+        }
+    }
+
 
 }
@@ -0,0 +1,189 @@
+package com.example.service;
+
+import org.springframework.beans.factory.annotation.Autowired;
+import org.springframework.beans.factory.annotation.Value;
+import org.springframework.stereotype.Component;
+import org.springframework.transaction.support.TransactionTemplate;
+
+import jakarta.annotation.PostConstruct;
+import jakarta.annotation.PreDestroy;
+import jakarta.persistence.EntityManager;
+import jakarta.persistence.PersistenceContext;
+import jakarta.persistence.Query;
+import org.slf4j.Logger;
+import org.slf4j.LoggerFactory;
+
+import java.io.File;
+import java.sql.Timestamp;
+import java.time.LocalDateTime;
+import java.util.Map;
+import java.util.concurrent.ConcurrentHashMap;
+import java.util.concurrent.Executors;
+import java.util.concurrent.ScheduledExecutorService;
+import java.util.concurrent.TimeUnit;
+
+import com.fasterxml.jackson.databind.JsonNode;
+import com.fasterxml.jackson.databind.ObjectMapper;
+
+/**
+ * 업로드마다 제출한 분석 작업을 추적하고, 끝나면 video 테이블의 eval을 채운다.
+ * - 업로드 시 video 행을 eval=-1(분석 중, 화면에는 Unknown)로 먼저 기록
+ * - 백그라운드 스레드 하나가 진행 중인 작업을 주기적으로 조회 (프론트가 job_status를 폴링하면 그때도 바로 반영)
+ * - 성공: 결과 JSON의 mlp_result.pred로 eval 갱신 / 실패: 행 삭제 (기존처럼 실패한 분석은 목록에 남기지 않음)
+ */
+@Component
+public class AnalysisJobTracker {
+    private static final Logger log = LoggerFactory.getLogger(AnalysisJobTracker.class);
+    private static final ObjectMapper MAPPER = new ObjectMapper();
+    public static final int EVAL_PENDING = -1;
+
+    @PersistenceContext
+    private EntityManager entityManager;
+
+    @Autowired
+    private TransactionTemplate transactionTemplate;
+
+    @Autowired
+    private AnalysisServiceClient client;
+
+    @Value("${analysis.job.poll-seconds:3}")
+    private int pollSeconds;
+
+    @Value("${analysis.job.timeout-minutes:60}")
+    private int timeoutMinutes;
+
+    private final Map<String, PendingJob> pending = new ConcurrentHashMap<>();
+    private ScheduledExecutorService poller;
+
+    private static class PendingJob {
+        final int userId;
+        final String vidName;
+        final String resultJsonName;
+        final long submittedAt = System.currentTimeMillis();
+
+        PendingJob(int userId, String vidName, String resultJsonName) {
+            this.userId = userId;
+            this.vidName = vidName;
+            this.resultJsonName = resultJsonName;
+        }
+    }
+
+    @PostConstruct
+    void start() {
+        poller = Executors.newSingleThreadScheduledExecutor(r -> {
+            Thread t = new Thread(r, "analysis-job-poller");
+            t.setDaemon(true);
+            return t;
+        });
+        poller.scheduleWithFixedDelay(this::pollPending, pollSeconds, pollSeconds, TimeUnit.SECONDS);
+    }
+
+    @PreDestroy
+    void stop() {
+        poller.shutdownNow();
+    }
+
+    /** 분석 중인 업로드 행 기록 (작업 제출 전에 커밋해서, 바로 끝나는 작업(결과 캐시 hit)도 갱신할 행이 있게 함) */
+    public void recordUpload(int userId, String vidName) {
+        transactionTemplate.executeWithoutResult(tx -> {
+            Query q = entityManager.createNativeQuery("INSERT INTO video (userid, vid_name, eval, upload_date) VALUES (?, ?, ?, ?)");
+            q.setParameter(1, userId);
+            q.setParameter(2, vidName);
+            q.setParameter(3, EVAL_PENDING);
+            q.setParameter(4, Timestamp.valueOf(LocalDateTime.now()));
+            q.executeUpdate();
+        });
+    }
+
+    /** 작업 제출에 실패한 업로드 행 삭제 */
+    public void forgetUpload(int userId, String vidName) {
+        deleteRow(userId, vidName);
+    }
+
+    public void track(String jobId, int userId, String vidName, String resultJsonName) {
+        pending.put(jobId, new PendingJob(userId, vidName, resultJsonName));
+    }
+
+    public File resultFile(String resultJsonName) {
+        return new File(new File(client.resPyDir(), "result"), new File(resultJsonName).getName());
+    }
+
+    /** 서비스의 작업 상태 (없으면 null), 끝난 작업이면 video 행에 반영 */
+    public JsonNode refresh(String jobId) throws Exception {
+        JsonNode status = client.status(jobId);
+        if (status != null) {
+            settle(jobId, status.path("status").asText(""));
+        }
+        return status;
+    }
+
+    private void pollPending() {
+        for (String jobId : pending.keySet()) {
+            try {
+                JsonNode status = refresh(jobId);
+                PendingJob job = pending.get(jobId);
+                if (status == null && job != null) {
+                    // 서비스가 재시작되어 작업 기록이 사라짐 → 결과 파일이 있으면 그걸로 반영
+                    settle(jobId, resultFile(job.resultJsonName).exists() ? "success" : "lost");
+                }
+            } catch (InterruptedException e) {
+                Thread.currentThread().interrupt();
+                return;
+            } catch (Exception e) {
+                log.warn("analysis job {} status check failed: {}", jobId, e.toString());
+            }
+            PendingJob job = pending.get(jobId);
+            if (job != null && System.currentTimeMillis() - job.submittedAt > timeoutMinutes * 60_000L) {
+                pending.remove(jobId);
+                log.warn("analysis job {} not finished after {} min; leaving eval={} for {}", jobId, timeoutMinutes, EVAL_PENDING, job.vidName);
+            }
+        }
+    }
+
+    private void settle(String jobId, String status) {
+        if (!"success".equals(status) && !"error".equals(status) && !"lost".equals(status)) return;
+        PendingJob job = pending.remove(jobId);
+        if (job == null) return;
+        try {
+            if ("success".equals(status)) {
+                int pred = readPred(resultFile(job.resultJsonName));
+                transactionTemplate.executeWithoutResult(tx -> {
+                    Query q = entityManager.createNativeQuery("UPDATE video SET eval = ? WHERE userid = ? AND vid_name = ?");
+                    q.setParameter(1, pred);
+                    q.setParameter(2, job.userId);
+                    q.setParameter(3, job.vidName);
+                    q.executeUpdate();
+                });
+                log.info("analysis job {} done: vid_name={}, eval={}", jobId, job.vidName, pred);
+            } else if ("error".equals(status)) {
+                deleteRow(job.userId, job.vidName);
+                log.warn("analysis job {} failed; removed video row {}", jobId, job.vidName);
+            } else {
+                log.warn("analysis job {} is unknown to the analysis service and has no result; leaving eval={} for {}",
+                        jobId, EVAL_PENDING, job.vidName);
+            }
+        } catch (Exception e) {
+            log.error("failed to record analysis job {} result for {}", jobId, job.vidName, e);
+        }
+    }
+
+    private void deleteRow(int userId, String vidName) {
+        transactionTemplate.executeWithoutResult(tx -> {
+            Query q = entityManager.createNativeQuery("DELETE FROM video WHERE userid = ? AND vid_name = ?");
+            q.setParameter(1, userId);
+            q.setParameter(2, vidName);
+            q.executeUpdate();
+        });
+    }
+
+    /** 결과 JSON의 mlp_result.pred (없거나 읽을 수 없으면 -1) */
+    private static int readPred(File resultFile) {
+        try {
+            JsonNode mlp = MAPPER.readTree(resultFile).path("mlp_result");
+            return mlp.has("pred") && !mlp.get("pred").isNull() ? mlp.get("pred").asInt() : EVAL_PENDING;
+        } catch (Exception e) {
+            log.warn("cannot read result JSON {}: {}", resultFile.getAbsolutePath(), e.toString());
+            return EVAL_PENDING;
+        }
+    }
+}
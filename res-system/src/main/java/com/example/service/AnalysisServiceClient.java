@@ -0,0 +1,155 @@
+package com.example.service;
+
+import org.springframework.beans.factory.annotation.Value;
+import org.springframework.stereotype.Component;
+
+import org.slf4j.Logger;
+import org.slf4j.LoggerFactory;
+
+import java.io.File;
+import java.io.IOException;
+import java.net.ConnectException;
+import java.net.URI;
+import java.net.URLEncoder;
+import java.net.http.HttpClient;
+import java.net.http.HttpRequest;
+import java.net.http.HttpResponse;
+import java.nio.charset.StandardCharsets;
+import java.time.Duration;
+import java.util.HashMap;
+import java.util.Map;
+
+import com.fasterxml.jackson.databind.JsonNode;
+import com.fasterxml.jackson.databind.ObjectMapper;
+
+/**
+ * resPy/analysis_service.py (상주 Python 분석 작업 서비스) HTTP 클라이언트.
+ * 서비스가 떠 있지 않으면 한 번 자동 실행한 뒤 /health가 응답할 때까지 기다린다 (analysis.service.autostart).
+ */
+@Component
+public class AnalysisServiceClient {
+    private static final Logger log = LoggerFactory.getLogger(AnalysisServiceClient.class);
+    private static final ObjectMapper MAPPER = new ObjectMapper();
+
+    @Value("${analysis.service.url:http://127.0.0.1:17660}")
+    private String serviceUrl;
+
+    @Value("${analysis.service.autostart:true}")
+    private boolean autostart;
+
+    @Value("${analysis.service.start-timeout-seconds:60}")
+    private int startTimeoutSeconds;
+
+    @Value("${analysis.python:python}")
+    private String python;
+
+    @Value("${analysis.respy-dir:D:/golf_evaluation_system-web-/resPy}")
+    private String resPyDir;
+
+    private final HttpClient http = HttpClient.newBuilder()
+            .connectTimeout(Duration.ofSeconds(5))
+            .build();
+
+    /** 서비스가 거절한 요청 (400 잘못된 요청, 503 큐 가득 참 등) */
+    public static class ServiceException extends IOException {
+        public final int status;
+
+        public ServiceException(int status, String message) {
+            super(message);
+            this.status = status;
+        }
+    }
+
+    public String resPyDir() {
+        return resPyDir;
+    }
+
+    /** 작업 제출 → {'job_id', 'status', 'status_url', 'result_url'} */
+    public JsonNode submit(String videoPath, int userId, String out) throws IOException, InterruptedException {
+        Map<String, Object> body = new HashMap<>();
+        body.put("video", videoPath);
+        body.put("user", String.valueOf(userId));
+        body.put("out", out);
+        HttpRequest req = HttpRequest.newBuilder(URI.create(serviceUrl + "/jobs"))
+                .timeout(Duration.ofSeconds(10))
+                .header("Content-Type", "application/json")
+                .POST(HttpRequest.BodyPublishers.ofString(MAPPER.writeValueAsString(body), StandardCharsets.UTF_8))
+                .build();
+        HttpResponse<String> res;
+        try {
+            res = http.send(req, HttpResponse.BodyHandlers.ofString(StandardCharsets.UTF_8));
+        } catch (ConnectException e) {
+            if (!autostart) throw e;
+            startService();
+            res = http.send(req, HttpResponse.BodyHandlers.ofString(StandardCharsets.UTF_8));
+        }
+        JsonNode json = parse(res.body());
+        if (res.statusCode() != 202) {
+            throw new ServiceException(res.statusCode(), json.path("error").asText("analysis service error " + res.statusCode()));
+        }
+        return json;
+    }
+
+    /** 작업 상태 ({'job_id', 'status', 'progress', 'error', ...}), 서비스가 모르는 job이면 null */
+    public JsonNode status(String jobId) throws IOException, InterruptedException {
+        HttpRequest req = HttpRequest.newBuilder(
+                        URI.create(serviceUrl + "/jobs/" + URLEncoder.encode(jobId, StandardCharsets.UTF_8)))
+                .timeout(Duration.ofSeconds(10))
+                .GET()
+                .build();
+        HttpResponse<String> res = http.send(req, HttpResponse.BodyHandlers.ofString(StandardCharsets.UTF_8));
+        if (res.statusCode() == 404) return null;
+        JsonNode json = parse(res.body());
+        if (res.statusCode() != 200) {
+            throw new ServiceException(res.statusCode(), json.path("error").asText("analysis service error " + res.statusCode()));
+        }
+        return json;
+    }
+
+    private boolean healthy() {
+        try {
+            HttpRequest req = HttpRequest.newBuilder(URI.create(serviceUrl + "/health"))
+                    .timeout(Duration.ofSeconds(2))
+                    .GET()
+                    .build();
+            return http.send(req, HttpResponse.BodyHandlers.discarding()).statusCode() == 200;
+        } catch (IOException e) {
+            return false;
+        } catch (InterruptedException e) {
+            Thread.currentThread().interrupt();
+            return false;
+        }
+    }
+
+    /** python analysis_service.py serve 실행 후 준비될 때까지 대기 (동시 업로드가 여러 개 띄우지 않도록 synchronized) */
+    private synchronized void startService() throws IOException, InterruptedException {
+        if (healthy()) return;
+        File logsDir = new File(resPyDir, "result/logs");
+        logsDir.mkdirs();
+        File logFile = new File(logsDir, "analysis_service.log");
+        ProcessBuilder pb = new ProcessBuilder(python, "-u", new File(resPyDir, "analysis_service.py").getAbsolutePath(), "serve");
+        pb.directory(new File(resPyDir));
+        pb.environment().put("PYTHONIOENCODING", "utf-8");
+        pb.redirectErrorStream(true);
+        pb.redirectOutput(ProcessBuilder.Redirect.appendTo(logFile));
+        log.info("analysis service not reachable at {}; starting it (log: {})", serviceUrl, logFile.getAbsolutePath());
+        Process process = pb.start();
+        long deadline = System.currentTimeMillis() + startTimeoutSeconds * 1000L;
+        while (System.currentTimeMillis() < deadline) {
+            if (healthy()) {
+                log.info("analysis service ready (pid={})", process.pid());
+                return;
+            }
+            if (!process.isAlive() && !healthy()) {
+                throw new IOException("analysis service exited during startup (exit=" + process.exitValue()
+                        + ", log=" + logFile.getAbsolutePath() + ")");
+            }
+            Thread.sleep(500);
+        }
+        throw new IOException("analysis service not ready within " + startTimeoutSeconds + "s (log=" + logFile.getAbsolutePath() + ")");
+    }
+
+    private static JsonNode parse(String body) throws IOException {
+        return MAPPER.readTree(body == null || body.isEmpty() ? "{}" : body);
+    }
+}
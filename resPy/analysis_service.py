@@ -0,0 +1,406 @@
+"""
+로컬 비동기 분석 작업 서비스 (HTTP, localhost 전용)
+- 업로드 핸들러(Spring FilePythonController)가 analyze_golf_video.py 프로세스를 새로 띄워 최대 10분 기다리는 대신,
+  상주 프로세스에 작업을 제출하고 job id를 바로 받는다 (서비스가 없으면 Spring이 한 번 자동 실행,
+  AnalysisServiceClient). 프론트는 /images/job_status로 진행 상황을, 결과는 기존처럼 search_json으로 읽는다.
+- 작업은 제한된 worker pool에서 실행되고, 큐가 가득 차면 503으로 거절한다.
+- 결과 JSON은 CLI 실행과 같은 resPy/result/<out 파일명>에 저장되므로 기존 search_json 폴링은 그대로 동작.
+- 한 인터프리터에서 여러 작업을 처리하므로 import/모델 로드(임베딩 데몬, 결과 캐시 digest 등)가 작업마다 반복되지 않는다.
+
+API (JSON)
+    GET  /health                 -> {'ok', 'workers', 'queued', 'running', 'max_queue'}
+    POST /jobs                   {'video': str, 'user': str|null, 'out': str|null, 'overlay_mode': 'video'|'data'|null}
+                                 -> 202 {'job_id', 'status', 'status_url', 'result_url'} | 400 | 503(큐 가득 참)
+    GET  /jobs                   -> {'jobs': [status, ...]}
+    GET  /jobs/<id>              -> {'job_id', 'status', 'progress': {...}, 'out', 'error', ...} | 404
+    GET  /jobs/<id>/result       -> 200 결과 JSON (성공/에러) | 202 {'job_id', 'status'} (아직 실행 중) | 404
+                                    (실행 중이라도 partial 결과가 기록됐으면 202 + status='partial' 결과 JSON)
+    GET  /jobs/<id>/events?since=<seq>
+                                 -> {'job_id', 'status', 'events': [진행 이벤트 (pipeline_progress), seq > since]}
+    status: queued | running | success | error
+
+실행
+    python analysis_service.py serve [--port 17660] [--workers 1]
+    python analysis_service.py submit --video X.mp4 --user 3 --out result_X.mp4.json [--overlay-mode data] [--wait]
+    python analysis_service.py status <job_id>
+    python analysis_service.py result <job_id>
+
+환경 변수
+- ANALYSIS_SERVICE_HOST     : bind 주소 (기본 127.0.0.1)
+- ANALYSIS_SERVICE_PORT     : 포트 (기본 17660)
+- ANALYSIS_SERVICE_WORKERS  : 동시에 실행할 작업 수 (기본 1, 작업 안의 stage는 PIPELINE_WORKERS로 따로 병렬)
+- ANALYSIS_SERVICE_QUEUE    : 대기+실행 중 작업 최대 수 (기본 16)
+- ANALYSIS_SERVICE_KEEP     : 메모리에 보관할 완료 작업 수 (기본 200)
+진행 이벤트는 CLI 실행과 같은 <out>.progress.ndjson 파일에도 기록된다.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+import traceback
+from collections import deque
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = Path(__file__).parent.resolve()
+DEFAULT_PORT = 17660
+# analyze_golf_video의 stage 그래프 (openpose, overlay, angles, timesformer, stgcn, mlp)
+PIPELINE_STAGES = ('openpose', 'overlay', 'angles', 'timesformer', 'stgcn', 'mlp')
+# 작업마다 메모리에 보관할 최근 진행 이벤트 수
+MAX_EVENTS = 500
+
+
+def service_address():
+    host = os.environ.get('ANALYSIS_SERVICE_HOST', '127.0.0.1')
+    port = int(os.environ.get('ANALYSIS_SERVICE_PORT', str(DEFAULT_PORT)))
+    return host, port
+
+
+def _env_int(name, default):
+    try:
+        return max(1, int(os.environ.get(name, str(default))))
+    except ValueError:
+        return default
+
+
+class QueueFull(RuntimeError):
+    pass
+
+
+class Job:
+    def __init__(self, video, user_id=None, out=None, overlay_mode=None):
+        self.job_id = uuid.uuid4().hex[:16]
+        self.video = str(video)
+        self.user_id = user_id
+        self.overlay_mode = overlay_mode    # None이면 OVERLAY_MODE 환경 변수 (analyze_golf_video)
+        # Spring과 같은 기본 결과 파일명 규칙: result_<업로드 파일명>.json
+        self.out = out or f'result_{Path(video).name}.json'
+        self.status = 'queued'
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.stages = {}    # stage_name -> 'start' | 'done' | 'fail'
+        self.result_path = None
+        self.error = None
+        self.events = deque(maxlen=MAX_EVENTS)
+        self.last_progress = {}
+
+    def on_event(self, name, event):
+        self.stages[name] = event
+
+    def on_progress(self, rec):
+        self.events.append(rec)
+        self.last_progress = rec
+
+    def events_since(self, since=0):
+        return [e for e in list(self.events) if e['seq'] > since]
+
+    def progress(self):
+        done = sum(1 for n, e in self.stages.items() if e == 'done' and n in PIPELINE_STAGES)
+        total = len(PIPELINE_STAGES)
+        if self.status == 'success':
+            done = total
+        return {
+            'stages_done': done,
+            'stages_total': total,
+            'fraction': round(done / total, 3),
+            'running': sorted(n for n, e in self.stages.items() if e == 'start'),
+            'failed': sorted(n for n, e in self.stages.items() if e == 'fail'),
+            'eta_s': self.last_progress.get('eta_s'),
+            'last_event': self.last_progress or None,
+        }
+
+    def to_dict(self):
+        now = time.time()
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'video': self.video,
+            'user_id': self.user_id,
+            'overlay_mode': self.overlay_mode,
+            'out': Path(self.out).name,
+            'progress': self.progress(),
+            'submitted_at': self.submitted_at,
+            'queued_s': round((self.started_at or now) - self.submitted_at, 3),
+            'elapsed_s': round((self.finished_at or now) - self.started_at, 3) if self.started_at else None,
+            'error': self.error,
+        }
+
+
+class JobService:
+    """bounded worker pool에서 analyze_golf_video 실행, 작업 상태는 메모리에 보관"""
+
+    def __init__(self, workers=None, max_queue=None, keep=None):
+        self.workers = workers or _env_int('ANALYSIS_SERVICE_WORKERS', 1)
+        self.max_queue = max_queue or _env_int('ANALYSIS_SERVICE_QUEUE', 16)
+        self.keep = keep or _env_int('ANALYSIS_SERVICE_KEEP', 200)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='job')
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+    def _active(self):
+        return [j for j in self._jobs.values() if j.status in ('queued', 'running')]
+
+    def submit(self, video, user_id=None, out=None, overlay_mode=None):
+        if not Path(video).exists():
+            raise FileNotFoundError(f'video not found: {video}')
+        if overlay_mode is not None:
+            from overlay_track import overlay_mode as resolve_overlay_mode
+            overlay_mode = resolve_overlay_mode(overlay_mode)
+        with self._lock:
+            if len(self._active()) >= self.max_queue:
+                raise QueueFull(f'job queue full ({self.max_queue})')
+            job = Job(video, user_id=user_id, out=out, overlay_mode=overlay_mode)
+            self._jobs[job.job_id] = job
+            self._prune_locked()
+        self._pool.submit(self._run, job)
+        print(f'[STEP] job submitted: id={job.job_id}, video={job.video}, out={job.out}'); sys.stdout.flush()
+        return job
+
+    def _prune_locked(self):
+        finished = sorted((j for j in self._jobs.values() if j.status in ('success', 'error')),
+                          key=lambda j: j.finished_at or 0)
+        for j in finished[:max(0, len(finished) - self.keep)]:
+            del self._jobs[j.job_id]
+
+    def _run(self, job):
+        from analyze_golf_video import analyze_golf_video, write_result_json, write_error_json, result_json_path
+        from pipeline_progress import progress_path_for
+        job.status = 'running'
+        job.started_at = time.time()
+        print(f'[STEP] job start: id={job.job_id}'); sys.stdout.flush()
+        try:
+            res = analyze_golf_video(job.video, user_id=job.user_id, on_event=job.on_event,
+                                     progress_path=progress_path_for(result_json_path(job.out)),
+                                     on_progress=job.on_progress, partial_out=job.out,
+                                     overlay_mode=job.overlay_mode)
+            job.result_path = write_result_json(res, job.out)
+            job.status = 'success'
+            print(f'[SUCCESS] job done: id={job.job_id}, result={job.result_path}'); sys.stdout.flush()
+        except Exception as e:
+            tb = traceback.format_exc()
+            job.error = str(e)
+            print(f'[FAIL] job failed: id={job.job_id}, error={e}', file=sys.stderr); sys.stderr.flush()
+            print(tb, file=sys.stderr); sys.stderr.flush()
+            try:
+                job.result_path = write_error_json(job.out, e, tb, user_id=job.user_id)
+            except Exception as e2:
+                print(f'[WARN] failed to write error JSON for job {job.job_id}: {e2}', file=sys.stderr); sys.stderr.flush()
+            job.status = 'error'
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda j: j.submitted_at)
+
+    def health(self):
+        with self._lock:
+            active = self._active()
+        return {
+            'ok': True,
+            'pid': os.getpid(),
+            'workers': self.workers,
+            'max_queue': self.max_queue,
+            'queued': sum(1 for j in active if j.status == 'queued'),
+            'running': sum(1 for j in active if j.status == 'running'),
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+# ======================[ HTTP ]======================
+def make_handler(service):
+    from http.server import BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        server_version = 'GolfAnalysisService/1'
+
+        def log_message(self, fmt, *args):
+            # 폴링 요청마다 stderr에 찍히지 않도록 조용히
+            pass
+
+        def _send(self, code, obj):
+            body = json.dumps(obj, ensure_ascii=False).encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _parts(self):
+            return [p for p in self.path.split('?', 1)[0].split('/') if p]
+
+        def _query(self):
+            from urllib.parse import urlparse, parse_qs
+            return {k: v[-1] for k, v in parse_qs(urlparse(self.path).query).items()}
+
+        def do_GET(self):
+            parts = self._parts()
+            if parts == ['health']:
+                return self._send(200, service.health())
+            if parts == ['jobs']:
+                return self._send(200, {'jobs': [j.to_dict() for j in service.jobs()]})
+            if len(parts) in (2, 3) and parts[0] == 'jobs':
+                job = service.get(parts[1])
+                if job is None:
+                    return self._send(404, {'error': f'unknown job: {parts[1]}'})
+                if len(parts) == 2:
+                    return self._send(200, job.to_dict())
+                if parts[2] == 'events':
+                    try:
+                        since = int(self._query().get('since', '0'))
+                    except ValueError:
+                        return self._send(400, {'error': 'since must be an integer'})
+                    return self._send(200, {'job_id': job.job_id, 'status': job.status, 'events': job.events_since(since)})
+                if parts[2] == 'result':
+                    if job.status == 'running' and job.stages.get('partial') == 'done':
+                        from analyze_golf_video import result_json_path
+                        try:
+                            with open(result_json_path(job.out), 'r', encoding='utf-8') as f:
+                                return self._send(202, json.load(f))
+                        except (OSError, ValueError):
+                            pass
+                    if job.status in ('queued', 'running') or job.result_path is None:
+                        return self._send(202, {'job_id': job.job_id, 'status': job.status, 'error': job.error})
+                    with open(job.result_path, 'r', encoding='utf-8') as f:
+                        return self._send(200, json.load(f))
+            return self._send(404, {'error': f'not found: {self.path}'})
+
+        def do_POST(self):
+            if self._parts() != ['jobs']:
+                return self._send(404, {'error': f'not found: {self.path}'})
+            try:
+                length = int(self.headers.get('Content-Length') or 0)
+                req = json.loads(self.rfile.read(length).decode('utf-8') or '{}')
+                video = req['video']
+            except (ValueError, KeyError) as e:
+                return self._send(400, {'error': f'bad request: {e}'})
+            user = req.get('user')
+            try:
+                job = service.submit(video, user_id=None if user is None else str(user), out=req.get('out'),
+                                     overlay_mode=req.get('overlay_mode'))
+            except (FileNotFoundError, ValueError) as e:
+                return self._send(400, {'error': str(e)})
+            except QueueFull as e:
+                return self._send(503, {'error': str(e)})
+            return self._send(202, {
+                'job_id': job.job_id,
+                'status': job.status,
+                'status_url': f'/jobs/{job.job_id}',
+                'result_url': f'/jobs/{job.job_id}/result',
+            })
+
+    return Handler
+
+
+def serve(host=None, port=None, workers=None, max_queue=None):
+    from http.server import ThreadingHTTPServer
+    if str(BASE_DIR) not in sys.path:
+        sys.path.insert(0, str(BASE_DIR))
+    default_host, default_port = service_address()
+    host = host or default_host
+    port = port or default_port
+    # 이전 프로세스가 죽으면서 남긴 scratch workspace 정리
+    import scratch_workspace
+    scratch_workspace.sweep_once()
+    service = JobService(workers=workers, max_queue=max_queue)
+    httpd = ThreadingHTTPServer((host, port), make_handler(service))
+    httpd.daemon_threads = True
+    print(f'[STEP] analysis service listening on http://{host}:{port} (workers={service.workers}, max_queue={service.max_queue})'); sys.stdout.flush()
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        service.shutdown()
+
+
+# ======================[ CLIENT ]======================
+def _call(method, path, payload=None, timeout=10.0):
+    """(http status, JSON body)"""
+    import urllib.request
+    import urllib.error
+    host, port = service_address()
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    req = urllib.request.Request(f'http://{host}:{port}{path}', data=data, method=method,
+                                 headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as r:
+            return r.status, json.loads(r.read().decode('utf-8'))
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read().decode('utf-8') or '{}')
+
+
+def submit(video_path, user_id=None, out=None, overlay_mode=None):
+    code, body = _call('POST', '/jobs', {'video': str(Path(video_path).resolve()), 'user': user_id, 'out': out,
+                                         'overlay_mode': overlay_mode})
+    if code != 202:
+        raise RuntimeError(f'submit failed ({code}): {body.get("error")}')
+    return body['job_id']
+
+
+def status(job_id):
+    return _call('GET', f'/jobs/{job_id}')[1]
+
+
+def events(job_id, since=0):
+    return _call('GET', f'/jobs/{job_id}/events?since={int(since)}')[1]
+
+
+def result(job_id):
+    """결과 JSON, 아직 끝나지 않았으면 None"""
+    code, body = _call('GET', f'/jobs/{job_id}/result')
+    if code == 202:
+        return None
+    if code != 200:
+        raise RuntimeError(f'result failed ({code}): {body.get("error")}')
+    return body
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='로컬 비동기 분석 작업 서비스')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p_serve = sub.add_parser('serve', help='서비스 실행')
+    p_serve.add_argument('--host', default=None)
+    p_serve.add_argument('--port', type=int, default=None)
+    p_serve.add_argument('--workers', type=int, default=None, help='동시에 실행할 작업 수 (기본: ANALYSIS_SERVICE_WORKERS 또는 1)')
+    p_serve.add_argument('--max-queue', type=int, default=None, help='대기+실행 작업 최대 수 (기본: ANALYSIS_SERVICE_QUEUE 또는 16)')
+    p_submit = sub.add_parser('submit', help='작업 제출 후 job id 출력')
+    p_submit.add_argument('--video', required=True)
+    p_submit.add_argument('--user', default=None)
+    p_submit.add_argument('--out', default=None)
+    p_submit.add_argument('--overlay-mode', choices=['video', 'data'], default=None,
+                          help='data: skeleton 비디오 대신 프론트용 keypoint track (기본: 서비스의 OVERLAY_MODE 또는 video)')
+    p_submit.add_argument('--wait', action='store_true', help='끝날 때까지 기다린 뒤 결과 출력')
+    for name in ('status', 'result'):
+        p = sub.add_parser(name)
+        p.add_argument('job_id')
+    args = parser.parse_args()
+    if args.cmd == 'serve':
+        serve(args.host, args.port, args.workers, args.max_queue)
+    elif args.cmd == 'submit':
+        job_id = submit(args.video, args.user, args.out, args.overlay_mode)
+        if not args.wait:
+            print(job_id)
+        else:
+            while True:
+                res = result(job_id)
+                if res is not None:
+                    print(json.dumps(res, ensure_ascii=False, indent=2))
+                    sys.exit(0 if res.get('status') != 'error' else 1)
+                time.sleep(2.0)
+    elif args.cmd == 'status':
+        print(json.dumps(status(args.job_id), ensure_ascii=False, indent=2))
+    else:
+        res = result(args.job_id)
+        print(json.dumps(res if res is not None else status(args.job_id), ensure_ascii=False, indent=2))
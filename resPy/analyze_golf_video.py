@@ -1,7 +1,7 @@
 """
 Golf AI 멀티모달 분석 파이프라인 (단일 비디오)
 - 입력: 비디오 파일 경로
-- 출력: skeleton 비디오, crop_video, crop_csv, 임베딩, 분류 결과
+- 출력: skeleton 비디오, crop_video, crop keypoint track (+ 요청 시 crop_csv), 임베딩, 분류 결과
 """
 
 
@@ -10,28 +10,133 @@ from pathlib import Path
 import json
 import subprocess
 import sys
-from openpose_skeleton_overlay import openpose_skeleton_overlay
 
 # 1. OpenPose로 skeleton 추출 및 skeleton 비디오 생성
-# 2. crop_video, crop_csv 생성
+# 2. crop_video, crop keypoint track 생성
 # 3. crop_video → Timesformer 임베딩 추출
-# 4. crop_csv → mmaction 임베딩 추출
+# 4. crop keypoint → mmaction 임베딩 추출
 # 5. MLP 이진분류
 # 6. 결과 및 skeleton 비디오 spring으로 반환
 
-def analyze_golf_video(input_video_path, user_id=None):
+# 임베딩 종류별 (conda 환경, 추출 스크립트)
+EMBEDDING_SCRIPTS = {
+    'timesformer': ('timesformer', 'extract_timesformer_single.py'),
+    'stgcn': ('mmaction', 'extract_stgcn_single.py'),
+}
+
+
+# stage별 (버전, 코드 파일) — stage_manifest fingerprint용. 결과 의미가 바뀌면 버전을 올린다.
+STAGE_SPECS = {
+    'openpose': (2, ['openpose_utils.py', 'keypoint_track.py', 'pose_stride.py', 'bbox_proxy.py',
+                      'person_tracker.py', 'swing_window.py', 'pose_chunks.py',
+                      'media_transcode.py', 'frame_store.py']),
+    'overlay': (3, ['openpose_skeleton_overlay.py', 'keypoint_track.py', 'media_transcode.py', 'overlay_track.py']),
+    'angles': (2, ['save_angle_json.py', 'keypoint_track.py']),
+    'timesformer': (1, ['extract_timesformer_single.py']),
+    'stgcn': (1, ['extract_stgcn_single.py', 'my_stgcnpp.py', 'keypoint_track.py']),
+    'mlp': (1, ['mlp_classifier.py']),
+}
+
+# stage 의존 관계 (run_stage_graph, 진행률 ETA critical path 계산에 같이 사용)
+STAGE_DEPS = {
+    'openpose': (),
+    'overlay': ('openpose',),
+    'angles': ('openpose',),
+    'timesformer': ('openpose',),
+    'stgcn': ('openpose',),
+    'mlp': ('stgcn',),
+}
+
+
+def run_in_conda_env(env_name, script_path, args):
+    cmd = ['conda', 'run', '--no-capture-output', '-n', env_name, 'python', '-u', script_path] + [str(a) for a in args]
+    env = os.environ.copy()
+    env['CUBLAS_WORKSPACE_CONFIG'] = ':16:8'
+    env['KMP_DUPLICATE_LIB_OK'] = 'TRUE'
+    env['PYTHONIOENCODING'] = 'utf-8'
+    print('[RUN] ' + ' '.join(cmd)); sys.stdout.flush()
+    print('[DEBUG] run_in_conda_env: cwd=' + os.getcwd()); sys.stdout.flush()
+    print('[DEBUG] run_in_conda_env: env=' + str({k:env[k] for k in ["CUBLAS_WORKSPACE_CONFIG","KMP_DUPLICATE_LIB_OK","PYTHONIOENCODING"] if k in env})); sys.stdout.flush()
+    result = subprocess.run(cmd, stdout=sys.stdout, stderr=sys.stderr, env=env)
+    if result.returncode != 0:
+        print(f'[FAIL] Subprocess failed: cmd={cmd}, returncode={result.returncode}', file=sys.stderr); sys.stderr.flush()
+        raise subprocess.CalledProcessError(result.returncode, result.args)
+
+
+def run_embedding(kind, input_path, out_npy_path):
+    """
+    임베딩 추출: 모델이 로드된 상주 데몬(embedding_daemon)을 먼저 사용하고,
+    데몬을 쓸 수 없으면 기존 conda run subprocess 경로로 fallback
+    """
+    from embedding_daemon import embed_with_daemon
+    if embed_with_daemon(kind, input_path, out_npy_path):
+        return
+    env_name, script = EMBEDDING_SCRIPTS[kind]
+    run_in_conda_env(env_name, str(Path(__file__).parent / script), [input_path, out_npy_path])
+
+
+def analyze_golf_video(input_video_path, user_id=None, max_workers=None, resume=True, on_event=None,
+                       progress_path=None, on_progress=None, partial_out=None, overlay_mode=None):
     """
     전체 파이프라인 실행 함수
     input_video_path: str or Path
     user_id: str or None (선택 사항)
-    return: dict (결과 json)
+    max_workers: 동시에 실행할 stage 수 (None이면 PIPELINE_WORKERS 환경변수, 기본 4)
+    resume: True면 manifest/<basename>.json 기록으로 fingerprint가 같은 완료 stage를 건너뜀
+    on_event: optional callback(stage_name, event) — run_stage_graph와 같음
+    progress_path: 진행 이벤트 NDJSON 파일 경로 (None이면 파일 기록 안 함, pipeline_progress)
+    on_progress: optional callback(event_dict) — 진행 이벤트 (작업 서비스 진행률/ETA용)
+    partial_out: 결과 JSON 이름 — 주어지면 openpose/overlay/angles가 끝나는 즉시
+                 status='partial' 결과를 먼저 기록 (분류 필드는 null, 최종 결과가 나중에 덮어씀)
+    overlay_mode: 'video' (skeleton overlay 비디오 인코딩) | 'data' (overlay_track: 프론트가 crop 비디오 위에 그릴
+                  keypoint track만, 인코딩 없음) — None이면 OVERLAY_MODE 환경 변수 (기본 'video')
+    return: dict (결과 json, stage별 계측은 'timings' 섹션 — pipeline_spans)
+
+    stage 그래프 (crop_video/keypoint track이 나온 뒤의 stage들은 서로 독립이라 동시에 실행):
+        openpose ─┬─ overlay
+                  ├─ angles
+                  ├─ timesformer
+                  └─ stgcn ── mlp
+    openpose + overlay + angles 완료 → partial 결과 기록 (partial_out)
     """
-    from pathlib import Path
-    import shutil
-    import numpy as np
-    import torch
-    import sys
-    import logging
+    from pipeline_spans import SpanRecorder, recording, span
+    from pipeline_progress import ProgressChannel, reporting
+    recorder = SpanRecorder(meta={'video': Path(input_video_path).name, 'user_id': user_id})
+    progress = ProgressChannel(progress_path, stage_deps=STAGE_DEPS,
+                               listeners=[on_progress] if on_progress is not None else ())
+
+    def _on_event(name, event):
+        progress.on_stage_event(name, event)
+        if on_event is not None:
+            on_event(name, event)
+
+    progress.emit('pipeline_start', video=str(input_video_path))
+    try:
+        with recording(recorder), reporting(progress), span('pipeline'):
+            result = _run_pipeline(input_video_path, user_id, max_workers, resume, _on_event, partial_out,
+                                   overlay_mode)
+    except BaseException as e:
+        progress.emit('pipeline_error', error=str(e))
+        raise
+    finally:
+        recorder.flush_metrics()
+    progress.emit('pipeline_done', status=result.get('status'))
+    result['timings'] = recorder.summary()
+    return result
+
+
+def _run_pipeline(input_video_path, user_id, max_workers, resume, on_event, partial_out=None, overlay_mode=None):
+    from pipeline_dag import Stage, run_stage_graph
+    from stage_manifest import StageManifest, manifest_enabled, run_stage_cached
+    from openpose_utils import single_pass_enabled, pose_backend_name
+    from keypoint_track import meta_path as keypoints_meta_path, csv_export_enabled
+    from pose_stride import stride_config
+    from bbox_proxy import proxy_config
+    from swing_window import trim_config
+    from media_transcode import transcode_config, encoder_config
+    import overlay_track
+    overlay_mode = overlay_track.overlay_mode(overlay_mode)
+    from pipeline_spans import span
     # 경로 세팅
     input_video_path = Path(input_video_path)
     basename = input_video_path.stem
@@ -48,169 +153,328 @@ def analyze_golf_video(input_video_path, user_id=None):
     angle_dir = base_dir / "angle"
     angle_dir.mkdir(exist_ok=True, parents=True)
 
-    # 1. OpenPose 실행 및 skeleton 비디오 생성
-    # (openpose 실행, crop, csv, skeleton 비디오 생성)
+    timesformer_emb_path = embedding_dir / f"{basename}_timesformer.npy"
+    stgcn_emb_path = embedding_dir / f"{basename}_stgcn.npy"
+
+    # 0. 결과 캐시 조회: 같은 비디오 바이트 + 같은 파이프라인/모델 fingerprint면 산출물을 새 이름으로 link해서 즉시 반환
+    import result_cache
+    result_cache_key = None
+    # 입력 비디오 digest는 여기서 한 번만 계산 → 결과 캐시, stage manifest, mezzanine/pose chunk checkpoint key가 같이 씀
     try:
-        print(f'[STEP] OpenPose start: input={input_video_path}'); sys.stdout.flush()
-        from openpose_utils import run_openpose_and_crop
-        crop_video_path, crop_csv_path = run_openpose_and_crop(
-            input_video_path, crop_video_dir, crop_csv_dir, skeleton_video_dir
-        )
-        # sanity check: ensure outputs exist
-        if not Path(crop_video_path).exists():
-            raise FileNotFoundError(f'crop_video not created by OpenPose: {crop_video_path}')
-        if not Path(crop_csv_path).exists():
-            raise FileNotFoundError(f'crop_csv not created by OpenPose: {crop_csv_path}')
-        print(f'[SUCCESS] OpenPose done: crop_video={crop_video_path}, crop_csv={crop_csv_path}'); sys.stdout.flush()
-
-        # openpose 좌표 기반 skeleton overlay 비디오(h264)만 생성
+        with span('input.digest'):
+            video_digest = result_cache.hash_file(input_video_path)
+    except OSError as e:
+        print(f'[WARN] input digest failed: {e}', file=sys.stderr); sys.stderr.flush()
+        video_digest = None
+    if result_cache.cache_enabled() and video_digest is not None:
+        try:
+            with span('result_cache.lookup') as sp:
+                result_cache_key = result_cache.cache_key(video_digest, options={'overlay_mode': overlay_mode})
+                entry = result_cache.lookup(result_cache_key)
+                if entry is not None:
+                    # run_openpose_and_crop / stage들이 쓰는 것과 같은 파일명 규칙
+                    cached_base_name = Path(f"{basename}_crop.mp4").stem.replace('_crop', '')
+                    targets = {
+                        'crop_video': crop_video_dir / f"{basename}_crop.mp4",
+                        'crop_keypoints': crop_csv_dir / f"{basename}_crop.kps.npy",
+                        'crop_csv': crop_csv_dir / f"{basename}_crop.csv",
+                        'angle_json': angle_dir / (cached_base_name + '_angles.json'),
+                        'embedding_timesformer': timesformer_emb_path,
+                        'embedding_stgcn': stgcn_emb_path,
+                        'openpose_skeleton_video_h264': skeleton_video_dir / (cached_base_name + '_crop_openpose_skeleton_h264.mp4'),
+                        'overlay_track': overlay_track.track_path(skeleton_video_dir, cached_base_name + '_crop'),
+                    }
+                    result = result_cache.materialize(entry, targets, user_id=user_id)
+                    sp.set(hit=True)
+                    print(f'[CACHE] result cache hit: key={result_cache_key[:12]}, input={input_video_path}'); sys.stdout.flush()
+                    return result
+                sp.set(hit=False)
+                print(f'[CACHE] result cache miss: key={result_cache_key[:12]}'); sys.stdout.flush()
+        except Exception as e:
+            print(f'[WARN] result cache lookup failed: {e}', file=sys.stderr); sys.stderr.flush()
+            result_cache_key = None
+
+    # 1. OpenPose 실행 (openpose 실행, crop, keypoint track 생성)
+    def stage_openpose(_):
+        try:
+            print(f'[STEP] OpenPose start: input={input_video_path}'); sys.stdout.flush()
+            from openpose_utils import run_openpose_and_crop
+            crop_video_path, keypoints_path = run_openpose_and_crop(
+                input_video_path, crop_video_dir, crop_csv_dir, skeleton_video_dir, input_digest=video_digest
+            )
+            # sanity check: ensure outputs exist
+            if not Path(crop_video_path).exists():
+                raise FileNotFoundError(f'crop_video not created by OpenPose: {crop_video_path}')
+            if not Path(keypoints_path).exists():
+                raise FileNotFoundError(f'keypoint track not created by OpenPose: {keypoints_path}')
+            # crop_csv는 KEYPOINT_CSV=1일 때만 생성 (호환용 export)
+            crop_csv_path = crop_csv_dir / f"{basename}_crop.csv"
+            crop_csv_path = crop_csv_path if csv_export_enabled() and crop_csv_path.exists() else None
+            print(f'[SUCCESS] OpenPose done: crop_video={crop_video_path}, keypoints={keypoints_path}'); sys.stdout.flush()
+        except Exception as e:
+            import traceback
+            tb = traceback.format_exc()
+            print(f'[FAIL] openpose stage failed: input={input_video_path}, error={e}', file=sys.stderr); sys.stderr.flush()
+            print(tb, file=sys.stderr); sys.stderr.flush()
+            raise
         base_name = Path(crop_video_path).stem.replace('_crop', '')
-        openpose_skeleton_video_path = skeleton_video_dir / (base_name + '_crop_openpose_skeleton_h264.mp4')
-        print(f'[STEP] openpose_skeleton_overlay: crop_video={crop_video_path}, crop_csv={crop_csv_path}, out={openpose_skeleton_video_path}'); sys.stdout.flush()
-        # Generate points-only overlay to match frontend expectation
-        openpose_skeleton_overlay(str(crop_video_path), str(crop_csv_path), str(openpose_skeleton_video_path), fourcc_code='avc1', points_only=True)
-        print(f'[SUCCESS] openpose_skeleton_overlay done: {openpose_skeleton_video_path}'); sys.stdout.flush()
-
-        # --- generate angle JSON (angles, fps, com_stability_scores) and embed in result ---
-        generated_angles = None
-        generated_fps = None
-        generated_com_scores = []
-        angle_json_path = None
+        return {'crop_video': crop_video_path, 'keypoints': keypoints_path, 'crop_csv': crop_csv_path, 'base_name': base_name}
+
+    # 1-1. openpose 좌표 기반 skeleton overlay 비디오(h264)만 생성
+    #      overlay_mode='data'면 비디오 대신 프론트 canvas용 keypoint track (overlay_track)
+    def stage_overlay(done):
+        op = done['openpose']
+        if overlay_mode == 'data':
+            out_path = overlay_track.track_path(skeleton_video_dir, op['base_name'] + '_crop')
+        else:
+            out_path = skeleton_video_dir / (op['base_name'] + '_crop_openpose_skeleton_h264.mp4')
+        try:
+            if overlay_mode == 'data':
+                print(f'[STEP] overlay track: keypoints={op["keypoints"]}, out={out_path}'); sys.stdout.flush()
+                with span('overlay.track'):
+                    overlay_track.write_track(op['keypoints'], out_path)
+                print(f'[SUCCESS] overlay track done: {out_path}'); sys.stdout.flush()
+                return {'video': None, 'track': out_path}
+            print(f'[STEP] openpose_skeleton_overlay: crop_video={op["crop_video"]}, keypoints={op["keypoints"]}, out={out_path}'); sys.stdout.flush()
+            # Generate points-only overlay to match frontend expectation
+            from openpose_skeleton_overlay import openpose_skeleton_overlay
+            openpose_skeleton_overlay(str(op['crop_video']), str(op['keypoints']), str(out_path), fourcc_code='avc1', points_only=True)
+            print(f'[SUCCESS] openpose_skeleton_overlay done: {out_path}'); sys.stdout.flush()
+        except Exception as e:
+            import traceback
+            tb = traceback.format_exc()
+            print(f'[FAIL] overlay stage failed (mode={overlay_mode}): keypoints={op["keypoints"]}, out={out_path}, error={e}', file=sys.stderr); sys.stderr.flush()
+            print(tb, file=sys.stderr); sys.stderr.flush()
+            raise
+        return {'video': out_path, 'track': None}
+
+    # 1-2. generate angle JSON (angles, fps, com_stability_scores) and embed in result
+    def stage_angles(done):
+        op = done['openpose']
+        out = {'angles': None, 'fps': None, 'com_scores': [], 'angle_json_path': None}
         try:
-            # local import to avoid heavy deps at module import timeB
-            import cv2 as _cv2
+            # local import to avoid heavy deps at module import time
             from save_angle_json import save_angle_json
             # store angle JSONs in dedicated angle directory (not result folder)
-            angle_json_path = angle_dir / (base_name + '_angles.json')
-            # read fps from crop video
-            cap_tmp = _cv2.VideoCapture(str(crop_video_path))
-            fps_val = cap_tmp.get(_cv2.CAP_PROP_FPS)
-            cap_tmp.release()
-            if fps_val is None or fps_val != fps_val:  # NaN check
-                fps_val = 30
-            # create angle json
-            save_angle_json(str(crop_csv_path), str(angle_json_path), int(round(fps_val)))
+            angle_json_path = angle_dir / (op['base_name'] + '_angles.json')
+            # create angle json (fps는 keypoint track 메타데이터 = crop 비디오 fps)
+            save_angle_json(str(op['keypoints']), str(angle_json_path))
+            out['angle_json_path'] = angle_json_path
             # read back and attach
             if angle_json_path.exists():
                 with open(angle_json_path, 'r', encoding='utf-8') as af:
                     aj = json.load(af)
-                generated_angles = aj.get('angles')
-                generated_fps = aj.get('fps')
-                generated_com_scores = aj.get('com_stability_scores', [])
+                out['angles'] = aj.get('angles')
+                out['fps'] = aj.get('fps')
+                out['com_scores'] = aj.get('com_stability_scores', [])
         except Exception as e:
             print(f'[WARN] angle JSON generation failed: {e}', file=sys.stderr); sys.stderr.flush()
-            angle_json_path = None
-    except Exception as e:
-        import traceback
-        tb = traceback.format_exc()
-        print(f'[FAIL] OpenPose/Angle failed: input={input_video_path}, error={e}', file=sys.stderr); sys.stderr.flush()
-        print(tb, file=sys.stderr); sys.stderr.flush()
-        raise
-
-    # 2. Timesformer 임베딩 추출 (crop_video) - 가상환경 subprocess 실행
-    def run_in_conda_env(env_name, script_path, args):
-        cmd = ['conda', 'run', '--no-capture-output', '-n', env_name, 'python', '-u', script_path] + [str(a) for a in args]
-        env = os.environ.copy()
-        env['CUBLAS_WORKSPACE_CONFIG'] = ':16:8'
-        env['KMP_DUPLICATE_LIB_OK'] = 'TRUE'
-        env['PYTHONIOENCODING'] = 'utf-8'
-        print('[RUN] ' + ' '.join(cmd)); sys.stdout.flush()
-        print('[DEBUG] run_in_conda_env: cwd=' + os.getcwd()); sys.stdout.flush()
-        print('[DEBUG] run_in_conda_env: env=' + str({k:env[k] for k in ["CUBLAS_WORKSPACE_CONFIG","KMP_DUPLICATE_LIB_OK","PYTHONIOENCODING"] if k in env})); sys.stdout.flush()
-        result = subprocess.run(cmd, stdout=sys.stdout, stderr=sys.stderr, env=env)
-        if result.returncode != 0:
-            print(f'[FAIL] Subprocess failed: cmd={cmd}, returncode={result.returncode}', file=sys.stderr); sys.stderr.flush()
-            raise subprocess.CalledProcessError(result.returncode, result.args)
+            out['angle_json_path'] = None
+        return out
 
-    timesformer_emb_path = embedding_dir / f"{basename}_timesformer.npy"
-    try:
-        print(f'[STEP] Timesformer embedding start: input={crop_video_path}, output={timesformer_emb_path}'); sys.stdout.flush()
-        run_in_conda_env('timesformer', str(Path(__file__).parent / 'extract_timesformer_single.py'), [crop_video_path, timesformer_emb_path])
-        print(f'[SUCCESS] Timesformer embedding done: {timesformer_emb_path}'); sys.stdout.flush()
-    except Exception as e:
-        import traceback
-        tb = traceback.format_exc()
-        print(tb, file=sys.stderr); sys.stderr.flush()
-        raise
+    # 2. Timesformer 임베딩 추출 (crop_video) - 상주 데몬 우선, 실패 시 가상환경 subprocess 실행
+    def stage_timesformer(done):
+        crop_video_path = done['openpose']['crop_video']
+        try:
+            print(f'[STEP] Timesformer embedding start: input={crop_video_path}, output={timesformer_emb_path}'); sys.stdout.flush()
+            run_embedding('timesformer', crop_video_path, timesformer_emb_path)
+            print(f'[SUCCESS] Timesformer embedding done: {timesformer_emb_path}'); sys.stdout.flush()
+        except Exception as e:
+            import traceback
+            tb = traceback.format_exc()
+            print(tb, file=sys.stderr); sys.stderr.flush()
+            raise
+        return timesformer_emb_path
 
-    # 3. STGCN 임베딩 추출 (crop_csv) - 가상환경 subprocess 실행
-    stgcn_emb_path = embedding_dir / f"{basename}_stgcn.npy"
-    try:
-        print(f'[STEP] STGCN embedding start: input={crop_csv_path}, output={stgcn_emb_path}'); sys.stdout.flush()
-        run_in_conda_env('mmaction', str(Path(__file__).parent / 'extract_stgcn_single.py'), [crop_csv_path, stgcn_emb_path])
-        # npy 파일 생성 후 존재 여부 체크
-        if not stgcn_emb_path.exists():
-            print(f'[FAIL] STGCN embedding npy not found: {stgcn_emb_path}', file=sys.stderr); sys.stderr.flush()
-            raise FileNotFoundError(f'STGCN npy not found: {stgcn_emb_path}')
-        print(f'[SUCCESS] STGCN embedding done: {stgcn_emb_path}'); sys.stdout.flush()
-    except Exception as e:
-        import traceback
-        tb = traceback.format_exc()
-        print(f'[FAIL] STGCN embedding failed: input={crop_csv_path}, output={stgcn_emb_path}, error={e}', file=sys.stderr); sys.stderr.flush()
-        print(tb, file=sys.stderr); sys.stderr.flush()
-        raise
+    # 3. STGCN 임베딩 추출 (keypoint track) - 상주 데몬 우선, 실패 시 가상환경 subprocess 실행
+    def stage_stgcn(done):
+        keypoints_path = done['openpose']['keypoints']
+        try:
+            print(f'[STEP] STGCN embedding start: input={keypoints_path}, output={stgcn_emb_path}'); sys.stdout.flush()
+            run_embedding('stgcn', keypoints_path, stgcn_emb_path)
+            # npy 파일 생성 후 존재 여부 체크
+            if not stgcn_emb_path.exists():
+                print(f'[FAIL] STGCN embedding npy not found: {stgcn_emb_path}', file=sys.stderr); sys.stderr.flush()
+                raise FileNotFoundError(f'STGCN npy not found: {stgcn_emb_path}')
+            print(f'[SUCCESS] STGCN embedding done: {stgcn_emb_path}'); sys.stdout.flush()
+        except Exception as e:
+            import traceback
+            tb = traceback.format_exc()
+            print(f'[FAIL] STGCN embedding failed: input={keypoints_path}, output={stgcn_emb_path}, error={e}', file=sys.stderr); sys.stderr.flush()
+            print(tb, file=sys.stderr); sys.stderr.flush()
+            raise
+        return stgcn_emb_path
 
     # 4. MLP 이진분류 (예외 발생 시에도 결과 구조 보장)
-    from mlp_classifier import mlp_predict
-    mlp_result = None
-    mlp_error = None
-    try:
-        print(f'[STEP] MLP classification start: timesformer={timesformer_emb_path}, stgcn={stgcn_emb_path}'); sys.stdout.flush()
-        # Pass explicit model_path to avoid legacy two-arg ambiguity in mlp_predict
-        default_model = Path(__file__).parent.resolve() / 'mlp_model.pth'
-        mlp_result = mlp_predict(str(stgcn_emb_path), model_path=str(default_model))
-        print(f'[SUCCESS] MLP classification done: result={mlp_result}'); sys.stdout.flush()
-    except Exception as e:
-        import traceback
-        tb = traceback.format_exc()
-        print(f'[FAIL] MLP classification failed: timesformer={timesformer_emb_path}, stgcn={stgcn_emb_path}, error={e}', file=sys.stderr); sys.stderr.flush()
-        print(tb, file=sys.stderr); sys.stderr.flush()
-        mlp_error = str(e)
-        mlp_result = {
-            "prob_true": None,
-            "prob_false": None,
-            "pred": None,
-            "error": mlp_error
-        }
-
-    # 5. 결과 반환
-    result = {
-        "user_id": user_id,
-        "openpose_skeleton_video_h264": str(openpose_skeleton_video_path),
-        "crop_video": str(crop_video_path),
-        "crop_csv": str(crop_csv_path),
-        "embedding_timesformer": str(timesformer_emb_path),
-        "embedding_stgcn": str(stgcn_emb_path),
-        "mlp_result": mlp_result,
-    "status": "success",
-    "result_version": 1,
-        # 호환성: 이전 파이프라인 key도 항상 포함
-        "angle_json": None,
-        "skeleton_video": None
-    }
-    # Attach angle/com info if generated
-    if generated_angles is not None:
-        result['angles'] = generated_angles
-    if generated_fps is not None:
-        result['fps'] = generated_fps
-    if generated_com_scores:
-        result['com_stability_scores'] = generated_com_scores
-    if angle_json_path is not None:
-        # store filename only for frontend compatibility
+    def stage_mlp(done):
+        from mlp_classifier import mlp_predict
+        mlp_error = None
         try:
-            result['angle_json'] = Path(angle_json_path).name
-        except Exception:
-            result['angle_json'] = str(angle_json_path)
-    else:
-        # ensure angle_json points at filename if it exists in angle folder
-        candidate = angle_dir / (Path(crop_video_path).stem.replace('_crop', '') + '_angles.json')
-        if candidate.exists():
+            print(f'[STEP] MLP classification start: timesformer={timesformer_emb_path}, stgcn={stgcn_emb_path}'); sys.stdout.flush()
+            # Pass explicit model_path to avoid legacy two-arg ambiguity in mlp_predict
+            default_model = Path(__file__).parent.resolve() / 'mlp_model.pth'
+            mlp_result = mlp_predict(str(stgcn_emb_path), model_path=str(default_model))
+            print(f'[SUCCESS] MLP classification done: result={mlp_result}'); sys.stdout.flush()
+        except Exception as e:
+            import traceback
+            tb = traceback.format_exc()
+            print(f'[FAIL] MLP classification failed: timesformer={timesformer_emb_path}, stgcn={stgcn_emb_path}, error={e}', file=sys.stderr); sys.stderr.flush()
+            print(tb, file=sys.stderr); sys.stderr.flush()
+            mlp_error = str(e)
+            mlp_result = {
+                "prob_true": None,
+                "prob_false": None,
+                "pred": None,
+                "error": mlp_error
+            }
+        return {'mlp_result': mlp_result, 'mlp_error': mlp_error}
+
+    # stage manifest: fingerprint(입력 산출물/코드/모델)가 같은 완료 stage는 건너뛰고, 죽은 작업은 이어서 실행
+    manifest = None
+    if resume and manifest_enabled():
+        manifest = StageManifest(base_dir / 'manifest' / f'{basename}.json')
+        if video_digest is not None:
+            manifest.remember_digest(input_video_path, video_digest)
+
+    def with_manifest(name, fn, inputs, models=(), outputs_of=None, should_record=None, config=None):
+        version, sources = STAGE_SPECS[name]
+        def run(done):
+            with span(f'stage.{name}'):
+                if manifest is None:
+                    return fn(done)
+                fp = manifest.fingerprint(version, sources=sources, inputs=inputs(done), models=models, config=config)
+                return run_stage_cached(manifest, name, lambda: fn(done), fp,
+                                        outputs_of=outputs_of, should_record=should_record)
+        return run
+
+    keypoint_files = lambda op: [op['keypoints'], keypoints_meta_path(op['keypoints'])]
+    crop_outputs = lambda done: [done['openpose']['crop_video']] + keypoint_files(done['openpose'])
+    stages = [
+        Stage('openpose', with_manifest(
+            'openpose', stage_openpose,
+            inputs=lambda done: [input_video_path],
+            outputs_of=lambda v: [v['crop_video']] + keypoint_files(v) + ([v['crop_csv']] if v['crop_csv'] else []),
+            config={'single_pass': single_pass_enabled(), 'pose_backend': pose_backend_name(),
+                    'pose_input_height': os.environ.get('POSE_INPUT_HEIGHT'),
+                    'keypoint_csv': csv_export_enabled(), 'pose_stride': stride_config(),
+                    'bbox_proxy': proxy_config(), 'max_people': os.environ.get('POSE_MAX_PEOPLE'),
+                    'swing_trim': trim_config(), 'transcode': transcode_config()})),
+        Stage('overlay', with_manifest(
+            'overlay', stage_overlay, inputs=crop_outputs,
+            outputs_of=lambda v: [p for p in (v['video'], v['track']) if p],
+            config={'mode': overlay_mode, 'encoder': encoder_config('OVERLAY') if overlay_mode == 'video' else None}),
+            deps=STAGE_DEPS['overlay']),
+        Stage('angles', with_manifest(
+            'angles', stage_angles, inputs=crop_outputs,
+            outputs_of=lambda v: [v['angle_json_path']],
+            should_record=lambda v: v['angle_json_path'] is not None), deps=STAGE_DEPS['angles']),
+        Stage('timesformer', with_manifest(
+            'timesformer', stage_timesformer,
+            inputs=lambda done: [done['openpose']['crop_video']],
+            models=[base_dir / 'timesformer_model.pth'],
+            outputs_of=lambda v: [v]), deps=STAGE_DEPS['timesformer']),
+        Stage('stgcn', with_manifest(
+            'stgcn', stage_stgcn,
+            inputs=lambda done: keypoint_files(done['openpose']),
+            models=[base_dir / 'stgcn_62p.pth'],
+            outputs_of=lambda v: [v]), deps=STAGE_DEPS['stgcn']),
+        Stage('mlp', with_manifest(
+            'mlp', stage_mlp,
+            inputs=lambda done: [done['stgcn']],
+            models=[base_dir / 'mlp_model.pth'],
+            should_record=lambda v: not v['mlp_error'] and not (v['mlp_result'] or {}).get('error')), deps=STAGE_DEPS['mlp']),
+    ]
+
+    def build_result(outputs, status='success'):
+        """stage 결과 → 결과 JSON dict. status='partial'이면 아직 안 끝난 임베딩/분류 필드는 null"""
+        crop_video_path = outputs['openpose']['crop_video']
+        keypoints_path = outputs['openpose']['keypoints']
+        crop_csv_path = outputs['openpose']['crop_csv']
+        openpose_skeleton_video_path = outputs['overlay']['video']
+        overlay_track_path = outputs['overlay']['track']
+        generated_angles = outputs['angles']['angles']
+        generated_fps = outputs['angles']['fps']
+        generated_com_scores = outputs['angles']['com_scores']
+        angle_json_path = outputs['angles']['angle_json_path']
+        final = status != 'partial'
+
+        result = {
+            "user_id": user_id,
+            "openpose_skeleton_video_h264": str(openpose_skeleton_video_path) if openpose_skeleton_video_path else None,
+            # overlay_mode='data'면 skeleton 비디오 대신 프론트가 그릴 keypoint track (overlay_track 형식)
+            "overlay_mode": overlay_mode,
+            "overlay_track": str(overlay_track_path) if overlay_track_path else None,
+            "crop_video": str(crop_video_path),
+            "crop_keypoints": str(keypoints_path),
+            # 호환용 CSV (KEYPOINT_CSV=1일 때만, 아니면 null)
+            "crop_csv": str(crop_csv_path) if crop_csv_path else None,
+            "embedding_timesformer": str(timesformer_emb_path) if final else None,
+            "embedding_stgcn": str(stgcn_emb_path) if final else None,
+            "mlp_result": outputs['mlp']['mlp_result'] if final else None,
+        "status": status,
+        "result_version": 1,
+            # 호환성: 이전 파이프라인 key도 항상 포함
+            "angle_json": None,
+            "skeleton_video": None
+        }
+        if not final:
+            # 아직 실행 중인 stage (프론트는 status가 바뀔 때까지 계속 폴링)
+            result['pending'] = [n for n in ('timesformer', 'stgcn', 'mlp') if n not in outputs]
+        # Attach angle/com info if generated
+        if generated_angles is not None:
+            result['angles'] = generated_angles
+        if generated_fps is not None:
+            result['fps'] = generated_fps
+        if generated_com_scores:
+            result['com_stability_scores'] = generated_com_scores
+        if angle_json_path is not None:
+            # store filename only for frontend compatibility
             try:
-                result['angle_json'] = candidate.name
+                result['angle_json'] = Path(angle_json_path).name
             except Exception:
-                result['angle_json'] = str(candidate)
+                result['angle_json'] = str(angle_json_path)
+        else:
+            # ensure angle_json points at filename if it exists in angle folder
+            candidate = angle_dir / (Path(crop_video_path).stem.replace('_crop', '') + '_angles.json')
+            if candidate.exists():
+                try:
+                    result['angle_json'] = candidate.name
+                except Exception:
+                    result['angle_json'] = str(candidate)
+        return result
+
+    # 4-1. 차트/스켈레톤에 필요한 stage가 끝나면 임베딩/분류를 기다리지 않고 partial 결과를 먼저 기록
+    if partial_out is not None:
+        def stage_partial(done):
+            try:
+                with span('result.partial'):
+                    out_path = write_result_json(build_result(done, status='partial'), partial_out)
+                print(f'[STEP] partial result written: {out_path}'); sys.stdout.flush()
+            except Exception as e:
+                # 최종 결과는 그대로 기록되므로 partial 실패는 경고만
+                print(f'[WARN] partial result write failed: {e}', file=sys.stderr); sys.stderr.flush()
+        stages.append(Stage('partial', stage_partial, deps=('openpose', 'overlay', 'angles')))
+
+    try:
+        outputs = run_stage_graph(stages, max_workers=max_workers, on_event=on_event)
+    finally:
+        # decode-once frame store는 이번 실행의 crop/overlay/TimeSformer 용도로만 씀 (store 위치는 crop sidecar에 있음)
+        import frame_store
+        frame_store.release(linked=[crop_video_dir / f"{basename}_crop.mp4"])
+
+    # 5. 결과 반환
+    result = build_result(outputs)
+    mlp_result = outputs['mlp']['mlp_result']
+    mlp_error = outputs['mlp']['mlp_error']
     if mlp_error:
         result["mlp_error_detail"] = mlp_error
+    # 완전히 성공한 결과만 캐시에 저장 (MLP 실패 결과는 다음 업로드에서 다시 시도)
+    if result_cache_key is not None and not mlp_error and not (mlp_result or {}).get("error"):
+        try:
+            result_cache.store(result_cache_key, result, {'angle': angle_dir})
+            print(f'[CACHE] stored result: key={result_cache_key[:12]}'); sys.stdout.flush()
+        except Exception as e:
+            print(f'[WARN] result cache store failed: {e}', file=sys.stderr); sys.stderr.flush()
     return result
 
 
@@ -251,8 +515,50 @@ def validate_result_schema(res):
     for k in required_keys:
         if k not in res:
             raise ValueError(f"Result missing required key: {k}")
-    if res.get("status") not in ("success", "error"):
-        raise ValueError("Invalid status in result; must be 'success' or 'error'")
+    if res.get("status") not in ("success", "partial", "error"):
+        raise ValueError("Invalid status in result; must be 'success', 'partial' or 'error'")
+
+def result_json_path(out):
+    """결과 JSON은 항상 resPy/result/<out 파일명>에 저장 (Spring/프론트가 여기서 읽음)"""
+    result_dir = Path(__file__).parent.resolve() / "result"
+    result_dir.mkdir(exist_ok=True, parents=True)
+    return result_dir / Path(out).name
+
+
+def _write_json_atomic(obj, out_path):
+    # atomic write: write to temp then replace
+    tmp_out = out_path.with_suffix(out_path.suffix + ".tmp")
+    with open(tmp_out, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_out, out_path)
+
+
+def write_result_json(res, out):
+    """스키마 검증 후 결과 JSON 저장, 저장 경로 반환"""
+    out_path = result_json_path(out)
+    # validate result schema
+    try:
+        validate_result_schema(res)
+    except Exception as e:
+        print(f"Result schema validation failed: {e}", file=sys.stderr); sys.stderr.flush()
+        raise
+    _write_json_atomic(res, out_path)
+    return out_path
+
+
+def write_error_json(out, error, tb, user_id=None):
+    """서버/프론트가 실패를 읽을 수 있도록 error JSON 저장, 저장 경로 반환"""
+    out_path = result_json_path(out)
+    err_obj = {
+        "status": "error",
+        "error": str(error),
+        "cmd_error": str(error),
+        "traceback": tb,
+        "user_id": user_id
+    }
+    _write_json_atomic(err_obj, out_path)
+    return out_path
+
 
 if __name__ == "__main__":
     import argparse
@@ -260,47 +566,26 @@ if __name__ == "__main__":
     parser.add_argument("--video", type=str, required=True, help="분석할 비디오 파일 경로")
     parser.add_argument("--out", type=str, default="result/result.json", help="결과 json 저장 경로")
     parser.add_argument("--user", type=str, default=None, help="사용자 ID (선택)")
+    parser.add_argument("--workers", type=int, default=None, help="동시에 실행할 stage 수 (기본: PIPELINE_WORKERS 또는 4)")
+    parser.add_argument("--no-resume", dest="resume", action="store_false", help="stage manifest를 무시하고 모든 stage 재계산")
+    parser.add_argument("--overlay-mode", choices=['video', 'data'], default=None,
+                        help="video: skeleton overlay 비디오 인코딩, data: 프론트용 keypoint track만 (기본: OVERLAY_MODE 또는 video)")
     args = parser.parse_args()
     try:
         print('Starting analyze_golf_video main...'); sys.stdout.flush()
-        res = analyze_golf_video(args.video, user_id=args.user)
+        from pipeline_progress import progress_path_for
+        res = analyze_golf_video(args.video, user_id=args.user, max_workers=args.workers, resume=args.resume,
+                                 progress_path=progress_path_for(result_json_path(args.out)),
+                                 partial_out=args.out, overlay_mode=args.overlay_mode)
         # 결과는 항상 result 폴더에 저장
-        result_dir = Path(__file__).parent.resolve() / "result"
-        result_dir.mkdir(exist_ok=True, parents=True)
-        out_name = Path(args.out).name  # 파일명만 추출
-        out_path = result_dir / out_name
-        # validate result schema
-        try:
-            validate_result_schema(res)
-        except Exception as e:
-            print(f"Result schema validation failed: {e}", file=sys.stderr); sys.stderr.flush()
-            raise
-        # atomic write: write to temp then replace
-        tmp_out = out_path.with_suffix(out_path.suffix + ".tmp")
-        with open(tmp_out, "w", encoding="utf-8") as f:
-            json.dump(res, f, ensure_ascii=False, indent=2)
-        os.replace(tmp_out, out_path)
+        out_path = write_result_json(res, args.out)
         print(f"Analysis done: {out_path}"); sys.stdout.flush()
     except Exception as e:
         import traceback
         tb = traceback.format_exc()
         # Try to write an error JSON so the server/frontend can read the failure
         try:
-            result_dir = Path(__file__).parent.resolve() / "result"
-            result_dir.mkdir(exist_ok=True, parents=True)
-            out_name = Path(args.out).name
-            out_path = result_dir / out_name
-            err_obj = {
-                "status": "error",
-                "error": str(e),
-                "cmd_error": str(e),
-                "traceback": tb,
-                "user_id": args.user
-            }
-            tmp_out = out_path.with_suffix(out_path.suffix + ".tmp")
-            with open(tmp_out, "w", encoding="utf-8") as f:
-                json.dump(err_obj, f, ensure_ascii=False, indent=2)
-            os.replace(tmp_out, out_path)
+            out_path = write_error_json(args.out, e, tb, user_id=args.user)
             print(f"Wrote error JSON to {out_path}", file=sys.stderr); sys.stderr.flush()
         except Exception as e2:
             print(f"Failed to write error JSON: {e2}", file=sys.stderr); sys.stderr.flush()
@@ -0,0 +1,207 @@
+"""
+crop bbox 검출 전용 proxy pass (openpose_utils.run_openpose_and_crop, POSE_BBOX_PROXY=1)
+- 1차 pose pass는 골퍼 union box(person_tracker 골퍼 track + union_box, PAD_RATIO)를 찾는 데만 쓰이는데
+  원본 해상도 전체 frame에 full network 입력으로 돌고 있음
+- proxy: frame 높이 POSE_PROXY_HEIGHT로 축소 + POSE_PROXY_STRIDE frame 간격 + 작은 network 입력(POSE_PROXY_NET_HEIGHT)
+  → keypoint를 원본 좌표로 되돌린 뒤 기존과 같은 track 연결/union box → 원본 좌표 bbox
+- full-res pose는 crop에서 한 번만 실행 (two-pass 고정)
+- 프로세스 안 backend는 frame store에서 선택 frame을 축소해서 바로 읽고, OpenPose CLI는 proxy 비디오를 넘김
+  (run_openpose_and_crop은 proxy_rendition으로 재인코딩과 같은 디코드에서 만듦, media_transcode)
+
+기존(full-res 1차 pass) bbox 대비 정확도 보고서
+    python bbox_proxy.py a.mp4 b.mp4 --backend cvdnn --json bbox_report.json
+    python bbox_proxy.py --min-iou 0.9      # 평균 IoU가 기준 미만이면 exit 1
+    iou       : 두 bbox IoU (frame 안으로 자른 뒤)
+    coverage  : 기존 bbox 면적 중 proxy bbox 안에 들어오는 비율 (1 미만이면 crop에서 몸이 잘릴 수 있음)
+    edge_px   : 네 변 위치 차이 최댓값 (pixel)
+
+환경 변수
+- POSE_BBOX_PROXY=1        : run_openpose_and_crop에서 proxy bbox 사용 (기본 0 = 끔)
+- POSE_PROXY_HEIGHT        : proxy frame 높이 (기본 360, 원본이 더 작으면 축소 안 함)
+- POSE_PROXY_STRIDE        : proxy frame 간격 (기본 round(fps / 10) → 약 10fps, 최소 1)
+- POSE_PROXY_NET_HEIGHT    : proxy network 입력 높이 (기본 208, 전체 pass 기본 368)
+"""
+import os
+import sys
+import json
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.resolve()
+PROXY_FPS = 10.0
+
+
+def proxy_enabled():
+    return os.environ.get('POSE_BBOX_PROXY', '0') == '1'
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ[name])
+    except (KeyError, ValueError):
+        return default
+
+
+def proxy_params(fps):
+    """(stride, proxy_height, net_height)"""
+    stride = max(1, _env_int('POSE_PROXY_STRIDE', int(round((fps or PROXY_FPS) / PROXY_FPS))))
+    return stride, max(16, _env_int('POSE_PROXY_HEIGHT', 360)), max(16, _env_int('POSE_PROXY_NET_HEIGHT', 208))
+
+
+def proxy_config():
+    """stage fingerprint에 들어갈 설정 (끔이면 None)"""
+    if not proxy_enabled():
+        return None
+    return {name: os.environ.get(name) for name in ('POSE_PROXY_HEIGHT', 'POSE_PROXY_STRIDE', 'POSE_PROXY_NET_HEIGHT')}
+
+
+def proxy_geometry(width, height, fps):
+    """(stride, proxy size (w, h), net_height) — yuv420p 인코딩을 위해 짝수 크기"""
+    stride, proxy_height, net_height = proxy_params(fps)
+    scale = min(1.0, proxy_height / float(height)) if height else 1.0
+    size = (max(2, int(round(width * scale / 2)) * 2), max(2, int(round(height * scale / 2)) * 2))
+    return stride, size, net_height
+
+
+def proxy_rendition(video_path, out_path):
+    """
+    proxy 비디오 rendition (media_transcode filter graph: stride frame 선택 + 축소)
+    frame_store.ingest의 extra로 넘기면 재인코딩과 같은 디코드에서 생성 → proxy_people(proxy_video=out_path)
+    """
+    import media_transcode
+    from frame_store import _probe
+    w, h, fps, _ = _probe(video_path)
+    stride, size, _ = proxy_geometry(w, h, fps)
+    filters = [f'framestep=step={stride}' if stride > 1 else None,
+               f'scale={size[0]}:{size[1]}:flags=area' if size != (w, h) else None]
+    return media_transcode.Rendition(out_path, filters, args=media_transcode.encode_args(web=False))
+
+
+def proxy_people(backend, video_path, view=None, work_dir=None, phase='bbox_proxy', portion=(0.0, 1.0),
+                 max_people=None, proxy_video=None):
+    """
+    proxy pass pose → (people (K, P, 17, 3) 원본 좌표, frame_indices (K,), info dict)
+    run_openpose_and_crop은 이 결과를 person_tracker로 연결해서 bbox/스윙 구간을 구함
+    proxy_video: proxy_rendition으로 미리 만든 비디오 (파일 입력 backend는 다시 인코딩하지 않고 그대로 사용)
+    """
+    import numpy as np
+    from frame_store import _probe
+    from person_tracker import max_people as default_max_people
+    from pose_stride import estimate_selected
+    if view is not None:
+        w, h, fps, n = view.width, view.height, view.fps, len(view)
+    else:
+        w, h, fps, n = _probe(video_path)
+    stride, size, net_height = proxy_geometry(w, h, fps)
+    indices = np.arange(0, n, stride, dtype=np.int64)
+    detector = backend.detection_variant(net_height)
+    max_people = max_people or default_max_people()
+    if proxy_video is not None and not getattr(detector, 'in_process', True):
+        kps = detector.estimate_people(proxy_video, work_dir=work_dir, phase=phase, portion=portion,
+                                       max_people=max_people)
+    else:
+        kps = estimate_selected(detector, video_path, indices, view=view, size=size, work_dir=work_dir, phase=phase,
+                                portion=portion, max_people=max_people)
+    kps = np.array(kps, dtype=np.float32)
+    # proxy 좌표 → 원본 좌표 (검출 안 된 점은 0 그대로)
+    kps[..., 0] *= w / float(size[0])
+    kps[..., 1] *= h / float(size[1])
+    info = {'frames': int(len(kps)), 'stride': stride, 'scale': round(size[1] / float(h), 4) if h else 1.0,
+            'size': list(size), 'net_height': getattr(detector, 'net_height', None) or getattr(detector, 'input_height', None)}
+    return kps, indices[:len(kps)], info
+
+
+def detect_bbox(backend, video_path, view=None, work_dir=None, phase='bbox_proxy', portion=(0.0, 1.0)):
+    """
+    proxy pass로 crop bbox 검출 → (bbox (x, y, w, h) 원본 좌표 또는 None, info dict)
+    bbox는 frame 안으로 자르기 전 값 (run_openpose_and_crop이 clamp_box)
+    """
+    from openpose_utils import crop_bbox
+    people, indices, info = proxy_people(backend, video_path, view=view, work_dir=work_dir, phase=phase, portion=portion)
+    return crop_bbox(people, indices), info
+
+
+def box_metrics(ref, test):
+    """(x, y, w, h) 두 개 → iou, coverage (ref 면적 중 test 안 비율), edge_px"""
+    rx1, ry1, rx2, ry2 = ref[0], ref[1], ref[0] + ref[2], ref[1] + ref[3]
+    tx1, ty1, tx2, ty2 = test[0], test[1], test[0] + test[2], test[1] + test[3]
+    iw = max(0, min(rx2, tx2) - max(rx1, tx1))
+    ih = max(0, min(ry2, ty2) - max(ry1, ty1))
+    inter = iw * ih
+    ref_area, test_area = ref[2] * ref[3], test[2] * test[3]
+    union = ref_area + test_area - inter
+    return {
+        'iou': round(inter / float(union), 4) if union > 0 else None,
+        'coverage': round(inter / float(ref_area), 4) if ref_area > 0 else None,
+        'edge_px': int(max(abs(rx1 - tx1), abs(ry1 - ty1), abs(rx2 - tx2), abs(ry2 - ty2))),
+    }
+
+
+def main(argv=None):
+    import argparse
+    import numpy as np
+    from frame_store import _probe
+    from openpose_utils import get_pose_backend, crop_bbox, clamp_box
+    from person_tracker import max_people
+    parser = argparse.ArgumentParser(description='proxy bbox vs full-res first pass bbox 보고서')
+    parser.add_argument('videos', nargs='*', help='비디오 (기본: uploaded-videos/*.mp4)')
+    parser.add_argument('--limit', type=int, default=None)
+    parser.add_argument('--backend', default=None, help='pose backend (openpose | cvdnn | fake, 기본 POSE_BACKEND)')
+    parser.add_argument('--work-dir', default=str(BASE_DIR / 'result' / 'bbox_compare'))
+    parser.add_argument('--min-iou', type=float, default=None, help='평균 IoU가 이보다 낮으면 exit 1')
+    parser.add_argument('--json', dest='json_out', default=None)
+    args = parser.parse_args(argv)
+
+    videos = [Path(v) for v in args.videos] or sorted((BASE_DIR / 'uploaded-videos').glob('*.mp4'))
+    if args.limit:
+        videos = videos[:args.limit]
+    if not videos:
+        parser.error('no videos to compare')
+    backend = get_pose_backend(args.backend)
+    reports = []
+    for video in videos:
+        rep = {'video': video.name}
+        try:
+            w, h, _, _ = _probe(video)
+            work_dir = Path(args.work_dir) / video.stem
+            t0 = time.perf_counter()
+            full_box = crop_bbox(backend.estimate_people(video, work_dir=work_dir, phase='full', max_people=max_people()))
+            rep['full_time_s'] = round(time.perf_counter() - t0, 2)
+            t0 = time.perf_counter()
+            proxy_box, info = detect_bbox(backend, video, work_dir=work_dir)
+            rep['proxy_time_s'] = round(time.perf_counter() - t0, 2)
+            if full_box is None or proxy_box is None:
+                raise RuntimeError(f'no person detected (full={full_box is not None}, proxy={proxy_box is not None})')
+            full_box, proxy_box = clamp_box(full_box, w, h), clamp_box(proxy_box, w, h)
+            rep.update({'full_bbox': list(full_box), 'proxy_bbox': list(proxy_box), 'proxy': info})
+            rep.update(box_metrics(full_box, proxy_box))
+            rep['speedup'] = round(rep['full_time_s'] / rep['proxy_time_s'], 2) if rep['proxy_time_s'] else None
+        except Exception as e:
+            rep['error'] = f'{type(e).__name__}: {e}'
+            print(f'[WARN] {video.name}: {rep["error"]}', file=sys.stderr); sys.stderr.flush()
+        reports.append(rep)
+        print(f'[RESULT] {json.dumps(rep, ensure_ascii=False)}'); sys.stdout.flush()
+    ok = [r for r in reports if 'error' not in r and r['iou'] is not None]
+    full_t = sum(r['full_time_s'] for r in ok)
+    proxy_t = sum(r['proxy_time_s'] for r in ok)
+    summary = {
+        'videos': len(reports),
+        'failed': len(reports) - len(ok),
+        'iou_mean': round(float(np.mean([r['iou'] for r in ok])), 4) if ok else None,
+        'iou_min': round(float(np.min([r['iou'] for r in ok])), 4) if ok else None,
+        'coverage_min': round(float(np.min([r['coverage'] for r in ok])), 4) if ok else None,
+        'edge_px_max': int(max(r['edge_px'] for r in ok)) if ok else None,
+        'speedup': round(full_t / proxy_t, 2) if proxy_t else None,
+    }
+    print(f'[SUMMARY] {json.dumps(summary, ensure_ascii=False)}'); sys.stdout.flush()
+    if args.json_out:
+        with open(args.json_out, 'w', encoding='utf-8') as f:
+            json.dump({'summary': summary, 'videos': reports}, f, ensure_ascii=False, indent=2)
+    if args.min_iou is not None and (summary['iou_mean'] is None or summary['iou_mean'] < args.min_iou):
+        print(f'[FAIL] iou {summary["iou_mean"]} < {args.min_iou}', file=sys.stderr); sys.stderr.flush()
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
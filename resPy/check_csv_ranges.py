@@ -1,12 +1,13 @@
 import cv2
-import pandas as pd
 import numpy as np
 import json
 import sys
 from pathlib import Path
+from keypoint_track import KeypointSequence
 
-video = Path(r"d:/golf_evaluation_system-web-/resPy/crop_video/1_20201124_General_037_DOS_A_M40_MS_038_crop_crop.mp4")
-csv = Path(r"d:/golf_evaluation_system-web-/resPy/crop_csv/1_20201124_General_037_DOS_A_M40_MS_038_crop_crop.csv")
+# keypoint track (.kps.npy) 또는 이전 crop_csv 모두 가능
+video = Path(sys.argv[1] if len(sys.argv) > 1 else r"d:/golf_evaluation_system-web-/resPy/crop_video/1_20201124_General_037_DOS_A_M40_MS_038_crop_crop.mp4")
+csv = Path(sys.argv[2] if len(sys.argv) > 2 else r"d:/golf_evaluation_system-web-/resPy/crop_csv/1_20201124_General_037_DOS_A_M40_MS_038_crop_crop.kps.npy")
 
 if not video.exists():
     print(json.dumps({"error":"video_not_found", "video": str(video)}))
@@ -23,20 +24,18 @@ width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
 height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
 cap.release()
 
-df = pd.read_csv(str(csv))
-# find x/y columns
-x_cols = [c for c in df.columns if c.endswith('_x')]
-y_cols = [c for c in df.columns if c.endswith('_y')]
-report = {"video": str(video), "csv": str(csv), "frame_width": width, "frame_height": height, "x_cols": len(x_cols), "y_cols": len(y_cols)}
-
-if not x_cols or not y_cols:
-    report["error"] = "no_xy_columns"
-    print(json.dumps(report, ensure_ascii=False))
+try:
+    seq = KeypointSequence.load(csv)
+except ValueError as e:
+    print(json.dumps({"error": "invalid_keypoints", "csv": str(csv), "detail": str(e)}, ensure_ascii=False))
     sys.exit(0)
+report = {"video": str(video), "csv": str(csv), "frame_width": width, "frame_height": height,
+          "x_cols": seq.num_joints, "y_cols": seq.num_joints, "coord_space": seq.coord_space}
 
-# convert to numeric
-xvals = df[x_cols].replace([np.inf, -np.inf], np.nan).astype(float).to_numpy()
-yvals = df[y_cols].replace([np.inf, -np.inf], np.nan).astype(float).to_numpy()
+# 사람 없는 frame은 NaN (기존 CSV의 NaN 행과 같은 의미)
+xy = seq.masked_xy(mask=np.broadcast_to(seq.frame_valid()[:, None], seq.conf.shape))
+xvals = xy[:, :, 0]
+yvals = xy[:, :, 1]
 
 report["x_min"] = float(np.nanmin(xvals))
 report["x_max"] = float(np.nanmax(xvals))
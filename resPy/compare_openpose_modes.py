@@ -0,0 +1,162 @@
+"""
+OpenPose two-pass vs single-pass 품질/시간 비교 (openpose_utils.run_openpose_and_crop)
+- 코퍼스의 비디오마다 두 모드로 crop keypoint track을 만들고, two-pass 결과를 기준으로 single-pass keypoint를 비교한다.
+- 두 모드의 crop bbox는 같은 1차 pass에서 나오므로 crop 좌표계가 같다 → keypoint를 그대로 비교할 수 있음.
+
+지표 (비디오별 + 전체)
+    frames          : 두 track의 frame 수
+    detect_agree    : 둘 중 하나라도 사람이 있는 frame 중 둘 다 있는 비율
+    px_median/p95   : 두 모드 모두 신뢰도 > --conf 인 joint의 pixel 오차 (crop 좌표)
+    pck             : 오차 < --pck-ratio * crop 대각선 인 joint 비율
+    joint_px_median : joint별 pixel 오차 중앙값
+    time_s          : 모드별 run_openpose_and_crop wall time, speedup = two / single
+
+실행
+    python compare_openpose_modes.py                       # uploaded-videos/*.mp4
+    python compare_openpose_modes.py a.mp4 b.mp4 --limit 5 --json report.json
+    python compare_openpose_modes.py --min-pck 0.9         # 전체 pck가 기준 미만이면 exit 1
+"""
+import sys
+import json
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.resolve()
+MODES = (('two_pass', False), ('single_pass', True))
+
+
+def run_mode(video, out_root, single_pass, backend=None):
+    from openpose_utils import run_openpose_and_crop
+    out_root = Path(out_root)
+    dirs = [out_root / d for d in ('crop_video', 'crop_csv', 'skeleton_video')]
+    for d in dirs:
+        d.mkdir(exist_ok=True, parents=True)
+    t0 = time.perf_counter()
+    crop_video, keypoints = run_openpose_and_crop(Path(video), *dirs, single_pass=single_pass, backend=backend)
+    return crop_video, keypoints, time.perf_counter() - t0
+
+
+def compare_tracks(ref_path, test_path, crop_size, conf=0.1, pck_ratio=0.05):
+    """two-pass track(ref) 기준 single-pass track(test) 비교 (CSV도 가능). crop_size: (w, h)"""
+    from keypoint_track import KeypointSequence
+    return compare_keypoints(KeypointSequence.load(ref_path).data, KeypointSequence.load(test_path).data,
+                             crop_size, conf=conf, pck_ratio=pck_ratio)
+
+
+def compare_keypoints(ref, test, crop_size, conf=0.1, pck_ratio=0.05, frame_mask=None):
+    """
+    (F, 17, 3) 배열 비교 → (report, errs, diag)
+    frame_mask: (F,) bool — True인 frame만 비교 (예: stride에서 보간된 frame만)
+    """
+    import numpy as np
+    from keypoint_track import KP
+    ref = np.asarray(ref, dtype=np.float64)
+    test = np.asarray(test, dtype=np.float64)
+    n = min(len(ref), len(test))
+    if frame_mask is not None:
+        keep = np.asarray(frame_mask, dtype=bool)[:n]
+        ref, test = ref[:n][keep], test[:n][keep]
+        n = len(ref)
+    ref, test = ref[:n], test[:n]
+    has_ref = (np.nan_to_num(ref[:, :, 2]) > 0).any(1)
+    has_test = (np.nan_to_num(test[:, :, 2]) > 0).any(1)
+    either = has_ref | has_test
+    both_conf = (np.nan_to_num(ref[:, :, 2]) > conf) & (np.nan_to_num(test[:, :, 2]) > conf)
+    err = np.linalg.norm(np.nan_to_num(ref[:, :, :2]) - np.nan_to_num(test[:, :, :2]), axis=2)
+    errs = err[both_conf]
+    diag = float(np.hypot(*crop_size)) if crop_size else None
+    rep = {
+        'frames': [int(len(ref)), int(len(test))],
+        'detect_agree': round(float((has_ref & has_test).sum() / either.sum()), 4) if either.any() else None,
+        'joints_compared': int(errs.size),
+        'px_mean': round(float(errs.mean()), 2) if errs.size else None,
+        'px_median': round(float(np.median(errs)), 2) if errs.size else None,
+        'px_p95': round(float(np.percentile(errs, 95)), 2) if errs.size else None,
+        'pck': round(float((errs < pck_ratio * diag).mean()), 4) if errs.size and diag else None,
+        'joint_px_median': {},
+    }
+    for j, name in enumerate(KP):
+        e = err[both_conf[:, j], j]
+        rep['joint_px_median'][name] = round(float(np.median(e)), 2) if e.size else None
+    return rep, errs, diag
+
+
+def _crop_size(video):
+    import cv2
+    cap = cv2.VideoCapture(str(video))
+    size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    cap.release()
+    return size
+
+
+def main(argv=None):
+    import argparse
+    import numpy as np
+    parser = argparse.ArgumentParser(description='OpenPose two-pass vs single-pass comparison')
+    parser.add_argument('videos', nargs='*', help='비교할 비디오 (기본: uploaded-videos/*.mp4)')
+    parser.add_argument('--limit', type=int, default=None)
+    parser.add_argument('--out-dir', default=str(BASE_DIR / 'result' / 'mode_compare'))
+    parser.add_argument('--conf', type=float, default=0.1, help='비교할 joint 최소 신뢰도')
+    parser.add_argument('--pck-ratio', type=float, default=0.05, help='PCK 기준 (crop 대각선 비율)')
+    parser.add_argument('--min-pck', type=float, default=None, help='전체 pck가 이보다 낮으면 exit 1')
+    parser.add_argument('--backend', default=None, help='pose backend (openpose | cvdnn | fake, 기본 POSE_BACKEND)')
+    parser.add_argument('--json', dest='json_out', default=None, help='결과 JSON 저장 경로')
+    args = parser.parse_args(argv)
+
+    videos = [Path(v) for v in args.videos] or sorted((BASE_DIR / 'uploaded-videos').glob('*.mp4'))
+    if args.limit:
+        videos = videos[:args.limit]
+    if not videos:
+        parser.error('no videos to compare')
+
+    reports, all_errs, pck_hits = [], [], []
+    times = {m: 0.0 for m, _ in MODES}
+    for video in videos:
+        rep = {'video': video.name}
+        try:
+            outs = {}
+            for mode, single in MODES:
+                print(f'[STEP] {video.name}: {mode}'); sys.stdout.flush()
+                crop_video, keypoints, t = run_mode(video, Path(args.out_dir) / mode, single, backend=args.backend)
+                outs[mode] = (crop_video, keypoints)
+                rep[f'{mode}_time_s'] = round(t, 2)
+                times[mode] += t
+            size = _crop_size(outs['two_pass'][0])
+            cmp, errs, diag = compare_tracks(outs['two_pass'][1], outs['single_pass'][1], size,
+                                             conf=args.conf, pck_ratio=args.pck_ratio)
+            rep.update(cmp)
+            rep['speedup'] = round(rep['two_pass_time_s'] / rep['single_pass_time_s'], 2) if rep['single_pass_time_s'] else None
+            all_errs.append(errs)
+            if diag:
+                pck_hits.append(errs < args.pck_ratio * diag)
+        except Exception as e:
+            rep['error'] = f'{type(e).__name__}: {e}'
+            print(f'[WARN] {video.name}: {rep["error"]}', file=sys.stderr); sys.stderr.flush()
+        reports.append(rep)
+        print(f'[RESULT] {json.dumps(rep, ensure_ascii=False)}'); sys.stdout.flush()
+
+    errs = np.concatenate(all_errs) if all_errs else np.zeros(0)
+    hits = np.concatenate(pck_hits) if pck_hits else np.zeros(0, dtype=bool)
+    summary = {
+        'videos': len(videos),
+        'failed': sum(1 for r in reports if 'error' in r),
+        'px_median': round(float(np.median(errs)), 2) if errs.size else None,
+        'px_p95': round(float(np.percentile(errs, 95)), 2) if errs.size else None,
+        'pck': round(float(hits.mean()), 4) if hits.size else None,
+        'two_pass_time_s': round(times['two_pass'], 2),
+        'single_pass_time_s': round(times['single_pass'], 2),
+        'speedup': round(times['two_pass'] / times['single_pass'], 2) if times['single_pass'] else None,
+    }
+    print(f'[SUMMARY] {json.dumps(summary, ensure_ascii=False)}'); sys.stdout.flush()
+    if args.json_out:
+        with open(args.json_out, 'w', encoding='utf-8') as f:
+            json.dump({'summary': summary, 'videos': reports, 'conf': args.conf, 'pck_ratio': args.pck_ratio},
+                      f, ensure_ascii=False, indent=2)
+    if args.min_pck is not None and (summary['pck'] is None or summary['pck'] < args.min_pck):
+        print(f'[FAIL] pck {summary["pck"]} < {args.min_pck}', file=sys.stderr); sys.stderr.flush()
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
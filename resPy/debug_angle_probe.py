@@ -1,6 +1,6 @@
-import pandas as pd
 import numpy as np
 import math
+from keypoint_track import KeypointSequence
 
 CSV = r"d:\golf_evaluation_system-web-\resPy\crop_csv\1_20201124_General_037_DOS_A_M40_MS_038_crop_1_crop.csv"
 
@@ -17,43 +17,22 @@ def calculate_angle_2d(joint_coords):
     angle_radians = math.acos(cos_theta)
     return math.degrees(angle_radians)
 
-COCO_KP = [
-    "Nose", "LEye", "REye", "LEar", "REar", "LShoulder", "RShoulder", "LElbow", "RElbow",
-    "LWrist", "RWrist", "LHip", "RHip", "LKnee", "RKnee", "LAnkle", "RAnkle"
-]
-
+# 관절 이름/순서, 이전 CSV 컬럼(LEGACY_KP) 대응은 keypoint_track
 print('reading', CSV)
-df = pd.read_csv(CSV)
-cols = set(df.columns)
-use_name_cols = any(f"{name}_x" in cols for name in COCO_KP)
-print('use_name_cols =', use_name_cols)
+seq = KeypointSequence.load(CSV)
+xy = seq.masked_xy(mask=np.broadcast_to(seq.frame_valid()[:, None], seq.conf.shape))
 
-if use_name_cols:
-    def get2d(row, j):
-        x = row.get(f"{j}_x", np.nan)
-        y = row.get(f"{j}_y", np.nan)
-        try:
-            return float(x), float(y)
-        except Exception:
-            return np.nan, np.nan
-else:
-    idx_map = {name:i for i,name in enumerate(COCO_KP)}
-    def get2d(row, j):
-        i = idx_map[j]
-        x = row.get(f"x_{i}", np.nan)
-        y = row.get(f"y_{i}", np.nan)
-        try:
-            return float(x), float(y)
-        except Exception:
-            return np.nan, np.nan
+def get2d(i, j):
+    x, y = xy[i, seq.index(j)]
+    return float(x), float(y)
 
-for i, row in df.head(20).iterrows():
-    ls = get2d(row, 'LShoulder')
-    le = get2d(row, 'LElbow')
-    lw = get2d(row, 'LWrist')
-    rs = get2d(row, 'RShoulder')
-    re = get2d(row, 'RElbow')
-    rw = get2d(row, 'RWrist')
+for i in range(min(20, len(seq))):
+    ls = get2d(i, 'LShoulder')
+    le = get2d(i, 'LElbow')
+    lw = get2d(i, 'LWrist')
+    rs = get2d(i, 'RShoulder')
+    re = get2d(i, 'RElbow')
+    rw = get2d(i, 'RWrist')
     print(f'frame {i}: LShoulder={ls} LElbow={le} LWrist={lw}')
     a = calculate_angle_2d([ls, le, lw])
     b = calculate_angle_2d([rs, re, rw])
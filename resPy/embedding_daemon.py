@@ -0,0 +1,431 @@
+"""
+임베딩 상주 데몬 (TimeSformer / STGCN++)
+- 업로드마다 `conda run ... extract_*_single.py`로 conda 활성화 + torch/mmengine import + 체크포인트 로드를
+  반복하지 않도록, 환경별로 모델을 한 번만 로드해 두고 localhost 소켓으로 임베딩 요청을 처리한다.
+- 서버: conda 환경 안에서 실행
+    conda run -n timesformer python -u embedding_daemon.py serve --kind timesformer
+    conda run -n mmaction python -u embedding_daemon.py serve --kind stgcn
+- 클라이언트: analyze_golf_video에서 embed_with_daemon(kind, input, output) 호출
+  (데몬이 없으면 자동 실행, 응답이 없으면 재시작, 그래도 실패하면 False를 반환 → 기존 subprocess 경로로 fallback)
+
+환경 변수
+- EMBED_DAEMON=0                     : 데몬 사용 안 함 (항상 subprocess)
+- EMBED_DAEMON_AUTOSTART=0           : 데몬 자동 실행 안 함 (이미 떠 있는 데몬만 사용)
+- EMBED_DAEMON_<KIND>_PORT           : 포트 (기본 timesformer=17651, stgcn=17652)
+- EMBED_DAEMON_AUTHKEY               : 소켓 인증 키 override (기본: 설치마다 처음 실행할 때 만든 임의 키,
+                                       daemon/embed_daemon.key, 0600 — 소켓이 pickle을 받으므로 고정 키를 쓰지 말 것)
+- EMBED_DAEMON_START_TIMEOUT         : 자동 실행 후 warm-up 완료까지 기다리는 시간(초, 기본 300)
+- EMBED_DAEMON_TIMEOUT               : 임베딩 요청 1건 응답 대기 시간(초, 기본 600)
+"""
+import os
+import sys
+import time
+import json
+import signal
+import secrets
+import subprocess
+import traceback
+from pathlib import Path
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+
+BASE_DIR = Path(__file__).parent.resolve()
+DAEMON_DIR = BASE_DIR / 'daemon'
+
+# kind -> (conda env, 기본 포트)
+DAEMON_KINDS = {
+    'timesformer': ('timesformer', 17651),
+    'stgcn': ('mmaction', 17652),
+}
+
+PING_TIMEOUT = 5.0
+
+
+class DaemonUnavailable(RuntimeError):
+    """데몬에 연결할 수 없거나 응답이 없음 (호출 측은 subprocess로 fallback)"""
+
+
+def daemon_enabled():
+    return os.environ.get('EMBED_DAEMON', '1') != '0'
+
+
+def daemon_address(kind):
+    _, default_port = DAEMON_KINDS[kind]
+    port = int(os.environ.get(f'EMBED_DAEMON_{kind.upper()}_PORT', default_port))
+    return ('127.0.0.1', port)
+
+
+def _authkey_file():
+    return DAEMON_DIR / 'embed_daemon.key'
+
+
+def daemon_authkey(create=False):
+    """
+    소켓 인증 키: EMBED_DAEMON_AUTHKEY가 있으면 그 값, 아니면 daemon/embed_daemon.key
+    create=True (데몬 실행 측)면 키 파일이 없을 때 임의 키를 만들어 소유자만 읽을 수 있게(0600) 저장
+    키 파일이 없으면 클라이언트 측은 DaemonUnavailable (떠 있는 데몬이 없음)
+    """
+    env = os.environ.get('EMBED_DAEMON_AUTHKEY')
+    if env:
+        return env.encode('utf-8')
+    path = _authkey_file()
+    if create and not path.exists():
+        DAEMON_DIR.mkdir(exist_ok=True, parents=True)
+        try:
+            fd = os.open(str(path), os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o600)
+        except FileExistsError:
+            pass    # 동시에 실행된 다른 프로세스가 먼저 만듦
+        else:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(secrets.token_hex(32).encode('ascii'))
+    try:
+        key = path.read_bytes().strip()
+    except OSError as e:
+        raise DaemonUnavailable(f'daemon authkey not available ({path}): {e}')
+    if not key:
+        raise DaemonUnavailable(f'daemon authkey file is empty: {path}')
+    return key
+
+
+def _pid_file(kind):
+    return DAEMON_DIR / f'embed_daemon_{kind}.pid'
+
+
+def _log_file(kind):
+    return DAEMON_DIR / f'embed_daemon_{kind}.log'
+
+
+# ======================[ SERVER ]======================
+class _EmbeddingWorker:
+    """conda 환경 안에서 모델을 한 번 로드하고 요청마다 재사용"""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.state = None
+        self.loaded_at = None
+        self.requests = 0
+        self.failures = 0
+
+    def load(self, warmup=True):
+        t0 = time.time()
+        if self.kind == 'timesformer':
+            import extract_timesformer_single as ext
+            self.state = ext.load_timesformer_model()
+            if warmup:
+                ext.warmup_timesformer(self.state)
+        elif self.kind == 'stgcn':
+            import extract_stgcn_single as ext
+            self.state = ext.load_stgcn_model()
+            if warmup:
+                DAEMON_DIR.mkdir(exist_ok=True, parents=True)
+                ext.warmup_stgcn(self.state, DAEMON_DIR)
+        else:
+            raise ValueError(f'unknown daemon kind: {self.kind}')
+        self.loaded_at = time.time()
+        print(f'[DAEMON] {self.kind} model loaded (warmup={warmup}) in {self.loaded_at - t0:.1f}s'); sys.stdout.flush()
+
+    def embed(self, input_path, output_path):
+        if self.kind == 'timesformer':
+            import extract_timesformer_single as ext
+            ext.embed_video(self.state, Path(input_path), Path(output_path))
+        else:
+            import extract_stgcn_single as ext
+            ext.embed_keypoints(self.state, Path(input_path), Path(output_path), inline_loader=True)
+
+    def health(self):
+        return {
+            'ok': self.state is not None,
+            'kind': self.kind,
+            'pid': os.getpid(),
+            'uptime': (time.time() - self.loaded_at) if self.loaded_at else None,
+            'requests': self.requests,
+            'failures': self.failures,
+        }
+
+
+def serve(kind, warmup=True, max_requests=0):
+    """
+    요청 프로토콜 (multiprocessing.connection, pickle dict)
+    - {'op': 'ping'}                                  -> {'ok', 'loading', 'kind', 'pid', 'uptime', 'requests', 'failures'}
+    - {'op': 'embed', 'input': str, 'output': str}    -> {'ok': True, 'output': str, 'elapsed': float, 'spans': list} | {'ok': False, 'error', 'traceback'}
+    - {'op': 'shutdown'}                              -> {'ok': True} 후 종료
+    연결마다 스레드에서 처리하므로 모델 로드/임베딩 중에도 ping은 바로 응답한다.
+    임베딩은 lock으로 한 번에 하나씩 실행 (모델/GPU 1개 공유).
+    """
+    import threading
+    if kind not in DAEMON_KINDS:
+        raise ValueError(f'unknown daemon kind: {kind}')
+    if str(BASE_DIR) not in sys.path:
+        sys.path.insert(0, str(BASE_DIR))
+    from pipeline_spans import SpanRecorder, recording
+    DAEMON_DIR.mkdir(exist_ok=True, parents=True)
+    address = daemon_address(kind)
+    # 포트를 먼저 잡아서 동시에 뜬 두 번째 데몬은 모델 로드 전에 바로 종료되도록 함
+    authkey = daemon_authkey(create=True)
+    listener = Listener(address, authkey=authkey)
+    worker = _EmbeddingWorker(kind)
+    ready = threading.Event()
+    stop = threading.Event()
+    model_lock = threading.Lock()
+
+    def _request_stop():
+        stop.set()
+        # accept()에서 대기 중인 메인 스레드를 깨움
+        try:
+            Client(address, authkey=authkey).close()
+        except Exception:
+            pass
+
+    def _handle(conn):
+        try:
+            req = conn.recv()
+            op = req.get('op') if isinstance(req, dict) else None
+            if op == 'ping':
+                h = worker.health()
+                h['loading'] = not ready.is_set()
+                conn.send(h)
+            elif op == 'embed':
+                ready.wait()
+                with model_lock:
+                    t0 = time.time()
+                    worker.requests += 1
+                    # 데몬 안에서 측정한 span은 응답으로 돌려보내 호출 측 timings에 합침
+                    recorder = SpanRecorder(meta={'daemon': kind})
+                    try:
+                        with recording(recorder):
+                            worker.embed(req['input'], req['output'])
+                        elapsed = time.time() - t0
+                        print(f'[DAEMON] {kind} embed done in {elapsed:.2f}s: {req["output"]}'); sys.stdout.flush()
+                        res = {'ok': True, 'output': req['output'], 'elapsed': elapsed, 'spans': recorder.records()}
+                    except Exception as e:
+                        worker.failures += 1
+                        tb = traceback.format_exc()
+                        print(f'[FAIL] {kind} embed failed: {e}', file=sys.stderr); sys.stderr.flush()
+                        print(tb, file=sys.stderr); sys.stderr.flush()
+                        res = {'ok': False, 'error': str(e), 'traceback': tb}
+                    recycle = bool(max_requests) and worker.requests >= max_requests
+                conn.send(res)
+                if recycle:
+                    # 메모리 누수 대비 주기적 재시작 (다음 클라이언트가 자동 실행)
+                    print(f'[DAEMON] {kind} reached max_requests={max_requests}, exiting'); sys.stdout.flush()
+                    _request_stop()
+            elif op == 'shutdown':
+                conn.send({'ok': True})
+                _request_stop()
+            else:
+                conn.send({'ok': False, 'error': f'unknown op: {op}'})
+        except (EOFError, OSError) as e:
+            print(f'[WARN] client connection dropped: {e}', file=sys.stderr); sys.stderr.flush()
+        finally:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _accept_loop():
+        while not stop.is_set():
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                # 인증 실패 등은 해당 연결만 버림
+                if not stop.is_set():
+                    print(f'[WARN] accept failed: {e}', file=sys.stderr); sys.stderr.flush()
+                continue
+            if stop.is_set():
+                conn.close()
+                break
+            threading.Thread(target=_handle, args=(conn,), daemon=True).start()
+
+    acceptor = threading.Thread(target=_accept_loop, name=f'{kind}-accept', daemon=True)
+    acceptor.start()
+    try:
+        worker.load(warmup=warmup)
+        ready.set()
+        _pid_file(kind).write_text(str(os.getpid()), encoding='utf-8')
+        print(f'[DAEMON] {kind} serving on {address[0]}:{address[1]} pid={os.getpid()}'); sys.stdout.flush()
+        while not stop.wait(1.0):
+            pass
+        # 진행 중인 임베딩이 끝날 때까지 대기
+        with model_lock:
+            pass
+    finally:
+        stop.set()
+        listener.close()
+        try:
+            pf = _pid_file(kind)
+            if pf.exists() and pf.read_text(encoding='utf-8').strip() == str(os.getpid()):
+                pf.unlink()
+        except Exception:
+            pass
+
+
+# ======================[ CLIENT ]======================
+def _request(kind, payload, timeout):
+    """요청 1건 전송 후 응답 dict 반환. 연결 실패/무응답은 DaemonUnavailable"""
+    authkey = daemon_authkey()
+    try:
+        conn = Client(daemon_address(kind), authkey=authkey)
+    except (OSError, EOFError, AuthenticationError) as e:
+        raise DaemonUnavailable(f'{kind} daemon not reachable: {e}')
+    try:
+        conn.send(payload)
+        if not conn.poll(timeout):
+            raise DaemonUnavailable(f'{kind} daemon did not answer within {timeout}s')
+        return conn.recv()
+    except (OSError, EOFError) as e:
+        raise DaemonUnavailable(f'{kind} daemon connection lost: {e}')
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+def health(kind, timeout=PING_TIMEOUT):
+    """데몬 상태 dict (모델 로드 중이면 loading=True), 연결 불가면 None"""
+    try:
+        res = _request(kind, {'op': 'ping'}, timeout)
+    except DaemonUnavailable:
+        return None
+    return res if isinstance(res, dict) else None
+
+
+def ping(kind, timeout=PING_TIMEOUT):
+    """health check: 요청을 받을 준비가 됐으면 health dict, 아니면 None"""
+    h = health(kind, timeout)
+    return h if h and h.get('ok') and not h.get('loading') else None
+
+
+def start_daemon(kind):
+    """conda 환경에서 데몬을 detached 프로세스로 실행"""
+    env_name, _ = DAEMON_KINDS[kind]
+    DAEMON_DIR.mkdir(exist_ok=True, parents=True)
+    # 데몬과 클라이언트가 같은 키 파일을 읽도록 실행 전에 만들어 둠
+    daemon_authkey(create=True)
+    cmd = ['conda', 'run', '--no-capture-output', '-n', env_name, 'python', '-u',
+           str(BASE_DIR / 'embedding_daemon.py'), 'serve', '--kind', kind]
+    env = os.environ.copy()
+    env['CUBLAS_WORKSPACE_CONFIG'] = ':16:8'
+    env['KMP_DUPLICATE_LIB_OK'] = 'TRUE'
+    env['PYTHONIOENCODING'] = 'utf-8'
+    kwargs = {}
+    if os.name == 'nt':
+        kwargs['creationflags'] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs['start_new_session'] = True
+    log_f = open(_log_file(kind), 'a', encoding='utf-8')
+    print('[RUN] ' + ' '.join(cmd)); sys.stdout.flush()
+    try:
+        return subprocess.Popen(cmd, stdout=log_f, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+                                cwd=str(BASE_DIR), env=env, **kwargs)
+    finally:
+        log_f.close()
+
+
+def stop_daemon(kind, timeout=PING_TIMEOUT):
+    """정상 종료 요청, 응답이 없으면 pid 파일 기준으로 강제 종료"""
+    try:
+        _request(kind, {'op': 'shutdown'}, timeout)
+        return
+    except DaemonUnavailable:
+        pass
+    pf = _pid_file(kind)
+    if not pf.exists():
+        return
+    try:
+        pid = int(pf.read_text(encoding='utf-8').strip())
+        if os.name == 'nt':
+            subprocess.run(['taskkill', '/F', '/T', '/PID', str(pid)], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        else:
+            os.kill(pid, signal.SIGKILL)
+        print(f'[WARN] killed unresponsive {kind} daemon pid={pid}', file=sys.stderr); sys.stderr.flush()
+    except Exception as e:
+        print(f'[WARN] failed to kill {kind} daemon: {e}', file=sys.stderr); sys.stderr.flush()
+    try:
+        pf.unlink()
+    except Exception:
+        pass
+
+
+def ensure_daemon(kind, autostart=None, start_timeout=None):
+    """데몬 health check, 없으면 자동 실행 후 warm-up이 끝날 때까지 대기. 실패 시 DaemonUnavailable"""
+    h = health(kind)
+    if h and h.get('ok') and not h.get('loading'):
+        return
+    if autostart is None:
+        autostart = os.environ.get('EMBED_DAEMON_AUTOSTART', '1') != '0'
+    if not autostart:
+        raise DaemonUnavailable(f'{kind} daemon not running (autostart disabled)')
+    if start_timeout is None:
+        start_timeout = float(os.environ.get('EMBED_DAEMON_START_TIMEOUT', '300'))
+    proc = None
+    if not (h and h.get('loading')):
+        # 응답 없는 데몬이 포트를 잡고 있으면 먼저 정리 (다른 업로드가 띄운 데몬이 로드 중이면 그대로 대기)
+        stop_daemon(kind)
+        proc = start_daemon(kind)
+    deadline = time.time() + start_timeout
+    while time.time() < deadline:
+        h = health(kind)
+        if h and h.get('ok') and not h.get('loading'):
+            print(f'[SUCCESS] {kind} daemon ready'); sys.stdout.flush()
+            return
+        if proc is not None and proc.poll() is not None and h is None:
+            # 포트 충돌로 먼저 종료된 경우가 아니라면 (다른 데몬도 응답 없음) 실패
+            raise DaemonUnavailable(f'{kind} daemon exited during startup (returncode={proc.returncode}, log={_log_file(kind)})')
+        time.sleep(1.0)
+    raise DaemonUnavailable(f'{kind} daemon not ready within {start_timeout}s (log={_log_file(kind)})')
+
+
+def embed_with_daemon(kind, input_path, output_path, timeout=None):
+    """
+    데몬으로 임베딩 추출. 성공하면 True, 데몬을 쓸 수 없으면 False (호출 측 subprocess fallback).
+    데몬이 죽었거나 응답이 없으면 1회 재시작 후 재시도한다.
+    """
+    if not daemon_enabled():
+        return False
+    if timeout is None:
+        timeout = float(os.environ.get('EMBED_DAEMON_TIMEOUT', '600'))
+    payload = {'op': 'embed', 'input': str(Path(input_path).resolve()), 'output': str(Path(output_path).resolve())}
+    for attempt in range(2):
+        try:
+            ensure_daemon(kind)
+            res = _request(kind, payload, timeout)
+        except DaemonUnavailable as e:
+            print(f'[WARN] embedding daemon unavailable (attempt {attempt + 1}): {e}', file=sys.stderr); sys.stderr.flush()
+            if attempt == 0:
+                stop_daemon(kind)
+            continue
+        if res.get('ok') and Path(output_path).exists():
+            print(f'[DAEMON] {kind} embedding served in {res.get("elapsed", 0.0):.2f}s'); sys.stdout.flush()
+            from pipeline_spans import merge
+            merge(res.get('spans'))
+            return True
+        print(f'[WARN] {kind} daemon embed failed: {res.get("error")}', file=sys.stderr); sys.stderr.flush()
+        if res.get('traceback'):
+            print(res['traceback'], file=sys.stderr); sys.stderr.flush()
+        return False
+    return False
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='TimeSformer/STGCN 임베딩 상주 데몬')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p_serve = sub.add_parser('serve', help='데몬 실행 (conda 환경 안에서)')
+    p_serve.add_argument('--kind', choices=sorted(DAEMON_KINDS), required=True)
+    p_serve.add_argument('--no-warmup', dest='warmup', action='store_false', help='시작 시 더미 forward 생략')
+    p_serve.add_argument('--max-requests', type=int, default=0, help='N건 처리 후 종료 (0=무제한)')
+    for name, help_text in (('start', '데몬 실행 후 준비될 때까지 대기'), ('stop', '데몬 종료'), ('status', 'health check')):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument('--kind', choices=sorted(DAEMON_KINDS), required=True)
+    args = parser.parse_args()
+    if args.cmd == 'serve':
+        serve(args.kind, warmup=args.warmup, max_requests=args.max_requests)
+    elif args.cmd == 'start':
+        ensure_daemon(args.kind, autostart=True)
+    elif args.cmd == 'stop':
+        stop_daemon(args.kind)
+    else:
+        h = ping(args.kind)
+        print(json.dumps(h if h else {'ok': False, 'kind': args.kind}, ensure_ascii=False))
+        sys.exit(0 if h else 1)
@@ -3,103 +3,119 @@ import os
 import sys
 import traceback
 from pathlib import Path
-import numpy as np
-import torch
-import torch.nn as nn
 import pickle
-from mmengine.config import Config
-from mmengine.runner import Runner, load_checkpoint
+from pipeline_spans import timed, annotate
+# numpy/torch/mmengine은 실제로 쓰는 함수 안에서 import (모듈 import만으로는 로드하지 않음)
 
 # print('[STEP] STGCN embedding script start'); sys.stdout.flush()
 
-# ======================[ MAIN FUNCTION ]======================
-def extract_stgcn_embedding(crop_csv_path, out_npy_path):
-    """
-    crop_csv_path: Path
-    out_npy_path: Path (저장)
-    """
-    # 환경에 맞게 경로 수정
-    BASE_DIR = r"D:/mmaction2"
-    sys.path.insert(0, BASE_DIR)
-    CFG = r"D:/golf_evaluation_system-web-/resPy/my_stgcnpp.py"
-    CKPT = r"D:/golf_evaluation_system-web-/resPy/stgcn_62p.pth"
-    DEVICE = 'cuda' if torch.cuda.is_available() else 'cpu'
-
-    # data_loader.ipynb의 make_pkl, load_and_process 방식 반영
-    def csv_to_pkl(csv_path, out_pkl):
-        import pandas as pd
-        df = pd.read_csv(csv_path)
-        F = df.shape[0]
-        V = 17
-        COCO_NAMES = [
-            "Nose", "LEye", "REye", "LEar", "REar", "LShoulder", "RShoulder", "LElbow", "RElbow",
-            "LWrist", "RWrist", "LHip", "RHip", "LKnee", "RKnee", "LAnkle", "RAnkle"
-        ]
-        # x_0~x_16 포맷
-        x_cols = [f"x_{i}" for i in range(V)]
-        y_cols = [f"y_{i}" for i in range(V)]
-        score_cols = [f"score_{i}" for i in range(V)]
-        if all(col in df.columns for col in x_cols) and all(col in df.columns for col in y_cols) and all(col in df.columns for col in score_cols):
-            arr = np.stack([
-                np.stack([df[x_cols].values, df[y_cols].values, df[score_cols].values], axis=2)
-            ], axis=0)[0]
-        # COCO 관절명 기반 포맷 (Nose_x, ...)
-        elif all(f"{name}_x" in df.columns for name in COCO_NAMES) and all(f"{name}_y" in df.columns for name in COCO_NAMES) and all(f"{name}_c" in df.columns for name in COCO_NAMES):
-            arr = np.stack([
-                np.stack([
-                    df[[f"{name}_x" for name in COCO_NAMES]].values,
-                    df[[f"{name}_y" for name in COCO_NAMES]].values,
-                    df[[f"{name}_c" for name in COCO_NAMES]].values
-                ], axis=2)
-            ], axis=0)[0]
-        else:
-            raise ValueError("CSV는 반드시 openpose COCO17 포맷(x_0~x_16, y_0~x_16, score_0~16) 또는 (Nose_x, ..., RAnkle_c) 포맷이어야 합니다.")
-        # (F, 17, 3)
-        keypoint = arr[:, :, :2]  # (F, 17, 2)
-        keypoint_score = arr[:, :, 2]  # (F, 17)
-        keypoint = np.expand_dims(keypoint, axis=0)  # (1, F, 17, 2)
-        keypoint_score = np.expand_dims(keypoint_score, axis=0)  # (1, F, 17)
-        ann = {
-            'frame_dir': csv_path.stem,
-            'total_frames': F,
-            'keypoint': keypoint,
-            'keypoint_score': keypoint_score,
-            'label': 0,
-            'img_shape': (1080, 1920),
-            'original_shape': (1080, 1920),
-            'metainfo': {'frame_dir': csv_path.stem, 'img_shape': (1080, 1920)}
-        }
-        data = {
-            'annotations': [ann],
-            'split': {'xsub_val': [csv_path.stem]}
-        }
-        with open(out_pkl, 'wb') as f:
-            pickle.dump(data, f, protocol=4)
+# 환경에 맞게 경로 수정
+BASE_DIR = r"D:/mmaction2"
+CFG = r"D:/golf_evaluation_system-web-/resPy/my_stgcnpp.py"
+CKPT = r"D:/golf_evaluation_system-web-/resPy/stgcn_62p.pth"
+
+
+# ======================[ DATA PREP ]======================
+def keypoints_to_pkl(arr, frame_dir, out_pkl):
+    """(F, 17, 3) keypoint 배열을 mmaction PoseDataset용 pkl로 저장"""
+    import numpy as np
+    F = arr.shape[0]
+    keypoint = arr[:, :, :2]  # (F, 17, 2)
+    keypoint_score = arr[:, :, 2]  # (F, 17)
+    keypoint = np.expand_dims(keypoint, axis=0)  # (1, F, 17, 2)
+    keypoint_score = np.expand_dims(keypoint_score, axis=0)  # (1, F, 17)
+    ann = {
+        'frame_dir': frame_dir,
+        'total_frames': F,
+        'keypoint': keypoint,
+        'keypoint_score': keypoint_score,
+        'label': 0,
+        'img_shape': (1080, 1920),
+        'original_shape': (1080, 1920),
+        'metainfo': {'frame_dir': frame_dir, 'img_shape': (1080, 1920)}
+    }
+    data = {
+        'annotations': [ann],
+        'split': {'xsub_val': [frame_dir]}
+    }
+    with open(out_pkl, 'wb') as f:
+        pickle.dump(data, f, protocol=4)
+
+
+# data_loader.ipynb의 make_pkl, load_and_process 방식 반영
+def track_to_pkl(keypoints_path, out_pkl):
+    """keypoint track (.kps.npy, mmap) 또는 이전 crop_csv → PoseDataset pkl (사람 없는 frame은 0)"""
+    from keypoint_track import KeypointSequence, track_stem
+    seq = KeypointSequence.load(keypoints_path)
+    # (F, 17, 3)
+    annotate(frames=len(seq))
+    keypoints_to_pkl(seq.data, track_stem(keypoints_path), out_pkl)
 
-    tmp_pkl = Path(str(out_npy_path).replace('.npy', '.pkl'))
-    csv_to_pkl(crop_csv_path, tmp_pkl)
 
+# ======================[ MODEL ]======================
+@timed('stgcn.load_model')
+def load_stgcn_model(device=None):
+    """
+    STGCN++ Runner/모델을 한 번만 로드해서 재사용 가능한 state dict로 반환
+    return: {'cfg', 'runner', 'model', 'last_lin', 'feat_dim', 'device'}
+    """
+    import torch
+    import torch.nn as nn
+    from mmengine.config import Config
+    from mmengine.runner import Runner
+    if BASE_DIR not in sys.path:
+        sys.path.insert(0, BASE_DIR)
+    device = device or ('cuda' if torch.cuda.is_available() else 'cpu')
     # runner, model, last_lin, feat_dim 정의
     cfg = Config.fromfile(CFG)
-    # ann_file 경로를 임시 pkl로 덮어쓰기
-    if hasattr(cfg, 'test_dataloader'):
-        cfg.test_dataloader.dataset.ann_file = str(tmp_pkl)
-    else:
-        cfg.data.test.dataset.ann_file = str(tmp_pkl)
     runner = Runner.from_cfg(cfg)
-    runner.load_checkpoint(CKPT, map_location=DEVICE)
+    runner.load_checkpoint(CKPT, map_location=device)
     model = runner.model
-    model = model.to(DEVICE)
+    model = model.to(device)
     model.eval()
     # 마지막 Linear layer 찾기 (cls_head 내부에서 nn.Linear 탐색)
     last_lin = next((m for m in model.cls_head.modules() if isinstance(m, nn.Linear)), None)
     if last_lin is None:
         raise RuntimeError("cls_head 내부에 nn.Linear 레이어가 없습니다.")
-    feat_dim = last_lin.in_features
+    return {
+        'cfg': cfg,
+        'runner': runner,
+        'model': model,
+        'last_lin': last_lin,
+        'feat_dim': last_lin.in_features,
+        'device': device,
+    }
+
+
+def embed_pkl(state, pkl_path, inline_loader=False):
+    """
+    로드된 모델로 pkl 1개의 비디오 임베딩 계산
+    inline_loader: True면 DataLoader worker 프로세스를 띄우지 않음 (상주 데몬용)
+    """
+    import copy
+    import numpy as np
+    import torch
+    cfg = state['cfg']
+    runner = state['runner']
+    model = state['model']
+    last_lin = state['last_lin']
+    feat_dim = state['feat_dim']
+    device = state['device']
+    # ann_file 경로를 임시 pkl로 덮어쓰기
+    if hasattr(cfg, 'test_dataloader'):
+        dl_cfg = copy.deepcopy(cfg.test_dataloader)
+        dl_cfg.dataset.ann_file = str(pkl_path)
+    else:
+        dl_cfg = copy.deepcopy(cfg.data.test)
+        dl_cfg.dataset.ann_file = str(pkl_path)
+    if inline_loader:
+        dl_cfg['num_workers'] = 0
+        dl_cfg['persistent_workers'] = False
+    dataloader = runner.build_dataloader(dl_cfg, seed=runner.seed)
 
     embs = []
     with torch.no_grad():
-        for batch in runner.test_dataloader:
+        for batch in dataloader:
             data_samples = batch['data_samples']
             inputs = batch['inputs']
             for i, ds in enumerate(data_samples):
@@ -108,11 +124,11 @@ def extract_stgcn_embedding(crop_csv_path, out_npy_path):
                     clip_embs.append(inp[0].cpu().squeeze(0))
                 handle = last_lin.register_forward_hook(hook)
                 if isinstance(inputs, list):
-                    inp = inputs[i].unsqueeze(0).to(DEVICE)
+                    inp = inputs[i].unsqueeze(0).to(device)
                 elif isinstance(inputs, dict):
-                    inp = {k: v[i].unsqueeze(0).to(DEVICE) for k, v in inputs.items()}
+                    inp = {k: v[i].unsqueeze(0).to(device) for k, v in inputs.items()}
                 elif torch.is_tensor(inputs):
-                    inp = inputs[i].unsqueeze(0).to(DEVICE)
+                    inp = inputs[i].unsqueeze(0).to(device)
                 model.forward(inp, [ds], mode='predict')
                 handle.remove()
                 if not clip_embs:
@@ -121,8 +137,43 @@ def extract_stgcn_embedding(crop_csv_path, out_npy_path):
                 video_emb = np.nan_to_num(video_emb, nan=0.0, posinf=0.0, neginf=0.0)
                 embs.append(video_emb)
     em_arr = np.stack(embs, 0)
-    np.save(out_npy_path, em_arr[0])
-    tmp_pkl.unlink()  # 임시 pkl 삭제
+    return em_arr[0]
+
+
+@timed('stgcn.embed_keypoints')
+def embed_keypoints(state, keypoints_path, out_npy_path, inline_loader=False):
+    """로드된 모델로 keypoint track(또는 crop_csv) → 임베딩 npy 저장"""
+    import numpy as np
+    tmp_pkl = Path(str(out_npy_path).replace('.npy', '.pkl'))
+    track_to_pkl(keypoints_path, tmp_pkl)
+    try:
+        emb = embed_pkl(state, tmp_pkl, inline_loader=inline_loader)
+        np.save(out_npy_path, emb)
+    finally:
+        if tmp_pkl.exists():
+            tmp_pkl.unlink()  # 임시 pkl 삭제
+
+
+def warmup_stgcn(state, work_dir, frames=100):
+    """더미 skeleton으로 forward 1회 실행 (cudnn/메모리 할당 예열)"""
+    import numpy as np
+    tmp_pkl = Path(work_dir) / '_stgcn_warmup.pkl'
+    keypoints_to_pkl(np.zeros((frames, 17, 3), dtype=np.float32), '_warmup', tmp_pkl)
+    try:
+        embed_pkl(state, tmp_pkl, inline_loader=True)
+    finally:
+        if tmp_pkl.exists():
+            tmp_pkl.unlink()
+
+
+# ======================[ MAIN FUNCTION ]======================
+def extract_stgcn_embedding(keypoints_path, out_npy_path):
+    """
+    keypoints_path: Path (keypoint track .kps.npy 또는 crop_csv)
+    out_npy_path: Path (저장)
+    """
+    state = load_stgcn_model()
+    embed_keypoints(state, keypoints_path, out_npy_path)
 
     # print(f'[SUCCESS] Saved embedding to {out_npy_path}'); sys.stdout.flush()
 
@@ -130,11 +181,11 @@ def extract_stgcn_embedding(crop_csv_path, out_npy_path):
 if __name__ == "__main__":
     try:
         if len(sys.argv) != 3:
-            print("Usage: python extract_stgcn_single.py <input_csv> <output_npy>", file=sys.stderr)
+            print("Usage: python extract_stgcn_single.py <input_keypoints(.kps.npy|.csv)> <output_npy>", file=sys.stderr)
             sys.exit(1)
-        input_csv = sys.argv[1]
+        input_keypoints = sys.argv[1]
         output_npy = sys.argv[2]
-        extract_stgcn_embedding(Path(input_csv), Path(output_npy))
+        extract_stgcn_embedding(Path(input_keypoints), Path(output_npy))
         # print(f"[STGCN] Saved embedding to {output_npy}")
     except Exception as e:
         import traceback
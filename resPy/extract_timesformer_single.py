@@ -1,59 +1,87 @@
-
 """
 단일 crop_video에서 Timesformer 임베딩 추출
 - extract_timesformer_embedding: crop_video_path, out_npy_path
+- load_timesformer_model / embed_video: 모델을 한 번 로드해 여러 비디오에 재사용 (embedding_daemon)
+- torch/torchvision/decord는 실제로 쓰는 함수 안에서 import (모듈 import만으로는 로드하지 않음)
 """
 from pathlib import Path
-import torch
-import torch.nn as nn
-import numpy as np
-from torchvision import transforms
-from torchvision.transforms import InterpolationMode
-from decord import VideoReader
 import sys
+import functools
+from pipeline_spans import timed, annotate
 
-def extract_timesformer_embedding(crop_video_path, out_npy_path):
-    """
-    crop_video_path: Path
-    out_npy_path: Path (저장)
-    """
-    # 환경에 맞게 경로 수정
-    MODEL_PATH = Path(__file__).parent / 'timesformer_model.pth'
-    PRETRAINED = Path(r'D:/timesformer/pretrained/TimeSformer_divST_96x4_224_K600.pyth')
-    IMG_SIZE = 224
-    NUM_FRAMES = 96
-    CLIPS_PER_VID = 2
-    DEVICE = 'cuda' if torch.cuda.is_available() else 'cpu'
-    sys.path.append(r'D:/timesformer')
-    from timesformer.models.vit import TimeSformer
-    mean = [0.485, 0.456, 0.406]
-    std  = [0.229, 0.224, 0.225]
-    eval_transform = transforms.Compose([
+# 환경에 맞게 경로 수정
+MODEL_PATH = Path(__file__).parent / 'timesformer_model.pth'
+PRETRAINED = Path(r'D:/timesformer/pretrained/TimeSformer_divST_96x4_224_K600.pyth')
+TIMESFORMER_ROOT = r'D:/timesformer'
+IMG_SIZE = 224
+NUM_FRAMES = 96
+CLIPS_PER_VID = 2
+
+mean = [0.485, 0.456, 0.406]
+std  = [0.229, 0.224, 0.225]
+
+
+@functools.lru_cache(maxsize=1)
+def eval_transform():
+    from torchvision import transforms
+    from torchvision.transforms import InterpolationMode
+    return transforms.Compose([
         transforms.Resize(256, interpolation=InterpolationMode.BICUBIC),
         transforms.CenterCrop(IMG_SIZE),
         transforms.ToTensor(),
         transforms.Normalize(mean, std),
     ])
-    def uniform_sample(length, num):
-        if length >= num:
-            return np.linspace(0, length-1, num, dtype=int)
-        return np.pad(np.arange(length), (0,num-length), mode='edge')
-    def load_clip(path):
+
+
+def uniform_sample(length, num):
+    import numpy as np
+    if length >= num:
+        return np.linspace(0, length-1, num, dtype=int)
+    return np.pad(np.arange(length), (0,num-length), mode='edge')
+
+
+def load_clip(path):
+    import numpy as np
+    import torch
+    from torchvision import transforms
+    from frame_store import open_view
+    transform = eval_transform()
+    # crop 단계의 frame store가 살아 있으면 필요한 frame만 mmap에서 읽음 (decord 디코드 생략)
+    view = open_view(path)
+    if view is not None:
+        L = len(view)
+        get_batch = lambda idx: view.get_batch(idx, rgb=True)
+    else:
+        from decord import VideoReader
         vr = VideoReader(str(path))
-        L  = len(vr)
-        segs = np.linspace(0, L, CLIPS_PER_VID+1, dtype=int)
-        clips = []
-        for s,e in zip(segs[:-1], segs[1:]):
-            idx = uniform_sample(e-s, NUM_FRAMES) + s
-            arr = vr.get_batch(idx).asnumpy()
-            proc = []
-            for frame in arr:
-                img = transforms.ToPILImage()(frame)
-                img_t = eval_transform(img)
-                proc.append(img_t)
-            clip = torch.stack(proc, dim=1)
-            clips.append(clip)
-        return clips
+        L = len(vr)
+        get_batch = lambda idx: vr.get_batch(idx).asnumpy()
+    annotate(frames=L, frame_store=view is not None)
+    segs = np.linspace(0, L, CLIPS_PER_VID+1, dtype=int)
+    clips = []
+    for s,e in zip(segs[:-1], segs[1:]):
+        idx = uniform_sample(e-s, NUM_FRAMES) + s
+        arr = get_batch(idx)
+        proc = []
+        for frame in arr:
+            img = transforms.ToPILImage()(frame)
+            img_t = transform(img)
+            proc.append(img_t)
+        clip = torch.stack(proc, dim=1)
+        clips.append(clip)
+    return clips
+
+
+@timed('timesformer.load_model')
+def load_timesformer_model(device=None):
+    """TimeSformerEmbed 모델 로드 (eval 모드, device 이동까지)"""
+    import torch
+    import torch.nn as nn
+    device = device or ('cuda' if torch.cuda.is_available() else 'cpu')
+    if TIMESFORMER_ROOT not in sys.path:
+        sys.path.append(TIMESFORMER_ROOT)
+    from timesformer.models.vit import TimeSformer
+
     class TimeSformerEmbed(nn.Module):
         def __init__(self, model_path, img_size, num_frames, num_classes, pretrained_path):
             super().__init__()
@@ -86,25 +114,61 @@ def extract_timesformer_embedding(crop_video_path, out_npy_path):
             self.base.cls_head = nn.Identity()
         def forward(self, x):
             return self.base(x)
+
     embed_model = TimeSformerEmbed(
         model_path=MODEL_PATH,
         img_size=IMG_SIZE,
         num_frames=NUM_FRAMES,
         num_classes=2,
         pretrained_path=PRETRAINED
-    ).to(DEVICE)
+    ).to(device)
     embed_model.eval()
-    clips = load_clip(crop_video_path)
+    return embed_model
+
+
+def _model_device(embed_model):
+    return next(embed_model.parameters()).device
+
+
+def embed_clips(embed_model, clips):
+    """clip 리스트 → 평균 CLS feature (np.ndarray)"""
+    import numpy as np
+    import torch
+    device = _model_device(embed_model)
     feats = []
     for clip in clips:
-        c = clip.unsqueeze(0).to(DEVICE)
+        c = clip.unsqueeze(0).to(device)
         with torch.no_grad():
             out = embed_model.base.model.forward_features(c)
         cls = out[:,0,:] if out.ndim==3 else out
         feats.append(cls.squeeze(0).cpu().numpy())
-    emb = np.stack(feats,0).mean(0)
+    return np.stack(feats,0).mean(0)
+
+
+@timed('timesformer.embed_video')
+def embed_video(embed_model, crop_video_path, out_npy_path):
+    """로드된 모델로 crop_video → 임베딩 npy 저장"""
+    import numpy as np
+    clips = load_clip(crop_video_path)
+    emb = embed_clips(embed_model, clips)
     np.save(out_npy_path, emb)
 
+
+def warmup_timesformer(embed_model):
+    """더미 clip으로 forward 1회 실행 (cudnn/메모리 할당 예열)"""
+    import torch
+    dummy = torch.zeros(3, NUM_FRAMES, IMG_SIZE, IMG_SIZE)
+    embed_clips(embed_model, [dummy])
+
+
+def extract_timesformer_embedding(crop_video_path, out_npy_path):
+    """
+    crop_video_path: Path
+    out_npy_path: Path (저장)
+    """
+    embed_model = load_timesformer_model()
+    embed_video(embed_model, crop_video_path, out_npy_path)
+
 if __name__ == "__main__":
     import sys
     import traceback
@@ -0,0 +1,377 @@
+"""
+decode-once frame store (memory-mapped uint8 BGR frames)
+- 업로드 1개의 프레임을 ffmpeg로 한 번만 디코드해서
+    1) OpenPose 입력용 재인코딩 mp4 (OpenPoseDemo는 외부 프로세스라 파일이 필요, media_transcode mezzanine)
+    2) raw BGR frame 파일 (np.memmap, shape (F, H, W, 3))
+    (+ bbox proxy 비디오 등 추가 rendition)
+  을 같은 디코드에서 동시에 만든다 (media_transcode split filter graph).
+- crop / overlay / TimeSformer는 원본을 다시 디코드하지 않고 store를 읽는다.
+    crop      : store[:, y:y+h, x:x+w] 를 ffmpeg stdin으로 인코딩 (디코드 없음)
+    overlay   : open_view(crop_video) → frame view를 그대로 그림
+    timesformer: open_view(crop_video) → 필요한 frame index만 zero-copy로 읽음 (임베딩 데몬 프로세스에서도 같은 파일을 mmap)
+- crop 비디오 옆 <crop_video>.frames.json (sidecar)이 store 위치/crop 영역을 가리킨다.
+  sidecar의 size/mtime이 crop 비디오와 다르거나 store가 없으면 open_view는 None → 호출 측은 기존 디코드 경로 사용.
+- 파이프라인이 끝나면 release()로 store를 지운다.
+- store는 scratch_workspace의 자기 workspace(frames-<key>)에 있으므로 SCRATCH_MAX_MB quota로 RAM/디스크가 정해지고,
+  프로세스가 죽어서 release()가 안 불려도 다음 sweep_orphans()가 지운다.
+
+파일 (<key>는 run_openpose_and_crop의 scratch workspace 이름 — 같은 basename 동시 작업도 충돌 없음)
+    <scratch root>/frames-<key>/frames.bgr     raw frame (F*H*W*3 bytes)
+    <scratch root>/frames-<key>/frames.json    {'frames', 'width', 'height', 'fps', 'source'}
+
+환경 변수
+- FRAME_STORE=0          : 사용 안 함 (기존 ffmpeg/cv2/decord 디코드)
+- FRAME_STORE_MAX_MB     : store 최대 크기 (기본 2048), 넘는 비디오는 store 없이 처리
+- SCRATCH_DIR, SCRATCH_MAX_MB, SCRATCH_DISK_DIR : store 위치/quota (scratch_workspace 참고)
+"""
+import os
+import sys
+import json
+import subprocess
+import threading
+from pathlib import Path
+
+READ_CHUNK_FRAMES = 8
+
+
+def store_enabled():
+    return os.environ.get('FRAME_STORE', '1') != '0'
+
+
+def max_store_bytes():
+    try:
+        return int(float(os.environ.get('FRAME_STORE_MAX_MB', '2048')) * 1024 * 1024)
+    except ValueError:
+        return 2048 * 1024 * 1024
+
+
+def store_workspace_name(key):
+    return f'frames-{key}'
+
+
+def _files(ws_path):
+    return Path(ws_path) / 'frames.bgr', Path(ws_path) / 'frames.json'
+
+
+def store_paths(key):
+    """key의 (data, meta) 경로, store가 없으면 None"""
+    import scratch_workspace
+    path = scratch_workspace.find(store_workspace_name(key))
+    return _files(path) if path is not None else None
+
+
+def _sidecar_path(video_path):
+    p = Path(video_path)
+    return p.with_name(p.name + '.frames.json')
+
+
+class FrameView:
+    """store의 (crop) 영역 view — frames는 np.memmap slice (복사 없음)"""
+
+    def __init__(self, frames, fps):
+        self.frames = frames
+        self.fps = fps
+
+    @property
+    def width(self):
+        return int(self.frames.shape[2])
+
+    @property
+    def height(self):
+        return int(self.frames.shape[1])
+
+    def __len__(self):
+        return int(self.frames.shape[0])
+
+    def __getitem__(self, idx):
+        return self.frames[idx]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.frames[i]
+
+    def get_batch(self, indices, rgb=False):
+        """frame index 배열 → (N, H, W, 3) uint8 (decord VideoReader.get_batch 대응)"""
+        import numpy as np
+        arr = self.frames[np.asarray(indices, dtype=np.int64)]
+        return np.ascontiguousarray(arr[..., ::-1]) if rgb else arr
+
+    def crop(self, x, y, w, h):
+        return FrameView(self.frames[:, y:y + h, x:x + w], self.fps)
+
+    def window(self, start, end):
+        """frame 구간 [start, end) view (스윙 구간 trim, swing_window)"""
+        return FrameView(self.frames[start:end], self.fps)
+
+    def close(self):
+        """memmap 참조를 놓음 (마지막 참조가 사라지면 unmap → Windows에서도 release가 store 파일을 지울 수 있음)"""
+        self.frames = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SelectedFrames:
+    """
+    frame index 부분집합 view (pose temporal stride용 pose_stride, bbox proxy용 bbox_proxy)
+    - view가 있으면 해당 frame만 memmap에서 읽고, 없으면 video_path를 순서대로 grab하면서 선택된 frame만 retrieve
+    - crop (x, y, w, h): 디코드 경로에서 frame을 잘라서 줌 (view 경로는 이미 crop된 view를 넘김)
+    - size (w, h): 주면 frame을 축소해서 줌 (INTER_AREA)
+    """
+
+    def __init__(self, indices, view=None, video_path=None, crop=None, size=None):
+        import numpy as np
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.view = view
+        self.video_path = video_path
+        self.crop_box = crop
+        if view is not None:
+            self.width, self.height, self.fps = view.width, view.height, view.fps
+        else:
+            w, h, fps, _ = _probe(video_path)
+            if crop is not None:
+                w, h = crop[2], crop[3]
+            self.width, self.height, self.fps = w, h, fps
+        self.size = None
+        if size is not None and tuple(size) != (self.width, self.height):
+            self.size = (int(size[0]), int(size[1]))
+            self.width, self.height = self.size
+
+    def _resize(self, frame):
+        if self.size is None:
+            return frame
+        import cv2
+        return cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+
+    def __len__(self):
+        return int(len(self.indices))
+
+    def __getitem__(self, k):
+        if self.view is None:
+            raise TypeError('random access needs a frame view')
+        return self._resize(self.view[int(self.indices[k])])
+
+    def __iter__(self):
+        if self.view is not None:
+            for i in self.indices:
+                yield self._resize(self.view[int(i)])
+            return
+        import cv2
+        wanted = set(int(i) for i in self.indices)
+        last = int(self.indices[-1]) if len(self.indices) else -1
+        cap = cv2.VideoCapture(str(self.video_path))
+        try:
+            i = 0
+            while i <= last and cap.grab():
+                if i in wanted:
+                    ret, frame = cap.retrieve()
+                    if not ret:
+                        break
+                    if self.crop_box is not None:
+                        x, y, w, h = self.crop_box
+                        frame = frame[y:y + h, x:x + w]
+                    yield self._resize(frame)
+                i += 1
+        finally:
+            cap.release()
+
+
+class FrameStore(FrameView):
+    def __init__(self, data_path, meta):
+        import numpy as np
+        self.data_path = Path(data_path)
+        self.meta = meta
+        shape = (meta['frames'], meta['height'], meta['width'], 3)
+        frames = np.memmap(self.data_path, dtype=np.uint8, mode='r', shape=shape) if meta['frames'] else \
+            np.zeros(shape, dtype=np.uint8)
+        super().__init__(frames, meta.get('fps') or 30.0)
+
+    @classmethod
+    def open(cls, key=None, data_path=None, meta_path=None):
+        """store 열기, 없거나 깨졌으면 None"""
+        if key is not None:
+            paths = store_paths(key)
+            if paths is None:
+                return None
+            data_path, meta_path = paths
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            expected = meta['frames'] * meta['height'] * meta['width'] * 3
+            if Path(data_path).stat().st_size < expected:
+                return None
+            return cls(data_path, meta)
+        except (OSError, ValueError, KeyError):
+            return None
+
+
+def _probe(src):
+    import cv2
+    cap = cv2.VideoCapture(str(src))
+    try:
+        w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        n = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    finally:
+        cap.release()
+    if not fps or fps != fps:
+        fps = 30.0
+    return w, h, float(fps), n
+
+
+def ingest(src, reencoded_out, key, reencode_args=None, extra=()):
+    """
+    src를 한 번 디코드해서 reencoded_out(mp4), extra rendition(media_transcode.Rendition), frame store를
+    같은 filter graph에서 같이 만든다. reencoded_out이 None이면 재인코딩 없이 store/extra만 (mezzanine 재사용)
+    key: store 이름 (scratch workspace frames-<key>에 생성, release(key)로 삭제)
+    reencode_args: None이면 media_transcode.encode_args() (MEDIA_PRESET, faststart)
+    return: FrameStore | None (store를 만들 수 없으면 None — 파일 rendition은 항상 생성, 실패 시 RuntimeError)
+    """
+    import numpy as np
+    import media_transcode
+    import scratch_workspace
+    w, h, fps, est = _probe(src)
+    frame_bytes = w * h * 3
+    # 프레임 수 추정치가 틀릴 수 있으므로 여유를 두고, 넘치면 store는 포기
+    capacity = int(est * 1.1) + 8 if est > 0 else 0
+    use_store = store_enabled() and frame_bytes > 0 and 0 < capacity * frame_bytes <= max_store_bytes()
+    if store_enabled() and not use_store:
+        print(f'[WARN] frame store skipped for {Path(src).name}: {w}x{h}x{est} frames exceeds FRAME_STORE_MAX_MB or unknown length',
+              file=sys.stderr); sys.stderr.flush()
+
+    renditions = list(extra)
+    if reencoded_out is not None:
+        renditions.insert(0, media_transcode.Rendition(reencoded_out, args=reencode_args))
+    if not use_store:
+        if renditions:
+            media_transcode.run(src, renditions)
+        return None
+
+    ws = scratch_workspace.workspace('frames', name=store_workspace_name(key), estimate_bytes=capacity * frame_bytes)
+    data_path, meta_path = _files(ws.path)
+    frames = np.memmap(data_path, dtype=np.uint8, mode='w+', shape=(capacity, h, w, 3))
+    cmd = media_transcode.build_command(src, renditions + [media_transcode.raw_rendition()])
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    err_chunks = []
+    err_thread = threading.Thread(target=lambda: err_chunks.append(proc.stderr.read()), daemon=True)
+    err_thread.start()
+    n, overflow, partial = 0, False, b''
+    chunk = frame_bytes * READ_CHUNK_FRAMES
+    while True:
+        buf = proc.stdout.read(chunk)
+        if not buf:
+            break
+        buf = partial + buf
+        k = len(buf) // frame_bytes
+        if k and not overflow:
+            if n + k > capacity:
+                overflow = True
+            else:
+                frames[n:n + k] = np.frombuffer(buf, dtype=np.uint8, count=k * frame_bytes).reshape(k, h, w, 3)
+        n += k
+        partial = buf[k * frame_bytes:]
+    proc.wait()
+    err_thread.join()
+    if proc.returncode != 0:
+        del frames
+        release(key)
+        stderr = (err_chunks[0] if err_chunks else b'').decode('utf-8', errors='ignore')
+        raise RuntimeError(f'ffmpeg re-encode failed: returncode={proc.returncode}\nstderr={stderr}')
+    frames.flush()
+    del frames
+    if overflow or partial or n == 0:
+        print(f'[WARN] frame store discarded for {Path(src).name}: frames={n}, capacity={capacity}, '
+              f'trailing_bytes={len(partial)}', file=sys.stderr); sys.stderr.flush()
+        release(key)
+        return None
+    # 실제 frame 수로 파일 크기를 맞춤
+    with open(data_path, 'r+b') as f:
+        f.truncate(n * frame_bytes)
+    meta = {'frames': n, 'width': w, 'height': h, 'fps': fps, 'source': str(Path(src).resolve())}
+    tmp = meta_path.with_suffix('.json.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    os.replace(tmp, meta_path)
+    return FrameStore(data_path, meta)
+
+
+def encode_view(view, out_path, args=('-pix_fmt', 'yuv420p')):
+    """frame view를 ffmpeg stdin(rawvideo)으로 인코딩 — 원본을 다시 디코드하지 않는 crop 비디오 생성
+    args: 출력 옵션 (crop은 media_transcode.encode_args() → 바로 웹 재생용)"""
+    cmd = ['ffmpeg', '-y', '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{view.width}x{view.height}',
+           '-r', f'{view.fps:.6f}', '-i', 'pipe:0', *args, str(out_path)]
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    err_chunks = []
+    err_thread = threading.Thread(target=lambda: err_chunks.append(proc.stderr.read()), daemon=True)
+    err_thread.start()
+    try:
+        for frame in view:
+            proc.stdin.write(frame.tobytes())
+    except BrokenPipeError:
+        pass
+    finally:
+        proc.stdin.close()
+    proc.wait()
+    err_thread.join()
+    if proc.returncode != 0:
+        stderr = (err_chunks[0] if err_chunks else b'').decode('utf-8', errors='ignore')
+        raise subprocess.CalledProcessError(proc.returncode, cmd, stderr=stderr)
+
+
+def link_view(video_path, store, crop=None, window=None):
+    """video_path(crop 비디오)가 store의 crop 영역(+ frame 구간 window)과 같은 frame임을 sidecar로 기록"""
+    st = Path(video_path).stat()
+    side = {
+        'store': str(store.data_path), 'meta': str(_files(Path(store.data_path).parent)[1]),
+        'crop': list(crop) if crop else None,
+        'window': list(window) if window else None,
+        'video_size': st.st_size, 'video_mtime_ns': st.st_mtime_ns,
+    }
+    with open(_sidecar_path(video_path), 'w', encoding='utf-8') as f:
+        json.dump(side, f)
+
+
+def open_view(video_path):
+    """video_path에 연결된 store view, 없거나 오래됐으면 None"""
+    if not store_enabled():
+        return None
+    try:
+        with open(_sidecar_path(video_path), 'r', encoding='utf-8') as f:
+            side = json.load(f)
+        st = Path(video_path).stat()
+    except (OSError, ValueError):
+        return None
+    if side.get('video_size') != st.st_size or side.get('video_mtime_ns') != st.st_mtime_ns:
+        return None
+    store = FrameStore.open(data_path=side['store'], meta_path=side['meta'])
+    if store is None:
+        return None
+    view = store.window(*side['window']) if side.get('window') else store
+    return view.crop(*side['crop']) if side.get('crop') else view
+
+
+def release(key=None, linked=()):
+    """key의 store와 linked 비디오의 sidecar(+ sidecar가 가리키는 store) 삭제
+    key를 모르는 호출 측(analyze_golf_video)은 linked만 넘긴다"""
+    import scratch_workspace
+    names = [store_workspace_name(key)] if key is not None else []
+    for v in linked:
+        try:
+            with open(_sidecar_path(v), 'r', encoding='utf-8') as f:
+                side = json.load(f)
+            names.append(Path(side['store']).parent.name)
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        try:
+            _sidecar_path(v).unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f'[WARN] failed to remove frame store sidecar {v}: {e}', file=sys.stderr); sys.stderr.flush()
+    for name in dict.fromkeys(names):
+        if name.startswith(store_workspace_name('')):
+            scratch_workspace.remove(name)
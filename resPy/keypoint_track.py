@@ -0,0 +1,432 @@
+"""
+binary keypoint track (crop keypoint를 stage 사이에 넘기는 형식)
+- <stem>.kps.npy  : float32 (F, 17, 3) [x, y, c] — np.load(mmap_mode='r')로 텍스트 파싱 없이 바로 읽음
+- <stem>.kps.json : sidecar 메타데이터
+    {'format', 'version', 'frames', 'joints', 'fps', 'width', 'height', 'coord_space', 'backend', ...}
+  coord_space: 'pixel' (crop 비디오 pixel 좌표) | 'normalized' (0..1, 이전 CSV 일부)
+- 사람 없는 frame은 전부 0 (c == 0). CSV export에서는 기존 crop_csv와 같게 NaN 행.
+- .npz는 mmap이 안 되므로 .npy + JSON sidecar만 사용.
+- CSV (<이름>_x/_y/_c 또는 x_i/y_i/score_i)도 load_track으로 읽을 수 있음 (이전 산출물 호환).
+- 관절 순서는 KP (OpenPose COCO 순서), 관절은 index 숫자 대신 이름(JOINT_INDEX, seq.joint)으로 찾는다.
+  이전 버전 CSV/sidecar의 MS COCO 이름(LEGACY_KP)은 위치로 KP에 대응 (read_meta, read_keypoints_csv).
+- KeypointSequence: 소비 모듈 공통 자료구조 (관절 이름 view, validity mask, 정규화↔pixel 변환).
+  KeypointSequence.load는 파일(path, size, mtime)별로 캐시 → 같은 프로세스의 여러 stage가 한 번만 읽음.
+  캐시에는 memmap이 아니라 메모리로 읽은 배열을 둠 (열린 memmap이 Windows에서 os.replace/unlink를 막음),
+  save_track은 캐시를 비움.
+
+    from keypoint_track import KeypointSequence
+    seq = KeypointSequence.load('crop_csv/X_crop.kps.npy')   # seq.data: 읽기 전용 (F, 17, 3) 배열
+    wrist = seq.joint('LWrist')                                # (F, 3) view
+    pts = seq.to_pixel().masked_xy(min_conf=0.01, fill=-1)     # (F, 17, 2), 안 보이는 점은 -1
+
+CSV export
+    python keypoint_track.py export crop_csv/X_crop.kps.npy [--csv out.csv]
+    python keypoint_track.py info crop_csv/X_crop.kps.npy
+
+환경 변수
+- KEYPOINT_CSV=1 : 파이프라인이 track 옆에 crop_csv(<stem>.csv)도 같이 저장 (호환용, 기본 끔)
+"""
+import os
+import sys
+import json
+import functools
+from pathlib import Path
+
+FORMAT = 'golf-keypoints'
+# 형식/의미가 바뀌면 올림 (load_track은 더 높은 버전을 거부)
+FORMAT_VERSION = 1
+TRACK_SUFFIX = '.kps.npy'
+META_SUFFIX = '.kps.json'
+
+# keypoint 이름 = OpenPose --model_pose COCO 출력 순서의 앞 17개 (18번째 LEar는 버림), 모든 pose backend 공통
+# CSV 컬럼 (<이름>_x, <이름>_y, <이름>_c)
+KP = [
+    "Nose", "Neck", "RShoulder", "RElbow", "RWrist", "LShoulder", "LElbow", "LWrist",
+    "RHip", "RKnee", "RAnkle", "LHip", "LKnee", "LAnkle", "REye", "LEye", "REar"
+]
+COLS = [f"{n}_{a}" for n in KP for a in ("x", "y", "c")]
+NUM_KP = len(KP)
+JOINT_INDEX = {name: i for i, name in enumerate(KP)}
+# MS COCO 17 keypoint 순서 (mmaction x_i/y_i CSV)
+# 이전 버전은 이 이름을 OpenPose 순서 배열에 그대로 붙여서 저장했음 (CSV 컬럼, track sidecar 'joints')
+# → 이 이름 목록이 붙은 이전 산출물은 이름이 아니라 위치로 읽는다 (i번째 컬럼 = KP[i])
+LEGACY_KP = [
+    "Nose", "LEye", "REye", "LEar", "REar", "LShoulder", "RShoulder", "LElbow", "RElbow",
+    "LWrist", "RWrist", "LHip", "RHip", "LKnee", "RKnee", "LAnkle", "RAnkle"
+]
+LEGACY_COLS = [f"{n}_{a}" for n in LEGACY_KP for a in ("x", "y", "c")]
+# 뼈대 연결 (OpenPose COCO limb, LEar 제외) / COM 계산에 쓰는 관절 (hips, shoulders, knees, ankles)
+# — 서버 overlay(openpose_skeleton_overlay)와 프론트용 overlay track(overlay_track)이 같이 씀
+COCO_CONNECTIONS = [(JOINT_INDEX[a], JOINT_INDEX[b]) for a, b in [
+    ("Neck", "RShoulder"), ("RShoulder", "RElbow"), ("RElbow", "RWrist"),
+    ("Neck", "LShoulder"), ("LShoulder", "LElbow"), ("LElbow", "LWrist"),
+    ("Neck", "RHip"), ("RHip", "RKnee"), ("RKnee", "RAnkle"),
+    ("Neck", "LHip"), ("LHip", "LKnee"), ("LKnee", "LAnkle"),
+    ("Neck", "Nose"), ("Nose", "REye"), ("REye", "REar"), ("Nose", "LEye"),
+]]
+COM_JOINTS = ["LHip", "RHip", "LShoulder", "RShoulder", "LKnee", "RKnee", "LAnkle", "RAnkle"]
+COM_INDICES = [JOINT_INDEX[n] for n in COM_JOINTS]
+# KeypointSequence.load 캐시 크기 (파일 수)
+SEQUENCE_CACHE_SIZE = 16
+
+
+def csv_export_enabled():
+    return os.environ.get('KEYPOINT_CSV', '0') == '1'
+
+
+def track_path(directory, stem):
+    return Path(directory) / f'{stem}{TRACK_SUFFIX}'
+
+
+def track_stem(path):
+    """X_crop.kps.npy / X_crop.csv -> X_crop"""
+    name = Path(path).name
+    for suffix in (TRACK_SUFFIX, '.csv', '.npy'):
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return Path(path).stem
+
+
+def meta_path(path):
+    return Path(path).with_name(track_stem(path) + META_SUFFIX)
+
+
+def is_track(path):
+    return Path(path).name.endswith(TRACK_SUFFIX)
+
+
+def save_track(path, kps, fps=None, width=None, height=None, coord_space='pixel', backend=None, **extra):
+    """(F, 17, 3) keypoint → path(.kps.npy) + sidecar. 둘 다 임시 파일에 쓴 뒤 rename"""
+    import numpy as np
+    path = Path(path)
+    arr = np.ascontiguousarray(kps, dtype=np.float32)
+    if arr.ndim != 3 or arr.shape[1:] != (NUM_KP, 3):
+        raise ValueError(f'keypoint track must be (F, {NUM_KP}, 3), got {arr.shape}')
+    meta = {
+        'format': FORMAT,
+        'version': FORMAT_VERSION,
+        'frames': int(arr.shape[0]),
+        'joints': KP,
+        'fps': float(fps) if fps else None,
+        'width': int(width) if width else None,
+        'height': int(height) if height else None,
+        'coord_space': coord_space,
+        'backend': backend,
+    }
+    meta.update(extra)
+    path.parent.mkdir(exist_ok=True, parents=True)
+    # 캐시된 sequence가 이전 내용을 들고 있지 않게 (새 파일은 size/mtime이 달라 어차피 다시 읽음)
+    _load_sequence_cached.cache_clear()
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'wb') as f:
+        np.save(f, arr)
+    os.replace(tmp, path)
+    mpath = meta_path(path)
+    tmp = mpath.with_name(mpath.name + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp, mpath)
+    return path
+
+
+def read_meta(path):
+    """sidecar 메타데이터 (없으면 기본값 — 이전 버전 track도 읽을 수 있게)"""
+    meta = {'format': FORMAT, 'version': FORMAT_VERSION, 'joints': KP, 'fps': None, 'width': None,
+            'height': None, 'coord_space': 'pixel', 'backend': None}
+    try:
+        with open(meta_path(path), 'r', encoding='utf-8') as f:
+            meta.update(json.load(f))
+    except FileNotFoundError:
+        pass
+    if meta.get('format') != FORMAT or int(meta.get('version') or 0) > FORMAT_VERSION:
+        raise ValueError(f'unsupported keypoint track {path}: format={meta.get("format")} version={meta.get("version")}')
+    if meta.get('joints') == LEGACY_KP:
+        # 이전 버전 sidecar: 배열은 같은 OpenPose 순서, 이름만 잘못 붙어 있었음
+        meta['joints'] = KP
+    return meta
+
+
+def load_track(path, mmap=True):
+    """
+    keypoint track 또는 CSV → (kps, meta)
+    kps: (F, 17, 3) float32 — .npy는 mmap=True면 읽기 전용 memmap (복사 없음), CSV는 파싱한 배열
+    """
+    import numpy as np
+    path = Path(path)
+    if path.suffix.lower() == '.csv':
+        return read_keypoints_csv(path)
+    kps = np.load(path, mmap_mode='r' if mmap else None)
+    if kps.dtype != np.float32 or kps.ndim != 3 or kps.shape[1:] != (NUM_KP, 3):
+        raise ValueError(f'invalid keypoint track {path}: dtype={kps.dtype} shape={kps.shape}')
+    meta = read_meta(path)
+    meta['frames'] = int(kps.shape[0])
+    return kps, meta
+
+
+def read_keypoints_csv(csv_path):
+    """
+    이전 crop_csv → (kps, meta) (호환용)
+    - <이름>_x/_y/_c (OpenPose 파이프라인, KP 이름 — 이전 버전의 LEGACY_KP 이름 컬럼은 위치로 KP에 대응)
+      또는 x_i/y_i[/score_i|visibility_i] (mmaction/mediapipe 형식, MS COCO 순서 → KP 순서로 재배치, z는 무시)
+      MS COCO에 없는 Neck은 양 어깨가 모두 있으면 중점
+    - NaN(사람 없는 frame)은 0, 좌표 최대값이 1 이하면 coord_space='normalized'
+    - 'frame' 컬럼이 있으면 meta['frame_index']
+    """
+    import numpy as np
+    import pandas as pd
+    df = pd.read_csv(csv_path)
+    cols = set(df.columns)
+    named = COLS if all(c in cols for c in COLS) else LEGACY_COLS if all(c in cols for c in LEGACY_COLS) else None
+    if named is not None:
+        vals = df[named].apply(lambda col: pd.to_numeric(col, errors='coerce')).to_numpy(dtype=np.float32)
+        kps = vals.reshape(len(df), NUM_KP, 3)
+    elif all(f'{a}_{i}' in cols for i in range(NUM_KP) for a in ('x', 'y')):
+        kps = np.ones((len(df), NUM_KP, 3), dtype=np.float32)
+        for a, k in (('x', 0), ('y', 1)):
+            kps[:, :, k] = df[[f'{a}_{i}' for i in range(NUM_KP)]].apply(
+                lambda col: pd.to_numeric(col, errors='coerce')).to_numpy(dtype=np.float32)
+        # 신뢰도 컬럼: score_i (mmaction) 또는 visibility_i (mediapipe), 없으면 좌표가 있는 점은 1
+        for conf in ('score', 'visibility'):
+            if all(f'{conf}_{i}' in cols for i in range(NUM_KP)):
+                kps[:, :, 2] = df[[f'{conf}_{i}' for i in range(NUM_KP)]].apply(
+                    lambda col: pd.to_numeric(col, errors='coerce')).to_numpy(dtype=np.float32)
+                break
+        kps[np.isnan(kps[:, :, :2]).any(-1)] = np.nan
+        kps = _from_mscoco(kps)
+    else:
+        raise ValueError(f'CSV는 17 keypoint 포맷(Nose_x, ..., REar_c 또는 x_0~x_16, y_0~y_16, score_0~16)이어야 합니다: {csv_path}')
+    kps = np.nan_to_num(kps, nan=0.0, posinf=0.0, neginf=0.0)
+    meta = read_meta(csv_path)
+    meta.update({'frames': int(len(kps)), 'source': str(csv_path),
+                 'coord_space': guess_coord_space(kps)})
+    if 'frame' in cols:
+        frames = pd.to_numeric(df['frame'], errors='coerce')
+        if frames.notna().all():
+            meta['frame_index'] = [int(f) for f in frames]
+    return kps, meta
+
+
+def _from_mscoco(kps):
+    """MS COCO 순서 (F, 17, 3) → KP 순서, Neck = 양 어깨 중점 (둘 중 하나라도 없으면 NaN)"""
+    import numpy as np
+    out = np.full_like(kps, np.nan)
+    src = {name: i for i, name in enumerate(LEGACY_KP)}
+    for i, name in enumerate(KP):
+        if name in src:
+            out[:, i] = kps[:, src[name]]
+    shoulders = kps[:, [src['LShoulder'], src['RShoulder']]]
+    out[:, JOINT_INDEX['Neck'], :2] = shoulders[..., :2].mean(1)
+    out[:, JOINT_INDEX['Neck'], 2] = shoulders[..., 2].min(1)
+    return out
+
+
+def guess_coord_space(kps):
+    """좌표 최대값이 0 초과 1 이하면 'normalized' (0..1), 아니면 'pixel'"""
+    import numpy as np
+    xy = np.asarray(kps)[..., :2]
+    if not xy.size:
+        return 'pixel'
+    mx = float(np.nanmax(xy)) if np.isfinite(xy).any() else 0.0
+    return 'normalized' if 0 < mx <= 1.0 else 'pixel'
+
+
+class KeypointSequence:
+    """
+    (F, V, 3) float32 keypoint sequence [x, y, c] + 메타데이터
+    - data는 C-contiguous float32 (track memmap이면 복사 없이 그대로)
+    - 사람 없는 frame / 검출 안 된 관절은 c == 0 (CSV의 NaN은 읽을 때 0)
+    """
+    __slots__ = ('data', 'fps', 'width', 'height', 'coord_space', 'joints', 'frame_index', 'meta', '_index')
+
+    def __init__(self, data, fps=None, width=None, height=None, coord_space=None, joints=None,
+                 frame_index=None, meta=None):
+        import numpy as np
+        data = np.ascontiguousarray(data, dtype=np.float32)
+        if data.ndim != 3 or data.shape[2] != 3:
+            raise ValueError(f'keypoint sequence must be (F, V, 3), got {data.shape}')
+        self.data = data
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.coord_space = coord_space or guess_coord_space(data)
+        self.joints = list(joints) if joints else KP[:data.shape[1]]
+        self.frame_index = frame_index
+        self.meta = meta or {}
+        self._index = JOINT_INDEX if self.joints == KP else {n: i for i, n in enumerate(self.joints)}
+
+    @classmethod
+    def from_track(cls, kps, meta):
+        return cls(kps, fps=meta.get('fps'), width=meta.get('width'), height=meta.get('height'),
+                   coord_space=meta.get('coord_space'), joints=meta.get('joints'),
+                   frame_index=meta.get('frame_index'), meta=meta)
+
+    @classmethod
+    def load(cls, path, cached=True):
+        """
+        keypoint track / CSV → KeypointSequence
+        cached=True면 (path, size, mtime) 기준 캐시 (읽기 전용, 메모리로 읽은 data)
+        cached=False면 캐시 없이 읽음 (.npy는 memmap — 다 쓰면 참조를 버려야 파일을 바꿀 수 있음)
+        """
+        p = Path(path).resolve()
+        if not cached:
+            return cls.from_track(*load_track(p))
+        st = p.stat()
+        return _load_sequence_cached(str(p), st.st_size, st.st_mtime_ns)
+
+    # ---------- 기본 view ----------
+    def __len__(self):
+        return int(self.data.shape[0])
+
+    @property
+    def num_joints(self):
+        return int(self.data.shape[1])
+
+    @property
+    def xy(self):
+        """(F, V, 2) view"""
+        return self.data[..., :2]
+
+    @property
+    def conf(self):
+        """(F, V) view"""
+        return self.data[..., 2]
+
+    def index(self, name):
+        return self._index[name]
+
+    def joint(self, name):
+        """(F, 3) view"""
+        return self.data[:, self._index[name]]
+
+    def joints_xy(self, *names):
+        """(F, len(names), 2) (복사)"""
+        return self.data[:, [self._index[n] for n in names], :2]
+
+    # ---------- validity ----------
+    def valid(self, min_conf=0.0):
+        """(F, V) bool — 유한 좌표, c > min_conf, (0, 0)이 아닌 점"""
+        import numpy as np
+        d = self.data
+        return (np.isfinite(d).all(-1) & (d[..., 2] > min_conf)
+                & ~((d[..., 0] == 0) & (d[..., 1] == 0)))
+
+    def frame_valid(self):
+        """(F,) bool — 사람이 검출된 frame (c > 0인 관절이 하나라도 있음)"""
+        return (self.conf > 0).any(-1)
+
+    def first_valid_frame(self):
+        import numpy as np
+        idx = np.flatnonzero(self.frame_valid())
+        return int(idx[0]) if idx.size else None
+
+    def masked_xy(self, min_conf=0.0, fill=float('nan'), mask=None):
+        """(F, V, 2) float 복사본, mask(기본 valid(min_conf))가 False인 점은 fill"""
+        import numpy as np
+        xy = np.array(self.xy, dtype=np.float64)
+        xy[~(self.valid(min_conf) if mask is None else mask)] = fill
+        return xy
+
+    # ---------- 좌표계 ----------
+    def _size(self, width, height):
+        w, h = width or self.width, height or self.height
+        if not w or not h:
+            raise ValueError('frame size is required for coordinate conversion')
+        return w, h
+
+    def _with_data(self, data, coord_space, width, height):
+        return KeypointSequence(data, fps=self.fps, width=width, height=height, coord_space=coord_space,
+                                joints=self.joints, frame_index=self.frame_index, meta=self.meta)
+
+    def to_pixel(self, width=None, height=None):
+        """pixel 좌표 sequence (이미 pixel이면 self). normalized면 width/height(기본 메타데이터) 배율"""
+        import numpy as np
+        if self.coord_space == 'pixel':
+            return self
+        w, h = self._size(width, height)
+        data = np.array(self.data)
+        data[..., 0] *= w
+        data[..., 1] *= h
+        return self._with_data(data, 'pixel', w, h)
+
+    def to_normalized(self, width=None, height=None):
+        """0..1 정규화 좌표 sequence (이미 normalized면 self)"""
+        import numpy as np
+        if self.coord_space == 'normalized':
+            return self
+        w, h = self._size(width, height)
+        data = np.array(self.data)
+        data[..., 0] /= w
+        data[..., 1] /= h
+        return self._with_data(data, 'normalized', w, h)
+
+    # ---------- 저장 ----------
+    def save(self, path, **extra):
+        meta = {k: v for k, v in self.meta.items() if k not in ('format', 'version', 'frames', 'joints', 'fps',
+                                                              'width', 'height', 'coord_space', 'backend', 'source')}
+        meta.update(extra)
+        if self.frame_index is not None:
+            meta['frame_index'] = list(self.frame_index)
+        return save_track(path, self.data, fps=self.fps, width=self.width, height=self.height,
+                          coord_space=self.coord_space, backend=self.meta.get('backend'), **meta)
+
+    def to_csv(self, csv_path):
+        write_keypoints_csv(self.data, csv_path)
+        return Path(csv_path)
+
+    def __repr__(self):
+        return (f'KeypointSequence(frames={len(self)}, joints={self.num_joints}, coord_space={self.coord_space!r}, '
+                f'size={self.width}x{self.height}, fps={self.fps})')
+
+
+@functools.lru_cache(maxsize=SEQUENCE_CACHE_SIZE)
+def _load_sequence_cached(path, size, mtime_ns):
+    # memmap을 캐시에 두면 파일 핸들이 계속 열려 있음 → 메모리로 읽음 (track은 수 MB 이하)
+    seq = KeypointSequence.from_track(*load_track(path, mmap=False))
+    # 캐시된 배열은 여러 호출자가 공유하므로 읽기 전용
+    seq.data.flags.writeable = False
+    return seq
+
+
+def keypoints_to_rows(kps):
+    """(F, 17, 3) → CSV 행 배열 (F, 51), 사람 없는 frame은 NaN 행 (기존 crop_csv와 같은 의미)"""
+    import numpy as np
+    rows = np.asarray(kps, dtype=np.float64).reshape(len(kps), -1).copy()
+    rows[~(np.asarray(kps)[..., 2] > 0).any(-1)] = np.nan
+    return rows
+
+
+def write_keypoints_csv(kps, csv_path):
+    import pandas as pd
+    pd.DataFrame(keypoints_to_rows(kps), columns=COLS).to_csv(csv_path, index=False)
+
+
+def export_csv(path, csv_path=None):
+    """track → CSV (기본: 같은 폴더 <stem>.csv). return: csv 경로"""
+    kps, _ = load_track(path)
+    csv_path = Path(csv_path) if csv_path else Path(path).with_name(track_stem(path) + '.csv')
+    write_keypoints_csv(kps, csv_path)
+    return csv_path
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description='keypoint track 도구')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p_export = sub.add_parser('export', help='track → CSV')
+    p_export.add_argument('track')
+    p_export.add_argument('--csv', default=None, help='출력 CSV 경로 (기본: <stem>.csv)')
+    p_info = sub.add_parser('info', help='메타데이터와 검출 frame 수 출력')
+    p_info.add_argument('track')
+    args = parser.parse_args(argv)
+    if args.cmd == 'export':
+        out = export_csv(args.track, args.csv)
+        print(f'[SUCCESS] exported {args.track} -> {out}'); sys.stdout.flush()
+    else:
+        seq = KeypointSequence.load(args.track, cached=False)
+        info = dict(seq.meta, detected_frames=int(seq.frame_valid().sum()), first_valid_frame=seq.first_valid_frame())
+        print(json.dumps(info, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
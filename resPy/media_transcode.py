@@ -0,0 +1,422 @@
+"""
+ffmpeg transcode 공통 (frame_store.ingest, openpose_utils.run_openpose_and_crop, bbox_proxy, skeleton_video)
+- 기존: 업로드 → 재인코딩 mp4(작업 폴더, 끝나면 삭제), crop은 원본을 다시 디코드해서 기본 인코더 설정으로,
+  skeleton_video는 웹 호환용으로 한 번 더 재인코딩 — 호출마다 ffmpeg 명령/설정이 제각각
+- build_command: 입력을 한 번 디코드해서 split filter graph로 여러 rendition을 동시에 씀
+    [0:v:0]split=3[s0][s1][s2];[s0]null[o0];[s1]framestep=step=3,scale=640:360:flags=area[o1];[s2]null[o2]
+    rendition = Rendition(출력 경로 또는 pipe:1, filter chain, 출력 옵션)
+  ingest : mezzanine(pose 입력) + pose proxy(bbox_proxy, OpenPose CLI) + frame store(raw pipe)를 같은 디코드에서
+  crop   : crop(+ 스윙 구간 trim)을 바로 웹 재생용 mp4로 (h264/yuv420p/faststart, 별도 재인코딩 없음)
+- 인코딩 설정은 preset 하나로 통일 (MEDIA_PRESET), ffmpeg thread 상한 (MEDIA_THREADS)
+- mezzanine: 정규화된 입력(h264/yuv420p/faststart)을 입력 내용 digest + 인코딩 설정 key로 보관
+  → 같은 비디오를 다시 돌릴 때(설정/코드가 바뀌어 결과 캐시 miss, 실패 후 재시도) 재인코딩 없이 pose 입력으로 사용
+- open_encoder: 그린 frame(BGR)을 바로 h264/yuv420p/faststart mp4로 (overlay, skeleton_video)
+    ffmpeg : rawvideo를 ffmpeg stdin으로 (기본)
+    pyav   : PyAV(libav) encoder를 프로세스 안에서 (av 패키지 필요)
+    cv2    : 기존 cv2.VideoWriter avc1/mp4v (open_encoder는 None → 호출 측 fallback)
+  설정은 <PREFIX>_ENCODER / _PRESET / _CRF / _MAX_HEIGHT (없으면 MEDIA_*), MAX_HEIGHT보다 크면 화면 크기로 축소
+
+환경 변수
+- MEDIA_PRESET         : fast | balanced (기본, libx264 기본값과 같음) | small
+- MEDIA_CRF            : preset의 CRF 대신 사용
+- MEDIA_THREADS        : ffmpeg encode/filter thread 상한 (기본 0 = ffmpeg 자동)
+- MEZZANINE=0          : mezzanine 보관 안 함 (작업 폴더에 재인코딩, 기존 방식)
+- MEZZANINE_DIR        : 보관 위치 (기본 resPy/_mezzanine)
+- MEZZANINE_MAX_AGE_H  : 마지막 사용 후 보관 시간 (기본 72)
+- OVERLAY_ENCODER      : ffmpeg (기본) | pyav | cv2 — overlay 비디오 encoder
+- OVERLAY_PRESET, OVERLAY_CRF : overlay 인코딩 preset/CRF (기본 MEDIA_PRESET/MEDIA_CRF)
+- OVERLAY_MAX_HEIGHT   : overlay 출력 최대 높이 (기본 0 = 원본 크기)
+
+    python media_transcode.py ls       # 보관 중인 mezzanine
+    python media_transcode.py sweep    # 오래된 mezzanine 삭제
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import hashlib
+import subprocess
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+
+BASE_DIR = Path(__file__).parent.resolve()
+# name -> (libx264 preset, CRF)
+PRESETS = {
+    'fast': ('veryfast', 23),
+    'balanced': ('medium', 23),
+    'small': ('slow', 26),
+}
+DEFAULT_PRESET = 'balanced'
+RAW_BGR_ARGS = ('-f', 'rawvideo', '-pix_fmt', 'bgr24')
+
+_lock = threading.Lock()
+_swept = False
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ[name])
+    except (KeyError, ValueError):
+        return default
+
+
+def preset_name(name=None):
+    name = name or os.environ.get('MEDIA_PRESET', DEFAULT_PRESET)
+    if name not in PRESETS:
+        print(f'[WARN] unknown media preset {name!r}; using {DEFAULT_PRESET}', file=sys.stderr); sys.stderr.flush()
+        return DEFAULT_PRESET
+    return name
+
+
+def encode_settings(preset=None, crf=None):
+    """(libx264 preset, CRF) — preset: PRESETS 이름 (None이면 MEDIA_PRESET), crf: None이면 MEDIA_CRF 또는 preset 값"""
+    x264_preset, default_crf = PRESETS[preset_name(preset)]
+    if crf is None:
+        crf = _env_int('MEDIA_CRF', default_crf)
+    return x264_preset, max(0, min(51, int(crf)))
+
+
+def thread_cap():
+    return max(0, _env_int('MEDIA_THREADS', 0))
+
+
+def transcode_config():
+    """stage fingerprint에 들어갈 설정 (출력 바이트를 바꾸는 것만)"""
+    preset, crf = encode_settings()
+    return {'preset': preset, 'crf': crf}
+
+
+def encode_args(web=True, preset=None, crf=None):
+    """h264/yuv420p 출력 옵션, web=True면 faststart (moov를 앞으로 → 브라우저가 다 받기 전에 재생)"""
+    preset, crf = encode_settings(preset, crf)
+    args = ['-c:v', 'libx264', '-preset', preset, '-crf', str(crf), '-pix_fmt', 'yuv420p']
+    if thread_cap():
+        args += ['-threads', str(thread_cap())]
+    if web:
+        args += ['-movflags', '+faststart']
+    return args
+
+
+class Rendition:
+    """filter graph 출력 하나 — path: 파일 또는 'pipe:1', filters: filter chain (None 항목은 무시), args: 출력 옵션"""
+    __slots__ = ('path', 'filters', 'args')
+
+    def __init__(self, path, filters=(), args=None):
+        self.path = str(path)
+        self.filters = [f for f in filters if f]
+        self.args = list(encode_args() if args is None else args)
+
+    def __repr__(self):
+        return f'Rendition({self.path!r}, {self.filters!r})'
+
+
+def raw_rendition():
+    """frame store용 raw BGR stdout 출력"""
+    return Rendition('pipe:1', args=RAW_BGR_ARGS)
+
+
+def trim_filter(window):
+    """frame 구간 [start, end) (swing_window)"""
+    start, end = window
+    return f'trim=start_frame={start}:end_frame={end},setpts=PTS-STARTPTS'
+
+
+def crop_filter(x, y, w, h):
+    return f'crop={w}:{h}:{x}:{y}'
+
+
+def build_command(src, renditions):
+    """src를 한 번 디코드해서 renditions를 모두 쓰는 ffmpeg 명령 (출력이 여러 개면 split)"""
+    n = len(renditions)
+    if n == 0:
+        raise ValueError('no renditions')
+    cmd = ['ffmpeg', '-y']
+    if thread_cap():
+        cmd += ['-filter_complex_threads', str(thread_cap())]
+    cmd += ['-i', str(src)]
+    graph = [f'[0:v:0]split={n}' + ''.join(f'[s{i}]' for i in range(n))] if n > 1 else []
+    for i, r in enumerate(renditions):
+        source = f'[s{i}]' if n > 1 else '[0:v:0]'
+        graph.append(f'{source}{",".join(r.filters) or "null"}[o{i}]')
+    cmd += ['-filter_complex', ';'.join(graph)]
+    for i, r in enumerate(renditions):
+        cmd += ['-map', f'[o{i}]', *r.args, r.path]
+    return cmd
+
+
+def run(src, renditions):
+    """파일 rendition만 있는 transcode 실행 (stdout rendition은 frame_store.ingest처럼 직접 Popen), 실패 시 RuntimeError"""
+    cmd = build_command(src, renditions)
+    p = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if p.returncode != 0:
+        raise RuntimeError(f'ffmpeg transcode failed: returncode={p.returncode}\nstderr={p.stderr}')
+
+
+@contextmanager
+def writing(path):
+    """path를 원자적으로 생성: 같은 폴더의 임시 경로를 주고, 블록이 성공하면 path로 교체 (실패하면 임시 파일 삭제)"""
+    path = Path(path)
+    tmp = path.with_name(f'{path.stem}.{os.getpid()}.{uuid.uuid4().hex[:8]}.partial{path.suffix}')
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    finally:
+        try:
+            tmp.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def web_copy(path):
+    """mp4를 제자리에서 웹 재생용(h264/yuv420p/faststart)으로 재인코딩, 성공하면 True"""
+    path = Path(path)
+    try:
+        with writing(path) as tmp:
+            run(path, [Rendition(tmp)])
+    except (OSError, RuntimeError) as e:
+        print(f'[WARN] web re-encode failed for {path}: {e}', file=sys.stderr); sys.stderr.flush()
+        return False
+    return True
+
+
+def scaled_size(width, height, max_height=None):
+    """출력 크기: max_height보다 높으면 비율 유지 축소, yuv420p를 위해 항상 짝수"""
+    if max_height and height > max_height:
+        width, height = width * max_height / float(height), max_height
+    return max(2, int(width) // 2 * 2), max(2, int(height) // 2 * 2)
+
+
+def encoder_config(prefix='OVERLAY'):
+    """<prefix>_ENCODER / _PRESET / _CRF / _MAX_HEIGHT → dict (stage fingerprint에도 사용)"""
+    preset = preset_name(os.environ.get(f'{prefix}_PRESET'))
+    return {
+        'encoder': os.environ.get(f'{prefix}_ENCODER', 'ffmpeg'),
+        'preset': preset,
+        'crf': encode_settings(preset, _env_int(f'{prefix}_CRF', None))[1],
+        'max_height': max(0, _env_int(f'{prefix}_MAX_HEIGHT', 0)),
+    }
+
+
+class FrameEncoder:
+    """
+    BGR frame → ffmpeg stdin(rawvideo) → h264/yuv420p/faststart mp4 (한 번에 웹 재생용, 재인코딩 없음)
+    cv2.VideoWriter 자리에 그대로 쓸 수 있도록 write/release, 실패 시 abort()로 출력 삭제
+    """
+    name = 'ffmpeg'
+
+    def __init__(self, path, width, height, fps, preset=None, crf=None, max_height=None):
+        self.path = Path(path)
+        self.width, self.height = int(width), int(height)
+        self.size = scaled_size(width, height, max_height)
+        filters = [f'scale={self.size[0]}:{self.size[1]}:flags=area'] if self.size != (self.width, self.height) else []
+        self.cmd = ['ffmpeg', '-y', '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{self.width}x{self.height}',
+                    '-r', f'{float(fps or 30.0):.6f}', '-i', 'pipe:0',
+                    *(['-vf', ','.join(filters)] if filters else []), *encode_args(True, preset, crf), str(self.path)]
+        self.proc = subprocess.Popen(self.cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        self._err = []
+        self._err_thread = threading.Thread(target=lambda: self._err.append(self.proc.stderr.read()), daemon=True)
+        self._err_thread.start()
+
+    def isOpened(self):
+        return self.proc.poll() is None
+
+    def write(self, frame):
+        try:
+            self.proc.stdin.write(memoryview(frame).cast('B') if frame.flags['C_CONTIGUOUS'] else frame.tobytes())
+        except (BrokenPipeError, OSError):
+            self.proc.wait()
+            raise RuntimeError(f'ffmpeg encoder exited: returncode={self.proc.returncode}\nstderr={self._stderr()}')
+
+    def _stderr(self):
+        self._err_thread.join(timeout=5)
+        return (self._err[0] if self._err else b'').decode('utf-8', errors='ignore')
+
+    def release(self):
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        self.proc.wait()
+        if self.proc.returncode != 0:
+            raise RuntimeError(f'ffmpeg encode failed: returncode={self.proc.returncode}\nstderr={self._stderr()}')
+        self._err_thread.join()
+
+    def abort(self):
+        self.proc.kill()
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        self.proc.wait()
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
+
+
+class PyAVEncoder:
+    """FrameEncoder와 같은 interface, PyAV(libx264)로 프로세스 안에서 인코딩 (frame을 pipe로 복사하지 않음)"""
+    name = 'pyav'
+
+    def __init__(self, path, width, height, fps, preset=None, crf=None, max_height=None):
+        import av
+        from fractions import Fraction
+        self.path = Path(path)
+        self.size = scaled_size(width, height, max_height)
+        x264_preset, crf = encode_settings(preset, crf)
+        self.container = av.open(str(self.path), 'w', options={'movflags': '+faststart'})
+        self.stream = self.container.add_stream('libx264', rate=Fraction(float(fps or 30.0)).limit_denominator(100000),
+                                                options={'preset': x264_preset, 'crf': str(crf)})
+        self.stream.width, self.stream.height = self.size
+        self.stream.pix_fmt = 'yuv420p'
+        if thread_cap():
+            self.stream.thread_count = thread_cap()
+        self._av = av
+
+    def isOpened(self):
+        return True
+
+    def write(self, frame):
+        vf = self._av.VideoFrame.from_ndarray(frame, format='bgr24')
+        vf = vf.reformat(width=self.size[0], height=self.size[1], format='yuv420p')
+        for packet in self.stream.encode(vf):
+            self.container.mux(packet)
+
+    def release(self):
+        for packet in self.stream.encode():
+            self.container.mux(packet)
+        self.container.close()
+
+    def abort(self):
+        try:
+            self.container.close()
+        except Exception:
+            pass
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
+
+
+ENCODERS = {'ffmpeg': FrameEncoder, 'pyav': PyAVEncoder}
+
+
+def open_encoder(path, width, height, fps, prefix='OVERLAY'):
+    """
+    encoder_config(prefix)대로 frame encoder 생성, cv2를 골랐거나 쓸 수 없으면 None (호출 측은 cv2.VideoWriter)
+    pyav를 골랐는데 av가 없으면 ffmpeg, ffmpeg가 없으면 None
+    """
+    import shutil
+    cfg = encoder_config(prefix)
+    name = cfg['encoder']
+    if name == 'cv2':
+        return None
+    if name not in ENCODERS:
+        print(f'[WARN] unknown {prefix}_ENCODER {name!r}; using ffmpeg', file=sys.stderr); sys.stderr.flush()
+        name = 'ffmpeg'
+    if name == 'pyav':
+        try:
+            import av  # noqa: F401
+        except ImportError:
+            print('[WARN] PyAV (av) not installed; encoding with ffmpeg', file=sys.stderr); sys.stderr.flush()
+            name = 'ffmpeg'
+    if name == 'ffmpeg' and shutil.which('ffmpeg') is None:
+        print('[WARN] ffmpeg not found; falling back to cv2.VideoWriter', file=sys.stderr); sys.stderr.flush()
+        return None
+    return ENCODERS[name](path, width, height, fps, preset=cfg['preset'], crf=cfg['crf'], max_height=cfg['max_height'])
+
+
+def mezzanine_enabled():
+    return os.environ.get('MEZZANINE', '1') != '0'
+
+
+def mezzanine_dir():
+    env = os.environ.get('MEZZANINE_DIR')
+    return Path(env) if env else BASE_DIR / '_mezzanine'
+
+
+def max_age_seconds():
+    try:
+        return float(os.environ.get('MEZZANINE_MAX_AGE_H', '72')) * 3600
+    except ValueError:
+        return 72 * 3600
+
+
+def mezzanine_path(src, digest=None):
+    """입력 내용 digest + 인코딩 설정 → 보관 경로, digest: 이미 계산한 src의 sha256 (없으면 여기서 계산)"""
+    if digest is None:
+        from result_cache import hash_file
+        digest = hash_file(src)
+    h = hashlib.sha256()
+    h.update(digest.encode('ascii'))
+    h.update(json.dumps(transcode_config(), sort_keys=True).encode('utf-8'))
+    return mezzanine_dir() / f'{h.hexdigest()[:24]}.mp4'
+
+
+def lookup_mezzanine(src, digest=None):
+    """(mezzanine 경로 | None (끔), 이미 있는지) — 있으면 mtime을 갱신해서 sweep 대상에서 늦춤"""
+    if not mezzanine_enabled():
+        return None, False
+    sweep_once()
+    path = mezzanine_path(src, digest)
+    path.parent.mkdir(exist_ok=True, parents=True)
+    try:
+        hit = path.stat().st_size > 0
+    except OSError:
+        return path, False
+    if hit:
+        os.utime(path)
+    return path, hit
+
+
+def list_mezzanines():
+    root = mezzanine_dir()
+    if not root.is_dir():
+        return []
+    return sorted(Path(e.path) for e in os.scandir(root) if e.is_file() and e.name.endswith('.mp4'))
+
+
+def sweep_stale():
+    """마지막 사용 후 MEZZANINE_MAX_AGE_H가 지난 mezzanine(+ 남은 partial) 삭제 → 삭제한 경로 목록"""
+    cutoff = time.time() - max_age_seconds()
+    removed = []
+    for path in list_mezzanines():
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed.append(str(path))
+        except OSError:
+            pass
+    if removed:
+        print(f'[STEP] swept {len(removed)} stale mezzanine file(s)'); sys.stdout.flush()
+    return removed
+
+
+def sweep_once():
+    global _swept
+    with _lock:
+        if _swept:
+            return
+        _swept = True
+    sweep_stale()
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description='mezzanine 관리')
+    parser.add_argument('command', choices=['ls', 'sweep'])
+    args = parser.parse_args(argv)
+    if args.command == 'sweep':
+        for p in sweep_stale():
+            print(p)
+        return 0
+    for path in list_mezzanines():
+        st = path.stat()
+        print(json.dumps({'path': str(path), 'bytes': st.st_size, 'last_used': st.st_mtime}, ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
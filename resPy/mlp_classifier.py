@@ -6,19 +6,9 @@ mlp_predict(stgcn_npy, model_path=None, scaler_path=None) -> dict
  - scaler_path: optional path to a saved StandardScaler (joblib). If not provided,
    no scaling is applied and a warning is logged.
 """
-import numpy as np
-import torch
-import torch.nn as nn
-from sklearn.preprocessing import StandardScaler
 import logging
 import sys
 
-# joblib optional
-try:
-    from joblib import load as joblib_load
-except Exception:
-    joblib_load = None
-
 # 모든 로그가 stdout으로 가도록 설정
 logging.basicConfig(stream=sys.stdout, level=logging.INFO, format='[PYTHON-MLP] %(message)s')
 
@@ -37,6 +27,15 @@ def mlp_predict(stgcn_npy, model_path=None, scaler_path=None):
         model_path = None
 
     model_path = model_path or "mlp_model.pth"
+    # torch/numpy/joblib은 예측할 때만 import (모듈 import 비용 최소화)
+    import numpy as np
+    import torch
+    import torch.nn as nn
+    # joblib optional
+    try:
+        from joblib import load as joblib_load
+    except Exception:
+        joblib_load = None
     try:
         # load stgcn embedding
         X_st = np.load(stgcn_npy)
@@ -1,231 +1,368 @@
+"""
+crop 비디오 + keypoint track → skeleton overlay 비디오 (analyze_golf_video overlay stage)
+- 그릴 좌표(pixel, int), 유효 mask, COM(골반/어깨/무릎/발목 평균), user index 재배치를 전체 frame에 대해 numpy로 한 번에 계산
+- decode → draw → encode를 bounded queue(OVERLAY_QUEUE frame)로 연결한 3개 thread로 실행
+  → cv2 디코드(또는 frame store 복사)와 VideoWriter 인코딩이 겹침 (cv2 호출은 GIL을 놓음)
+
+환경 변수
+- encode는 media_transcode.open_encoder: 그린 frame을 ffmpeg stdin(또는 PyAV)으로 바로 h264/yuv420p/faststart
+  (cv2.VideoWriter avc1/mp4v는 브라우저 재생이 안 되는 경우가 있음), OVERLAY_MAX_HEIGHT면 화면 크기로 축소
+
+- OVERLAY_QUEUE   : stage 사이 queue 크기 (기본 8, 0이면 한 thread에서 순서대로 — 기존 방식)
+- OVERLAY_ENCODER, OVERLAY_PRESET, OVERLAY_CRF, OVERLAY_MAX_HEIGHT : encoder 설정 (media_transcode)
+
+순차 vs pipeline 속도 비교 (1080p 등, keypoint가 없으면 fake)
+    python openpose_skeleton_overlay.py clip.mp4 fake out.mp4 --benchmark
+"""
+import os
+import sys
 import cv2
 import numpy as np
-import pandas as pd
 import argparse
 import json
+import time
+import queue
+import threading
+from pathlib import Path
+from keypoint_track import KP, COCO_CONNECTIONS, COM_INDICES, KeypointSequence
+from pipeline_spans import timed, annotate
+from pipeline_progress import report_frames
 
-def draw_openpose_skeleton(frame, keypoints, connections=None, names=None, color=(0,255,0), thickness=2, draw_lines=True):
+def draw_openpose_skeleton(frame, keypoints, connections=None, names=None, color=(0,255,0), thickness=2, draw_lines=True,
+                           valid=None):
     """
     Draw skeleton on frame.
     - keypoints: (N,2) ndarray
     - connections: list of (i,j) pairs (optional)
     - names: optional list of strings for labeling each keypoint
     - draw_lines: if False, only draw points and labels
+    - valid: optional (N,) bool mask (precomputed, see overlay_points); default: both coordinates >= 0
     """
+    if valid is None:
+        valid = (np.asarray(keypoints) >= 0).all(-1)
+    n = len(keypoints)
     # draw connections first (if enabled)
     if draw_lines and connections is not None:
         for i, j in connections:
-            if i < 0 or j < 0 or i >= len(keypoints) or j >= len(keypoints):
+            if i < 0 or j < 0 or i >= n or j >= n:
                 continue
-            if np.all(keypoints[i] >= 0) and np.all(keypoints[j] >= 0):
-                pt1 = tuple(int(x) for x in keypoints[i])
-                pt2 = tuple(int(x) for x in keypoints[j])
+            if valid[i] and valid[j]:
+                pt1 = (int(keypoints[i][0]), int(keypoints[i][1]))
+                pt2 = (int(keypoints[j][0]), int(keypoints[j][1]))
                 cv2.line(frame, pt1, pt2, color, thickness)
 
     # draw keypoints and optional labels
-    for idx, pt in enumerate(keypoints):
-        if not np.all(pt >= 0):
-            continue
-        p = tuple(int(x) for x in pt)
+    for idx in np.flatnonzero(valid):
         # draw only a red filled circle (no text labels)
-        cv2.circle(frame, p, 4, (0,0,255), -1)
+        cv2.circle(frame, (int(keypoints[idx][0]), int(keypoints[idx][1])), 4, (0,0,255), -1)
     return frame
 
-# Canonical COCO17 keypoint connections (0-indexed)
-# Reference mapping: 0:Nose,1:LEye,2:REye,3:LEar,4:REar,5:LShoulder,6:RShoulder,7:LElbow,8:RElbow,
-# 9:LWrist,10:RWrist,11:LHip,12:RHip,13:LKnee,14:RKnee,15:LAnkle,16:RAnkle
-COCO_CONNECTIONS = [
-    (0,1),(0,2),(1,3),(2,4),
-    (5,6),(5,7),(7,9),(6,8),(8,10),
-    (5,11),(6,12),(11,12),
-    (11,13),(13,15),(12,14),(14,16)
-]
+# Canonical keypoint names / connections / COM joints (0-indexed, OpenPose COCO order, keypoint_track.KP)
+COCO_NAMES = KP
+DEFAULT_QUEUE_FRAMES = 8
+_DONE = object()
 
-def openpose_skeleton_overlay(
-    input_video_path, csv_path, output_video_path, fourcc_code='avc1', points_only=False):
-    cap = cv2.VideoCapture(input_video_path)
-    df = pd.read_csv(csv_path)
-    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    fourcc = cv2.VideoWriter_fourcc(*fourcc_code)
-    out = cv2.VideoWriter(output_video_path, fourcc, fps, (width, height))
-    if not out.isOpened():
-        print(f'Warning: VideoWriter failed with {fourcc_code}, fallback to mp4v')
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(output_video_path, fourcc, fps, (width, height))
-        if not out.isOpened():
-            print('Error: VideoWriter failed to open. Abort.')
-            cap.release()
-            return
-    frame_idx = 0
-    # 오직 openpose COCO17 포맷(x_0~x_16, y_0~y_16, score_0~16)만 지원
-    V = 17
-    COCO_NAMES = [
-        "Nose", "LEye", "REye", "LEar", "REar", "LShoulder", "RShoulder", "LElbow", "RElbow",
-        "LWrist", "RWrist", "LHip", "RHip", "LKnee", "RKnee", "LAnkle", "RAnkle"
-    ]
-    # 우선 x_0~x_16, ... 포맷 시도
-    x_cols = [f"x_{i}" for i in range(V)]
-    y_cols = [f"y_{i}" for i in range(V)]
-    score_cols = [f"score_{i}" for i in range(V)]
-    # Determine whether CSV stores normalized coords (0..1) or absolute pixels (>1)
-    def _is_normalized(columns_x):
-        # safe check: if max value across the column set <= 1.0 -> normalized
+
+def queue_frames():
+    try:
+        return max(0, int(os.environ.get('OVERLAY_QUEUE', DEFAULT_QUEUE_FRAMES)))
+    except ValueError:
+        return DEFAULT_QUEUE_FRAMES
+
+
+def com_points(pts):
+    """(F, 17, 2) pixel 좌표 (-1 = 없음) → (F, 2) int COM, COM 관절이 하나도 없는 frame은 -1"""
+    sub = pts[:, COM_INDICES]
+    valid = (sub >= 0).all(-1)
+    cnt = valid.sum(1)
+    com = np.full((len(pts), 2), -1, dtype=np.int32)
+    has = cnt > 0
+    com[has] = ((sub[has] * valid[has, :, None]).sum(1) / cnt[has, None]).astype(np.int32)
+    return com
+
+
+def overlay_points(seq, width, height, coco_to_user=None, max_user=None):
+    """
+    그릴 좌표를 전체 frame에 대해 한 번에 계산
+    return: pts (F, N, 2) int32, valid (F, N) bool, com (F, 2) int32 (-1 = 없음)
+    - 신뢰도 0.01 이하, (0, 0), NaN인 점은 그리지 않음
+    - coco_to_user가 있으면 N = max_user + 1 (user index 순서로 재배치, 매핑 없는 자리는 invalid)
+    """
+    xy = seq.to_pixel(width, height).masked_xy(min_conf=0.01, fill=-1)
+    com = com_points(xy)
+    if coco_to_user is not None:
+        user_xy = np.full((len(xy), max_user + 1, 2), -1.0)
+        for coco_idx, uidx in coco_to_user.items():
+            if 0 <= coco_idx < xy.shape[1]:
+                user_xy[:, uidx] = xy[:, coco_idx]
+        xy = user_xy
+    valid = (xy >= 0).all(-1)
+    return xy.astype(np.int32), valid, com
+
+
+def _put(q, item, stop):
+    """stop이 설정되면 포기하는 put (다음 stage가 실패해도 멈추지 않도록)"""
+    while not stop.is_set():
         try:
-            vals = df[columns_x].replace([float('inf'), -float('inf')], pd.NA).dropna(how='all')
-            if vals.size == 0:
-                return False
-            mx = vals.to_numpy(dtype=float).max()
-            return mx <= 1.0
-        except Exception:
-            return False
-
-    if all(col in df.columns for col in x_cols) and all(col in df.columns for col in y_cols) and all(col in df.columns for col in score_cols):
-        normalized = _is_normalized(x_cols)
-        def get_keypoints(idx):
-            pts = []
-            for i in range(V):
-                xv = df.at[idx, f'x_{i}']
-                yv = df.at[idx, f'y_{i}']
-                sc = df.at[idx, f'score_{i}'] if f'score_{i}' in df.columns else None
-                # treat NaN, 0, or low-confidence as missing
-                if pd.isna(xv) or pd.isna(yv) or (not pd.isna(sc) and float(sc) <= 0.01) or (xv == 0 and yv == 0):
-                    pts.append([-1, -1])
-                    continue
-                try:
-                    xv = float(xv)
-                    yv = float(yv)
-                except Exception:
-                    pts.append([-1, -1]); continue
-                if normalized:
-                    pts.append([xv * width, yv * height])
-                else:
-                    pts.append([xv, yv])
-            return np.array(pts)
-    # COCO 관절명 기반 포맷 지원 (Nose_x, ...)
-    elif all(f"{name}_x" in df.columns for name in COCO_NAMES) and all(f"{name}_y" in df.columns for name in COCO_NAMES) and all(f"{name}_c" in df.columns for name in COCO_NAMES):
-        name_x_cols = [f"{name}_x" for name in COCO_NAMES]
-        normalized = _is_normalized(name_x_cols)
-        def get_keypoints(idx):
-            pts = []
-            for name in COCO_NAMES:
-                xv = df.at[idx, f'{name}_x']
-                yv = df.at[idx, f'{name}_y']
-                sc = df.at[idx, f'{name}_c'] if f'{name}_c' in df.columns else None
-                if pd.isna(xv) or pd.isna(yv) or (not pd.isna(sc) and float(sc) <= 0.01) or (xv == 0 and yv == 0):
-                    pts.append([-1, -1])
-                    continue
-                try:
-                    xv = float(xv)
-                    yv = float(yv)
-                except Exception:
-                    pts.append([-1, -1]); continue
-                if normalized:
-                    pts.append([xv * width, yv * height])
-                else:
-                    pts.append([xv, yv])
-            return np.array(pts)
-    else:
-        raise KeyError('CSV는 반드시 openpose COCO17 포맷(x_0~x_16, y_0~x_16, score_0~16) 또는 (Nose_x, ..., RAnkle_c) 포맷이어야 합니다.')
-
-    while True:
-        ret, frame = cap.read()
-        if not ret or frame_idx >= len(df):
-            break
-        keypoints = get_keypoints(frame_idx)
-        # compute COM from available keypoints (hip/shoulder/knee/ankle set)
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q, stop):
+    """stop이 설정되면 _DONE을 돌려주는 get"""
+    while not stop.is_set():
         try:
-            # indices in COCO order for hips, shoulders, knees, ankles
-            com_indices = [11, 12, 5, 6, 13, 14, 15, 16]
-            com_pts = []
-            for ci in com_indices:
-                kp = keypoints[ci]
-                if kp[0] < 0 or kp[1] < 0:
-                    continue
-                com_pts.append(kp)
-            if com_pts:
-                arr = np.array(com_pts, dtype=float)
-                com_xy = arr.mean(axis=0)
-                com_pt = (int(com_xy[0]), int(com_xy[1]))
-                # draw a slightly larger filled circle for COM
-                cv2.circle(frame, com_pt, 6, (0, 255, 0), -1)
-        except Exception:
-            # don't fail overlay if COM computation fails
-            pass
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _DONE
+
+
+def _run_stages(frames, draw, write, depth):
+    """
+    decode(frames iterator) → draw(i, frame) → write(frame) 를 bounded queue로 연결한 thread에서 실행
+    depth 0이면 한 thread에서 순서대로. return: 쓴 frame 수, 어느 stage든 예외가 나면 다시 raise
+    """
+    if depth <= 0:
+        n = 0
+        for i, frame in enumerate(frames):
+            write(draw(i, frame))
+            n += 1
+        return n
+    decoded, drawn = queue.Queue(depth), queue.Queue(depth)
+    stop = threading.Event()
+    errors = []
+
+    def _decode():
+        try:
+            for item in enumerate(frames):
+                if not _put(decoded, item, stop):
+                    return
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            _put(decoded, _DONE, stop)
+
+    def _draw():
+        try:
+            while True:
+                item = _get(decoded, stop)
+                if item is _DONE:
+                    break
+                if not _put(drawn, draw(*item), stop):
+                    return
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            _put(drawn, _DONE, stop)
+
+    threads = [threading.Thread(target=_decode, name='overlay-decode', daemon=True),
+               threading.Thread(target=_draw, name='overlay-draw', daemon=True)]
+    for t in threads:
+        t.start()
+    n = 0
+    try:
+        while True:
+            frame = drawn.get()
+            if frame is _DONE:
+                break
+            write(frame)
+            n += 1
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+    if errors:
+        raise errors[0]
+    return n
+
+
+def user_mapping(user_map):
+    """
+    user_map {user_index: coco_index} → (coco_to_user, connections, max_user, names)
+    connections/names는 user index 기준 (COCO_CONNECTIONS 중 양 끝이 모두 매핑된 것만)
+    """
+    coco_to_user = {coco_idx: user_idx for user_idx, coco_idx in user_map.items()}
+    connections = [(coco_to_user[a], coco_to_user[b]) for a, b in COCO_CONNECTIONS
+                   if a in coco_to_user and b in coco_to_user]
+    max_user = max(user_map)
+    names = [str(i) for i in range(max_user + 1)]
+    for user_idx, coco_idx in user_map.items():
+        if 0 <= user_idx <= max_user and 0 <= coco_idx < len(COCO_NAMES):
+            names[user_idx] = COCO_NAMES[coco_idx]
+    return coco_to_user, connections, max_user, names
+
+
+@timed('overlay.openpose_skeleton_overlay')
+def openpose_skeleton_overlay(
+    input_video_path, keypoints, output_video_path, fourcc_code='avc1', points_only=False, queue_size=None,
+    user_map=None):
+    """
+    keypoints: keypoint track 경로 (.kps.npy, keypoint_track) / 이전 crop_csv 경로 / KeypointSequence / (F, 17, 3) 배열
+    queue_size: decode/draw/encode stage 사이 queue 크기 (None이면 OVERLAY_QUEUE, 0이면 순차)
+    user_map: {user_index: coco_index} — 주면 user index 공간으로 재배치해서 그림 (--map JSON)
+    return: 쓴 frame 수
+    """
+    from frame_store import open_view
+    if isinstance(keypoints, (str, Path)):
+        seq = KeypointSequence.load(keypoints)
+    elif isinstance(keypoints, KeypointSequence):
+        seq = keypoints
+    else:
+        # 배열 입력은 값 범위로 좌표계 판단 (최대값이 1 이하면 0..1 정규화 좌표)
+        seq = KeypointSequence(keypoints)
+    # crop 단계의 frame store가 살아 있으면 crop 비디오를 다시 디코드하지 않고 같은 frame을 읽음
+    view = open_view(input_video_path)
+    cap = None
+    try:
+        if view is not None:
+            width, height, fps = view.width, view.height, view.fps
+            n_source = len(view)
+        else:
+            cap = cv2.VideoCapture(input_video_path)
+            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            n_source = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+
+        def read_frames():
+            for i in range(len(seq)):
+                if cap is not None:
+                    ret, frame = cap.read()
+                    if not ret:
+                        return
+                elif i < n_source:
+                    # memmap은 읽기 전용 → 그리기용 복사본
+                    frame = np.array(view[i])
+                else:
+                    return
+                yield frame
+        # 그린 frame을 바로 h264/yuv420p/faststart로 (ffmpeg stdin 또는 PyAV, OVERLAY_ENCODER) — 재인코딩 없이 웹 재생
+        # encoder를 쓸 수 없거나 OVERLAY_ENCODER=cv2면 기존 cv2.VideoWriter (fourcc_code, 실패 시 mp4v)
+        import media_transcode
+        out = media_transcode.open_encoder(output_video_path, width, height, fps)
+        if out is None:
+            fourcc = cv2.VideoWriter_fourcc(*fourcc_code)
+            out = cv2.VideoWriter(output_video_path, fourcc, fps, (width, height))
+        if not out.isOpened():
+            print(f'Warning: VideoWriter failed with {fourcc_code}, fallback to mp4v')
+            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+            out = cv2.VideoWriter(output_video_path, fourcc, fps, (width, height))
+            if not out.isOpened():
+                print('Error: VideoWriter failed to open. Abort.')
+                return 0
+        encoder = getattr(out, 'name', 'cv2')
+        total_frames = min(n_source, len(seq)) or len(seq)
+
         # If user mapping is provided, draw in user-index space
-        if hasattr(openpose_skeleton_overlay, '_user_connections') and openpose_skeleton_overlay._user_connections is not None:
-            # build user_kp array from coco-ordered keypoints
-            coco_to_user = openpose_skeleton_overlay._coco_to_user
-            max_user = openpose_skeleton_overlay._max_user_index
-            user_kp = [[-1, -1] for _ in range(max_user+1)]
-            for coco_idx in range(len(keypoints)):
-                if coco_idx in coco_to_user:
-                    uidx = coco_to_user[coco_idx]
-                    user_kp[uidx] = [float(keypoints[coco_idx][0]), float(keypoints[coco_idx][1])]
-            # prepare user names (mapped COCO names where available)
-            user_names = [str(i) for i in range(max_user+1)]
-            if hasattr(openpose_skeleton_overlay, '_user_name_map') and openpose_skeleton_overlay._user_name_map is not None:
-                for uidx, name in openpose_skeleton_overlay._user_name_map.items():
-                    if uidx >= 0 and uidx < len(user_names):
-                        user_names[uidx] = name
-            frame = draw_openpose_skeleton(frame, np.array(user_kp), openpose_skeleton_overlay._user_connections, names=user_names, draw_lines=(not points_only))
+        if user_map:
+            coco_to_user, connections, max_user, names = user_mapping(user_map)
+            pts_all, valid_all, com_all = overlay_points(seq, width, height, coco_to_user, max_user)
         else:
-            frame = draw_openpose_skeleton(frame, keypoints, COCO_CONNECTIONS, names=COCO_NAMES, draw_lines=(not points_only))
-        out.write(frame)
-        frame_idx += 1
-    cap.release()
-    out.release()
+            pts_all, valid_all, com_all = overlay_points(seq, width, height)
+            connections, names = COCO_CONNECTIONS, COCO_NAMES
+
+        def draw(i, frame):
+            if com_all[i, 0] >= 0:
+                # draw a slightly larger filled circle for COM
+                cv2.circle(frame, (int(com_all[i, 0]), int(com_all[i, 1])), 6, (0, 255, 0), -1)
+            return draw_openpose_skeleton(frame, pts_all[i], connections, names=names, draw_lines=(not points_only),
+                                          valid=valid_all[i])
+
+        written = [0]
+
+        def write(frame):
+            out.write(frame)
+            written[0] += 1
+            report_frames('overlay', written[0], total_frames)
+
+        depth = queue_frames() if queue_size is None else queue_size
+        try:
+            _run_stages(read_frames(), draw, write, depth)
+        except BaseException:
+            # encoder는 반쯤 쓴 출력을 지움
+            getattr(out, 'abort', out.release)()
+            raise
+        out.release()
+    finally:
+        if cap is not None:
+            cap.release()
+        if view is not None:
+            # store memmap을 놓아야 analyze_golf_video의 frame_store.release가 파일을 지울 수 있음
+            view.close()
+    out_size = getattr(out, 'size', (width, height))
+    annotate(frames=written[0], width=out_size[0], height=out_size[1], frame_store=view is not None, queue=depth,
+             encoder=encoder)
     print(f'OpenPose skeleton overlay video saved: {output_video_path}')
+    return written[0]
+
+
+def media_transcode_config():
+    import media_transcode
+    return media_transcode.encoder_config('OVERLAY')
+
+
+def benchmark(input_video, keypoints, output_video, repeat=1):
+    """같은 입력으로 순차(queue 0) / pipeline(OVERLAY_QUEUE) 실행 → fps 비교 dict"""
+    if keypoints == 'fake':
+        from openpose_utils import FakePoseBackend
+        keypoints = FakePoseBackend().estimate(input_video)
+    rep = {'video': Path(input_video).name}
+    depth = queue_frames() or DEFAULT_QUEUE_FRAMES
+    for label, q in (('sequential', 0), ('pipeline', depth)):
+        best = None
+        for _ in range(max(1, repeat)):
+            t0 = time.perf_counter()
+            n = openpose_skeleton_overlay(input_video, keypoints, output_video, points_only=True, queue_size=q)
+            dt = time.perf_counter() - t0
+            best = dt if best is None else min(best, dt)
+        rep[label] = {'frames': n, 'seconds': round(best, 3), 'fps': round(n / best, 1) if best else None}
+    seq_fps, pipe_fps = rep['sequential']['fps'], rep['pipeline']['fps']
+    rep['speedup'] = round(pipe_fps / seq_fps, 2) if seq_fps and pipe_fps else None
+    rep['queue'] = depth
+    rep['encoder'] = media_transcode_config()
+    return rep
+
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('input_video', help='input video path')
-    parser.add_argument('csv', help='csv keypoints path')
+    parser.add_argument('keypoints', help='keypoint track (.kps.npy) or csv keypoints path')
     parser.add_argument('output_video', help='output overlay video path')
     parser.add_argument('--map', dest='map_json', help='optional JSON file mapping user_index->coco_index', default=None)
     parser.add_argument('--impute', dest='impute', action='store_true', help='enable temporal imputation for missing keypoints')
     parser.add_argument('--points-only', dest='points_only', action='store_true', help='draw only points and labels; do not draw connecting lines')
+    parser.add_argument('--benchmark', action='store_true', help='compare sequential vs pipelined overlay fps (keypoints may be "fake")')
+    parser.add_argument('--repeat', type=int, default=1, help='benchmark runs per mode (best time is reported)')
     args = parser.parse_args()
 
-    # if imputation requested, perform simple temporal interpolation for x/y columns
+    if args.benchmark:
+        print(f'[RESULT] {json.dumps(benchmark(args.input_video, args.keypoints, args.output_video, args.repeat), ensure_ascii=False)}')
+        sys.stdout.flush()
+        sys.exit(0)
+
+    # if imputation requested, perform simple temporal interpolation per joint
+    keypoints_to_use = args.keypoints
     if args.impute:
         try:
-            # find x/y columns
-            V = 17
-            x_cols = [f"x_{i}" for i in range(V)]
-            y_cols = [f"y_{i}" for i in range(V)]
-            # if CSV uses name_x format, detect and use those
-            sample_df = pd.read_csv(args.csv, nrows=1)
-            if not all(col in sample_df.columns for col in x_cols):
-                # try COCO_NAMES style
-                COCO_NAMES = [
-                    "Nose", "LEye", "REye", "LEar", "REar", "LShoulder", "RShoulder",
-                    "LElbow", "RElbow", "LWrist", "RWrist", "LHip", "RHip", "LKnee",
-                    "RKnee", "LAnkle", "RAnkle"
-                ]
-                x_cols = [f"{n}_x" for n in COCO_NAMES]
-                y_cols = [f"{n}_y" for n in COCO_NAMES]
-            df_all = pd.read_csv(args.csv)
-            # treat (0,0) as missing
-            for xc,yc in zip(x_cols, y_cols):
-                df_all.loc[(df_all[xc]==0)&(df_all[yc]==0), xc] = np.nan
-                df_all.loc[(df_all[xc]==0)&(df_all[yc]==0), yc] = np.nan
-            # interpolate per column
-            df_all[x_cols] = df_all[x_cols].astype(float).interpolate(method='linear', limit_direction='both')
-            df_all[y_cols] = df_all[y_cols].astype(float).interpolate(method='linear', limit_direction='both')
-            # fill remaining NaN with nearest valid (ffill/bfill)
-            df_all[x_cols] = df_all[x_cols].fillna(method='ffill').fillna(method='bfill')
-            df_all[y_cols] = df_all[y_cols].fillna(method='ffill').fillna(method='bfill')
-            # write back temp csv to use for processing
-            tmp_csv = args.csv + '.imputed.tmp'
-            df_all.to_csv(tmp_csv, index=False)
-            csv_to_use = tmp_csv
+            seq = KeypointSequence.load(args.keypoints, cached=False)
+            # treat (0,0) / zero confidence as missing
+            valid_all = seq.valid()
+            kps_all = np.array(seq.data)
+            frames = np.arange(len(kps_all))
+            for j in range(kps_all.shape[1]):
+                valid = valid_all[:, j]
+                if valid.sum() == 0 or valid.all():
+                    continue
+                # linear interpolation inside, nearest valid value at both ends (x, y, confidence)
+                for a in range(3):
+                    kps_all[~valid, j, a] = np.interp(frames[~valid], frames[valid], kps_all[valid, j, a])
+            keypoints_to_use = KeypointSequence(kps_all, coord_space=seq.coord_space, width=seq.width, height=seq.height)
         except Exception as e:
             print('Imputation failed:', e)
-            csv_to_use = args.csv
-    else:
-        csv_to_use = args.csv
 
     # load optional mapping
     user_map = None
@@ -239,29 +376,5 @@ if __name__ == '__main__':
             print('Failed to load mapping JSON:', e)
             user_map = None
 
-    # if mapping provided, prepare helper attributes for overlay function
-    if user_map:
-        # build coco_to_user mapping
-        coco_to_user = {}
-        for user_idx, coco_idx in user_map.items():
-            coco_to_user[coco_idx] = user_idx
-        # build user connections from COCO_CONNECTIONS using coco_to_user
-        user_connections = []
-        for a,b in COCO_CONNECTIONS:
-            if a in coco_to_user and b in coco_to_user:
-                user_connections.append((coco_to_user[a], coco_to_user[b]))
-        openpose_skeleton_overlay._user_connections = user_connections
-        openpose_skeleton_overlay._coco_to_user = coco_to_user
-        openpose_skeleton_overlay._max_user_index = max(user_map.keys())
-        # prepare optional user name map for labels
-        user_name_map = {}
-        for user_idx, coco_idx in user_map.items():
-            if 0 <= coco_idx < len(COCO_NAMES):
-                user_name_map[user_idx] = COCO_NAMES[coco_idx]
-            else:
-                user_name_map[user_idx] = str(user_idx)
-        openpose_skeleton_overlay._user_name_map = user_name_map
-    else:
-        openpose_skeleton_overlay._user_connections = None
-
-    openpose_skeleton_overlay(args.input_video, csv_to_use, args.output_video, points_only=args.points_only)
+    openpose_skeleton_overlay(args.input_video, keypoints_to_use, args.output_video, points_only=args.points_only,
+                              user_map=user_map)
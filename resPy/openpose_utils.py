@@ -1,219 +1,750 @@
 """
-OpenPose 실행, crop, csv 유틸리티
-- run_openpose_and_crop: 비디오 1개에 대해 crop_video, crop_csv 생성
+OpenPose 실행, crop, keypoint 유틸리티
+- run_openpose_and_crop: 비디오 1개에 대해 crop_video, crop keypoint track(<basename>_crop.kps.npy, keypoint_track) 생성
+  KEYPOINT_CSV=1이면 기존 crop_csv(<basename>_crop.csv)도 같이 저장
+- PoseBackend: 비디오(또는 frame view) → (F, 17, 3) float32 keypoint 배열 [x, y, c] (사람 없는 frame은 0)
+    openpose : OpenPoseDemo CLI (frame json을 쓰고 다시 읽음, 기존 방식)
+    cvdnn    : 같은 COCO pose_iter_440000.caffemodel을 cv2.dnn으로 프로세스 안에서 batch 추론 (CPU, frame 파일 I/O 없음)
+    fake     : 결정적인 합성 skeleton (테스트/벤치마크용, 모델 불필요)
+  keypoint 순서는 OpenPose --model_pose COCO 출력의 앞 17개 (CLI 결과와 같은 배열이 되도록 모든 backend 공통)
+
+single-pass 모드 (OPENPOSE_SINGLE_PASS=1)
+- 기본(two-pass)은 원본 전체에 OpenPose → crop bbox → crop 비디오에 OpenPose 재실행으로 crop keypoint를 만든다.
+- single-pass는 1차 keypoint를 crop offset만큼 평행이동(+ crop을 resize하면 scale)해서 crop keypoint를 바로 만든다.
+  OpenPose 실행이 1번으로 줄어 openpose stage 시간이 대략 절반.
+- 두 모드 품질 비교: compare_openpose_modes.py
+
+adaptive temporal stride (POSE_STRIDE=adaptive, pose_stride)
+- 고 fps 영상에서 움직임이 큰 구간은 매 frame, 나머지는 약 30fps 간격 frame만 pose 추정하고 나머지는 보간
+- 두 pass 모두 같은 선택 frame 사용, 결과 track은 항상 전체 frame 수
+
+bbox proxy 모드 (POSE_BBOX_PROXY=1, bbox_proxy)
+- 1차 pass는 crop bbox만 필요하므로 축소 + frame 간격 proxy를 작은 network 입력으로 실행, box는 원본 좌표로 되돌림
+- full-res pose는 crop에서 한 번만 (two-pass 고정), 기존 bbox 대비 정확도 보고: python bbox_proxy.py
+
+환경 변수
+- POSE_BACKEND          : openpose (기본) | cvdnn | fake
+- OPENPOSE_EXE          : OpenPoseDemo 경로 (기본 C:/openpose/openpose/bin/OpenPoseDemo.exe)
+- OPENPOSE_MODEL_FOLDER : models 폴더 (기본 <OpenPose root>/models)
+- POSE_BATCH_SIZE       : cvdnn batch 크기 (기본 8)
+- POSE_INPUT_HEIGHT     : cvdnn 입력 높이 (기본 368, OpenPose 기본 net_resolution과 같음)
+- POSE_JSON_WORKERS     : OpenPose frame json 읽기 thread 수 (기본 min(8, CPU 수))
+- POSE_MAX_PEOPLE       : 1차 pass frame당 검출 인원 (기본 4, 골퍼는 person_tracker가 track으로 고름)
+- SWING_TRIM=1          : 골퍼 keypoint로 스윙 구간(address → finish)을 찾아 crop/keypoint를 그 구간만 (swing_window)
+- SCRATCH_DIR, SCRATCH_MAX_MB, KEEP_TMP_JSON : 작업별 임시 폴더 (재인코딩 mp4, frame json), scratch_workspace 참고
+- POSE_CHUNKS           : OpenPose CLI를 frame 구간 chunk로 나눠 동시에 실행할 worker 수 (기본 1, pose_chunks)
+- MEDIA_PRESET, MEDIA_THREADS, MEZZANINE : 재인코딩/crop 인코딩 설정과 재인코딩 결과 보관, media_transcode 참고
 """
 import subprocess
+import sys
 from pathlib import Path
 import shutil
 import json
-import numpy as np
-import cv2
 import os
+from pipeline_spans import span
+from pipeline_progress import report_frames
+import pose_chunks
+import media_transcode
+
+# OpenPose 실행 중 json 파일 개수로 진행률을 확인하는 간격 (초)
+PROGRESS_POLL_S = 0.5
+# scratch workspace 예상 크기: 재인코딩 mp4 (입력 크기 배수) + frame json/stride/proxy 임시 비디오
+SCRATCH_INPUT_FACTOR = 3
+SCRATCH_EXTRA_BYTES = 64 * 1024 * 1024
+
+# keypoint 이름(OpenPose COCO 순서)/CSV 컬럼과 track 입출력은 keypoint_track
+from keypoint_track import KP, NUM_KP, write_keypoints_csv  # noqa: F401
+
+DEFAULT_OPENPOSE_EXE = r"C:/openpose/openpose/bin/OpenPoseDemo.exe"
+COCO_PROTOTXT = "pose/coco/pose_deploy_linevec.prototxt"
+COCO_CAFFEMODEL = "pose/coco/pose_iter_440000.caffemodel"
+
+
+def single_pass_enabled():
+    return os.environ.get('OPENPOSE_SINGLE_PASS', '0') == '1'
+
+
+def openpose_exe():
+    return Path(os.environ.get('OPENPOSE_EXE', DEFAULT_OPENPOSE_EXE))
+
+
+def openpose_model_folder():
+    env = os.environ.get('OPENPOSE_MODEL_FOLDER')
+    return Path(env) if env else openpose_exe().parent.parent / "models"
+
+
+def reproject_keypoints(kps, offset, scale=(1.0, 1.0), size=None, min_inside=0.5):
+    """
+    원본 좌표 keypoint (..., 17, 3) [x, y, c] → crop 좌표 (crop 비디오에 OpenPose를 다시 돌린 것과 같은 좌표계)
+    offset: crop 좌상단 (x, y), scale: crop을 resize했을 때 (sx, sy), size: crop (w, h)
+    - 검출 안 된 점 (c == 0)은 OpenPose 출력과 같게 (0, 0, 0) 유지
+    - crop 밖으로 나간 점은 c = 0 (crop 비디오에서는 보이지 않으므로)
+    - 검출된 점 중 crop 안에 있는 비율이 min_inside 미만인 frame은 전부 0 (crop 밖 다른 사람 → 빈 frame 취급)
+    """
+    import numpy as np
+    kps = np.asarray(kps, dtype=np.float32)
+    out = np.zeros_like(kps)
+    det = kps[..., 2] > 0
+    out[..., 0] = np.where(det, (kps[..., 0] - offset[0]) * scale[0], 0.0)
+    out[..., 1] = np.where(det, (kps[..., 1] - offset[1]) * scale[1], 0.0)
+    out[..., 2] = np.where(det, kps[..., 2], 0.0)
+    if size is not None:
+        w, h = size
+        inside = det & (out[..., 0] >= 0) & (out[..., 0] < w) & (out[..., 1] >= 0) & (out[..., 1] < h)
+        out[det & ~inside] = 0.0
+        n_det = det.sum(-1)
+        drop = (n_det > 0) & (inside.sum(-1) < min_inside * n_det)
+        out[drop] = 0.0
+    return out
+
+
+# crop bbox 여백 (union box 크기 대비)
+PAD_RATIO = 0.10
+
+
+def union_box(box_list, pad_ratio=PAD_RATIO):
+    """box 목록 → 여백 포함 (x, y, w, h)"""
+    import numpy as np
+    arr = np.array(box_list)
+    x1, y1 = arr[:, :2].min(0)
+    x2, y2 = arr[:, 2:].max(0)
+    w, h = x2 - x1, y2 - y1
+    pad_w = w * pad_ratio
+    pad_h = h * pad_ratio
+    return int(x1 - pad_w), int(y1 - pad_h), int(w + 2 * pad_w), int(h + 2 * pad_h)
+
+
+def clamp_box(bbox, frame_w, frame_h):
+    """(x, y, w, h)를 frame 안으로 자름"""
+    x, y, w, h = bbox
+    if x < 0: x = 0
+    if y < 0: y = 0
+    if x + w > frame_w: w = frame_w - x
+    if y + h > frame_h: h = frame_h - y
+    return x, y, w, h
+
+
+def golfer_box(tracker, pad_ratio=PAD_RATIO):
+    """PersonTracker → 골퍼 track의 union box (x, y, w, h), track이 없으면 None"""
+    golfer = tracker.golfer()
+    return union_box([golfer.extent], pad_ratio) if golfer is not None else None
+
+
+def crop_bbox(people_seq, frame_indices=None, pad_ratio=PAD_RATIO):
+    """
+    1차 pass keypoint (F, P, 17, 3) 또는 (F, 17, 3) → crop bbox (x, y, w, h), 사람이 없으면 None
+    frame마다 사람을 track으로 연결하고 골퍼 track(person_tracker)의 box만 사용
+    """
+    from person_tracker import track_people
+    return golfer_box(track_people(people_seq, frame_indices), pad_ratio)
+
+
+def _json_loads():
+    """orjson이 있으면 사용 (bytes 입력, 표준 json보다 수 배 빠름), 없으면 표준 json"""
+    try:
+        import orjson
+        return orjson.loads
+    except ImportError:
+        return json.loads
+
+
+def json_read_workers():
+    env = os.environ.get('POSE_JSON_WORKERS')
+    if env:
+        try:
+            return max(1, int(env))
+        except ValueError:
+            pass
+    return min(8, os.cpu_count() or 1)
+
+
+def read_openpose_json_dir(json_dir, workers=None, max_people=None):
+    """
+    OpenPose frame json 폴더 → (kps, empty)
+        kps  : (F, 17, 3) float32 — 미리 할당한 배열에 바로 채움 (사람 없는 frame은 0)
+               max_people을 주면 (F, max_people, 17, 3), json의 people 순서대로 (빈 자리는 0)
+        empty: (F,) bool — people이 비어 있는 frame
+    폴더는 os.scandir로 한 번만 훑고, 파일 읽기/파싱은 thread pool에서 chunk 단위로 나눠 처리.
+    """
+    import numpy as np
+    from concurrent.futures import ThreadPoolExecutor
+    with os.scandir(json_dir) as it:
+        files = sorted(e.path for e in it if e.name.endswith('.json'))
+    n = len(files)
+    slots = max_people or 1
+    kps = np.zeros((n, slots, NUM_KP, 3), dtype=np.float32)
+    empty = np.ones(n, dtype=bool)
+    loads = _json_loads()
+
+    def _fill(lo, hi):
+        for i in range(lo, hi):
+            with open(files[i], 'rb') as f:
+                people = loads(f.read()).get("people")
+            for p, person in enumerate((people or [])[:slots]):
+                flat = person["pose_keypoints_2d"]
+                m = min(len(flat) // 3, NUM_KP)  # 앞 17개 keypoint만 사용 (keypoint_track.KP)
+                kps[i, p, :m] = np.asarray(flat[:m * 3], dtype=np.float32).reshape(m, 3)
+                empty[i] = False
+
+    workers = min(workers or json_read_workers(), max(1, n))
+    if workers <= 1 or n < 64:
+        _fill(0, n)
+    else:
+        step = -(-n // (workers * 4))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pose-json') as pool:
+            list(pool.map(lambda lo: _fill(lo, min(n, lo + step)), range(0, n, step)))
+    return (kps if max_people else kps[:, 0]), empty
+
 
-def run_openpose_and_crop(input_video, crop_video_dir, crop_csv_dir, skeleton_video_dir):
+def _count_json(json_dir):
+    try:
+        return sum(1 for e in os.scandir(json_dir) if e.name.endswith('.json'))
+    except OSError:
+        return 0
+
+
+def _video_frame_count(path):
+    import cv2
+    cap = cv2.VideoCapture(str(path))
+    n = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    cap.release()
+    return n
+
+
+def _run_openpose_tracked(cmd, cwd, json_dir, on_frames):
+    """
+    subprocess.run(cmd, capture, text)과 같지만, 실행 중 json_dir에 쌓이는 frame json 개수를
+    on_frames(n)으로 알린다 (진행 이벤트용). return: CompletedProcess
+    """
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=cwd, text=True)
+    while True:
+        try:
+            out, err = proc.communicate(timeout=PROGRESS_POLL_S)
+            break
+        except subprocess.TimeoutExpired:
+            on_frames(_count_json(json_dir))
+    on_frames(_count_json(json_dir))
+    return subprocess.CompletedProcess(cmd, proc.returncode, out, err)
+
+
+def _iter_video_frames(video_path, frames=None):
+    """frame view(frame_store)가 있으면 그것을, 없으면 cv2로 디코드한 BGR frame을 순서대로"""
+    if frames is not None:
+        yield from frames
+        return
+    import cv2
+    cap = cv2.VideoCapture(str(video_path))
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield frame
+    finally:
+        cap.release()
+
+
+# ======================[ pose backends ]======================
+class PoseBackend:
+    """비디오 → (F, 17, 3) keypoint. 구현은 estimate()만 제공하면 됨"""
+    name = 'base'
+    # False면 frames(view)를 직접 읽지 못하고 video_path 파일이 필요 (pose_stride가 선택 frame 비디오를 만들어 넘김)
+    in_process = True
+
+    def estimate(self, video_path, frames=None, work_dir=None, phase='pose', portion=(0.0, 1.0)):
+        """
+        video_path: 입력 비디오 (frame 수/진행률 기준)
+        frames: optional frame view (frame_store) — 프로세스 안 backend는 디코드 대신 사용
+        work_dir: backend 임시 파일 폴더 (CLI backend의 json 출력)
+        phase/portion: 진행 이벤트 (report_frames) 구분
+        return: np.ndarray (F, 17, 3) float32
+        """
+        raise NotImplementedError
+
+    def estimate_people(self, video_path, frames=None, work_dir=None, phase='pose', portion=(0.0, 1.0), max_people=4):
+        """
+        frame당 여러 사람 → (F, P, 17, 3) (빈 자리는 0, person_tracker 입력)
+        기본 구현은 한 사람 결과를 P=1로 (다인원 검출이 없는 backend)
+        """
+        return self.estimate(video_path, frames=frames, work_dir=work_dir, phase=phase, portion=portion)[:, None]
+
+    def config(self):
+        """stage fingerprint에 들어갈 설정"""
+        return {'backend': self.name}
+
+    def detection_variant(self, input_height):
+        """bbox 검출 전용 (작은 network 입력) backend, 입력 크기를 못 바꾸는 backend는 자기 자신"""
+        return self
+
+
+class OpenPoseCLIBackend(PoseBackend):
+    """OpenPoseDemo 실행 → frame json → 배열 (기존 방식, 실패 시 1회 재시도)"""
+    name = 'openpose'
+    in_process = False
+
+    def __init__(self, exe=None, model_folder=None, net_height=None):
+        self.exe = Path(exe) if exe else openpose_exe()
+        # --net_resolution -1x<net_height> (None이면 OpenPose 기본 -1x368)
+        self.net_height = net_height
+        self.root = self.exe.parent.parent
+        self.model_folder = Path(model_folder) if model_folder else openpose_model_folder()
+        coco_model = self.model_folder / COCO_CAFFEMODEL
+        assert coco_model.exists(), f"COCO 모델 파일이 존재하지 않습니다: {coco_model}"
+
+    def detection_variant(self, input_height):
+        return OpenPoseCLIBackend(self.exe, self.model_folder, net_height=int(input_height) // 16 * 16)
+
+    def _command(self, video_path, json_dir, max_people, first=None, last=None, slot=0):
+        cmd = [str(self.exe),
+            "--video", os.path.abspath(str(video_path)),
+            "--write_json", os.path.abspath(str(json_dir)),
+            "--display", "0", "--render_pose", "0",
+            "--number_people_max", str(max_people),
+            "--model_folder", str(self.model_folder),
+            "--model_pose", "COCO"]
+        if self.net_height:
+            cmd += ["--net_resolution", f"-1x{self.net_height}"]
+        # frame 구간 chunk (pose_chunks), last는 포함
+        if first:
+            cmd += ["--frame_first", str(first)]
+        if last is not None:
+            cmd += ["--frame_last", str(last)]
+        gpus = pose_chunks.gpu_count()
+        if gpus:
+            cmd += ["--num_gpu", "1", "--num_gpu_start", str(slot % gpus)]
+        return cmd
+
+    def _run(self, video_path, frames, work_dir, phase, portion, max_people):
+        """
+        OpenPoseDemo 실행 → (F, max_people, 17, 3)
+        POSE_CHUNKS > 1이면 frame 구간 chunk를 병렬 실행하고 chunk별 checkpoint (실패한 chunk만 재시도)
+        """
+        import numpy as np
+        total_frames = len(frames) if frames is not None else _video_frame_count(video_path)
+        chunks = pose_chunks.plan_chunks(total_frames)
+        checkpoint = None
+        if len(chunks) > 1:
+            checkpoint = pose_chunks.ChunkCheckpoint.for_video(
+                video_path, {'phase': phase, 'max_people': max_people, 'net_height': self.net_height, 'chunks': chunks})
+        phase_dir = Path(work_dir) / phase
+
+        def run_chunk(start, end, slot, on_frames):
+            json_dir = phase_dir / f"chunk_{start:08d}" if len(chunks) > 1 else phase_dir
+            if json_dir.exists():
+                shutil.rmtree(json_dir, ignore_errors=True)
+            json_dir.mkdir(exist_ok=True, parents=True)
+            # 마지막 chunk는 frame 수 추정이 틀려도 끝까지 읽도록 --frame_last 없이
+            last = end - 1 if end < total_frames else None
+            cmd = self._command(video_path, json_dir, max_people, first=start, last=last, slot=slot)
+            res = _run_openpose_tracked(cmd, self.root, json_dir, on_frames)
+            if res.returncode != 0:
+                raise RuntimeError(f"OpenPose failed: returncode={res.returncode}\nstdout={res.stdout}\nstderr={res.stderr}")
+            kps, _ = read_openpose_json_dir(json_dir, max_people=max_people)
+            shutil.rmtree(json_dir, ignore_errors=True)
+            return kps
+
+        try:
+            kps = pose_chunks.run_chunked(
+                run_chunk, chunks, checkpoint=checkpoint,
+                on_progress=lambda n: report_frames('openpose', n, total_frames, phase=phase, portion=portion))
+        except Exception as e:
+            raise RuntimeError(f"OpenPose execution error: {e}")
+        if checkpoint is not None:
+            checkpoint.clear()
+        if kps.size == 0:
+            kps = np.zeros((0, max_people, NUM_KP, 3), dtype=np.float32)
+        return kps
+
+    def estimate(self, video_path, frames=None, work_dir=None, phase='pose', portion=(0.0, 1.0)):
+        return self._run(video_path, frames, work_dir, phase, portion, max_people=1)[:, 0]
+
+    def estimate_people(self, video_path, frames=None, work_dir=None, phase='pose', portion=(0.0, 1.0), max_people=4):
+        return self._run(video_path, frames, work_dir, phase, portion, max_people=max_people)
+
+
+class OpenCVDnnBackend(PoseBackend):
+    """
+    같은 COCO caffemodel을 cv2.dnn으로 프로세스 안에서 batch 추론 (CPU)
+    - frame json/디스크 I/O 없음, Windows 바이너리 불필요 (Linux worker용)
+    - --number_people_max 1 과 같이 한 사람만: 관절별 heatmap 최댓값 위치 (PAF grouping 없음)
+    """
+    name = 'cvdnn'
+    NUM_HEATMAPS = 19   # COCO 18 parts + background
+    CONF_THRESHOLD = 0.1
+
+    def __init__(self, model_folder=None, batch_size=None, input_height=None):
+        self.model_folder = Path(model_folder) if model_folder else openpose_model_folder()
+        self.batch_size = batch_size or int(os.environ.get('POSE_BATCH_SIZE', '8'))
+        self.input_height = input_height or int(os.environ.get('POSE_INPUT_HEIGHT', '368'))
+        self._net = None
+
+    def config(self):
+        return {'backend': self.name, 'input_height': self.input_height, 'conf_threshold': self.CONF_THRESHOLD}
+
+    def detection_variant(self, input_height):
+        variant = OpenCVDnnBackend(self.model_folder, self.batch_size, input_height=int(input_height) // 8 * 8)
+        variant._net = self._net
+        return variant
+
+    def net(self):
+        if self._net is None:
+            import cv2
+            proto = self.model_folder / COCO_PROTOTXT
+            weights = self.model_folder / COCO_CAFFEMODEL
+            assert weights.exists(), f"COCO 모델 파일이 존재하지 않습니다: {weights}"
+            self._net = cv2.dnn.readNetFromCaffe(str(proto), str(weights))
+            self._net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+            self._net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        return self._net
+
+    def _infer(self, batch, out, start):
+        import cv2
+        import numpy as np
+        h, w = batch[0].shape[:2]
+        in_h = self.input_height
+        in_w = max(8, int(round(in_h * w / float(h) / 8.0)) * 8)
+        blob = cv2.dnn.blobFromImages(batch, 1.0 / 255, (in_w, in_h), (0, 0, 0), swapRB=False, crop=False)
+        net = self.net()
+        net.setInput(blob)
+        heat = net.forward()[:, :NUM_KP]                    # (N, 17, hh, hw)
+        n, k, hh, hw = heat.shape
+        flat = heat.reshape(n, k, -1)
+        idx = flat.argmax(-1)
+        conf = np.take_along_axis(flat, idx[..., None], -1)[..., 0]
+        ys, xs = np.divmod(idx, hw)
+        kps = out[start:start + n]
+        kps[..., 0] = (xs + 0.5) * (w / float(hw))
+        kps[..., 1] = (ys + 0.5) * (h / float(hh))
+        kps[..., 2] = conf
+        kps[conf < self.CONF_THRESHOLD] = 0.0
+
+    def estimate(self, video_path, frames=None, work_dir=None, phase='pose', portion=(0.0, 1.0)):
+        import numpy as np
+        total = len(frames) if frames is not None else _video_frame_count(video_path)
+        out = np.zeros((max(total, 0), NUM_KP, 3), dtype=np.float32)
+        batch, done = [], 0
+        for frame in _iter_video_frames(video_path, frames):
+            batch.append(np.ascontiguousarray(frame))
+            if len(batch) == self.batch_size:
+                if done + len(batch) > len(out):
+                    out = np.concatenate([out, np.zeros((len(batch), NUM_KP, 3), dtype=np.float32)])
+                self._infer(batch, out, done)
+                done += len(batch)
+                batch = []
+                report_frames('openpose', done, total, phase=phase, portion=portion)
+        if batch:
+            if done + len(batch) > len(out):
+                out = np.concatenate([out, np.zeros((done + len(batch) - len(out), NUM_KP, 3), dtype=np.float32)])
+            self._infer(batch, out, done)
+            done += len(batch)
+        report_frames('openpose', done, done, phase=phase, portion=portion)
+        return out[:done]
+
+
+class FakePoseBackend(PoseBackend):
+    """결정적인 합성 skeleton (frame 크기 가운데에서 천천히 흔들리는 사람), 모델/바이너리 불필요"""
+    name = 'fake'
+    # 가운데 기준 정규화 좌표 (OpenPose COCO 출력 앞 17개 순서: Nose, Neck, RShoulder, ...)
+    BASE_POSE = [
+        (0.00, -0.40), (0.00, -0.30), (-0.10, -0.30), (-0.15, -0.15), (-0.18, 0.00),
+        (0.10, -0.30), (0.15, -0.15), (0.18, 0.00), (-0.07, 0.05), (-0.08, 0.25),
+        (-0.08, 0.45), (0.07, 0.05), (0.08, 0.25), (0.08, 0.45), (-0.03, -0.43),
+        (0.03, -0.43), (-0.06, -0.40),
+    ]
+
+    def __init__(self, seed=0, frame_count=None, size=None):
+        self.seed = seed
+        self.frame_count = frame_count
+        self.size = size
+
+    def config(self):
+        return {'backend': self.name, 'seed': self.seed}
+
+    def keypoints(self, n, width, height):
+        import numpy as np
+        t = np.arange(n, dtype=np.float32)[:, None]
+        base = np.asarray(self.BASE_POSE, dtype=np.float32)[None]        # (1, 17, 2)
+        phase = (np.arange(NUM_KP, dtype=np.float32) * 0.37 + self.seed)[None]
+        swing = 0.03 * np.sin(2 * np.pi * t / 60.0 + phase)              # (n, 17)
+        scale = 0.8 * min(width, height)
+        kps = np.zeros((n, NUM_KP, 3), dtype=np.float32)
+        kps[..., 0] = width / 2.0 + (base[..., 0] + swing) * scale
+        kps[..., 1] = height / 2.0 + (base[..., 1] + 0.5 * swing) * scale
+        kps[..., 2] = 0.9
+        return kps
+
+    def estimate(self, video_path, frames=None, work_dir=None, phase='pose', portion=(0.0, 1.0)):
+        if frames is not None:
+            n, (w, h) = len(frames), (frames.width, frames.height)
+        else:
+            n = self.frame_count if self.frame_count is not None else _video_frame_count(video_path)
+            if self.size is not None:
+                w, h = self.size
+            else:
+                import cv2
+                cap = cv2.VideoCapture(str(video_path))
+                w, h = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+                cap.release()
+        report_frames('openpose', n, n, phase=phase, portion=portion)
+        return self.keypoints(n, w, h)
+
+
+POSE_BACKENDS = {
+    'openpose': OpenPoseCLIBackend,
+    'cvdnn': OpenCVDnnBackend,
+    'fake': FakePoseBackend,
+}
+
+
+def pose_backend_name():
+    return os.environ.get('POSE_BACKEND', 'openpose')
+
+
+def get_pose_backend(name=None, **kwargs):
+    name = name or pose_backend_name()
+    try:
+        cls = POSE_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"unknown POSE_BACKEND {name!r}; choose from {sorted(POSE_BACKENDS)}")
+    return cls(**kwargs)
+
+
+def run_openpose_and_crop(input_video, crop_video_dir, crop_csv_dir, skeleton_video_dir, single_pass=None, backend=None,
+                          stride=None, bbox_proxy=None, input_digest=None):
     """
     input_video: Path
-    crop_video_dir, crop_csv_dir: Path
-    return: (crop_video_path, crop_csv_path)
+    crop_video_dir, crop_csv_dir: Path (crop_csv_dir에 keypoint track 저장)
+    single_pass: True면 1차 keypoint를 crop 좌표로 옮겨 crop keypoint 생성 (None이면 OPENPOSE_SINGLE_PASS 환경변수)
+    backend: PoseBackend 또는 이름 (None이면 POSE_BACKEND 환경변수, 기본 OpenPose CLI)
+    stride: True면 adaptive temporal stride (pose_stride, None이면 POSE_STRIDE 환경변수)
+    bbox_proxy: True면 1차 pass를 축소/frame 간격 proxy에서 bbox 검출용으로만 실행 (bbox_proxy, None이면 POSE_BBOX_PROXY)
+    input_digest: 이미 계산한 input_video sha256 (analyze_golf_video) — mezzanine/chunk checkpoint key가 다시 해시하지 않음
+    return: (crop_video_path, keypoints_path)  keypoints_path: <basename>_crop.kps.npy
     """
-    # OpenPose 실행 경로 및 모델 경로 (COCO17)
-    OPENPOSE_EXE = Path(r"C:/openpose/openpose/bin/OpenPoseDemo.exe")
-    OPENPOSE_ROOT = OPENPOSE_EXE.parent.parent
-    PAD_RATIO = 0.10
+    if backend is None or isinstance(backend, str):
+        backend = get_pose_backend(backend)
     basename = Path(input_video).stem
-    # COCO17 모델 사용
-    MODEL_FOLDER = OPENPOSE_ROOT / "models"
-    COCO_MODEL = MODEL_FOLDER / "pose/coco/pose_iter_440000.caffemodel"
-    assert COCO_MODEL.exists(), f"COCO 모델 파일이 존재하지 않습니다: {COCO_MODEL}"
-    # tmp_json_dir을 resPy 폴더 내부에 생성
-    respy_dir = Path(__file__).parent.resolve()
-    tmp_json_dir = respy_dir / f"_tmp_json_{basename}"
-    tmp_json_dir.mkdir(exist_ok=True, parents=True)
-    # Prepare a robust cleanup helper and register it to run at process exit.
-    import atexit, time
-    keep_tmp = os.environ.get('KEEP_TMP_JSON', '0') == '1'
-    def _rmtree_force(path):
-        # onerror handler: try to fix permissions then retry
-        def _onerror(func, path_, exc_info):
-            try:
-                os.chmod(path_, 0o700)
-                func(path_)
-            except Exception:
-                pass
+    # 작업별 고유 scratch workspace (tmpfs 우선, quota를 넘으면 디스크) — 같은 basename 동시 작업도 충돌 없음
+    from scratch_workspace import workspace
+    estimate = SCRATCH_INPUT_FACTOR * os.path.getsize(input_video) + SCRATCH_EXTRA_BYTES
+    with workspace('openpose', basename, estimate_bytes=estimate) as ws:
         try:
-            shutil.rmtree(path, onerror=_onerror)
-            return True
-        except Exception:
-            # retry a few times with small backoff
-            for _ in range(3):
-                time.sleep(0.2)
-                try:
-                    shutil.rmtree(path, onerror=_onerror)
-                    return True
-                except Exception:
-                    continue
-        return False
-
-    def _cleanup_tmp():
-        if keep_tmp:
-            print(f"[DEBUG] KEEP_TMP_JSON=1, preserving tmp_json_dir: {tmp_json_dir}")
-            return
-        ok = _rmtree_force(tmp_json_dir)
-        if not ok:
-            print(f"[WARN] _rmtree_force failed to remove tmp_json_dir: {tmp_json_dir}")
-
-    atexit.register(_cleanup_tmp)
+            return _openpose_and_crop(ws, input_video, crop_video_dir, crop_csv_dir, single_pass, backend, stride,
+                                      bbox_proxy, input_digest)
+        except BaseException:
+            # 실패하면 이 작업의 frame store도 바로 삭제 (성공하면 analyze_golf_video가 crop sidecar로 release)
+            from frame_store import release
+            release(ws.name)
+            raise
+
+
+def _openpose_and_crop(ws, input_video, crop_video_dir, crop_csv_dir, single_pass, backend, stride, bbox_proxy,
+                       input_digest):
+    """run_openpose_and_crop 본체, ws: scratch workspace (재인코딩 mp4, frame json, 임시 비디오), None 인자는 환경변수 기본값"""
+    import numpy as np
+    import cv2
+    import pose_stride
+    import bbox_proxy as proxy
+    from person_tracker import max_people, track_people, golfer_keypoints
+    import swing_window
+    if single_pass is None:
+        single_pass = single_pass_enabled()
+    if stride is None:
+        stride = pose_stride.stride_mode() is not None
+    if bbox_proxy is None:
+        bbox_proxy = proxy.proxy_enabled()
+    if bbox_proxy and single_pass:
+        # proxy keypoint는 저해상도/일부 frame이라 crop keypoint로 쓸 수 없음 → crop에서 full-res pose
+        print('[WARN] POSE_BBOX_PROXY ignores OPENPOSE_SINGLE_PASS; running pose on the crop', file=sys.stderr)
+        sys.stderr.flush()
+        single_pass = False
+    basename = Path(input_video).stem
+    tmp_json_dir = ws.path
     crop_video_dir = Path(crop_video_dir); crop_video_dir.mkdir(exist_ok=True)
     crop_csv_dir = Path(crop_csv_dir); crop_csv_dir.mkdir(exist_ok=True)
     # Prepare absolute input path and pre-reencode input video to ensure OpenPose/OpenCV can open it reliably
     abs_input_video = os.path.abspath(str(input_video))
-    reencoded_video = tmp_json_dir / f"{basename}_reencoded.mp4"
-    abs_reencoded = os.path.abspath(str(reencoded_video))
-    if not reencoded_video.exists():
-        ff_cmd = ["ffmpeg", "-y", "-i", abs_input_video, "-c:v", "libx264", "-pix_fmt", "yuv420p", "-movflags", "+faststart", abs_reencoded]
+    # 입력 digest는 파이프라인이 한 번 계산해서 넘김 — 단독 실행이면 쓰는 곳(mezzanine, chunk checkpoint)이 있을 때만 한 번
+    if input_digest is None and (media_transcode.mezzanine_enabled() or pose_chunks.chunk_workers() > 1):
+        from result_cache import hash_file
+        input_digest = hash_file(abs_input_video)
+    # 재인코딩 결과는 mezzanine으로 보관 (같은 비디오 재실행 시 재인코딩 생략, MEZZANINE=0이면 작업 폴더)
+    mezzanine, mezzanine_hit = media_transcode.lookup_mezzanine(abs_input_video, input_digest)
+    if mezzanine is None:
+        abs_reencoded = os.path.abspath(str(tmp_json_dir / f"{basename}_reencoded.mp4"))
+    else:
+        abs_reencoded = os.path.abspath(str(mezzanine))
+    # 재인코딩과 같은 디코드에서 frame store와 (OpenPose CLI용) bbox proxy 비디오도 만듦
+    # (crop/overlay/TimeSformer가 다시 디코드하지 않도록, frame_store / media_transcode filter graph)
+    # store key는 workspace 이름 (basename이 같은 동시 작업과 분리)
+    from frame_store import ingest, encode_view, link_view
+    proxy_video = tmp_json_dir / 'pose_proxy.mp4' if bbox_proxy and not backend.in_process else None
+    with span('openpose.reencode') as sp:
         try:
-            p = subprocess.run(ff_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-            if p.returncode != 0:
-                raise RuntimeError(f"ffmpeg re-encode failed: returncode={p.returncode}\nstdout={p.stdout}\nstderr={p.stderr}")
+            ingest_source = abs_reencoded if mezzanine_hit else abs_input_video
+            extra = [proxy.proxy_rendition(ingest_source, proxy_video)] if proxy_video is not None else []
+            if mezzanine_hit:
+                store = ingest(ingest_source, None, ws.name, extra=extra)
+            elif mezzanine is not None:
+                with media_transcode.writing(mezzanine) as partial:
+                    store = ingest(ingest_source, partial, ws.name, extra=extra)
+            else:
+                store = ingest(ingest_source, abs_reencoded, ws.name, extra=extra)
         except Exception as e:
             raise RuntimeError(f"Pre-reencode failed: {e}")
+        sp.set(in_ram=ws.in_ram, mezzanine='hit' if mezzanine_hit else 'miss' if mezzanine is not None else None)
+        if mezzanine_hit:
+            print(f'[STEP] reusing mezzanine: {abs_reencoded}'); sys.stdout.flush()
+        if store is not None:
+            sp.set(frames=len(store), frame_store=True)
     # use reencoded file as input for OpenPose
     abs_input_for_openpose = abs_reencoded
+    if input_digest is not None:
+        # pose chunk checkpoint key (재인코딩 파일을 다시 해시하지 않음)
+        pose_chunks.remember_source(abs_reencoded, pose_chunks.derive_key(
+            input_digest, rendition='reencoded', **media_transcode.transcode_config()))
+    if store is not None:
+        src_fps = store.fps
+    else:
+        cap = cv2.VideoCapture(abs_input_for_openpose)
+        src_fps = cap.get(cv2.CAP_PROP_FPS)
+        cap.release()
 
-    # 1. OpenPose 원본 실행 (json 추출, COCO17)
-    raw_json_dir = tmp_json_dir / f"raw_{basename}"
-    raw_json_dir.mkdir(exist_ok=True)
-    abs_raw_json_dir = os.path.abspath(str(raw_json_dir))
-    cmd = [str(OPENPOSE_EXE),
-        "--video", abs_input_for_openpose,
-        "--write_json", abs_raw_json_dir,
-        "--display", "0", "--render_pose", "0",
-        "--number_people_max", "1",
-        "--model_folder", str(MODEL_FOLDER),
-        "--model_pose", "COCO"]
-    # run with capture; retry once on failure
-    try:
-        res = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=OPENPOSE_ROOT, text=True)
-        if res.returncode != 0:
-            # retry once
-            res2 = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=OPENPOSE_ROOT, text=True)
-            if res2.returncode != 0:
-                raise RuntimeError(f"OpenPose failed: returncode={res2.returncode}\nstdout={res2.stdout}\nstderr={res2.stderr}")
-    except Exception as e:
-        raise RuntimeError(f"OpenPose execution error: {e}")
-
-    # 2. 주요 인물 박스 추출 (DBSCAN)
-    def main_person_boxes(json_dir):
-        from sklearn.cluster import DBSCAN
-        centers, boxes = [], []
-        for jf in sorted(json_dir.glob("*.json")):
-            data = json.load(open(jf))
-            people = data.get("people")
-            if not people:
-                continue
-            kps = np.array(people[0]["pose_keypoints_2d"]).reshape(-1, 3)  # COCO17: (17,3)
-            if kps[11, 2] < 0.10:  # COCO: 11번이 MidHip(중심)
-                continue
-            cx, cy = kps[11, :2]
-            valid = kps[:, 2] > 0.05
-            xs, ys = kps[valid, 0], kps[valid, 1]
-            centers.append([cx, cy])
-            boxes.append([xs.min(), ys.min(), xs.max(), ys.max()])
-        if not centers:
-            return []
-        centers = np.array(centers)
-        labels = DBSCAN(eps=100, min_samples=5).fit_predict(centers)
-        if (labels != -1).any():
-            main_label = np.bincount(labels[labels != -1]).argmax()
-        else:
-            main_label = 0
-        return [boxes[i] for i, lb in enumerate(labels) if lb == main_label]
-
-    def union_box(box_list):
-        arr = np.array(box_list)
-        x1, y1 = arr[:, :2].min(0)
-        x2, y2 = arr[:, 2:].max(0)
-        w, h = x2 - x1, y2 - y1
-        pad_w = w * PAD_RATIO
-        pad_h = h * PAD_RATIO
-        return int(x1 - pad_w), int(y1 - pad_h), int(w + 2 * pad_w), int(h + 2 * pad_h)
-
-    # 3. crop bbox 계산
-    boxes = main_person_boxes(raw_json_dir)
-    if not boxes:
+    # 0. adaptive stride: frame 차이로 pose를 돌릴 frame 선택 (두 pass 공통, proxy면 2차 pass만)
+    stride_indices = None
+    if stride:
+        with span('openpose.motion') as sp:
+            scores = pose_stride.motion_scores(abs_input_for_openpose, view=store)
+            stride_params = pose_stride.stride_params(src_fps)
+            stride_indices = pose_stride.select_frames(scores, *stride_params)
+            sp.frames = len(scores)
+            sp.set(sampled=len(stride_indices), stride=list(stride_params[:2]))
+        print(f'[STEP] pose stride: {len(stride_indices)}/{len(scores)} frames '
+              f'(stride {stride_params[0]}..{stride_params[1]})'); sys.stdout.flush()
+
+    # 1. 골퍼 찾기용 pose: frame마다 여러 사람을 검출 (person_tracker가 track으로 연결)
+    people_max = max_people()
+    proxy_meta = None
+    if bbox_proxy:
+        # 축소/frame 간격 proxy에서 bbox 검출용으로만 (keypoint는 원본 좌표로 되돌림)
+        with span('openpose.bbox_proxy') as sp:
+            people, sample_indices, proxy_meta = proxy.proxy_people(
+                backend, abs_input_for_openpose, view=store, work_dir=tmp_json_dir, portion=(0.0, 0.15),
+                max_people=people_max, proxy_video=proxy_video)
+            sp.frames = proxy_meta['frames']
+            sp.set(backend=backend.name, **{k: proxy_meta[k] for k in ('stride', 'scale', 'net_height')})
+        n_source = len(store) if store is not None else _video_frame_count(abs_input_for_openpose)
+    else:
+        # 원본 전체 pose 추정 (COCO17), single-pass면 1차 pass가 openpose stage의 거의 전부
+        first_portion = (0.0, 0.9) if single_pass else (0.0, 0.45)
+        with span('openpose.first_pass') as sp:
+            if stride_indices is None:
+                people = backend.estimate_people(abs_input_for_openpose, frames=store, work_dir=tmp_json_dir,
+                                                 phase='first_pass', portion=first_portion, max_people=people_max)
+                sample_indices = np.arange(len(people))
+            else:
+                people = pose_stride.estimate_selected(backend, abs_input_for_openpose, stride_indices, view=store,
+                                                       work_dir=tmp_json_dir, phase='first_pass',
+                                                       portion=first_portion, max_people=people_max)
+                sample_indices = stride_indices[:len(people)]
+            sp.frames = len(people)
+            sp.set(backend=backend.name, strided=stride_indices is not None, max_people=people_max)
+        n_source = len(scores) if stride_indices is not None else len(people)
+
+    # 2-3. 사람별 track 연결 → 골퍼 track (dwell x motion) → crop bbox
+    trim = swing_window.trim_enabled()
+    with span('openpose.track') as sp:
+        tracker = track_people(people, sample_indices, keep_history=bool(single_pass) or trim)
+        golfer = tracker.golfer()
+        sp.frames = golfer.hits if golfer is not None else 0
+        sp.set(tracks=len(tracker.tracks()))
+    bbox = golfer_box(tracker)
+    if bbox is None:
         raise RuntimeError(f"No valid person detected in {input_video}")
-    bbox = union_box(boxes)
+    kps_full = golfer_keypoints(golfer, sample_indices, n_source) if single_pass or trim else None
+
+    # 3-1. 스윙 구간 (address → finish + margin)만 남김 → crop/2차 pass/이후 stage 모두 이 구간만 (swing_window)
+    window = None
+    if trim:
+        with span('openpose.swing_window') as sp:
+            window = swing_window.detect_swing_window(kps_full, src_fps, swing_window.margin_seconds())
+            sp.frames = n_source
+            sp.set(window=list(window) if window else None)
+        if window:
+            print(f'[STEP] swing window: frames {window[0]}..{window[1]} of {n_source}'); sys.stdout.flush()
+    start, end = window or (0, n_source)
 
     # 4. crop_video 생성 (ffmpeg)
     crop_video_path = crop_video_dir / f"{basename}_crop.mp4"
-    x, y, w, h = bbox
     cap = cv2.VideoCapture(str(input_video))
     orig_w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     orig_h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
     cap.release()
-    if x < 0: x = 0
-    if y < 0: y = 0
-    if x + w > orig_w: w = orig_w - x
-    if y + h > orig_h: h = orig_h - y
+    x, y, w, h = clamp_box(bbox, orig_w, orig_h)
     if w <= 0 or h <= 0:
         raise ValueError(f"Invalid crop size: {(w, h)} for video {input_video}")
     abs_crop_video_path = os.path.abspath(str(crop_video_path))
-    cmd = ["ffmpeg", "-y", "-i", abs_input_video,
-        "-filter:v", f"crop={w}:{h}:{x}:{y}",
-        "-pix_fmt", "yuv420p", abs_crop_video_path]
-    subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-
-    # 5. crop_video에 대해 openpose 재실행 (crop_json, COCO17)
-    crop_json_dir = tmp_json_dir / f"crop_{basename}"
-    crop_json_dir.mkdir(exist_ok=True)
-    abs_crop_json_dir = os.path.abspath(str(crop_json_dir))
-    cmd = [str(OPENPOSE_EXE),
-        "--video", abs_crop_video_path,
-        "--write_json", abs_crop_json_dir,
-        "--display", "0", "--render_pose", "0",
-        "--number_people_max", "1",
-        "--model_folder", str(MODEL_FOLDER),
-        "--model_pose", "COCO"]
-    try:
-        res = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=OPENPOSE_ROOT, text=True)
-        if res.returncode != 0:
-            res2 = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=OPENPOSE_ROOT, text=True)
-            if res2.returncode != 0:
-                raise RuntimeError(f"OpenPose (crop) failed: returncode={res2.returncode}\nstdout={res2.stdout}\nstderr={res2.stderr}")
-    except Exception as e:
-        raise RuntimeError(f"OpenPose (crop) execution error: {e}")
-
-    # 6. crop_json → crop_csv
-    # COCO17 keypoint 이름
-    KP = [
-        "Nose", "LEye", "REye", "LEar", "REar", "LShoulder", "RShoulder", "LElbow", "RElbow",
-        "LWrist", "RWrist", "LHip", "RHip", "LKnee", "RKnee", "LAnkle", "RAnkle"
-    ]
-    COLS = [f"{n}_{a}" for n in KP for a in ("x","y","c")]
-    crop_csv_path = crop_csv_dir / f"{basename}_crop.csv"
-    rows = []
-    for jf in sorted(crop_json_dir.glob("*.json")):
-        data = json.load(open(jf))
-        people = data.get("people")
-        if not people:
-            rows.append([np.nan] * len(COLS))
+    crop_frames = None
+    with span('openpose.crop') as sp:
+        if store is not None:
+            # store의 crop 영역을 바로 인코딩 (원본 재디코드 없음), overlay/TimeSformer는 sidecar로 같은 frame을 읽음
+            crop_frames = (store.window(start, end) if window else store).crop(x, y, w, h)
+            encode_view(crop_frames, abs_crop_video_path, args=media_transcode.encode_args())
+            link_view(crop_video_path, store, (x, y, w, h), window=window)
+            sp.set(frames=len(crop_frames), frame_store=True)
         else:
-            kps = np.array(people[0]["pose_keypoints_2d"]).reshape(-1, 3)
-            kps = kps[:17]  # COCO17 keypoint만 사용
-            rows.append(kps.flatten())
-    import pandas as pd
-    pd.DataFrame(rows, columns=COLS).to_csv(crop_csv_path, index=False)
+            # single-pass: crop keypoint frame이 1차 pass frame과 1:1이어야 하므로 OpenPose가 읽은 재인코딩 파일에서 crop
+            # crop 출력이 곧 웹 재생용 (MEDIA_PRESET, faststart) — 별도 재인코딩 없음
+            crop_source = abs_input_for_openpose if single_pass else abs_input_video
+            filters = [media_transcode.trim_filter(window) if window else None, media_transcode.crop_filter(x, y, w, h)]
+            media_transcode.run(crop_source, [media_transcode.Rendition(abs_crop_video_path, filters)])
+    if input_digest is not None:
+        pose_chunks.remember_source(abs_crop_video_path, pose_chunks.derive_key(
+            input_digest, rendition='crop', crop=[x, y, w, h], window=window, frame_store=store is not None,
+            single_pass=bool(single_pass), **media_transcode.transcode_config()))
 
-    # 7. 임시 폴더 정리: 즉시 제거 시도 (또는 atexit에 의해 프로세스 종료 시 시도)
-    try:
-        if not keep_tmp:
-            ok = _rmtree_force(tmp_json_dir)
-            if not ok:
-                print(f"[WARN] Immediate removal failed for tmp_json_dir {tmp_json_dir}; will attempt again at process exit.")
-        else:
-            print(f"[DEBUG] KEEP_TMP_JSON=1, preserving tmp_json_dir: {tmp_json_dir}")
-    except Exception as e:
-        print(f"[WARN] Failed to remove tmp_json_dir {tmp_json_dir}: {e}")
-    return crop_video_path, crop_csv_path
+    if single_pass:
+        # 5. 1차 keypoint → crop 좌표 (crop은 resize하지 않으므로 scale 1)
+        kps_crop = reproject_keypoints(kps_full[start:end], (x, y), size=(w, h))
+    else:
+        # 5. crop_video에 대해 pose 재추정 (COCO17), stride면 구간 안 선택 frame만
+        with span('openpose.second_pass') as sp:
+            second_portion = (0.15, 0.95) if bbox_proxy else (0.5, 0.95)
+            if stride_indices is None:
+                kps_crop = backend.estimate(abs_crop_video_path, frames=crop_frames, work_dir=tmp_json_dir,
+                                            phase='second_pass', portion=second_portion)
+            else:
+                crop_indices = swing_window.window_indices(stride_indices, (start, end)) if window else stride_indices
+                kps_crop, _ = pose_stride.estimate_strided(backend, abs_crop_video_path, crop_indices, end - start,
+                                                           view=crop_frames, work_dir=tmp_json_dir,
+                                                           phase='second_pass', portion=second_portion)
+            sp.frames = len(kps_crop)
+            sp.set(backend=backend.name, strided=stride_indices is not None)
+
+    # 6. keypoint → binary track (+ 요청 시 crop_csv)
+    from keypoint_track import save_track, track_path, csv_export_enabled
+    keypoints_path = track_path(crop_csv_dir, f"{basename}_crop")
+    if store is not None:
+        fps = store.fps
+    else:
+        cap = cv2.VideoCapture(abs_crop_video_path)
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        cap.release()
+    stride_meta = None
+    if stride_indices is not None:
+        stride_meta = {'sampled': int(len(stride_indices)), 'frames': int(len(scores)),
+                       'min': stride_params[0], 'max': stride_params[1]}
+    with span('openpose.save_keypoints') as sp:
+        save_track(keypoints_path, kps_crop, fps=fps if fps == fps else None, width=w, height=h,
+                   backend=backend.name, single_pass=bool(single_pass), crop=[x, y, w, h], stride=stride_meta,
+                   bbox_proxy=proxy_meta, window=list(window) if window else None, source_frames=int(n_source))
+        if csv_export_enabled():
+            write_keypoints_csv(kps_crop, crop_csv_dir / f"{basename}_crop.csv")
+        sp.frames = len(kps_crop)
+        sp.set(csv=csv_export_enabled())
+        if single_pass:
+            sp.set(single_pass=True)
+
+    return crop_video_path, keypoints_path
 
 # --- skeleton 비디오 생성 함수 ---
@@ -0,0 +1,140 @@
+"""
+client-side skeleton overlay용 keypoint track (analyze_golf_video overlay_mode='data')
+- overlay_mode='video'(기존)는 crop 비디오에 점을 그린 _crop_openpose_skeleton_h264.mp4를 한 번 더 인코딩/저장
+- 'data'는 그릴 점만 작은 파일로 내보내고 프론트가 crop 비디오 위 canvas에 그림 (인코딩 없음, 비디오 저장 1개)
+- 점/유효 판정은 openpose_skeleton_overlay와 같음 (신뢰도 0.01 이하, (0, 0), NaN은 안 그림)
+
+파일 <base>_crop_overlay.kpt.gz = gzip(아래 바이트열), 정수는 little-endian
+    magic       4 bytes  b'GKPT'
+    header_len  uint32
+    header      UTF-8 JSON (header_len bytes)
+                {'format', 'version', 'frames', 'joints', 'names', 'fps', 'width', 'height',
+                 'start_s', 'coords': 'int16', 'valid': 'bits', 'com_joints', 'connections'}
+    coords      int16 (frames, joints, 2) — crop 비디오 pixel 좌표 [x, y] (반올림), 안 보이는 점은 0
+    valid       uint8 (frames, ceil(joints / 8)) — frame별 관절 유효 bit (bit j = byte j // 8의 (j % 8)번째, LSB부터)
+- frame i는 crop 비디오의 i번째 frame (시각 start_s + i / fps, crop 비디오와 1:1 — 스윙 구간 trim도 같은 구간)
+  프론트: frame = floor((video.currentTime - start_s) * fps) (requestVideoFrameCallback의 mediaTime 권장)
+- 서빙/그리기: FileSearchController /images/search_overlay_track (skeleton_video, Content-Encoding: gzip)
+  + /images/search_crop_video (crop 비디오), VideoresultView가 결과 JSON의 overlay_track이 있으면 crop 비디오 위 canvas에 그림
+- 17 관절 기준 frame당 71 bytes (gzip 전), 1000 frame이면 수십 KB
+
+    python overlay_track.py export crop_csv/X_crop.kps.npy [--out X_crop_overlay.kpt.gz]
+    python overlay_track.py info X_crop_overlay.kpt.gz
+"""
+import os
+import sys
+import json
+import gzip
+import struct
+from pathlib import Path
+
+MAGIC = b'GKPT'
+FORMAT = 'golf-overlay-track'
+FORMAT_VERSION = 1
+SUFFIX = '_overlay.kpt.gz'
+MIN_CONF = 0.01
+OVERLAY_MODES = ('video', 'data')
+
+
+def overlay_mode(mode=None):
+    """'video' (서버에서 overlay 비디오 인코딩, 기본) | 'data' (keypoint track만), None이면 OVERLAY_MODE 환경 변수"""
+    mode = mode or os.environ.get('OVERLAY_MODE', 'video')
+    if mode not in OVERLAY_MODES:
+        raise ValueError(f'unknown overlay_mode {mode!r}; choose from {list(OVERLAY_MODES)}')
+    return mode
+
+
+def track_path(directory, stem):
+    return Path(directory) / f'{stem}{SUFFIX}'
+
+
+def encode(keypoints, fps=None, width=None, height=None, start_s=0.0):
+    """
+    keypoints: keypoint track 경로 / KeypointSequence / (F, 17, 3) 배열
+    width/height: crop 비디오 크기 (None이면 track 메타데이터)
+    return: gzip 전 바이트열
+    """
+    import numpy as np
+    # cv2 없이 (openpose_skeleton_overlay를 import하지 않음) — data mode는 그리지 않음
+    from keypoint_track import COCO_CONNECTIONS, COM_INDICES, KeypointSequence
+    if isinstance(keypoints, (str, Path)):
+        seq = KeypointSequence.load(keypoints)
+    elif isinstance(keypoints, KeypointSequence):
+        seq = keypoints
+    else:
+        seq = KeypointSequence(keypoints, fps=fps, width=width, height=height)
+    width, height = width or seq.width, height or seq.height
+    pix = seq.to_pixel(width, height)
+    # openpose_skeleton_overlay와 같이 화면 밖(음수) 좌표도 안 그림
+    valid = pix.valid(MIN_CONF) & (np.nan_to_num(pix.xy) >= 0).all(-1)
+    xy = np.rint(np.nan_to_num(pix.xy)).clip(-32768, 32767).astype('<i2')
+    xy[~valid] = 0
+    bits = np.packbits(valid, axis=1, bitorder='little')
+    header = {
+        'format': FORMAT, 'version': FORMAT_VERSION,
+        'frames': int(len(seq)), 'joints': int(seq.num_joints), 'names': list(seq.joints),
+        'fps': float(fps or seq.fps or 30.0), 'width': int(width) if width else None,
+        'height': int(height) if height else None, 'start_s': float(start_s),
+        'coords': 'int16', 'valid': 'bits',
+        'com_joints': COM_INDICES, 'connections': [list(c) for c in COCO_CONNECTIONS],
+    }
+    head = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    return MAGIC + struct.pack('<I', len(head)) + head + xy.tobytes() + bits.tobytes()
+
+
+def write_track(keypoints, out_path, fps=None, width=None, height=None, start_s=0.0):
+    """gzip overlay track 저장 (임시 파일 → rename), 저장 경로 반환"""
+    out_path = Path(out_path)
+    data = encode(keypoints, fps=fps, width=width, height=height, start_s=start_s)
+    tmp = out_path.with_name(out_path.name + '.tmp')
+    with gzip.open(tmp, 'wb', compresslevel=6) as f:
+        f.write(data)
+    os.replace(tmp, out_path)
+    return out_path
+
+
+def read_track(path):
+    """→ (header dict, coords (F, J, 2) int16, valid (F, J) bool)"""
+    import numpy as np
+    with gzip.open(path, 'rb') as f:
+        data = f.read()
+    if data[:4] != MAGIC:
+        raise ValueError(f'not an overlay track: {path}')
+    (head_len,) = struct.unpack_from('<I', data, 4)
+    header = json.loads(data[8:8 + head_len].decode('utf-8'))
+    if header.get('version', 0) > FORMAT_VERSION:
+        raise ValueError(f'overlay track version {header.get("version")} is newer than {FORMAT_VERSION}')
+    n, j = header['frames'], header['joints']
+    off = 8 + head_len
+    coords = np.frombuffer(data, dtype='<i2', count=n * j * 2, offset=off).reshape(n, j, 2)
+    off += n * j * 4
+    bits = np.frombuffer(data, dtype=np.uint8, count=n * ((j + 7) // 8), offset=off).reshape(n, -1)
+    valid = np.unpackbits(bits, axis=1, count=j, bitorder='little').astype(bool)
+    return header, coords, valid
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description='client-side overlay keypoint track')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p_export = sub.add_parser('export', help='keypoint track → overlay track')
+    p_export.add_argument('track')
+    p_export.add_argument('--out', default=None)
+    p_info = sub.add_parser('info', help='overlay track header/size')
+    p_info.add_argument('path')
+    args = parser.parse_args(argv)
+    if args.cmd == 'export':
+        from keypoint_track import track_stem
+        out = Path(args.out) if args.out else track_path(Path(args.track).parent, track_stem(args.track))
+        write_track(args.track, out)
+        print(out)
+        return 0
+    header, coords, valid = read_track(args.path)
+    header.pop('connections', None)
+    print(json.dumps({**header, 'bytes': os.path.getsize(args.path), 'valid_ratio': round(float(valid.mean()), 4)
+                      if valid.size else None}, ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""
+다인원 pose track → 골퍼 track (openpose_utils.crop_bbox, run_openpose_and_crop 1차 pass)
+- 기존: OpenPose --number_people_max 1 출력의 MidHip 중심을 전체 frame에 대해 DBSCAN(eps=100) 군집
+  → 연습장처럼 사람이 많으면 frame마다 다른 사람이 잡혀 crop이 틀어짐
+- PersonTracker: frame마다 검출된 사람 전부(최대 POSE_MAX_PEOPLE)를 받아 직전 track과 연결 (한 번 훑는 streaming)
+    1. 비용: keypoint box IoU (1 - IoU), IoU가 낮으면 공통 관절 평균 거리 / track box 높이
+    2. 비용이 작은 쌍부터 greedy 배정 (frame당 O(tracks x people)), 연결 안 된 사람은 새 track
+    3. max_gap frame 동안 연결이 없으면 track 종료
+- 골퍼 track 선택: dwell(검출된 frame 비율) x motion energy(골반 중심 기준 관절 움직임 / box 높이의 합)
+  → 가만히 서 있는 사람(motion 0)과 지나가는 사람(dwell 작음)은 점수가 낮음
+- crop union box는 골퍼 track box의 running min/max로 바로 계산 (전체 frame 군집 없음)
+"""
+import os
+
+from keypoint_track import JOINT_INDEX
+
+# 골반 중심에 쓰는 관절 (keypoint_track 이름)
+HIP_INDICES = (JOINT_INDEX['RHip'], JOINT_INDEX['LHip'])
+# 검출로 인정하는 관절 최소 신뢰도 / 사람으로 인정하는 최소 관절 수
+MIN_JOINT_CONF = 0.05
+MIN_JOINTS = 4
+# 연결 기준: IoU 이상이면 box로, 아니면 관절 거리(box 높이 비율) 이하일 때 연결
+MIN_IOU = 0.3
+MAX_JOINT_DIST = 0.5
+# 연결 없이 유지하는 최대 sample 간격 (frame index 기준, stride/proxy면 더 큰 간격도 같은 track)
+MAX_GAP = 30
+
+
+def max_people():
+    """1차 pass에서 frame당 유지할 최대 인원 (POSE_MAX_PEOPLE, 기본 4)"""
+    try:
+        return max(1, int(os.environ.get('POSE_MAX_PEOPLE', '4')))
+    except ValueError:
+        return 4
+
+
+def person_box(kps):
+    """(17, 3) → (x1, y1, x2, y2) 검출 관절 box, 관절이 모자라면 None"""
+    valid = kps[:, 2] > MIN_JOINT_CONF
+    if int(valid.sum()) < MIN_JOINTS:
+        return None
+    xs, ys = kps[valid, 0], kps[valid, 1]
+    return float(xs.min()), float(ys.min()), float(xs.max()), float(ys.max())
+
+
+def box_iou(a, b):
+    iw = min(a[2], b[2]) - max(a[0], b[0])
+    ih = min(a[3], b[3]) - max(a[1], b[1])
+    if iw <= 0 or ih <= 0:
+        return 0.0
+    inter = iw * ih
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _center(kps):
+    """골반 중심 (RHip / LHip 평균), 없으면 검출 관절 평균"""
+    import numpy as np
+    valid = kps[:, 2] > MIN_JOINT_CONF
+    hips = [j for j in HIP_INDICES if valid[j]]
+    return kps[hips, :2].mean(0) if hips else kps[valid, :2].mean(0) if valid.any() else np.zeros(2, dtype=np.float32)
+
+
+class Track:
+    __slots__ = ('id', 'first', 'last', 'hits', 'box', 'kps', 'energy', 'extent', 'frames', 'history')
+
+    def __init__(self, track_id, frame, kps, box, keep_history=False):
+        self.id = track_id
+        self.first = self.last = frame
+        self.hits = 1
+        self.box = box
+        self.kps = kps
+        self.energy = 0.0
+        self.extent = list(box)
+        self.frames = [frame]
+        self.history = [kps] if keep_history else None
+
+    def update(self, frame, kps, box):
+        import numpy as np
+        # 골반 중심 기준 관절 움직임 (몸 전체 이동보다 스윙 같은 관절 운동에 민감), box 높이로 정규화
+        both = (kps[:, 2] > MIN_JOINT_CONF) & (self.kps[:, 2] > MIN_JOINT_CONF)
+        if both.any():
+            rel_now = kps[both, :2] - _center(kps)
+            rel_prev = self.kps[both, :2] - _center(self.kps)
+            height = max(box[3] - box[1], 1.0)
+            self.energy += float(np.linalg.norm(rel_now - rel_prev, axis=1).mean()) / height
+        self.last = frame
+        self.hits += 1
+        self.box = box
+        self.kps = kps
+        self.extent = [min(self.extent[0], box[0]), min(self.extent[1], box[1]),
+                       max(self.extent[2], box[2]), max(self.extent[3], box[3])]
+        self.frames.append(frame)
+        if self.history is not None:
+            self.history.append(kps)
+
+    def cost(self, kps, box):
+        """연결 비용 (0 ~ 2), 연결 불가면 None"""
+        import numpy as np
+        iou = box_iou(self.box, box)
+        if iou >= MIN_IOU:
+            return 1.0 - iou
+        both = (kps[:, 2] > MIN_JOINT_CONF) & (self.kps[:, 2] > MIN_JOINT_CONF)
+        if not both.any():
+            return None
+        dist = float(np.linalg.norm(kps[both, :2] - self.kps[both, :2], axis=1).mean())
+        dist /= max(self.box[3] - self.box[1], 1.0)
+        return 1.0 + dist if dist <= MAX_JOINT_DIST else None
+
+
+class PersonTracker:
+    """
+    update(frame_index, people)를 frame 순서대로 호출 → golfer()
+    people: (P, 17, 3) 또는 (17, 3), 빈 자리(관절 부족)는 무시
+    keep_history: True면 track별 keypoint를 보관 (golfer_keypoints용, single-pass crop keypoint)
+    """
+
+    def __init__(self, max_gap=MAX_GAP, keep_history=False):
+        self.max_gap = max_gap
+        self.keep_history = keep_history
+        self.active = []
+        self.finished = []
+        self.samples = 0
+        self._next_id = 0
+
+    def update(self, frame, people):
+        import numpy as np
+        people = np.asarray(people, dtype=np.float32)
+        if people.ndim == 2:
+            people = people[None]
+        self.samples += 1
+        # 오래 연결이 없던 track 종료
+        alive = []
+        for t in self.active:
+            (alive if frame - t.last <= self.max_gap else self.finished).append(t)
+        self.active = alive
+        dets = []
+        for kps in people:
+            box = person_box(kps)
+            if box is not None:
+                dets.append((kps, box))
+        pairs = []
+        for ti, t in enumerate(self.active):
+            for di, (kps, box) in enumerate(dets):
+                c = t.cost(kps, box)
+                if c is not None:
+                    pairs.append((c, ti, di))
+        pairs.sort()
+        used_t, used_d = set(), set()
+        for _, ti, di in pairs:
+            if ti in used_t or di in used_d:
+                continue
+            used_t.add(ti)
+            used_d.add(di)
+            self.active[ti].update(frame, *dets[di])
+        for di, (kps, box) in enumerate(dets):
+            if di not in used_d:
+                self.active.append(Track(self._next_id, frame, kps, box, self.keep_history))
+                self._next_id += 1
+
+    def tracks(self):
+        return self.finished + self.active
+
+    def score(self, track):
+        """dwell(전체 sample 중 검출 비율) x motion energy"""
+        dwell = track.hits / float(max(self.samples, 1))
+        return dwell * track.energy
+
+    def golfer(self):
+        """점수가 가장 높은 track (동점/모두 정지면 가장 오래 보인 track), 없으면 None"""
+        tracks = self.tracks()
+        if not tracks:
+            return None
+        return max(tracks, key=lambda t: (self.score(t), t.hits))
+
+    def summary(self):
+        return [{'id': t.id, 'first': t.first, 'last': t.last, 'hits': t.hits,
+                 'energy': round(t.energy, 4), 'score': round(self.score(t), 4)} for t in self.tracks()]
+
+
+def track_people(people_seq, frame_indices=None, keep_history=False):
+    """(F, P, 17, 3) 또는 (F, 17, 3) 순서대로 PersonTracker에 넣음 (frame_indices: 각 sample의 원본 frame index)"""
+    tracker = PersonTracker(keep_history=keep_history)
+    if frame_indices is None:
+        frame_indices = range(len(people_seq))
+    for frame, people in zip(frame_indices, people_seq):
+        tracker.update(int(frame), people)
+    return tracker
+
+
+def golfer_keypoints(track, sample_indices, n_frames):
+    """
+    골퍼 track keypoint → 전체 frame (n_frames, 17, 3)
+    sample_indices: tracker에 넣은 frame index 전체 — 골퍼가 없던 sample은 0, sample 사이는 pose_stride 보간
+    """
+    import numpy as np
+    from pose_stride import interpolate_keypoints
+    sample_indices = np.asarray(sample_indices, dtype=np.int64)
+    kps = np.zeros((len(sample_indices), 17, 3), dtype=np.float32)
+    if track is not None and track.history is not None:
+        kps[np.searchsorted(sample_indices, track.frames)] = np.stack(track.history)
+    return interpolate_keypoints(kps, sample_indices, n_frames)
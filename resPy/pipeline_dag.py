@@ -0,0 +1,125 @@
+"""
+파이프라인 stage 그래프 실행기
+- Stage(name, fn, deps): deps가 모두 끝난 stage부터 스레드 풀에서 동시에 실행
+- fn은 완료된 stage 결과 dict(name -> 반환값)를 인자로 받는다
+- stage는 제출 시점의 contextvars context에서 실행 (pipeline_spans recorder/부모 span 전파)
+- 한 stage가 예외를 던지면 새 stage는 더 시작하지 않고, 실행 중인 stage가 끝나길 기다린 뒤
+  첫 번째 예외를 그대로 다시 던진다 (순차 실행 때와 같은 실패 의미)
+
+무거운 작업은 대부분 외부 프로세스(OpenPose, ffmpeg, conda run)나 GIL을 놓는 cv2/numpy 호출이라
+스레드로 충분하다.
+"""
+import os
+import sys
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+DEFAULT_MAX_WORKERS = 4
+
+
+class Stage:
+    def __init__(self, name, fn, deps=()):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+
+    def __repr__(self):
+        return f'Stage({self.name!r}, deps={self.deps!r})'
+
+
+def default_max_workers():
+    try:
+        return max(1, int(os.environ.get('PIPELINE_WORKERS', DEFAULT_MAX_WORKERS)))
+    except ValueError:
+        return DEFAULT_MAX_WORKERS
+
+
+def _check_graph(stages):
+    names = [s.name for s in stages]
+    if len(set(names)) != len(names):
+        raise ValueError(f'duplicate stage names: {names}')
+    known = set(names)
+    for s in stages:
+        missing = [d for d in s.deps if d not in known]
+        if missing:
+            raise ValueError(f'stage {s.name!r} depends on unknown stage(s): {missing}')
+    # cycle check (Kahn)
+    indeg = {s.name: len(s.deps) for s in stages}
+    children = {s.name: [] for s in stages}
+    for s in stages:
+        for d in s.deps:
+            children[d].append(s.name)
+    queue = [n for n, k in indeg.items() if k == 0]
+    seen = 0
+    while queue:
+        n = queue.pop()
+        seen += 1
+        for c in children[n]:
+            indeg[c] -= 1
+            if indeg[c] == 0:
+                queue.append(c)
+    if seen != len(stages):
+        raise ValueError('stage graph has a cycle')
+
+
+def run_stage_graph(stages, max_workers=None, on_event=None):
+    """
+    stages: Stage 리스트 (선언 순서대로 ready stage를 제출)
+    max_workers: 동시에 실행할 stage 수 (None이면 PIPELINE_WORKERS 환경변수, 기본 4)
+    on_event: optional callback(stage_name, event) — event는 'start' | 'done' | 'fail'
+    return: {stage_name: 반환값}
+    """
+    stages = list(stages)
+    _check_graph(stages)
+    if max_workers is None:
+        max_workers = default_max_workers()
+    results = {}
+    lock = threading.Lock()
+    pending = list(stages)
+    running = {}
+    first_error = None
+
+    def _emit(name, event):
+        if on_event is None:
+            return
+        try:
+            on_event(name, event)
+        except Exception as e:
+            print(f'[WARN] stage event callback failed: {e}', file=sys.stderr); sys.stderr.flush()
+
+    def _run(stage):
+        _emit(stage.name, 'start')
+        with lock:
+            inputs = dict(results)
+        return stage.fn(inputs)
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='stage') as pool:
+        while pending or running:
+            if first_error is None:
+                for stage in list(pending):
+                    if len(running) >= max_workers:
+                        break
+                    if all(d in results for d in stage.deps):
+                        pending.remove(stage)
+                        running[pool.submit(contextvars.copy_context().run, _run, stage)] = stage
+            if not running:
+                break
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for fut in done:
+                stage = running.pop(fut)
+                try:
+                    value = fut.result()
+                except BaseException as e:
+                    _emit(stage.name, 'fail')
+                    if first_error is None:
+                        first_error = e
+                    continue
+                with lock:
+                    results[stage.name] = value
+                _emit(stage.name, 'done')
+    if first_error is not None:
+        raise first_error
+    if pending:
+        raise RuntimeError(f'stages never became ready: {[s.name for s in pending]}')
+    return results
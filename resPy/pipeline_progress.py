@@ -0,0 +1,223 @@
+"""
+파이프라인 진행 이벤트 (NDJSON side channel)
+- 결과 JSON 옆 <out>.progress.ndjson 파일에 이벤트를 한 줄씩 append (폴링하는 쪽은 마지막 줄만 보면 됨)
+    {"seq", "ts", "elapsed_s", "event", "stage", "phase", "frames_done", "frames_total",
+     "stage_fraction", "stages_done", "stages_total", "eta_s"}
+- event: pipeline_start | stage_start | stage_done | stage_fail | frames | pipeline_done | pipeline_error
+- listener(callback)로 같은 이벤트를 받을 수 있음 (analysis_service가 /jobs/<id>/events 로 제공)
+- frames 이벤트는 (stage, phase)마다 PROGRESS_INTERVAL 초에 한 번만 기록
+
+ETA: 남은 stage 그래프의 critical path 길이
+- 끝난 stage 0, 실행 중 stage는 frame 처리 속도로 남은 시간 추정 (frame 정보가 없으면 예상 시간 - 경과 시간)
+- 시작 안 한 stage는 예상 시간 = pipeline_metrics.jsonl(pipeline_spans)의 최근 성공 실행 중앙값, 없으면 DEFAULT_EXPECTED_S
+
+    from pipeline_progress import report_frames
+    report_frames('overlay', frame_idx, total_frames)
+
+환경 변수
+- PROGRESS_INTERVAL : frames 이벤트 최소 간격 초 (기본 0.5)
+"""
+import os
+import sys
+import json
+import time
+import threading
+import statistics
+import contextvars
+from contextlib import contextmanager
+from pathlib import Path
+
+# 실행 기록이 없을 때 쓰는 stage별 예상 시간 (초)
+DEFAULT_EXPECTED_S = {
+    'openpose': 90.0,
+    'overlay': 15.0,
+    'angles': 3.0,
+    'timesformer': 25.0,
+    'stgcn': 10.0,
+    'mlp': 2.0,
+}
+HISTORY_RUNS = 20
+HISTORY_TAIL_BYTES = 512 * 1024
+
+_current = contextvars.ContextVar('pipeline_progress', default=None)
+
+
+def progress_interval():
+    try:
+        return float(os.environ.get('PROGRESS_INTERVAL', '0.5'))
+    except ValueError:
+        return 0.5
+
+
+def progress_path_for(result_path):
+    """result_X.mp4.json -> result_X.mp4.progress.ndjson"""
+    p = Path(result_path)
+    return p.with_name(p.stem + '.progress.ndjson') if p.suffix == '.json' else p.with_name(p.name + '.progress.ndjson')
+
+
+def expected_stage_seconds(stages):
+    """pipeline_metrics.jsonl 끝부분에서 stage별 최근 성공(재개 아님) 실행 wall time 중앙값"""
+    expected = {s: DEFAULT_EXPECTED_S.get(s, 10.0) for s in stages}
+    try:
+        from pipeline_spans import metrics_path
+        path = metrics_path()
+        if not path.exists():
+            return expected
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - HISTORY_TAIL_BYTES))
+            lines = f.read().decode('utf-8', errors='ignore').splitlines()
+    except Exception:
+        return expected
+    history = {s: [] for s in stages}
+    for line in reversed(lines):
+        try:
+            rec = json.loads(line)
+        except ValueError:
+            continue
+        name = rec.get('name') or ''
+        if not name.startswith('stage.') or rec.get('status') != 'ok':
+            continue
+        if (rec.get('extra') or {}).get('resumed'):
+            continue
+        stage = name[len('stage.'):]
+        if stage in history and len(history[stage]) < HISTORY_RUNS:
+            history[stage].append(float(rec['wall_s']))
+    for s, walls in history.items():
+        if walls:
+            expected[s] = statistics.median(walls)
+    return expected
+
+
+class ProgressChannel:
+    def __init__(self, path=None, stage_deps=None, listeners=(), expected=None):
+        """
+        path: NDJSON 파일 경로 (None이면 파일 기록 안 함, 시작 시 비움)
+        stage_deps: {stage: (deps...)} — ETA critical path 계산용
+        listeners: callback(event_dict) 리스트
+        expected: {stage: 예상 초} (None이면 metrics 기록에서 계산)
+        """
+        self.path = Path(path) if path else None
+        self.stage_deps = dict(stage_deps or {})
+        self.listeners = list(listeners)
+        self.expected = expected if expected is not None else expected_stage_seconds(self.stage_deps)
+        self.t0 = time.time()
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._started = {}      # stage -> start time
+        self._finished = set()
+        self._fraction = {}     # stage -> 0..1 (frame 기반)
+        self._last_frames = {}  # (stage, phase) -> 마지막 frames 이벤트 시각
+        self._interval = progress_interval()
+        if self.path is not None:
+            try:
+                self.path.parent.mkdir(exist_ok=True, parents=True)
+                self.path.write_text('', encoding='utf-8')
+            except OSError as e:
+                print(f'[WARN] cannot create progress file {self.path}: {e}', file=sys.stderr); sys.stderr.flush()
+                self.path = None
+
+    # ---------- ETA ----------
+    def _remaining_locked(self, stage, now):
+        if stage in self._finished:
+            return 0.0
+        expected = self.expected.get(stage, DEFAULT_EXPECTED_S.get(stage, 10.0))
+        started = self._started.get(stage)
+        if started is None:
+            return expected
+        elapsed = now - started
+        frac = self._fraction.get(stage)
+        if frac is not None and frac >= 0.02:
+            return max(0.0, elapsed * (1.0 - frac) / frac)
+        return max(0.0, expected - elapsed)
+
+    def _eta_locked(self, now):
+        children = {s: [] for s in self.stage_deps}
+        for s, deps in self.stage_deps.items():
+            for d in deps:
+                children.setdefault(d, []).append(s)
+        memo = {}
+
+        def path_len(s):
+            if s not in memo:
+                memo[s] = self._remaining_locked(s, now) + max((path_len(c) for c in children.get(s, [])), default=0.0)
+            return memo[s]
+        roots = [s for s, deps in self.stage_deps.items() if not deps]
+        return round(max((path_len(r) for r in roots), default=0.0), 1)
+
+    # ---------- emit ----------
+    def emit(self, event, stage=None, **fields):
+        now = time.time()
+        with self._lock:
+            if event == 'stage_start':
+                self._started[stage] = now
+            elif event in ('stage_done', 'stage_fail'):
+                self._finished.add(stage)
+                self._fraction[stage] = 1.0
+            self._seq += 1
+            rec = {'seq': self._seq, 'ts': round(now, 3), 'elapsed_s': round(now - self.t0, 3), 'event': event}
+            if stage is not None:
+                rec['stage'] = stage
+            rec.update(fields)
+            if self.stage_deps:
+                rec['stages_done'] = len(self._finished & set(self.stage_deps))
+                rec['stages_total'] = len(self.stage_deps)
+                rec['eta_s'] = 0.0 if event == 'pipeline_done' else self._eta_locked(now)
+            if self.path is not None:
+                try:
+                    with open(self.path, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(rec, ensure_ascii=False) + '\n')
+                except OSError as e:
+                    print(f'[WARN] failed to write progress event: {e}', file=sys.stderr); sys.stderr.flush()
+        for cb in self.listeners:
+            try:
+                cb(rec)
+            except Exception as e:
+                print(f'[WARN] progress listener failed: {e}', file=sys.stderr); sys.stderr.flush()
+        return rec
+
+    def on_stage_event(self, name, event):
+        """run_stage_graph on_event 어댑터"""
+        self.emit({'start': 'stage_start', 'done': 'stage_done', 'fail': 'stage_fail'}.get(event, event), stage=name)
+
+    def frames(self, stage, done, total=None, phase=None, portion=(0.0, 1.0)):
+        """
+        frame 진행률 보고 (간격 제한). portion: 이 phase가 stage 전체에서 차지하는 구간
+        (예: OpenPose 1차 pass (0.0, 0.45), 2차 pass (0.5, 0.95))
+        """
+        now = time.time()
+        key = (stage, phase)
+        finished = bool(total) and done >= total
+        with self._lock:
+            last = self._last_frames.get(key)
+            if not finished and last is not None and now - last < self._interval:
+                return
+            self._last_frames[key] = now
+            if total:
+                lo, hi = portion
+                self._fraction[stage] = lo + (hi - lo) * min(1.0, done / float(total))
+            frac = self._fraction.get(stage)
+        fields = {'frames_done': int(done), 'frames_total': int(total) if total else None}
+        if phase is not None:
+            fields['phase'] = phase
+        if frac is not None:
+            fields['stage_fraction'] = round(frac, 4)
+        self.emit('frames', stage=stage, **fields)
+
+
+@contextmanager
+def reporting(channel):
+    """channel을 현재 context(와 여기서 시작하는 stage 스레드)의 진행 이벤트 채널로 활성화"""
+    token = _current.set(channel)
+    try:
+        yield channel
+    finally:
+        _current.reset(token)
+
+
+def report_frames(stage, done, total=None, phase=None, portion=(0.0, 1.0)):
+    """활성 채널이 있으면 frames 이벤트 (없으면 무시 — 단독 CLI 실행 등)"""
+    channel = _current.get()
+    if channel is not None:
+        channel.frames(stage, done, total, phase=phase, portion=portion)
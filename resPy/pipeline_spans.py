@@ -0,0 +1,261 @@
+"""
+파이프라인 계측 span (wall/CPU 시간, peak RSS, 처리 frame 수)
+
+    from pipeline_spans import span
+    with span('openpose.first_pass') as sp:
+        ...
+        sp.frames = n_frames
+
+    @timed('overlay')            # 함수 전체를 span으로, frame 수는 함수 안에서 annotate(frames=n)
+    def openpose_skeleton_overlay(...): ...
+
+- analyze_golf_video가 SpanRecorder를 recording()으로 활성화하면 그 안의 span이 모두 모여
+  결과 JSON의 'timings' 섹션이 되고, 끝날 때 metrics JSONL 파일에 한 줄씩 append 된다.
+- 활성 recorder가 없으면 (단독 CLI 실행, conda subprocess 등) span이 끝날 때 바로 metrics 파일에 append.
+- 활성 recorder/부모 span은 contextvars로 전달 (pipeline_dag의 stage 스레드에도 전파됨).
+
+span 1개 기록:
+    name, parent, ts(시작 epoch), wall_s, cpu_s(span을 실행한 스레드의 CPU — stage는 스레드에서 동시에 돌므로
+    프로세스 CPU를 쓰면 다른 stage 몫이 섞임, span 안에서 띄운 worker 스레드/자식 프로세스는 포함 안 됨),
+    frames, status, error, extra
+프로세스 단위 값은 실행(recorder)당 한 번만 기록 — SpanRecorder.summary()['process'], metrics 파일의 name='process' 줄:
+    cpu_s(프로세스 CPU), child_cpu_s(종료된 자식 프로세스 CPU, POSIX만), peak_rss_mb(프로세스 peak),
+    child_peak_rss_mb(자식 프로세스 peak, POSIX만)
+    (peak는 프로세스 시작 이후 값이라 상주 서비스에서는 이전 작업의 peak가 남아 있을 수 있음)
+
+환경 변수
+- PIPELINE_METRICS=0        : metrics 파일 기록 안 함
+- PIPELINE_METRICS_FILE     : metrics JSONL 경로 (기본 resPy/result/logs/pipeline_metrics.jsonl)
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+import contextvars
+import functools
+from contextlib import contextmanager
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.resolve()
+
+# (recorder, 현재 span) — recorder가 None이면 metrics 파일로 바로 기록
+_current = contextvars.ContextVar('pipeline_span', default=(None, None))
+_metrics_lock = threading.Lock()
+
+
+def metrics_enabled():
+    return os.environ.get('PIPELINE_METRICS', '1') != '0'
+
+
+def metrics_path():
+    return Path(os.environ.get('PIPELINE_METRICS_FILE', BASE_DIR / 'result' / 'logs' / 'pipeline_metrics.jsonl'))
+
+
+def _peak_rss_mb():
+    """프로세스 peak RSS (MB), 알 수 없으면 None"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux: KB, macOS: bytes
+        return peak / (1024.0 * 1024.0) if sys.platform == 'darwin' else peak / 1024.0
+    except ImportError:
+        pass
+    try:
+        import psutil
+        mi = psutil.Process().memory_info()
+        # Windows는 peak_wset, 그 외는 현재 rss로 근사
+        return getattr(mi, 'peak_wset', mi.rss) / (1024.0 * 1024.0)
+    except Exception:
+        return None
+
+
+def _child_usage():
+    """(종료된 자식 프로세스 CPU 초, 자식 peak RSS MB) — Windows에서는 (None, None)"""
+    try:
+        import resource
+    except ImportError:
+        return None, None
+    ru = resource.getrusage(resource.RUSAGE_CHILDREN)
+    peak = ru.ru_maxrss / (1024.0 * 1024.0) if sys.platform == 'darwin' else ru.ru_maxrss / 1024.0
+    return ru.ru_utime + ru.ru_stime, peak
+
+
+def process_usage(since=None):
+    """
+    프로세스 단위 CPU/메모리 (span별로 나눌 수 없는 값)
+    since: 이전 process_usage() 결과 — 주면 CPU는 그 이후 증가분
+    """
+    cpu = time.process_time()
+    child_cpu, child_peak = _child_usage()
+    usage = {'cpu_s': cpu, 'child_cpu_s': child_cpu, 'peak_rss_mb': _round(_peak_rss_mb()),
+             'child_peak_rss_mb': _round(child_peak)}
+    if since is not None:
+        for key in ('cpu_s', 'child_cpu_s'):
+            if usage[key] is not None and since.get(key) is not None:
+                usage[key] -= since[key]
+    for key in ('cpu_s', 'child_cpu_s'):
+        if usage[key] is not None:
+            usage[key] = round(max(0.0, usage[key]), 4)
+    return usage
+
+
+def append_metrics(records):
+    """span 기록 리스트를 metrics JSONL 파일에 append (실패해도 파이프라인은 계속)"""
+    if not records or not metrics_enabled():
+        return
+    path = metrics_path()
+    try:
+        path.parent.mkdir(exist_ok=True, parents=True)
+        lines = ''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in records)
+        with _metrics_lock:
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+    except Exception as e:
+        print(f'[WARN] failed to append pipeline metrics to {path}: {e}', file=sys.stderr); sys.stderr.flush()
+
+
+class Span:
+    def __init__(self, name, parent=None):
+        self.name = name
+        self.parent = parent
+        self.frames = None
+        self.extra = {}
+        self.record = None
+
+    def set(self, **fields):
+        """frames 외 추가 값 (예: resumed=True, fps=30)"""
+        if 'frames' in fields:
+            self.frames = fields.pop('frames')
+        self.extra.update(fields)
+
+
+class SpanRecorder:
+    """한 번의 파이프라인 실행에서 나온 span을 모음 (스레드 안전)"""
+
+    def __init__(self, run_id=None, meta=None):
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.meta = dict(meta or {})
+        self.ts = time.time()
+        self._usage0 = process_usage()
+        self._lock = threading.Lock()
+        self._records = []
+
+    def add(self, record):
+        with self._lock:
+            self._records.append(record)
+
+    def records(self):
+        with self._lock:
+            return list(self._records)
+
+    def process_usage(self):
+        """recorder 시작 이후 프로세스 CPU + 프로세스 peak RSS (실행 전체에 한 번)"""
+        return process_usage(since=self._usage0)
+
+    def summary(self):
+        """결과 JSON 'timings' 섹션: 시작 순서로 정렬, start_s는 recorder 시작 기준 offset"""
+        spans = []
+        for r in sorted(self.records(), key=lambda r: r['ts']):
+            r = dict(r)
+            r['start_s'] = round(r.pop('ts') - self.ts, 4)
+            spans.append(r)
+        total = max((s['start_s'] + s['wall_s'] for s in spans), default=0.0)
+        return {'run_id': self.run_id, 'total_s': round(total, 4), 'spans': spans, 'process': self.process_usage()}
+
+    def flush_metrics(self):
+        stamp = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.ts))
+        run = {'name': 'process', 'parent': None, 'ts': self.ts, 'wall_s': round(time.time() - self.ts, 4),
+               'process': self.process_usage()}
+        append_metrics([dict(r, run_id=self.run_id, run_started=stamp, **self.meta)
+                        for r in self.records() + [run]])
+
+
+@contextmanager
+def recording(recorder):
+    """recorder를 현재 context(와 여기서 시작하는 stage 스레드)의 span 수집기로 활성화"""
+    token = _current.set((recorder, None))
+    try:
+        yield recorder
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(name):
+    recorder, parent = _current.get()
+    sp = Span(name, parent=parent.name if parent is not None else None)
+    token = _current.set((recorder, sp))
+    ts = time.time()
+    t0 = time.perf_counter()
+    c0 = time.thread_time()
+    status, error = 'ok', None
+    try:
+        yield sp
+    except BaseException as e:
+        status, error = 'error', f'{type(e).__name__}: {e}'
+        raise
+    finally:
+        _current.reset(token)
+        rec = {
+            'name': name,
+            'parent': sp.parent,
+            'ts': ts,
+            'wall_s': round(time.perf_counter() - t0, 4),
+            'cpu_s': round(time.thread_time() - c0, 4),
+            'frames': sp.frames,
+            'status': status,
+        }
+        if error:
+            rec['error'] = error
+        if sp.extra:
+            rec['extra'] = sp.extra
+        sp.record = rec
+        if recorder is not None:
+            recorder.add(rec)
+        else:
+            # 단독 실행: 실행 단위가 없으므로 프로세스 값은 'process' 아래에 따로 (span 값이 아님)
+            append_metrics([dict(rec, pid=os.getpid(), argv0=Path(sys.argv[0]).name if sys.argv else None,
+                                 process=process_usage())])
+
+
+def timed(name):
+    """함수 호출 전체를 span(name)으로 감싸는 decorator"""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+def _round(v, nd=1):
+    return round(v, nd) if v is not None else None
+
+
+def annotate(**fields):
+    """현재 span에 값 추가 (span 밖이면 무시)"""
+    _, sp = _current.get()
+    if sp is not None:
+        sp.set(**fields)
+
+
+def merge(records):
+    """
+    다른 프로세스(임베딩 데몬)에서 받은 span 기록을 현재 recorder에 합침.
+    최상위 원격 span의 parent는 현재 span으로 연결한다.
+    """
+    recorder, parent = _current.get()
+    if not records:
+        return
+    if recorder is None:
+        append_metrics(records)
+        return
+    for r in records:
+        r = dict(r)
+        if r.get('parent') is None and parent is not None:
+            r['parent'] = parent.name
+        r['remote'] = True
+        recorder.add(r)
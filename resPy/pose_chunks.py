@@ -0,0 +1,231 @@
+"""
+frame 구간 병렬 + 재개 가능한 pose 실행 (openpose_utils.OpenPoseCLIBackend)
+- 기존: OpenPoseDemo 한 프로세스가 비디오 전체를 처리하고, 실패하면 frame 0부터 다시 실행
+- 비디오를 frame 구간 chunk로 나눠 POSE_CHUNKS개 worker가 동시에 실행 (--frame_first/--frame_last)
+  → 구간별 keypoint 배열을 frame 순서대로 이어 붙임
+- chunk가 끝날 때마다 배열을 checkpoint(.npy)로 저장 → 실패한 chunk만 재시도,
+  프로세스가 죽어도 같은 입력(파일 내용 digest + 설정)으로 다시 실행하면 남은 구간만 실행
+- pose 입력은 업로드에서 만든 재인코딩/crop 비디오라 run_openpose_and_crop이 업로드 digest(파이프라인이 한 번 계산)에서
+  유도한 key를 remember_source로 등록 → for_video가 큰 비디오를 다시 해시하지 않음 (등록 안 된 파일만 hash_file)
+- 전부 끝나면 checkpoint 삭제, 오래된 checkpoint(CHECKPOINT_MAX_AGE_H)는 다음 실행 때 정리
+
+환경 변수
+- POSE_CHUNKS            : 동시 worker 수 (기본 1 = 기존처럼 한 프로세스, GPU 메모리를 보고 늘릴 것)
+- POSE_CHUNK_MIN_FRAMES  : chunk 최소 frame 수 (기본 150, 짧은 비디오는 나누지 않음)
+- POSE_GPUS              : GPU 수 (주면 worker마다 --num_gpu 1 --num_gpu_start <slot % POSE_GPUS>)
+- POSE_CHECKPOINT_DIR    : checkpoint 위치 (기본 resPy/_pose_ckpt)
+"""
+import os
+import sys
+import json
+import time
+import queue
+import shutil
+import hashlib
+import threading
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.resolve()
+# worker 하나당 chunk 수 (끝나는 시간이 달라도 노는 worker가 적도록 + checkpoint를 잘게)
+CHUNKS_PER_WORKER = 2
+CHECKPOINT_MAX_AGE_H = 24
+# remember_source로 등록해 두는 파일 수 (오래된 것부터 버림)
+SOURCE_KEYS_MAX = 64
+
+_source_lock = threading.Lock()
+# (절대경로, size, mtime_ns) -> key
+_source_keys = {}
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ[name])
+    except (KeyError, ValueError):
+        return default
+
+
+def chunk_workers():
+    return max(1, _env_int('POSE_CHUNKS', 1))
+
+
+def min_chunk_frames():
+    return max(1, _env_int('POSE_CHUNK_MIN_FRAMES', 150))
+
+
+def gpu_count():
+    return max(0, _env_int('POSE_GPUS', 0))
+
+
+def checkpoint_root():
+    env = os.environ.get('POSE_CHECKPOINT_DIR')
+    return Path(env) if env else BASE_DIR / '_pose_ckpt'
+
+
+def plan_chunks(n_frames, workers=None, min_frames=None):
+    """[(start, end)] frame 구간 (end 제외), n_frames를 거의 같은 크기로"""
+    workers = workers or chunk_workers()
+    min_frames = min_frames or min_chunk_frames()
+    if n_frames <= 0:
+        return [(0, 0)]
+    count = max(1, min(workers * CHUNKS_PER_WORKER if workers > 1 else 1, n_frames // min_frames))
+    bounds = [round(i * n_frames / count) for i in range(count + 1)]
+    return [(bounds[i], bounds[i + 1]) for i in range(count)]
+
+
+def _file_id(path):
+    st = os.stat(path)
+    return os.path.abspath(str(path)), st.st_size, st.st_mtime_ns
+
+
+def derive_key(base, **parts):
+    """다른 key(예: 업로드 digest) + 만든 방법 → 유도 key (같은 입력/설정이면 같은 값)"""
+    h = hashlib.sha256(str(base).encode('utf-8'))
+    h.update(json.dumps(parts, sort_keys=True, default=str).encode('utf-8'))
+    return h.hexdigest()
+
+
+def remember_source(path, key):
+    """path 내용을 대신할 key 등록 (파일이 바뀌면 size/mtime이 달라져서 무시됨)"""
+    try:
+        fid = _file_id(path)
+    except OSError:
+        return
+    with _source_lock:
+        _source_keys.pop(fid, None)
+        _source_keys[fid] = key
+        while len(_source_keys) > SOURCE_KEYS_MAX:
+            _source_keys.pop(next(iter(_source_keys)))
+
+
+def source_key(path, compute=False):
+    """등록된 key, 없으면 compute=True일 때만 파일 내용 sha256 (result_cache.hash_file)"""
+    try:
+        fid = _file_id(path)
+    except OSError:
+        fid = None
+    with _source_lock:
+        key = _source_keys.get(fid)
+    if key is None and compute:
+        from result_cache import hash_file
+        key = hash_file(path)
+    return key
+
+
+class ChunkCheckpoint:
+    """chunk별 keypoint 배열 저장소 (<root>/<key>/<start>_<end>.npy)"""
+
+    def __init__(self, key):
+        self.dir = checkpoint_root() / key
+
+    @classmethod
+    def for_video(cls, video_path, config):
+        """비디오 내용 digest(remember_source로 등록된 key) + 설정으로 key (설정이나 입력이 다르면 다른 checkpoint)"""
+        h = hashlib.sha256()
+        h.update(source_key(video_path, compute=True).encode('ascii'))
+        h.update(json.dumps(config, sort_keys=True, default=str).encode('utf-8'))
+        _sweep_stale()
+        return cls(h.hexdigest()[:24])
+
+    def _path(self, start, end):
+        return self.dir / f'{start:08d}_{end:08d}.npy'
+
+    def load(self, start, end, exact=True):
+        import numpy as np
+        path = self._path(start, end)
+        if not path.exists():
+            return None
+        try:
+            arr = np.load(path)
+        except (OSError, ValueError):
+            return None
+        if exact and len(arr) != end - start:
+            return None
+        return arr
+
+    def save(self, start, end, arr):
+        import numpy as np
+        self.dir.mkdir(exist_ok=True, parents=True)
+        path = self._path(start, end)
+        tmp = path.with_name(f'{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp.npy')
+        np.save(tmp, arr)
+        os.replace(tmp, path)
+
+    def clear(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+def _sweep_stale():
+    root = checkpoint_root()
+    if not root.is_dir():
+        return
+    cutoff = time.time() - CHECKPOINT_MAX_AGE_H * 3600
+    for entry in os.scandir(root):
+        try:
+            if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+        except OSError:
+            pass
+
+
+def run_chunked(run_chunk, chunks, workers=None, checkpoint=None, on_progress=None, retries=1):
+    """
+    run_chunk(start, end, slot, on_frames) → (end - start, ...) 배열 (마지막 chunk는 비디오 끝까지라 길이가 다를 수 있음)
+        slot: 0..workers-1 (GPU 배정용), on_frames(n): 이 chunk에서 지금까지 처리한 frame 수
+    checkpoint: ChunkCheckpoint (None이면 저장/재개 없음)
+    on_progress(done_frames): 전체 진행
+    return: chunk 배열을 frame 순서대로 이어 붙인 배열
+    """
+    import numpy as np
+    from concurrent.futures import ThreadPoolExecutor
+    workers = min(workers or chunk_workers(), len(chunks))
+    last = len(chunks) - 1
+    results = {}
+    for i, (start, end) in enumerate(chunks):
+        arr = checkpoint.load(start, end, exact=i != last) if checkpoint is not None else None
+        if arr is not None:
+            results[i] = arr
+    if results:
+        print(f'[STEP] pose chunks: resuming, {len(results)}/{len(chunks)} chunks from checkpoint'); sys.stdout.flush()
+
+    lock = threading.Lock()
+    counts = {i: len(arr) for i, arr in results.items()}
+    slots = queue.Queue()
+    for s in range(workers):
+        slots.put(s)
+
+    def _report(i, n):
+        with lock:
+            counts[i] = n
+            total = sum(counts.values())
+        if on_progress is not None:
+            on_progress(total)
+
+    def _attempt(i):
+        start, end = chunks[i]
+        slot = slots.get()
+        try:
+            for attempt in range(retries + 1):
+                try:
+                    arr = run_chunk(start, end, slot, lambda n: _report(i, n))
+                    if i != last and len(arr) != end - start:
+                        raise RuntimeError(f'chunk {start}-{end} returned {len(arr)} frames')
+                    break
+                except Exception as e:
+                    _report(i, 0)
+                    if attempt == retries:
+                        raise RuntimeError(f'pose chunk {start}-{end} failed after {retries + 1} attempts: {e}') from e
+                    print(f'[WARN] pose chunk {start}-{end} failed ({e}); retrying this chunk', file=sys.stderr)
+                    sys.stderr.flush()
+            if checkpoint is not None:
+                checkpoint.save(start, end, arr)
+            _report(i, len(arr))
+            return i, arr
+        finally:
+            slots.put(slot)
+
+    todo = [i for i in range(len(chunks)) if i not in results]
+    if todo:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pose-chunk') as pool:
+            for i, arr in pool.map(_attempt, todo):
+                results[i] = arr
+    return np.concatenate([results[i] for i in range(len(chunks))]) if results else np.zeros(0)
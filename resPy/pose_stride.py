@@ -0,0 +1,261 @@
+"""
+고 frame rate 스윙 영상용 adaptive temporal stride (openpose_utils.run_openpose_and_crop)
+- 120~240fps 영상은 대부분의 frame이 임팩트 구간 밖에서 거의 같은데 pose 추정은 frame 수에 비례해서 느려짐
+- 1. 저해상도 회색조 frame 차이(mean abs diff)로 frame별 움직임 점수 계산 (frame store가 있으면 디코드 없음)
+  2. 움직임 상위 구간(+ 앞뒤 pad)은 min stride(기본 매 frame), 나머지는 max stride(기본 fps/30 → 약 30fps)로 frame 선택
+  3. 선택된 frame만 pose 추정 → 나머지 frame은 앞뒤 sample에서 선형 보간 (save_angle_json의 보간과 같은 방식)
+     관절이 앞뒤 sample 한쪽에서만 검출되면 가까운 sample 값을 그대로 사용
+- 첫/마지막 frame은 항상 선택
+- 30fps 영상은 max stride가 1이 되어 그대로 (전체 frame) 실행
+
+full-rate pose 대비 오차 보고서
+    python pose_stride.py a.mp4 b.mp4 --backend cvdnn --json stride_report.json
+    (같은 비디오를 전체 frame / stride로 각각 추정, 보간된 frame만 비교 — compare_openpose_modes.compare_keypoints)
+
+환경 변수
+- POSE_STRIDE=adaptive     : run_openpose_and_crop에서 stride 사용 (기본 0 = 끔)
+- POSE_STRIDE_MAX          : 정적 구간 stride (기본 round(fps / 30), 최소 1)
+- POSE_STRIDE_MIN          : 움직임 구간 stride (기본 1)
+- POSE_STRIDE_QUANTILE     : 움직임 구간 기준 분위수 (기본 0.7 → 상위 30% frame)
+"""
+import os
+import sys
+import json
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.resolve()
+# 움직임 점수 계산용 축소 폭 (pixel)
+MOTION_WIDTH = 64
+REFERENCE_FPS = 30.0
+
+
+def stride_mode():
+    mode = os.environ.get('POSE_STRIDE', '0')
+    return 'adaptive' if mode in ('1', 'adaptive') else None
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ[name])
+    except (KeyError, ValueError):
+        return default
+
+
+def stride_params(fps):
+    """(min_stride, max_stride, quantile)"""
+    max_default = max(1, int(round((fps or REFERENCE_FPS) / REFERENCE_FPS)))
+    min_stride = max(1, _env_int('POSE_STRIDE_MIN', 1))
+    max_stride = max(min_stride, _env_int('POSE_STRIDE_MAX', max_default))
+    try:
+        quantile = float(os.environ.get('POSE_STRIDE_QUANTILE', '0.7'))
+    except ValueError:
+        quantile = 0.7
+    return min_stride, max_stride, min(max(quantile, 0.0), 1.0)
+
+
+def stride_config():
+    """stage fingerprint에 들어갈 설정 (끔이면 None, max 기본값은 비디오 fps로 정해지므로 환경 변수 값 그대로)"""
+    if stride_mode() is None:
+        return None
+    return {'mode': stride_mode(), 'min': os.environ.get('POSE_STRIDE_MIN'), 'max': os.environ.get('POSE_STRIDE_MAX'),
+            'quantile': os.environ.get('POSE_STRIDE_QUANTILE')}
+
+
+def motion_scores(video_path=None, view=None):
+    """
+    frame별 움직임 점수 (F,) float32: 직전 frame과의 축소 회색조 mean abs diff (첫 frame은 0)
+    view(frame_store)가 있으면 memmap에서 pixel을 건너뛰며 읽고, 없으면 cv2로 디코드해서 축소
+    """
+    import numpy as np
+    scores, prev = [], None
+    if view is not None:
+        step = max(1, view.width // MOTION_WIDTH)
+        frames = (view[i][::step, ::step] for i in range(len(view)))
+    else:
+        import cv2
+        from openpose_utils import _iter_video_frames
+
+        def _small(frame):
+            h, w = frame.shape[:2]
+            return cv2.resize(frame, (MOTION_WIDTH, max(1, int(h * MOTION_WIDTH / float(w)))),
+                              interpolation=cv2.INTER_AREA)
+        frames = (_small(f) for f in _iter_video_frames(video_path))
+    for frame in frames:
+        gray = frame.astype(np.int16).sum(-1)
+        scores.append(0.0 if prev is None else float(np.abs(gray - prev).mean()))
+        prev = gray
+    return np.asarray(scores, dtype=np.float32)
+
+
+def select_frames(scores, min_stride=1, max_stride=4, quantile=0.7, pad=None):
+    """
+    움직임 점수 → 선택할 frame index (정렬된 int64 배열)
+    - 점수가 quantile 분위수 이상인 frame ± pad (기본 2 * max_stride)는 min_stride, 나머지는 max_stride 간격
+    """
+    import numpy as np
+    scores = np.asarray(scores, dtype=np.float32)
+    n = len(scores)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    if max_stride <= 1:
+        return np.arange(n, dtype=np.int64)
+    pad = 2 * max_stride if pad is None else pad
+    high = scores >= np.quantile(scores, quantile)
+    if pad > 0:
+        high = np.convolve(high.astype(np.int32), np.ones(2 * pad + 1, dtype=np.int32), mode='same') > 0
+    picks, i = [], 0
+    while i < n:
+        picks.append(i)
+        i += min_stride if high[i] else max_stride
+    if picks[-1] != n - 1:
+        picks.append(n - 1)
+    return np.asarray(picks, dtype=np.int64)
+
+
+def interpolate_keypoints(kps_sub, indices, n_frames):
+    """
+    선택 frame keypoint (K, 17, 3) → 전체 frame (n_frames, 17, 3)
+    양쪽 sample에서 모두 검출된 관절은 선형 보간, 아니면 가까운 sample 값 (검출 안 됨이면 0 그대로)
+    첫 sample 앞/마지막 sample 뒤 frame은 외삽하지 않고 가장 가까운 sample 값을 그대로 사용
+    """
+    import numpy as np
+    kps_sub = np.asarray(kps_sub, dtype=np.float32)
+    indices = np.asarray(indices, dtype=np.int64)
+    t = np.arange(n_frames, dtype=np.int64)
+    if len(indices) == 0:
+        return np.zeros((n_frames,) + kps_sub.shape[1:], dtype=np.float32)
+    pos = np.searchsorted(indices, t, side='left')
+    r = np.minimum(pos, len(indices) - 1)
+    # t가 sample이면 l = r, 마지막 sample 뒤도 l = r (→ span 0), 첫 sample 앞은 l = r = 0
+    l = np.where((pos == len(indices)) | (indices[r] == t), r, np.maximum(pos - 1, 0))
+    span = (indices[r] - indices[l]).astype(np.float32)
+    w = np.where(span > 0, (t - indices[l]) / np.maximum(span, 1.0), 0.0)
+    w = np.clip(w, 0.0, 1.0).astype(np.float32)[:, None, None]
+    left, right = kps_sub[l], kps_sub[r]
+    both = (left[..., 2] > 0) & (right[..., 2] > 0)
+    lerp = left + (right - left) * w
+    nearest = np.where(w < 0.5, left, right)
+    return np.where(both[..., None], lerp, nearest).astype(np.float32)
+
+
+def estimate_selected(backend, video_path, indices, view=None, crop=None, size=None, work_dir=None,
+                      phase='pose', portion=(0.0, 1.0), max_people=None):
+    """
+    선택된 frame만 pose 추정 → (K, 17, 3), max_people을 주면 backend.estimate_people (K, P, 17, 3)
+    - 프로세스 안 backend는 SelectedFrames를 바로 읽음
+    - 파일이 필요한 backend(OpenPose CLI)는 선택 frame만 담은 임시 비디오를 만들어 넘김
+    - size (w, h): 축소해서 추정 (bbox_proxy)
+    """
+    import pose_chunks
+    from frame_store import SelectedFrames, encode_view
+    selected = SelectedFrames(indices, view=view, video_path=video_path, crop=crop, size=size)
+    source = video_path
+    if not getattr(backend, 'in_process', True):
+        work_dir = Path(work_dir)
+        work_dir.mkdir(exist_ok=True, parents=True)
+        source = work_dir / f'{phase}_strided.mp4'
+        encode_view(selected, source)
+        # video_path에 등록된 key가 있으면 임시 비디오도 유도 key로 (chunk checkpoint가 다시 해시하지 않음)
+        base = pose_chunks.source_key(video_path)
+        if base is not None:
+            pose_chunks.remember_source(source, pose_chunks.derive_key(
+                base, indices=[int(i) for i in selected.indices], crop=crop, size=size))
+    if max_people:
+        return backend.estimate_people(source, frames=selected, work_dir=work_dir, phase=phase, portion=portion,
+                                       max_people=max_people)
+    return backend.estimate(source, frames=selected, work_dir=work_dir, phase=phase, portion=portion)
+
+
+def estimate_strided(backend, video_path, indices, n_frames, view=None, crop=None, work_dir=None,
+                     phase='pose', portion=(0.0, 1.0)):
+    """
+    선택된 frame만 pose 추정 후 전체 frame으로 보간 → (kps (n_frames, 17, 3), sampled (n_frames,) bool)
+    """
+    import numpy as np
+    kps_sub = estimate_selected(backend, video_path, indices, view=view, crop=crop, work_dir=work_dir,
+                                phase=phase, portion=portion)
+    if len(kps_sub) != len(indices):
+        print(f'[WARN] strided pose returned {len(kps_sub)} frames for {len(indices)} selected; aligning',
+              file=sys.stderr); sys.stderr.flush()
+        k = min(len(kps_sub), len(indices))
+        kps_sub, indices = kps_sub[:k], indices[:k]
+    sampled = np.zeros(n_frames, dtype=bool)
+    sampled[indices] = True
+    return interpolate_keypoints(kps_sub, indices, n_frames), sampled
+
+
+def _video_info(video_path):
+    import cv2
+    cap = cv2.VideoCapture(str(video_path))
+    info = (int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0), cap.get(cv2.CAP_PROP_FPS) or REFERENCE_FPS,
+            (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))))
+    cap.release()
+    return info
+
+
+def main(argv=None):
+    import argparse
+    import numpy as np
+    from openpose_utils import get_pose_backend
+    from compare_openpose_modes import compare_keypoints
+    parser = argparse.ArgumentParser(description='adaptive temporal stride vs full-rate pose 오차 보고서')
+    parser.add_argument('videos', nargs='*', help='비디오 (기본: uploaded-videos/*.mp4)')
+    parser.add_argument('--limit', type=int, default=None)
+    parser.add_argument('--backend', default=None, help='pose backend (openpose | cvdnn | fake, 기본 POSE_BACKEND)')
+    parser.add_argument('--work-dir', default=str(BASE_DIR / 'result' / 'stride_compare'))
+    parser.add_argument('--conf', type=float, default=0.1)
+    parser.add_argument('--pck-ratio', type=float, default=0.05, help='PCK 기준 (frame 대각선 비율)')
+    parser.add_argument('--json', dest='json_out', default=None)
+    args = parser.parse_args(argv)
+
+    videos = [Path(v) for v in args.videos] or sorted((BASE_DIR / 'uploaded-videos').glob('*.mp4'))
+    if args.limit:
+        videos = videos[:args.limit]
+    if not videos:
+        parser.error('no videos to compare')
+    backend = get_pose_backend(args.backend)
+    reports = []
+    for video in videos:
+        rep = {'video': video.name}
+        try:
+            n, fps, size = _video_info(video)
+            work_dir = Path(args.work_dir) / video.stem
+            t0 = time.perf_counter()
+            full = backend.estimate(video, work_dir=work_dir, phase='full')
+            rep['full_time_s'] = round(time.perf_counter() - t0, 2)
+            n = len(full)
+            min_stride, max_stride, quantile = stride_params(fps)
+            t0 = time.perf_counter()
+            indices = select_frames(motion_scores(video)[:n], min_stride, max_stride, quantile)
+            strided, sampled = estimate_strided(backend, video, indices, n, work_dir=work_dir, phase='strided')
+            rep['strided_time_s'] = round(time.perf_counter() - t0, 2)
+            cmp, _, _ = compare_keypoints(full, strided, size, conf=args.conf, pck_ratio=args.pck_ratio,
+                                          frame_mask=~sampled)
+            rep.update({'fps': round(float(fps), 2), 'frames': n, 'sampled': int(sampled.sum()),
+                        'sample_ratio': round(float(sampled.mean()), 4) if n else None,
+                        'stride': [min_stride, max_stride], 'interpolated': cmp})
+            rep['speedup'] = round(rep['full_time_s'] / rep['strided_time_s'], 2) if rep['strided_time_s'] else None
+        except Exception as e:
+            rep['error'] = f'{type(e).__name__}: {e}'
+            print(f'[WARN] {video.name}: {rep["error"]}', file=sys.stderr); sys.stderr.flush()
+        reports.append(rep)
+        print(f'[RESULT] {json.dumps(rep, ensure_ascii=False)}'); sys.stdout.flush()
+    ok = [r for r in reports if 'error' not in r]
+    summary = {
+        'videos': len(reports),
+        'failed': len(reports) - len(ok),
+        'sample_ratio': round(float(np.mean([r['sample_ratio'] for r in ok if r['sample_ratio'] is not None])), 4) if ok else None,
+        'px_median': [r['interpolated']['px_median'] for r in ok],
+        'pck': [r['interpolated']['pck'] for r in ok],
+    }
+    print(f'[SUMMARY] {json.dumps(summary, ensure_ascii=False)}'); sys.stdout.flush()
+    if args.json_out:
+        with open(args.json_out, 'w', encoding='utf-8') as f:
+            json.dump({'summary': summary, 'videos': reports, 'conf': args.conf, 'pck_ratio': args.pck_ratio},
+                      f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,322 @@
+"""
+입력 비디오 내용 기반(content-addressed) 전체 파이프라인 결과 캐시
+- 같은 스윙 영상을 다시 업로드하면 (파일명은 getUniqueFilename으로 매번 달라도) 바이트가 같으므로
+  OpenPose/ffmpeg/임베딩/MLP를 다시 돌리지 않고 캐시된 산출물을 새 파일명으로 link해서 결과를 돌려준다.
+- 캐시 키 = sha256(입력 비디오 sha256 + 파이프라인/모델 fingerprint)
+  fingerprint에는 파이프라인 코드 파일, 모델 체크포인트 digest, 결과를 바꾸는 환경 변수(PIPELINE_SETTINGS)가
+  들어가므로 코드나 모델, 모드가 바뀌면 자동으로 miss.
+
+디렉터리 구조
+    cache/results/<key[:2]>/<key>/entry.json     결과 dict + 산출물 목록(size/mtime)
+    cache/results/<key[:2]>/<key>/<artifact>     crop.mp4, crop.kps.npy(+.json), crop.csv, angles.json, timesformer.npy, stgcn.npy, skeleton.mp4
+    cache/digests.json                           큰 체크포인트 파일 digest 메모 (path, size, mtime 기준)
+
+환경 변수
+- RESULT_CACHE=0     : 캐시 사용 안 함
+- RESULT_CACHE_DIR   : 캐시 루트 (기본 resPy/cache)
+"""
+import os
+import sys
+import json
+import shutil
+import hashlib
+import threading
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.resolve()
+
+# 캐시 형식이나 결과 의미가 바뀌면 올려서 기존 캐시를 무효화
+CACHE_VERSION = 2
+CHUNK_SIZE = 1 << 20
+
+# 결과에 영향을 주는 코드 파일
+PIPELINE_FILES = [
+    'analyze_golf_video.py',
+    'openpose_utils.py',
+    'keypoint_track.py',
+    'pose_stride.py',
+    'bbox_proxy.py',
+    'person_tracker.py',
+    'swing_window.py',
+    'pose_chunks.py',
+    'media_transcode.py',
+    'openpose_skeleton_overlay.py',
+    'overlay_track.py',
+    'save_angle_json.py',
+    'extract_timesformer_single.py',
+    'extract_stgcn_single.py',
+    'mlp_classifier.py',
+    'my_stgcnpp.py',
+]
+# 모델 체크포인트 (없으면 'missing'으로 fingerprint에 반영)
+# 결과에 영향을 주는 환경 변수 (모드 전환)
+PIPELINE_SETTINGS = [
+    'OPENPOSE_SINGLE_PASS',
+    'POSE_BACKEND',
+    'POSE_INPUT_HEIGHT',
+    'KEYPOINT_CSV',
+    'POSE_STRIDE',
+    'POSE_STRIDE_MAX',
+    'POSE_STRIDE_MIN',
+    'POSE_STRIDE_QUANTILE',
+    'POSE_BBOX_PROXY',
+    'POSE_PROXY_HEIGHT',
+    'POSE_PROXY_STRIDE',
+    'POSE_PROXY_NET_HEIGHT',
+    'POSE_MAX_PEOPLE',
+    'SWING_TRIM',
+    'SWING_MARGIN_S',
+    'MEDIA_PRESET',
+    'MEDIA_CRF',
+    'OVERLAY_ENCODER',
+    'OVERLAY_PRESET',
+    'OVERLAY_CRF',
+    'OVERLAY_MAX_HEIGHT',
+]
+
+MODEL_FILES = [
+    'mlp_model.pth',
+    'stgcn_62p.pth',
+    'timesformer_model.pth',
+]
+
+# result key -> (캐시 내 파일명)
+ARTIFACTS = {
+    'crop_video': 'crop.mp4',
+    'crop_keypoints': 'crop.kps.npy',
+    'crop_csv': 'crop.csv',
+    'angle_json': 'angles.json',
+    'embedding_timesformer': 'timesformer.npy',
+    'embedding_stgcn': 'stgcn.npy',
+    'openpose_skeleton_video_h264': 'skeleton.mp4',
+    'overlay_track': 'overlay.kpt.gz',
+}
+
+
+def _keypoints_sidecar(path):
+    """X.kps.npy -> X.kps.json (keypoint_track 메타데이터)"""
+    from keypoint_track import meta_path
+    return meta_path(path)
+
+
+# 산출물과 같이 옮겨야 하는 sidecar (result key -> sidecar 경로 함수)
+SIDECARS = {
+    'crop_keypoints': _keypoints_sidecar,
+}
+
+_digest_lock = threading.Lock()
+
+
+def cache_enabled():
+    return os.environ.get('RESULT_CACHE', '1') != '0'
+
+
+def cache_root():
+    return Path(os.environ.get('RESULT_CACHE_DIR', BASE_DIR / 'cache'))
+
+
+def hash_file(path, chunk_size=CHUNK_SIZE):
+    """파일 전체를 chunk 단위로 읽어 sha256 hex digest 계산 (메모리에 전부 올리지 않음)"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def file_digest(path):
+    """
+    sha256 digest, (절대경로, size, mtime_ns)가 같으면 cache/digests.json에 기록된 값을 재사용.
+    수백 MB 체크포인트를 매 실행마다 다시 해시하지 않기 위함. 파일이 없으면 None.
+    """
+    path = Path(path)
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    memo_path = cache_root() / 'digests.json'
+    key = str(path.resolve())
+    with _digest_lock:
+        memo = {}
+        if memo_path.exists():
+            try:
+                with open(memo_path, 'r', encoding='utf-8') as f:
+                    memo = json.load(f)
+            except Exception:
+                memo = {}
+        rec = memo.get(key)
+        if rec and rec.get('size') == st.st_size and rec.get('mtime_ns') == st.st_mtime_ns:
+            return rec['sha256']
+        digest = hash_file(path)
+        memo[key] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha256': digest}
+        try:
+            memo_path.parent.mkdir(exist_ok=True, parents=True)
+            tmp = memo_path.with_suffix('.json.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(memo, f, indent=1)
+            os.replace(tmp, memo_path)
+        except Exception as e:
+            print(f'[WARN] failed to update digest memo {memo_path}: {e}', file=sys.stderr); sys.stderr.flush()
+        return digest
+
+
+def pipeline_fingerprint():
+    """파이프라인 코드 + 모델 체크포인트 digest를 합친 fingerprint"""
+    h = hashlib.sha256()
+    h.update(f'cache_version={CACHE_VERSION}\n'.encode('utf-8'))
+    for name in PIPELINE_FILES + MODEL_FILES:
+        d = file_digest(BASE_DIR / name)
+        h.update(f'{name}={d or "missing"}\n'.encode('utf-8'))
+    for name in PIPELINE_SETTINGS:
+        h.update(f'env:{name}={os.environ.get(name, "")}\n'.encode('utf-8'))
+    return h.hexdigest()
+
+
+def cache_key(video_digest, fingerprint=None, options=None):
+    """options: 요청별 출력 설정 (예: {'overlay_mode': 'data'}), 다르면 다른 entry"""
+    fingerprint = fingerprint or pipeline_fingerprint()
+    key = f'{video_digest}:{fingerprint}'
+    if options:
+        key += ':' + json.dumps(options, sort_keys=True)
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def _entry_dir(key):
+    return cache_root() / 'results' / key[:2] / key
+
+
+def _link_or_copy(src, dst):
+    """hardlink 우선 (같은 디스크면 즉시, 용량 0), 실패 시 복사"""
+    dst = Path(dst)
+    if dst.exists() or dst.is_symlink():
+        dst.unlink()
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _resolve_artifact(result, key, dirs):
+    """result dict의 산출물 경로를 실제 파일 경로로 (angle_json은 파일명만 저장됨)"""
+    val = result.get(key)
+    if not val:
+        return None
+    p = Path(val)
+    if key == 'angle_json' and not p.is_absolute():
+        p = Path(dirs['angle']) / p.name
+    return p if p.exists() else None
+
+
+def lookup(key):
+    """캐시 entry dict 또는 None. link된 산출물이 이후 덮어써졌으면(size/mtime 불일치) 무효 처리"""
+    entry_dir = _entry_dir(key)
+    entry_path = entry_dir / 'entry.json'
+    if not entry_path.exists():
+        return None
+    try:
+        with open(entry_path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+    except Exception as e:
+        print(f'[WARN] unreadable cache entry {entry_path}: {e}', file=sys.stderr); sys.stderr.flush()
+        return None
+    for name, rec in entry.get('artifacts', {}).items():
+        for r in [rec] + ([rec['sidecar']] if rec.get('sidecar') else []):
+            p = entry_dir / r['file']
+            try:
+                st = p.stat()
+            except OSError:
+                print(f'[WARN] cache entry {key[:12]} missing artifact {name}; ignoring entry', file=sys.stderr); sys.stderr.flush()
+                return None
+            if st.st_size != r['size'] or st.st_mtime_ns != r['mtime_ns']:
+                print(f'[WARN] cache entry {key[:12]} artifact {name} changed on disk; evicting', file=sys.stderr); sys.stderr.flush()
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                return None
+    entry['_dir'] = str(entry_dir)
+    return entry
+
+
+def store(key, result, dirs):
+    """
+    성공한 결과와 산출물을 캐시에 저장 (임시 폴더에 만든 뒤 rename으로 원자적 반영)
+    dirs: {'angle': angle_dir} (angle_json 파일명 → 경로 해석용)
+    """
+    entry_dir = _entry_dir(key)
+    if (entry_dir / 'entry.json').exists():
+        return
+    tmp_dir = entry_dir.parent / f'.{key}.{os.getpid()}.{threading.get_ident()}.tmp'
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+    try:
+        artifacts = {}
+        for rkey, fname in ARTIFACTS.items():
+            src = _resolve_artifact(result, rkey, dirs)
+            if src is None:
+                continue
+            dst = tmp_dir / fname
+            _link_or_copy(src, dst)
+            st = dst.stat()
+            artifacts[rkey] = {'file': fname, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+            if rkey in SIDECARS:
+                side_src, side_dst = SIDECARS[rkey](src), SIDECARS[rkey](dst)
+                if side_src.exists():
+                    _link_or_copy(side_src, side_dst)
+                    st = side_dst.stat()
+                    artifacts[rkey]['sidecar'] = {'file': side_dst.name, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+        entry = {
+            'key': key,
+            'cache_version': CACHE_VERSION,
+            'result': {k: v for k, v in result.items() if k not in ARTIFACTS and k != 'user_id'},
+            'artifacts': artifacts,
+        }
+        with open(tmp_dir / 'entry.json', 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        try:
+            os.replace(tmp_dir, entry_dir)
+        except OSError:
+            # 동시에 같은 키를 저장한 다른 작업이 먼저 끝난 경우
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def materialize(entry, targets, user_id=None):
+    """
+    캐시 entry의 산출물을 새 업로드 이름(targets: result key -> 경로)으로 link하고 result dict 반환
+    """
+    entry_dir = Path(entry['_dir'])
+    result = dict(entry['result'])
+    result['user_id'] = user_id
+    for rkey in ARTIFACTS:
+        result.setdefault(rkey, None)
+    for rkey, rec in entry.get('artifacts', {}).items():
+        dst = Path(targets[rkey])
+        dst.parent.mkdir(exist_ok=True, parents=True)
+        _link_or_copy(entry_dir / rec['file'], dst)
+        if rec.get('sidecar'):
+            _link_or_copy(entry_dir / rec['sidecar']['file'], SIDECARS[rkey](dst))
+        # angle_json은 프론트 호환을 위해 파일명만 저장
+        result[rkey] = dst.name if rkey == 'angle_json' else str(dst)
+    return result
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='파이프라인 결과 캐시 관리')
+    parser.add_argument('--clear', action='store_true', help='결과 캐시 전체 삭제')
+    parser.add_argument('--fingerprint', action='store_true', help='현재 파이프라인 fingerprint 출력')
+    args = parser.parse_args()
+    results_dir = cache_root() / 'results'
+    if args.fingerprint:
+        print(pipeline_fingerprint())
+    if args.clear:
+        shutil.rmtree(results_dir, ignore_errors=True)
+        print(f'Cleared {results_dir}')
+    if not (args.clear or args.fingerprint):
+        entries = list(results_dir.glob('*/*/entry.json')) if results_dir.exists() else []
+        total = sum(p.stat().st_size for p in results_dir.rglob('*') if p.is_file()) if results_dir.exists() else 0
+        print(json.dumps({'entries': len(entries), 'bytes': total, 'dir': str(results_dir)}, ensure_ascii=False))
@@ -1,9 +1,10 @@
-import cv2
-import mediapipe as mp
 import csv
 
 # 웹 호환 skeleton video 및 angle json 생성 함수 (analyze_golf_video.py에서 import용)
 def process_with_skeleton(input_path, output_path, csv_path, json_path):
+    # mediapipe/cv2는 이 함수에서만 사용 (save_angle_json 경로에서는 import하지 않음)
+    import cv2
+    import mediapipe as mp
     # --- ffmpeg로 웹 호환 mp4로 재인코딩 (libx264/yuv420p/faststart) ---
     import shutil
     import subprocess
@@ -202,17 +203,13 @@ def process_with_skeleton(input_path, output_path, csv_path, json_path):
         print("[ffmpeg] ffmpeg not found in PATH. Skeleton video may not be web-compatible.")
 import sys
 import os
-import pandas as pd
 import numpy as np
 import math
 import json
-
-# COCO17 keypoint 이름 및 인덱스
-COCO_KP = [
-    "Nose", "LEye", "REye", "LEar", "REar", "LShoulder", "RShoulder", "LElbow", "RElbow",
-    "LWrist", "RWrist", "LHip", "RHip", "LKnee", "RKnee", "LAnkle", "RAnkle"
-]
-COCO_IDX = {name: i for i, name in enumerate(COCO_KP)}
+import warnings
+from pipeline_spans import timed, annotate
+# 관절 이름/순서와 COM 관절은 keypoint_track (관절은 이름으로 찾음, seq.index)
+from keypoint_track import COM_JOINTS
 
 def calculate_angle_2d(joint_coords):
     AB = (joint_coords[0][0] - joint_coords[1][0], joint_coords[0][1] - joint_coords[1][1])
@@ -241,6 +238,28 @@ def calculate_angle_3d(joint_coords):
     angle_radians = math.acos(np.clip(cos_theta, -1.0, 1.0))
     return math.degrees(angle_radians)
 
+# (결과 key, (A, B(꼭짓점), C), 차원) — 결과 JSON의 각도 key 순서
+ANGLE_JOINTS = [
+    ("left_elbow_flexion", ("LShoulder", "LElbow", "LWrist"), 2),
+    ("right_elbow_flexion", ("RShoulder", "RElbow", "RWrist"), 2),
+    ("left_knee_flexion", ("LHip", "LKnee", "LAnkle"), 2),
+    ("right_knee_flexion", ("RHip", "RKnee", "RAnkle"), 2),
+    ("left_hip_flexion", ("LShoulder", "LHip", "LKnee"), 3),
+    ("right_hip_flexion", ("RShoulder", "RHip", "RKnee"), 3),
+    ("left_shoulder_flexion", ("LHip", "LShoulder", "LElbow"), 2),
+    ("right_shoulder_flexion", ("RHip", "RShoulder", "RElbow"), 2),
+]
+
+def angle_series(a, b, c):
+    """calculate_angle_2d/3d의 벡터 버전: (F, D) 세 점 → (F,) 각도(도), 길이 0이거나 nan이면 nan"""
+    ab = a - b
+    cb = c - b
+    dot = (ab * cb).sum(-1)
+    mag = np.linalg.norm(ab, axis=-1) * np.linalg.norm(cb, axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cos = np.where(mag == 0, np.nan, dot / mag)
+    return np.degrees(np.arccos(np.clip(cos, -1.0, 1.0)))
+
 def replace_nan_with_none(obj):
     if isinstance(obj, float) and math.isnan(obj):
         return None
@@ -251,117 +270,56 @@ def replace_nan_with_none(obj):
     else:
         return obj
 
-def save_angle_json(csv_path, out_json_path, fps=30):
+@timed('angles.save_angle_json')
+def save_angle_json(keypoints_path, out_json_path, fps=None):
+    """
+    keypoints_path: keypoint track (.kps.npy, keypoint_track) 또는 이전 crop_csv
+    fps: None이면 track 메타데이터의 fps (없으면 30)
+    """
+    from keypoint_track import KeypointSequence
     try:
-        df = pd.read_csv(csv_path)
+        seq = KeypointSequence.load(keypoints_path)
     except Exception as e:
-        print(f"[ERROR] Failed to read CSV {csv_path}: {e}")
+        print(f"[ERROR] Failed to read keypoints {keypoints_path}: {e}")
         raise
-
-    # coerce all columns to numeric where possible to avoid numpy ufunc type errors
-    try:
-        df = df.apply(lambda col: pd.to_numeric(col, errors='coerce'))
-    except Exception as e:
-        print(f"[WARN] Failed to coerce CSV columns to numeric: {e}")
+    if fps is None:
+        fps = int(round(seq.fps or 30))
+    annotate(frames=len(seq))
+
+    # 사람 없는 frame (모든 관절 c == 0)은 NaN → 아래에서 앞뒤 frame으로 보간 (기존 CSV의 NaN 행과 같은 의미)
+    # 프레임 안에서 검출 안 된 관절은 이전과 같게 (0, 0) 그대로
+    xy = seq.masked_xy(mask=np.broadcast_to(seq.frame_valid()[:, None], seq.conf.shape))
+    # 2D keypoint라 z는 nan (3D 각도/COM z는 항상 None)
+    xyz = np.concatenate([xy, np.full(xy.shape[:2] + (1,), np.nan)], axis=-1)
+
+    def j2(name):
+        return xy[:, seq.index(name)]
+
+    def j3(name):
+        return xyz[:, seq.index(name)]
+
+    # 각도 계산 (관절 이름 기준, 전체 frame을 한 번에)
+    series = {}
+    for key, (a, b, c), dims in ANGLE_JOINTS:
+        get = j2 if dims == 2 else j3
+        series[key] = angle_series(get(a), get(b), get(c))
+    # 골반 기울기 및 회전
+    series["pelvis_list"] = j2("RHip")[:, 1] - j2("LHip")[:, 1]
+    series["pelvis_rotation"] = j2("RHip")[:, 0] - j2("LHip")[:, 0]
+    # COM (8개 점 평균, 전부 nan이면 nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        com_all = np.nanmean(xyz[:, [seq.index(j) for j in COM_JOINTS]], axis=1)
+
+    # 원본 비디오 frame 번호가 메타데이터에 있으면 사용, 없으면 아래에서 순서대로 부여
+    frame_index = seq.frame_index
     angle_data = []
     com_positions = []
-    # Use the CSV 'frame' column when present so we preserve original video frame indices
-    # detect CSV column format: OpenPose uses name_x/name_y/name_c, previous pipeline used x_0,y_0,z_0 style
-    cols = set(df.columns)
-    use_name_cols = any(f"{name}_x" in cols for name in COCO_KP)
-
-    def safe_num(v):
-        try:
-            return float(v)
-        except Exception:
-            return np.nan
-
-    for _, row in df.iterrows():
-        # normalize frame value (may be string in some CSVs)
-        frame_num = None
-        if 'frame' in df.columns and not pd.isna(row.get('frame', None)):
-            try:
-                frame_num = int(safe_num(row.get('frame')))
-            except Exception:
-                frame_num = None
-        frame_angles = {"frame": frame_num}
-        if use_name_cols:
-            def get2d(j):
-                # coerce to numeric; return (x,y) floats or (np.nan,np.nan)
-                x = safe_num(row.get(f"{j}_x", np.nan))
-                y = safe_num(row.get(f"{j}_y", np.nan))
-                return (x, y)
-            def get3d(j):
-                # OpenPose CSV typically has x,y,confidence but no z; return nan for z
-                x = safe_num(row.get(f"{j}_x", np.nan))
-                y = safe_num(row.get(f"{j}_y", np.nan))
-                return [x, y, np.nan]
-        else:
-            def get2d(j):
-                # fall back to index-based columns like x_0, y_0
-                colx = f"x_{COCO_IDX[j]}"
-                coly = f"y_{COCO_IDX[j]}"
-                x = safe_num(row.get(colx, np.nan))
-                y = safe_num(row.get(coly, np.nan))
-                return (x, y)
-            def get3d(j):
-                colx = f"x_{COCO_IDX[j]}"
-                coly = f"y_{COCO_IDX[j]}"
-                colz = f"z_{COCO_IDX[j]}"
-                x = safe_num(row.get(colx, np.nan))
-                y = safe_num(row.get(coly, np.nan))
-                z = safe_num(row.get(colz, np.nan))
-                return [x, y, z]
-
-        # 각도 계산 (COCO17 기준)
-        frame_angles["left_elbow_flexion"] = calculate_angle_2d([
-            get2d("LShoulder"), get2d("LElbow"), get2d("LWrist")
-        ])
-        frame_angles["right_elbow_flexion"] = calculate_angle_2d([
-            get2d("RShoulder"), get2d("RElbow"), get2d("RWrist")
-        ])
-        frame_angles["left_knee_flexion"] = calculate_angle_2d([
-            get2d("LHip"), get2d("LKnee"), get2d("LAnkle")
-        ])
-        frame_angles["right_knee_flexion"] = calculate_angle_2d([
-            get2d("RHip"), get2d("RKnee"), get2d("RAnkle")
-        ])
-        frame_angles["left_hip_flexion"] = calculate_angle_3d([
-            get3d("LShoulder"), get3d("LHip"), get3d("LKnee")
-        ])
-        frame_angles["right_hip_flexion"] = calculate_angle_3d([
-            get3d("RShoulder"), get3d("RHip"), get3d("RKnee")
-        ])
-        frame_angles["left_shoulder_flexion"] = calculate_angle_2d([
-            get2d("LHip"), get2d("LShoulder"), get2d("LElbow")
-        ])
-        frame_angles["right_shoulder_flexion"] = calculate_angle_2d([
-            get2d("RHip"), get2d("RShoulder"), get2d("RElbow")
-        ])
-
-        # 골반 기울기 및 회전 (use get2d to support both CSV formats)
-        rh_x, rh_y = get2d("RHip")
-        lh_x, lh_y = get2d("LHip")
-        try:
-            p_list = safe_num(rh_y) - safe_num(lh_y)
-        except Exception:
-            p_list = np.nan
-        try:
-            p_rot = safe_num(rh_x) - safe_num(lh_x)
-        except Exception:
-            p_rot = np.nan
-        frame_angles["pelvis_list"] = p_list
-        frame_angles["pelvis_rotation"] = p_rot
-
-        # COM (8개 점 평균)
-        com_joints = ["LHip", "RHip", "LShoulder", "RShoulder", "LKnee", "RKnee", "LAnkle", "RAnkle"]
-        com_coords = [get3d(j) for j in com_joints]
-        com_array = np.array(com_coords)
-        # nanmean will return nan if all values nan; handle later
-        try:
-            com_mean = np.nanmean(com_array, axis=0)
-        except Exception:
-            com_mean = np.array([np.nan, np.nan, np.nan])
+    for i in range(len(seq)):
+        frame_angles = {"frame": int(frame_index[i]) if frame_index else None}
+        for key, values in series.items():
+            frame_angles[key] = float(values[i])
+        com_mean = com_all[i]
         frame_angles["com"] = {"x": float(com_mean[0]) if not np.isnan(com_mean[0]) else None,
                                "y": float(com_mean[1]) if not np.isnan(com_mean[1]) else None,
                                "z": float(com_mean[2]) if not np.isnan(com_mean[2]) else None}
@@ -599,9 +557,9 @@ def save_angle_json(csv_path, out_json_path, fps=30):
 
 if __name__ == "__main__":
     if len(sys.argv) < 3:
-        print("Usage: python save_angle_json.py <input_csv> <output_json> [fps]")
+        print("Usage: python save_angle_json.py <input_keypoints(.kps.npy|.csv)> <output_json> [fps]")
         sys.exit(1)
-    csv_path = sys.argv[1]
+    keypoints_path = sys.argv[1]
     out_json_path = sys.argv[2]
-    fps = int(sys.argv[3]) if len(sys.argv) > 3 else 30
-    save_angle_json(csv_path, out_json_path, fps)
+    fps = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    save_angle_json(keypoints_path, out_json_path, fps)
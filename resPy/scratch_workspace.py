@@ -0,0 +1,287 @@
+"""
+작업별 임시 폴더 (scratch workspace)
+- run_openpose_and_crop의 재인코딩 mp4, OpenPose frame json(수천 개의 작은 파일), stride/proxy 임시 비디오용
+- frame_store의 raw frame 파일도 자기 workspace(frames-<key>)에 둠 → 같은 quota/orphan sweep 적용
+- 작업마다 고유한 폴더 (<prefix>-<basename>-<pid>-<random>) → 같은 basename 작업이 동시에 돌아도 충돌 없음
+- 예상 크기가 RAM 쪽 quota(SCRATCH_MAX_MB) 안에 들어가면 tmpfs(/dev/shm), 아니면 디스크
+- with 블록이 끝나면 바로 삭제 (atexit/재시도 없이), 프로세스가 죽어서 남은 폴더는
+  다음 프로세스의 첫 workspace 생성 때(또는 analysis_service 시작 때) sweep_orphans()가 정리
+  (폴더 안 .owner.json의 pid가 더 이상 없거나 SCRATCH_MAX_AGE_H보다 오래된 것)
+
+사용
+    with scratch_workspace.workspace('openpose', basename, estimate_bytes=n) as ws:
+        ws.path / 'first_pass'      # pathlib.Path
+        ws.name                     # 고유 이름 (frame store key 등)
+
+    ws = scratch_workspace.workspace('frames', name=f'frames-{key}', estimate_bytes=n)  # 이름 지정 (with 밖에서 유지)
+    scratch_workspace.remove(ws.name)                                                   # 다른 함수에서 이름으로 삭제
+
+    python scratch_workspace.py ls       # 현재 workspace 목록
+    python scratch_workspace.py sweep    # orphan 정리
+
+환경 변수
+- SCRATCH_DIR          : RAM 쪽 root (기본 /dev/shm/golf_scratch, /dev/shm이 없으면 디스크만 사용)
+- SCRATCH_DISK_DIR     : 디스크 root (기본 resPy/_scratch)
+- SCRATCH_MAX_MB       : RAM root 전체 사용량 상한 (기본 3072, frame store 포함)
+- SCRATCH_MAX_AGE_H    : pid 확인과 관계없이 orphan으로 보는 나이 (기본 24)
+- KEEP_TMP_JSON=1      : 디버깅용, workspace를 지우지 않음
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import socket
+import threading
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.resolve()
+OWNER_FILE = '.owner.json'
+
+_lock = threading.Lock()
+_swept = False
+# 이 프로세스에서 RAM root에 잡아 둔 예상 크기 (아직 파일이 다 써지지 않은 동시 작업도 quota에 반영)
+_reserved = {}
+
+
+def ram_root():
+    env = os.environ.get('SCRATCH_DIR')
+    if env:
+        return Path(env)
+    shm = Path('/dev/shm')
+    return shm / 'golf_scratch' if shm.is_dir() else None
+
+
+def disk_root():
+    env = os.environ.get('SCRATCH_DISK_DIR')
+    return Path(env) if env else BASE_DIR / '_scratch'
+
+
+def max_ram_bytes():
+    try:
+        return int(float(os.environ.get('SCRATCH_MAX_MB', '3072')) * 1024 * 1024)
+    except ValueError:
+        return 3072 * 1024 * 1024
+
+
+def max_age_seconds():
+    try:
+        return float(os.environ.get('SCRATCH_MAX_AGE_H', '24')) * 3600
+    except ValueError:
+        return 24 * 3600
+
+
+def keep_enabled():
+    return os.environ.get('KEEP_TMP_JSON', '0') == '1'
+
+
+def _tree_bytes(path):
+    total = 0
+    for dirpath, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(dirpath, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def _pid_alive(pid):
+    if pid == os.getpid():
+        return True
+    if os.name == 'nt':
+        # Windows의 os.kill(pid, 0)은 프로세스를 종료시키므로 OpenProcess로 확인
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        try:
+            code = ctypes.c_ulong()
+            kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+            return code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _remove(path):
+    """읽기 전용 파일도 권한을 바꿔서 삭제, 실패하면 False"""
+    def _onerror(func, path_, exc_info):
+        try:
+            os.chmod(path_, 0o700)
+            func(path_)
+        except OSError:
+            pass
+    shutil.rmtree(path, onerror=_onerror)
+    return not Path(path).exists()
+
+
+class Workspace:
+    def __init__(self, path, in_ram):
+        self.path = Path(path)
+        self.name = self.path.name
+        self.in_ram = in_ram
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cleanup()
+        return False
+
+    def cleanup(self):
+        with _lock:
+            _reserved.pop(self.name, None)
+        if keep_enabled():
+            print(f'[DEBUG] KEEP_TMP_JSON=1, preserving workspace: {self.path}'); sys.stdout.flush()
+            return
+        if self.path.exists() and not _remove(self.path):
+            print(f'[WARN] failed to remove workspace {self.path}; it will be swept later', file=sys.stderr)
+            sys.stderr.flush()
+
+    def __repr__(self):
+        return f'Workspace({str(self.path)!r}, in_ram={self.in_ram})'
+
+
+def _choose_root(estimate_bytes):
+    """RAM root에 quota/여유 공간이 있으면 RAM, 아니면 디스크"""
+    ram = ram_root()
+    if ram is None:
+        return disk_root(), False
+    try:
+        ram.mkdir(exist_ok=True, parents=True)
+        used = _tree_bytes(ram) + sum(_reserved.values())
+        free = shutil.disk_usage(ram).free
+    except OSError:
+        return disk_root(), False
+    if used + estimate_bytes <= max_ram_bytes() and estimate_bytes < free:
+        return ram, True
+    return disk_root(), False
+
+
+def _safe(text):
+    return ''.join(c if c.isalnum() or c in '-_' else '_' for c in str(text))
+
+
+def workspace(prefix, label='', estimate_bytes=0, name=None):
+    """고유 workspace 생성 (with 문으로 사용), estimate_bytes: 예상 최대 크기 (RAM/디스크 선택 기준)
+    name: 주면 그 이름 그대로 (호출 측이 고유성을 보장, 나중에 remove(name)으로 삭제)"""
+    sweep_once()
+    if name is not None:
+        name = _safe(name)
+    else:
+        name = '-'.join(p for p in (prefix, _safe(label)[:40], str(os.getpid()), uuid.uuid4().hex[:8]) if p)
+    with _lock:
+        root, in_ram = _choose_root(int(estimate_bytes))
+        path = root / name
+        path.mkdir(parents=True)
+        if in_ram:
+            _reserved[name] = int(estimate_bytes)
+    with open(path / OWNER_FILE, 'w', encoding='utf-8') as f:
+        json.dump({'pid': os.getpid(), 'host': socket.gethostname(), 'created': time.time()}, f)
+    return Workspace(path, in_ram)
+
+
+def find(name):
+    """이름으로 workspace 경로 찾기 (RAM/디스크 root), 없으면 None"""
+    name = _safe(name)
+    for root in (ram_root(), disk_root()):
+        if root is not None and (root / name).is_dir():
+            return root / name
+    return None
+
+
+def remove(name):
+    """이름으로 workspace 삭제 (with 밖에서 만든 workspace용), 없으면 무시 → 지웠거나 없으면 True"""
+    with _lock:
+        _reserved.pop(_safe(name), None)
+    path = find(name)
+    if path is None or _remove(path):
+        return True
+    print(f'[WARN] failed to remove workspace {path}; it will be swept later', file=sys.stderr); sys.stderr.flush()
+    return False
+
+
+def list_workspaces():
+    """[(path, owner dict | None)] — RAM/디스크 root 모두"""
+    out = []
+    for root in (ram_root(), disk_root()):
+        if root is None or not root.is_dir():
+            continue
+        for entry in os.scandir(root):
+            if not entry.is_dir():
+                continue
+            owner = None
+            try:
+                with open(os.path.join(entry.path, OWNER_FILE), 'r', encoding='utf-8') as f:
+                    owner = json.load(f)
+            except (OSError, ValueError):
+                pass
+            out.append((Path(entry.path), owner))
+    return out
+
+
+def _is_orphan(path, owner, now):
+    try:
+        age = now - (owner['created'] if owner else path.stat().st_mtime)
+    except (OSError, KeyError, TypeError):
+        return False
+    if age > max_age_seconds():
+        return True
+    if owner is None or owner.get('host') != socket.gethostname():
+        # owner 정보가 없거나 다른 host (공유 디스크)면 나이로만 판단
+        return False
+    return not _pid_alive(int(owner.get('pid', -1)))
+
+
+def sweep_orphans():
+    """죽은 프로세스/오래된 workspace 삭제 → 삭제한 경로 목록"""
+    now = time.time()
+    removed = []
+    for path, owner in list_workspaces():
+        if _is_orphan(path, owner, now) and _remove(path):
+            removed.append(str(path))
+    if removed:
+        print(f'[STEP] swept {len(removed)} orphaned workspace(s)'); sys.stdout.flush()
+    return removed
+
+
+def sweep_once():
+    """프로세스당 한 번만 sweep (첫 workspace 생성 시)"""
+    global _swept
+    with _lock:
+        if _swept:
+            return
+        _swept = True
+    try:
+        sweep_orphans()
+    except OSError as e:
+        print(f'[WARN] workspace sweep failed: {e}', file=sys.stderr); sys.stderr.flush()
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description='scratch workspace 관리')
+    parser.add_argument('command', choices=['ls', 'sweep'])
+    args = parser.parse_args(argv)
+    if args.command == 'sweep':
+        for p in sweep_orphans():
+            print(p)
+        return 0
+    now = time.time()
+    for path, owner in list_workspaces():
+        print(json.dumps({'path': str(path), 'owner': owner, 'bytes': _tree_bytes(path),
+                          'orphan': _is_orphan(path, owner, now)}, ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
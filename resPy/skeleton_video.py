@@ -185,26 +185,7 @@ def csv_to_precomputed_landmark_json(csv_path, json_path, fps):
 
 
 def process_with_skeleton(input_path, output_path, csv_path, json_path):
-    # --- ffmpeg로 웹 호환 mp4(h264/yuv420p/faststart)로 재인코딩 ---
-    import shutil
-    import subprocess
-    import os
-    ffmpeg_path = shutil.which('ffmpeg')
-    if ffmpeg_path is not None and os.path.exists(output_path):
-        temp_out = str(output_path) + '.ffmpeg_tmp.mp4'
-        cmd = [ffmpeg_path, '-y', '-i', str(output_path), '-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-movflags', '+faststart', temp_out]
-        try:
-            print(f"[ffmpeg] Re-encoding for web compatibility: {' '.join(cmd)}")
-            result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            if result.returncode == 0 and os.path.exists(temp_out):
-                os.replace(temp_out, output_path)
-                print(f"[ffmpeg] Web-compatible h264 mp4 saved: {output_path}")
-            else:
-                print(f"[ffmpeg] Re-encode failed: {result.stderr.decode(errors='ignore')}")
-        except Exception as e:
-            print(f"[ffmpeg] Exception during re-encode: {e}")
-    else:
-        print("[ffmpeg] ffmpeg not found or skeleton mp4 missing. h264 re-encode skipped.")
+    import media_transcode
     mp_drawing = mp.solutions.drawing_utils
     mp_pose = mp.solutions.pose
 
@@ -224,9 +205,13 @@ def process_with_skeleton(input_path, output_path, csv_path, json_path):
         width, height = orig_width, orig_height
 
 
-    # h264(avc1)로 저장 시도, 실패 시 mp4v로 fallback
-    fourcc = cv2.VideoWriter_fourcc(*'avc1')
-    out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+    # 그린 frame을 바로 웹 호환 mp4(h264/yuv420p/faststart)로 (media_transcode.open_encoder, 재인코딩 없음)
+    # encoder를 쓸 수 없으면 cv2 h264(avc1) → mp4v, 끝난 뒤 ffmpeg 재인코딩
+    out = media_transcode.open_encoder(output_path, width, height, fps)
+    reencode = out is None
+    if out is None:
+        fourcc = cv2.VideoWriter_fourcc(*'avc1')
+        out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
     if not out.isOpened():
         print('Warning: VideoWriter failed to open with avc1 (h264) codec. Trying mp4v fallback.')
         fourcc = cv2.VideoWriter_fourcc(*'mp4v')
@@ -311,6 +296,8 @@ def process_with_skeleton(input_path, output_path, csv_path, json_path):
     cap.release()
     out.release()
     csv_file.close()
+    if reencode and media_transcode.web_copy(output_path):
+        print(f"[ffmpeg] Web-compatible h264 mp4 saved: {output_path}")
 
     # COM 이동 범위 계산 (평균, 표준편차)
     com_positions_np = np.array(com_positions)  # (N, 3)
@@ -0,0 +1,169 @@
+"""
+stage별 산출물 manifest (fingerprint 기반 증분 재계산 / 중단 후 재개)
+- stage가 끝날 때마다 manifest/<basename>.json 에 기록:
+    fingerprint = sha256(stage 버전 + stage 코드 digest + 입력 산출물 digest + 모델 체크포인트 digest + 설정)
+    outputs     = 산출물 경로별 size/mtime/sha256
+    value       = stage 반환값 (JSON)
+- 다시 실행할 때 fingerprint가 같고 산출물이 그대로 남아 있으면 stage를 건너뛰고 기록된 value를 돌려준다.
+  → MLP만 실패했거나 mlp_model.pth만 바뀌면 MLP forward 1번만 다시 돈다.
+  → 중간에 죽은 작업은 마지막으로 끝난 stage 다음부터 재개된다.
+
+환경 변수
+- STAGE_MANIFEST=0 : manifest 사용 안 함 (항상 전체 재계산)
+"""
+import os
+import sys
+import json
+import hashlib
+import threading
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.resolve()
+MANIFEST_VERSION = 1
+
+
+def manifest_enabled():
+    return os.environ.get('STAGE_MANIFEST', '1') != '0'
+
+
+def _jsonable(value):
+    if isinstance(value, Path):
+        return str(value)
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    return value
+
+
+class StageManifest:
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.data = {'version': MANIFEST_VERSION, 'stages': {}, 'digests': {}}
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == MANIFEST_VERSION:
+                    self.data = data
+                    self.data.setdefault('stages', {})
+                    self.data.setdefault('digests', {})
+            except Exception as e:
+                print(f'[WARN] unreadable stage manifest {self.path}: {e}; starting fresh', file=sys.stderr); sys.stderr.flush()
+
+    # ---------- digests ----------
+    def remember_digest(self, path, digest):
+        """이미 계산한 digest (예: 결과 캐시용 입력 비디오 해시)를 재사용하도록 등록"""
+        try:
+            st = Path(path).stat()
+        except OSError:
+            return
+        with self._lock:
+            self.data['digests'][str(Path(path).resolve())] = {
+                'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha256': digest}
+
+    def artifact_digest(self, path):
+        """산출물 sha256, size/mtime이 기록과 같으면 다시 해시하지 않음. 파일이 없으면 None"""
+        from result_cache import hash_file
+        p = Path(path)
+        try:
+            st = p.stat()
+        except OSError:
+            return None
+        key = str(p.resolve())
+        with self._lock:
+            rec = self.data['digests'].get(key)
+        if rec and rec['size'] == st.st_size and rec['mtime_ns'] == st.st_mtime_ns:
+            return rec['sha256']
+        digest = hash_file(p)
+        with self._lock:
+            self.data['digests'][key] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha256': digest}
+        return digest
+
+    # ---------- fingerprint ----------
+    def fingerprint(self, stage_version, sources=(), inputs=(), models=(), config=None):
+        """
+        stage_version: stage 버전 (결과 의미가 바뀌면 올림)
+        sources: stage 코드 파일 (resPy 기준 상대경로)
+        inputs: 입력 산출물 경로
+        models: 모델 체크포인트/설정 파일 경로
+        config: stage 설정 dict
+        """
+        from result_cache import file_digest
+        h = hashlib.sha256()
+        h.update(f'stage_version={stage_version}\n'.encode('utf-8'))
+        for src in sources:
+            h.update(f'source:{src}={file_digest(BASE_DIR / src) or "missing"}\n'.encode('utf-8'))
+        for inp in inputs:
+            h.update(f'input={self.artifact_digest(inp) or "missing"}\n'.encode('utf-8'))
+        for m in models:
+            h.update(f'model:{Path(m).name}={file_digest(m) or "missing"}\n'.encode('utf-8'))
+        if config:
+            h.update(('config=' + json.dumps(_jsonable(config), sort_keys=True)).encode('utf-8'))
+        return h.hexdigest()
+
+    # ---------- lookup / record ----------
+    def lookup(self, name, fingerprint):
+        """(hit, value): fingerprint가 같고 기록된 산출물이 그대로(size/mtime) 있으면 hit"""
+        with self._lock:
+            rec = self.data['stages'].get(name)
+        if not rec or rec.get('fingerprint') != fingerprint:
+            return False, None
+        for p, meta in rec.get('outputs', {}).items():
+            try:
+                st = Path(p).stat()
+            except OSError:
+                return False, None
+            if st.st_size != meta['size'] or st.st_mtime_ns != meta['mtime_ns']:
+                return False, None
+        return True, rec.get('value')
+
+    def record(self, name, fingerprint, outputs=(), value=None):
+        outs = {}
+        for p in outputs:
+            p = Path(p)
+            if not p.exists():
+                continue
+            st = p.stat()
+            outs[str(p.resolve())] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns,
+                                      'sha256': self.artifact_digest(p)}
+        with self._lock:
+            self.data['stages'][name] = {'fingerprint': fingerprint, 'outputs': outs, 'value': _jsonable(value)}
+            self._save_locked()
+
+    def invalidate(self, name):
+        with self._lock:
+            if self.data['stages'].pop(name, None) is not None:
+                self._save_locked()
+
+    def _save_locked(self):
+        try:
+            self.path.parent.mkdir(exist_ok=True, parents=True)
+            tmp = self.path.with_suffix(self.path.suffix + '.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f'[WARN] failed to write stage manifest {self.path}: {e}', file=sys.stderr); sys.stderr.flush()
+
+
+def run_stage_cached(manifest, name, fn, fingerprint, outputs_of=None, should_record=None):
+    """
+    manifest가 있으면 fingerprint가 같은 완료 기록을 재사용하고, 없으면 fn()을 실행한 뒤 기록.
+    outputs_of: optional callable(value) -> stage 산출물 경로 리스트 (실행 후 기록용)
+    should_record: optional predicate(value) — False면 기록하지 않음 (soft failure 등)
+    """
+    if manifest is None:
+        return fn()
+    hit, value = manifest.lookup(name, fingerprint)
+    if hit:
+        from pipeline_spans import annotate
+        annotate(resumed=True)
+        print(f'[RESUME] stage {name} up to date (fingerprint={fingerprint[:12]}), skipping'); sys.stdout.flush()
+        return value
+    value = fn()
+    if should_record is None or should_record(value):
+        outputs = outputs_of(value) if outputs_of is not None else ()
+        manifest.record(name, fingerprint, outputs=outputs, value=value)
+    return value
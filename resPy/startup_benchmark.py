@@ -0,0 +1,169 @@
+"""
+분석 entry point 기동 시간 벤치마크 (python -X importtime)
+- entry point마다 새 인터프리터로 "첫 stage 직전까지" 필요한 모듈을 import하고
+  프로세스 시작 → 종료까지의 wall time(ms)과 -X importtime 누적 시간을 잰다.
+- 결과를 budget과 비교해서 넘으면 exit code 1 (CI/배포 전 회귀 확인용).
+- budget은 두 가지:
+    max_ms     : 반복 측정 중앙값 wall time 상한
+    forbidden  : 기동 경로에서 import되면 안 되는 무거운 모듈 (torch, cv2, ...) — 기계 성능과 무관하게 재현 가능한 검사
+
+실행
+    python startup_benchmark.py                 # 전체 entry point, 5회 반복
+    python startup_benchmark.py --repeat 10 --top 15 --json report.json
+    python startup_benchmark.py analyze_golf_video
+
+환경 변수
+- STARTUP_BUDGET_SCALE : max_ms 배율 (느린 머신에서 1.5 등)
+"""
+import os
+import sys
+import json
+import time
+import statistics
+import subprocess
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.resolve()
+
+HEAVY_MODULES = ['torch', 'torchvision', 'cv2', 'pandas', 'numpy', 'sklearn', 'mediapipe', 'decord', 'mmengine', 'scipy']
+
+# entry point -> (첫 stage 전까지 import되는 모듈, budget)
+ENTRY_POINTS = {
+    # analyze_golf_video.py: 모듈 import + analyze_golf_video() 안에서 첫 stage(openpose) 전에 import하는 것들
+    'analyze_golf_video': {
+        'modules': ['analyze_golf_video', 'pipeline_spans', 'pipeline_dag', 'stage_manifest', 'result_cache'],
+        'max_ms': 400,
+        'forbidden': HEAVY_MODULES,
+    },
+    'analysis_service': {
+        'modules': ['analysis_service', 'http.server'],
+        'max_ms': 300,
+        'forbidden': HEAVY_MODULES,
+    },
+    'embedding_daemon': {
+        'modules': ['embedding_daemon'],
+        'max_ms': 300,
+        'forbidden': HEAVY_MODULES,
+    },
+    # 추출/분류 스크립트: 모듈 import만으로는 torch 등을 올리지 않아야 함 (모델 로드 시점에 import)
+    'extract_timesformer_single': {
+        'modules': ['extract_timesformer_single'],
+        'max_ms': 300,
+        'forbidden': HEAVY_MODULES,
+    },
+    'extract_stgcn_single': {
+        'modules': ['extract_stgcn_single'],
+        'max_ms': 300,
+        'forbidden': HEAVY_MODULES,
+    },
+    'mlp_classifier': {
+        'modules': ['mlp_classifier'],
+        'max_ms': 300,
+        'forbidden': HEAVY_MODULES,
+    },
+    'openpose_utils': {
+        'modules': ['openpose_utils'],
+        'max_ms': 300,
+        'forbidden': HEAVY_MODULES,
+    },
+}
+
+
+def parse_importtime(stderr):
+    """-X importtime 출력 → [(module, self_us, cumulative_us, depth)]"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cum_us, name = line[len('import time:'):].split('|')
+            depth = (len(name) - len(name.lstrip(' '))) // 2
+            rows.append((name.strip(), int(self_us), int(cum_us), depth))
+        except ValueError:
+            continue
+    return rows
+
+
+def measure(modules, python=None):
+    """새 인터프리터에서 modules import: (wall_ms, importtime rows, returncode, stderr 꼬리)"""
+    python = python or sys.executable
+    code = ';'.join(f'import {m}' for m in modules)
+    env = os.environ.copy()
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    t0 = time.perf_counter()
+    p = subprocess.run([python, '-X', 'importtime', '-c', code], cwd=str(BASE_DIR), env=env,
+                       stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    wall_ms = (time.perf_counter() - t0) * 1000.0
+    errors = [ln for ln in p.stderr.splitlines() if not ln.startswith('import time:')]
+    return wall_ms, parse_importtime(p.stderr), p.returncode, '\n'.join(errors[-5:])
+
+
+def bench_entry(name, spec, repeat=5, top=10, scale=1.0):
+    # 첫 실행은 .pyc 생성/디스크 캐시 예열용으로 버림
+    measure(spec['modules'])
+    walls, rows, rc, err = [], [], 0, ''
+    for _ in range(repeat):
+        wall_ms, rows, rc, err = measure(spec['modules'])
+        walls.append(wall_ms)
+    imported = {r[0] for r in rows}
+    # top-level 패키지 이름 기준 (torch.nn → torch)
+    imported_top = {m.split('.')[0] for m in imported}
+    forbidden = sorted(m for m in spec.get('forbidden', []) if m in imported_top)
+    budget_ms = spec['max_ms'] * scale
+    median_ms = statistics.median(walls)
+    heaviest = sorted((r for r in rows if r[3] == 0), key=lambda r: -r[2])[:top]
+    failures = []
+    if rc != 0:
+        failures.append(f'import failed (rc={rc}): {err}')
+    if median_ms > budget_ms:
+        failures.append(f'median {median_ms:.0f}ms > budget {budget_ms:.0f}ms')
+    if forbidden:
+        failures.append(f'heavy modules imported at startup: {", ".join(forbidden)}')
+    return {
+        'entry': name,
+        'modules': spec['modules'],
+        'median_ms': round(median_ms, 1),
+        'min_ms': round(min(walls), 1),
+        'max_ms': round(max(walls), 1),
+        'budget_ms': round(budget_ms, 1),
+        'import_cumulative_ms': round(sum(r[2] for r in rows if r[3] == 0) / 1000.0, 1),
+        'heaviest': [{'module': m, 'cumulative_ms': round(c / 1000.0, 1)} for m, _, c, _ in heaviest],
+        'forbidden_imported': forbidden,
+        'ok': not failures,
+        'failures': failures,
+    }
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description='analysis entry point startup benchmark (python -X importtime)')
+    parser.add_argument('entries', nargs='*', help=f'entry point 이름 (기본: 전체) {sorted(ENTRY_POINTS)}')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help='가장 무거운 top-level import N개 출력')
+    parser.add_argument('--json', dest='json_out', default=None, help='결과 JSON 저장 경로')
+    args = parser.parse_args(argv)
+    names = args.entries or list(ENTRY_POINTS)
+    unknown = [n for n in names if n not in ENTRY_POINTS]
+    if unknown:
+        parser.error(f'unknown entry point(s): {unknown}')
+    scale = float(os.environ.get('STARTUP_BUDGET_SCALE', '1.0'))
+    reports = []
+    for name in names:
+        rep = bench_entry(name, ENTRY_POINTS[name], repeat=args.repeat, top=args.top, scale=scale)
+        reports.append(rep)
+        mark = 'OK  ' if rep['ok'] else 'FAIL'
+        print(f'[{mark}] {name}: median={rep["median_ms"]}ms (min {rep["min_ms"]}, max {rep["max_ms"]}) '
+              f'budget={rep["budget_ms"]}ms imports={rep["import_cumulative_ms"]}ms')
+        for h in rep['heaviest']:
+            print(f'         {h["cumulative_ms"]:8.1f}ms  {h["module"]}')
+        for f in rep['failures']:
+            print(f'       ! {f}')
+        sys.stdout.flush()
+    if args.json_out:
+        with open(args.json_out, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version, 'reports': reports}, f, ensure_ascii=False, indent=2)
+    return 0 if all(r['ok'] for r in reports) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
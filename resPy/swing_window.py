@@ -0,0 +1,173 @@
+"""
+스윙 구간(address → finish) 검출과 trim (openpose_utils.run_openpose_and_crop, SWING_TRIM=1)
+- 업로드에는 샷 전 루틴/걸어 나가는 장면이 길게 들어 있는데 crop 비디오, keypoint track(CSV), angle JSON,
+  overlay, TimeSformer(2x96 frame), ST-GCN(10x100 frame) 샘플링이 전부 그 frame까지 처리함
+- 1차 pass 골퍼 keypoint(원본 좌표, person_tracker)만으로 구간을 찾고, crop 단계에서 그 구간 + margin만 남긴다
+  → 2차 pass와 이후 stage가 모두 짧아지고 임베딩 모델이 빈 frame을 샘플링하지 않음
+
+검출 (몸통 길이로 정규화 → 해상도/거리 무관)
+    wrist  : 양 손목 평균, shoulder/hip: 양쪽 평균, 검출 안 된 frame은 시간 보간
+    speed  : 손목 속도 (torso / s, 약 0.1s 이동 평균)
+    height : (어깨 y - 손목 y) / torso  (> 0 이면 손이 어깨 위)
+    1. 손목 최고 속도 frame (임팩트 근처) = peak, 너무 느리면 스윙 없음 → None
+    2. peak에서 뒤로: 손이 어깨 아래이고 멈춘(speed < QUIET_RATIO * peak) 상태가 HOLD_S 이상 → address
+    3. peak에서 앞으로: 손이 어깨 위에서 멈춘 상태가 HOLD_S 이상 → finish (없으면 아무 정지 구간)
+    4. 구간 안에 손이 어깨 위로 올라간 frame이 없으면 스윙이 아님 → None
+    5. 앞뒤 margin을 붙이고, 거의 전체(MAX_KEEP_RATIO)면 trim 안 함 → None
+
+환경 변수
+- SWING_TRIM=1        : run_openpose_and_crop에서 스윙 구간만 crop (기본 0 = 끔)
+- SWING_MARGIN_S      : 구간 앞뒤 여유 (초, 기본 0.5)
+
+track 확인
+    python swing_window.py result/crop_csv/x_crop.kps.npy [--margin 0.5]
+"""
+import os
+import sys
+import json
+from pathlib import Path
+
+from keypoint_track import JOINT_INDEX
+
+# 관절은 keypoint_track 이름으로 찾음 (KP 순서)
+WRISTS = ('RWrist', 'LWrist')
+SHOULDERS = ('RShoulder', 'LShoulder')
+HIPS = ('RHip', 'LHip')
+MIN_CONF = 0.1
+MIN_VALID_RATIO = 0.25       # 손목이 검출된 frame 비율이 이보다 작으면 검출 안 함
+MIN_PEAK_SPEED = 3.0         # torso / s, 이보다 느리면 스윙 없음
+QUIET_RATIO = 0.1
+HOLD_S = 0.3
+SMOOTH_S = 0.1
+MAX_KEEP_RATIO = 0.95
+DEFAULT_MARGIN_S = 0.5
+
+
+def trim_enabled():
+    return os.environ.get('SWING_TRIM', '0') == '1'
+
+
+def margin_seconds():
+    try:
+        return max(0.0, float(os.environ.get('SWING_MARGIN_S', DEFAULT_MARGIN_S)))
+    except ValueError:
+        return DEFAULT_MARGIN_S
+
+
+def trim_config():
+    """stage fingerprint에 들어갈 설정 (끔이면 None)"""
+    return {'margin_s': margin_seconds()} if trim_enabled() else None
+
+
+def _mid(kps, names):
+    """관절(이름) 평균 (F, 2), 검출된 관절이 없는 frame은 NaN"""
+    import numpy as np
+    sel = kps[:, [JOINT_INDEX[n] for n in names]]
+    valid = sel[..., 2] > MIN_CONF
+    cnt = valid.sum(1)
+    out = np.full((len(kps), 2), np.nan, dtype=np.float64)
+    has = cnt > 0
+    out[has] = (sel[has, :, :2] * valid[has, :, None]).sum(1) / cnt[has, None]
+    return out
+
+
+def _fill_gaps(xy):
+    """NaN frame을 시간 선형 보간 (양 끝은 가까운 값), 유효 frame이 없으면 None"""
+    import numpy as np
+    ok = ~np.isnan(xy[:, 0])
+    if not ok.any():
+        return None
+    t = np.arange(len(xy))
+    return np.stack([np.interp(t, t[ok], xy[ok, c]) for c in range(2)], axis=1)
+
+
+def _quiet_run(mask, start, step, hold):
+    """start에서 step(±1) 방향으로 mask가 hold frame 연속인 첫 구간 → (start에 가까운 끝, 먼 끝), 없으면 None"""
+    run, i = 0, start
+    while 0 <= i < len(mask):
+        run = run + 1 if mask[i] else 0
+        if run >= hold:
+            return i - step * (hold - 1), i
+        i += step
+    return None
+
+
+def detect_swing_window(kps, fps, margin_s=None):
+    """
+    keypoint (F, 17, 3) [x, y, c] → (start, end) frame 구간 [start, end) 또는 None (스윙을 못 찾았거나 trim 이득 없음)
+    """
+    import numpy as np
+    kps = np.asarray(kps, dtype=np.float32)
+    n = len(kps)
+    fps = float(fps or 30.0)
+    if n < 8:
+        return None
+    wrist_raw = _mid(kps, WRISTS)
+    if (~np.isnan(wrist_raw[:, 0])).mean() < MIN_VALID_RATIO:
+        return None
+    wrist = _fill_gaps(wrist_raw)
+    shoulder = _fill_gaps(_mid(kps, SHOULDERS))
+    hip = _fill_gaps(_mid(kps, HIPS))
+    if shoulder is None or hip is None:
+        return None
+    torso = float(np.median(np.linalg.norm(shoulder - hip, axis=1)))
+    if not torso >= 1e-3:
+        return None
+
+    speed = np.concatenate([[0.0], np.linalg.norm(np.diff(wrist, axis=0), axis=1)]) * fps / torso
+    k = max(1, int(round(SMOOTH_S * fps)))
+    if k > 1:
+        speed = np.convolve(speed, np.ones(k) / k, mode='same')
+    height = (shoulder[:, 1] - wrist[:, 1]) / torso
+
+    peak = int(np.argmax(speed))
+    if speed[peak] < MIN_PEAK_SPEED:
+        return None
+    quiet = speed < QUIET_RATIO * speed[peak]
+    hold = max(1, int(round(HOLD_S * fps)))
+    # address: 정지 구간의 마지막 frame (takeaway 직전), finish: 정지 구간 끝까지
+    address = _quiet_run(quiet & (height < 0), peak, -1, hold)
+    start = 0 if address is None else address[0]
+    finish = _quiet_run(quiet & (height > 0), peak, 1, hold) or _quiet_run(quiet, peak, 1, hold)
+    end = n - 1 if finish is None else finish[1]
+    if not (height[start:end + 1] > 0).any():
+        return None
+
+    margin = int(round((DEFAULT_MARGIN_S if margin_s is None else margin_s) * fps))
+    start, end = max(0, start - margin), min(n, end + 1 + margin)
+    if end - start >= MAX_KEEP_RATIO * n:
+        return None
+    return int(start), int(end)
+
+
+def window_indices(indices, window):
+    """원본 frame index 배열 → window 안 index (window 시작 기준, 첫/마지막 frame 포함)"""
+    import numpy as np
+    start, end = window
+    indices = np.asarray(indices, dtype=np.int64)
+    inside = indices[(indices >= start) & (indices < end)] - start
+    return np.union1d(inside, [0, end - start - 1]).astype(np.int64)
+
+
+def main(argv=None):
+    import argparse
+    from keypoint_track import KeypointSequence
+    parser = argparse.ArgumentParser(description='keypoint track 스윙 구간 검출')
+    parser.add_argument('tracks', nargs='+', help='keypoint track (.kps.npy) 또는 CSV')
+    parser.add_argument('--margin', type=float, default=None, help='앞뒤 여유 (초, 기본 SWING_MARGIN_S)')
+    parser.add_argument('--fps', type=float, default=None, help='track에 fps가 없을 때 (기본 30)')
+    args = parser.parse_args(argv)
+    margin = margin_seconds() if args.margin is None else args.margin
+    for path in args.tracks:
+        seq = KeypointSequence.load(path)
+        fps = seq.fps or args.fps or 30.0
+        window = detect_swing_window(seq.data, fps, margin)
+        rep = {'track': Path(path).name, 'frames': len(seq), 'fps': fps, 'window': list(window) if window else None}
+        if window:
+            rep['seconds'] = [round(window[0] / fps, 2), round(window[1] / fps, 2)]
+        print(json.dumps(rep, ensure_ascii=False)); sys.stdout.flush()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,10 @@
+"""
+resPy 모듈은 스크립트처럼 bare name으로 import하므로 resPy를 sys.path에 추가
+numpy가 필요한 테스트는 pytest.importorskip('numpy') (cv2/OpenPose/torch는 필요 없음)
+"""
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
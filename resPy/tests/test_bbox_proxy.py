@@ -0,0 +1,83 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import bbox_proxy
+from frame_store import FrameView
+
+
+@pytest.fixture(autouse=True)
+def proxy_env(monkeypatch):
+    for name in ('POSE_PROXY_HEIGHT', 'POSE_PROXY_STRIDE', 'POSE_PROXY_NET_HEIGHT'):
+        monkeypatch.delenv(name, raising=False)
+
+
+class Detector:
+    """선택 frame 수만큼, 받은 frame 크기 기준으로 (x = frame index, y = 높이 가운데) 사람 1명을 돌려주는 가짜 backend"""
+    in_process = True
+
+    def __init__(self):
+        self.calls = []
+
+    def detection_variant(self, net_height):
+        self.net_height = net_height
+        return self
+
+    def estimate_people(self, source, frames=None, work_dir=None, phase='pose', portion=(0.0, 1.0), max_people=4):
+        self.calls.append((frames.indices.tolist(), frames.width, frames.height, max_people))
+        kps = np.zeros((len(frames), max_people, 17, 3), dtype=np.float32)
+        kps[:, 0, :, 0] = frames.indices[:, None] * frames.width / 1000.0
+        kps[:, 0, :, 1] = frames.height / 2.0
+        kps[:, 0, :, 2] = 0.9
+        return kps
+
+
+def _view(n, w=640, h=360, fps=60.0):
+    return FrameView(np.zeros((n, h, w, 3), dtype=np.uint8), fps)
+
+
+def test_geometry_scales_to_proxy_height_with_even_size(monkeypatch):
+    assert bbox_proxy.proxy_geometry(1920, 1080, 60.0) == (6, (640, 360), 208)
+    assert bbox_proxy.proxy_geometry(640, 360, 30.0) == (3, (640, 360), 208)
+    monkeypatch.setenv('POSE_PROXY_HEIGHT', '101')
+    stride, size, _ = bbox_proxy.proxy_geometry(1001, 1000, 5.0)
+    assert stride == 1 and size[0] % 2 == 0 and size[1] % 2 == 0
+
+
+def test_proxy_people_samples_every_stride_frames():
+    detector = Detector()
+    kps, indices, info = bbox_proxy.proxy_people(detector, None, view=_view(25), max_people=2)
+    assert indices.tolist() == list(range(0, 25, 6))
+    assert detector.calls == [(indices.tolist(), 640, 360, 2)]
+    assert kps.shape == (len(indices), 2, 17, 3)
+    assert np.allclose(kps[:, 0, 0, 0], indices * 0.64)
+    assert info['stride'] == 6 and info['frames'] == len(indices) and info['net_height'] == 208
+
+
+def test_proxy_keypoints_are_returned_in_source_coordinates(monkeypatch):
+    monkeypatch.setenv('POSE_PROXY_HEIGHT', '180')
+    detector = Detector()
+    kps, indices, info = bbox_proxy.proxy_people(detector, None, view=_view(12, fps=10.0), max_people=2)
+    assert detector.calls[0][1:3] == (320, 180)
+    assert info['size'] == [320, 180] and info['scale'] == 0.5
+    # 축소 frame 기준 좌표 → 원본 (640x360) 좌표
+    assert np.allclose(kps[:, 0, 0, 0], indices * 0.64)
+    assert (kps[:, 0, :, 1] == 180.0).all()
+    # 검출 안 된 사람은 0 그대로
+    assert not kps[:, 1].any()
+
+
+def test_short_detector_output_trims_indices():
+    class Short(Detector):
+        def estimate_people(self, source, **kwargs):
+            return super().estimate_people(source, **kwargs)[:2]
+
+    kps, indices, info = bbox_proxy.proxy_people(Short(), None, view=_view(25), max_people=1)
+    assert len(kps) == len(indices) == info['frames'] == 2
+    assert indices.tolist() == [0, 6]
+
+
+def test_box_metrics():
+    assert bbox_proxy.box_metrics((0, 0, 10, 10), (0, 0, 10, 10)) == {'iou': 1.0, 'coverage': 1.0, 'edge_px': 0}
+    m = bbox_proxy.box_metrics((0, 0, 10, 10), (5, 0, 10, 10))
+    assert m == {'iou': round(50 / 150, 4), 'coverage': 0.5, 'edge_px': 5}
@@ -0,0 +1,91 @@
+import json
+import os
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import frame_store
+import scratch_workspace
+from frame_store import FrameStore, link_view, open_view, release, store_paths, store_workspace_name
+
+
+@pytest.fixture(autouse=True)
+def scratch(tmp_path, monkeypatch):
+    monkeypatch.setenv('SCRATCH_DIR', str(tmp_path / 'ram'))
+    monkeypatch.setenv('SCRATCH_DISK_DIR', str(tmp_path / 'disk'))
+    monkeypatch.setattr(scratch_workspace, '_swept', True)
+    monkeypatch.setattr(scratch_workspace, '_reserved', {})
+    return tmp_path
+
+
+def _store(key, frames=4, w=6, h=5):
+    """ingest 없이 (ffmpeg/cv2 없이) 같은 위치에 store를 만듦"""
+    ws = scratch_workspace.workspace('frames', name=store_workspace_name(key), estimate_bytes=frames * w * h * 3)
+    data_path, meta_path = frame_store._files(ws.path)
+    data = np.arange(frames * h * w * 3, dtype=np.uint64).astype(np.uint8).reshape(frames, h, w, 3)
+    data.tofile(data_path)
+    meta_path.write_text(json.dumps({'frames': frames, 'width': w, 'height': h, 'fps': 30.0}), encoding='utf-8')
+    return ws, data
+
+
+def test_store_lives_in_its_own_scratch_workspace(scratch):
+    ws, data = _store('openpose-X-1-abc')
+    assert ws.in_ram and ws.path.parent == scratch / 'ram'
+    assert scratch_workspace._reserved[ws.name] == data.nbytes
+    assert store_paths('openpose-X-1-abc')[0].parent == ws.path
+    with FrameStore.open(key='openpose-X-1-abc') as store:
+        assert (store.get_batch([1, 3]) == data[[1, 3]]).all()
+    assert store_paths('missing') is None and FrameStore.open(key='missing') is None
+
+
+def test_store_counts_against_ram_quota(scratch, monkeypatch):
+    monkeypatch.setenv('SCRATCH_MAX_MB', str(1.5 * 4 * 6 * 5 * 3 / (1024 * 1024)))
+    _store('first')
+    # 두 번째 store는 RAM quota를 넘으므로 디스크
+    ws, _ = _store('second')
+    assert not ws.in_ram and ws.path.parent == scratch / 'disk'
+
+
+def test_release_by_key_and_by_linked_sidecar(scratch):
+    ws, data = _store('a')
+    video = scratch / 'X_crop.mp4'
+    video.write_bytes(b'video')
+    link_view(video, FrameStore.open(key='a'), crop=(1, 1, 3, 2), window=(1, 3))
+    with open_view(video) as view:
+        assert (view.get_batch([0]) == data[1:2, 1:3, 1:4]).all()
+
+    release(linked=[video])
+    assert not ws.path.exists() and not frame_store._sidecar_path(video).exists()
+    assert open_view(video) is None and 'frames-a' not in scratch_workspace._reserved
+
+    ws, _ = _store('b')
+    release('b')
+    assert not ws.path.exists()
+    release('b')  # 이미 없으면 무시
+
+
+def test_release_ignores_sidecar_outside_frame_store(scratch):
+    other = scratch_workspace.workspace('openpose', 'X')
+    video = scratch / 'X_crop.mp4'
+    video.write_bytes(b'video')
+    frame_store._sidecar_path(video).write_text(json.dumps({'store': str(other.path / 'frames.bgr')}),
+                                                encoding='utf-8')
+    release(linked=[video])
+    assert other.path.is_dir()
+
+
+def test_store_of_dead_process_is_swept(scratch):
+    ws, _ = _store('crashed')
+    owner = json.loads((ws.path / scratch_workspace.OWNER_FILE).read_text(encoding='utf-8'))
+    # SIGKILL 등으로 release()가 불리지 않은 store
+    owner['pid'] = 2 ** 22 + 7
+    while scratch_workspace._pid_alive(owner['pid']):
+        owner['pid'] += 1
+    (ws.path / scratch_workspace.OWNER_FILE).write_text(json.dumps(owner), encoding='utf-8')
+    alive, _ = _store('running')
+
+    removed = scratch_workspace.sweep_orphans()
+    assert removed == [str(ws.path)]
+    assert not ws.path.exists() and alive.path.is_dir()
+    assert os.listdir(scratch / 'ram') == [alive.name]
@@ -0,0 +1,105 @@
+import json
+import os
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from keypoint_track import (COCO_CONNECTIONS, COM_INDICES, JOINT_INDEX, KP, LEGACY_COLS, LEGACY_KP, NUM_KP,
+                            KeypointSequence, _load_sequence_cached, meta_path, save_track, write_keypoints_csv)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    _load_sequence_cached.cache_clear()
+    yield
+    _load_sequence_cached.cache_clear()
+
+
+def _kps(frames, value):
+    kps = np.full((frames, NUM_KP, 3), value, dtype=np.float32)
+    kps[..., 2] = 1.0
+    return kps
+
+
+def test_cached_load_holds_no_memmap(tmp_path):
+    path = save_track(tmp_path / 'X_crop.kps.npy', _kps(4, 10.0), fps=30, width=64, height=64)
+    seq = KeypointSequence.load(path)
+    assert not isinstance(seq.data, np.memmap)
+    assert not seq.data.flags.writeable
+    assert KeypointSequence.load(path) is seq
+
+
+def test_rewrite_and_unlink_while_cached(tmp_path):
+    path = save_track(tmp_path / 'X_crop.kps.npy', _kps(4, 10.0))
+    first = KeypointSequence.load(path)
+
+    # 캐시가 파일을 잡고 있지 않아야 (Windows에서 열린 memmap은 replace/unlink 실패)
+    save_track(path, _kps(6, 20.0))
+    assert _load_sequence_cached.cache_info().currsize == 0
+    second = KeypointSequence.load(path)
+    assert len(second) == 6 and float(second.data[0, 0, 0]) == 20.0
+    assert len(first) == 4
+
+    os.unlink(path)
+    assert not path.exists()
+
+
+def test_cache_is_bounded(tmp_path):
+    maxsize = _load_sequence_cached.cache_info().maxsize
+    paths = [save_track(tmp_path / f'X{i}_crop.kps.npy', _kps(2, float(i))) for i in range(maxsize + 3)]
+    for path in paths:
+        KeypointSequence.load(path)
+    assert _load_sequence_cached.cache_info().currsize <= maxsize
+
+
+def test_joint_order_is_openpose_coco():
+    # pose backend 출력 (OpenPose --model_pose COCO 앞 17개)과 같은 순서
+    assert [JOINT_INDEX[n] for n in ('Nose', 'Neck', 'RShoulder', 'RWrist', 'LShoulder', 'LWrist', 'RHip', 'LHip',
+                                     'REye', 'LEye', 'REar')] == [0, 1, 2, 4, 5, 7, 8, 11, 14, 15, 16]
+    assert len(COCO_CONNECTIONS) == 16 and all(0 <= j < NUM_KP for c in COCO_CONNECTIONS for j in c)
+    assert (JOINT_INDEX['RElbow'], JOINT_INDEX['RWrist']) in COCO_CONNECTIONS
+    assert sorted(KP[j] for j in COM_INDICES) == sorted(['LHip', 'RHip', 'LShoulder', 'RShoulder',
+                                                         'LKnee', 'RKnee', 'LAnkle', 'RAnkle'])
+
+
+def test_legacy_sidecar_joint_names_map_by_position(tmp_path):
+    kps = _kps(3, 1.0)
+    kps[:, JOINT_INDEX['RWrist'], 0] = 42.0
+    path = save_track(tmp_path / 'X_crop.kps.npy', kps)
+    meta = json.loads(meta_path(path).read_text(encoding='utf-8'))
+    assert meta['joints'] == KP
+    # 이전 버전 sidecar는 같은 배열에 MS COCO 이름을 붙였음
+    meta['joints'] = LEGACY_KP
+    meta_path(path).write_text(json.dumps(meta), encoding='utf-8')
+    seq = KeypointSequence.load(path, cached=False)
+    assert seq.joints == KP
+    assert (seq.joint('RWrist')[:, 0] == 42.0).all()
+
+
+def test_csv_round_trip_and_legacy_columns(tmp_path):
+    pd = pytest.importorskip('pandas')
+    kps = _kps(2, 5.0)
+    kps[:, JOINT_INDEX['LWrist'], :2] = (300.0, 400.0)
+    write_keypoints_csv(kps, tmp_path / 'new.csv')
+    assert KeypointSequence.load(tmp_path / 'new.csv').joint('LWrist')[0, :2].tolist() == [300.0, 400.0]
+
+    # 이전 crop_csv: 같은 순서의 값에 MS COCO 이름 컬럼
+    pd.DataFrame(kps.reshape(2, -1), columns=LEGACY_COLS).to_csv(tmp_path / 'old.csv', index=False)
+    seq = KeypointSequence.load(tmp_path / 'old.csv')
+    assert seq.joints == KP
+    assert seq.joint('LWrist')[0, :2].tolist() == [300.0, 400.0]
+
+
+def test_mscoco_index_csv_is_reordered(tmp_path):
+    pd = pytest.importorskip('pandas')
+    cols = {}
+    for i, name in enumerate(LEGACY_KP):
+        cols[f'x_{i}'] = [100.0 + i]
+        cols[f'y_{i}'] = [200.0 + i]
+        cols[f'score_{i}'] = [0.5]
+    pd.DataFrame(cols).to_csv(tmp_path / 'mm.csv', index=False)
+    seq = KeypointSequence.load(tmp_path / 'mm.csv')
+    assert seq.joint('LWrist')[0].tolist() == [100.0 + LEGACY_KP.index('LWrist'), 200.0 + LEGACY_KP.index('LWrist'), 0.5]
+    ls, rs = LEGACY_KP.index('LShoulder'), LEGACY_KP.index('RShoulder')
+    assert seq.joint('Neck')[0].tolist() == [100.0 + (ls + rs) / 2, 200.0 + (ls + rs) / 2, 0.5]
@@ -0,0 +1,105 @@
+import gzip
+import json
+import struct
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import overlay_track
+from keypoint_track import COM_INDICES, NUM_KP, KeypointSequence, save_track
+
+
+def _keypoints(frames, joints, seed=0):
+    rng = np.random.default_rng(seed)
+    kps = np.zeros((frames, joints, 3), dtype=np.float32)
+    kps[..., 0] = rng.uniform(0, 640, (frames, joints))
+    kps[..., 1] = rng.uniform(0, 360, (frames, joints))
+    kps[..., 2] = rng.uniform(0, 1, (frames, joints))
+    return kps
+
+
+def _expected_valid(kps):
+    return (kps[..., 2] > overlay_track.MIN_CONF) & (kps[..., :2] >= 0).all(-1)
+
+
+@pytest.mark.parametrize('joints', [NUM_KP, 8, 5, 1])
+def test_round_trip(tmp_path, joints):
+    kps = _keypoints(23, joints)
+    kps[3] = 0                      # 사람 없는 frame
+    kps[4, 0, :2] = (-5, 10)        # 화면 밖 점은 안 그림
+    path = overlay_track.write_track(kps, tmp_path / 'X_crop_overlay.kpt.gz', fps=60, width=640, height=360,
+                                     start_s=1.5)
+    header, coords, valid = overlay_track.read_track(path)
+
+    assert header['frames'] == 23 and header['joints'] == joints
+    assert header['fps'] == 60.0 and (header['width'], header['height']) == (640, 360)
+    assert header['start_s'] == 1.5
+    assert coords.shape == (23, joints, 2) and valid.shape == (23, joints)
+    expected = _expected_valid(kps)
+    assert (valid == expected).all()
+    assert not valid[3].any() and not valid[4, 0]
+    assert (coords[valid] == np.rint(kps[..., :2][valid])).all()
+    assert (coords[~valid] == 0).all()
+
+
+def test_valid_bits_are_lsb_first_per_frame():
+    # 관절 수가 8의 배수가 아니면 frame마다 마지막 byte의 남는 bit는 0
+    kps = np.zeros((2, 11, 3), dtype=np.float32)
+    kps[..., :2] = 10
+    kps[0, [0, 9], 2] = 1.0
+    kps[1, [7, 10], 2] = 1.0
+    data = overlay_track.encode(kps, fps=30, width=100, height=100)
+    (head_len,) = struct.unpack_from('<I', data, 4)
+    bits = data[8 + head_len + 2 * 11 * 4:]
+    assert list(bits) == [0b00000001, 0b00000010, 0b10000000, 0b00000100]
+
+
+def test_layout_matches_header(tmp_path):
+    path = overlay_track.write_track(_keypoints(5, NUM_KP), tmp_path / 'a.kpt.gz', fps=30, width=640, height=360)
+    with gzip.open(path, 'rb') as f:
+        data = f.read()
+    assert data[:4] == overlay_track.MAGIC
+    (head_len,) = struct.unpack_from('<I', data, 4)
+    header = json.loads(data[8:8 + head_len])
+    assert header['format'] == overlay_track.FORMAT and header['version'] == overlay_track.FORMAT_VERSION
+    assert header['coords'] == 'int16' and header['valid'] == 'bits'
+    assert header['com_joints'] == COM_INDICES and len(header['connections']) == 16
+    assert len(data) == 8 + head_len + 5 * NUM_KP * 4 + 5 * 3
+
+
+def test_track_file_uses_metadata_and_normalized_coords(tmp_path):
+    kps = _keypoints(6, NUM_KP)
+    kps[..., 0] /= 640
+    kps[..., 1] /= 360
+    track = save_track(tmp_path / 'X_crop.kps.npy', kps, fps=25, width=640, height=360, coord_space='normalized')
+    header, coords, valid = overlay_track.read_track(overlay_track.write_track(track, tmp_path / 'X.kpt.gz'))
+    assert header['fps'] == 25.0 and (header['width'], header['height']) == (640, 360)
+    assert header['names'] == KeypointSequence.load(track).joints
+    px = np.rint(kps[..., :2] * (640, 360))
+    assert (np.abs(coords[valid] - px[valid]) <= 1).all()
+
+
+def test_rejects_other_files_and_newer_versions(tmp_path):
+    bad = tmp_path / 'bad.kpt.gz'
+    with gzip.open(bad, 'wb') as f:
+        f.write(b'NOPE' + bytes(8))
+    with pytest.raises(ValueError, match='not an overlay track'):
+        overlay_track.read_track(bad)
+
+    head = json.dumps({'version': overlay_track.FORMAT_VERSION + 1, 'frames': 0, 'joints': 17}).encode()
+    newer = tmp_path / 'newer.kpt.gz'
+    with gzip.open(newer, 'wb') as f:
+        f.write(overlay_track.MAGIC + struct.pack('<I', len(head)) + head)
+    with pytest.raises(ValueError, match='newer'):
+        overlay_track.read_track(newer)
+
+
+def test_overlay_mode(monkeypatch):
+    monkeypatch.delenv('OVERLAY_MODE', raising=False)
+    assert overlay_track.overlay_mode() == 'video'
+    monkeypatch.setenv('OVERLAY_MODE', 'data')
+    assert overlay_track.overlay_mode() == 'data'
+    assert overlay_track.overlay_mode('video') == 'video'
+    with pytest.raises(ValueError):
+        overlay_track.overlay_mode('canvas')
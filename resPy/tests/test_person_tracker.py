@@ -0,0 +1,77 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from keypoint_track import JOINT_INDEX
+from person_tracker import MAX_GAP, PersonTracker, track_people
+
+WRISTS = [JOINT_INDEX['RWrist'], JOINT_INDEX['LWrist']]
+
+
+def _person(x, y, h=100.0, wave=0.0):
+    """x, y 근처에 선 사람 (17, 3), wave: 손목을 옮겨 motion energy를 만듦"""
+    kps = np.zeros((17, 3), dtype=np.float32)
+    kps[:, 0] = x + np.linspace(-20, 20, 17)
+    kps[:, 1] = y + np.linspace(0, h, 17)
+    kps[:, 2] = 0.9
+    kps[WRISTS, 0] += wave
+    return kps
+
+
+def _ids(tracker):
+    return sorted(t.id for t in tracker.tracks())
+
+
+def test_same_person_keeps_id():
+    tracker = PersonTracker()
+    for f in range(10):
+        tracker.update(f, _person(100 + f, 50))
+    assert _ids(tracker) == [0]
+    assert tracker.tracks()[0].hits == 10
+
+
+def test_id_survives_gap_up_to_max_gap():
+    tracker = PersonTracker()
+    tracker.update(0, _person(100, 50))
+    # 가려져서 검출 없음 (빈 frame)
+    for f in range(1, MAX_GAP):
+        tracker.update(f, np.zeros((17, 3), dtype=np.float32))
+    tracker.update(MAX_GAP, _person(102, 50))
+    assert _ids(tracker) == [0]
+    track = tracker.tracks()[0]
+    assert (track.first, track.last, track.hits) == (0, MAX_GAP, 2)
+
+
+def test_track_expires_after_max_gap():
+    tracker = PersonTracker()
+    tracker.update(0, _person(100, 50))
+    tracker.update(MAX_GAP + 1, _person(100, 50))
+    assert _ids(tracker) == [0, 1]
+    assert [t.id for t in tracker.finished] == [0]
+    assert [t.id for t in tracker.active] == [1]
+
+
+def test_gap_is_measured_in_frame_index_not_samples():
+    # stride/proxy: sample 수는 적어도 frame index 간격이 max_gap을 넘으면 종료
+    tracker = PersonTracker(max_gap=5)
+    tracker.update(0, _person(100, 50))
+    tracker.update(5, _person(100, 50))
+    tracker.update(11, _person(100, 50))
+    assert [t.id for t in tracker.finished] == [0]
+    assert tracker.finished[0].last == 5
+
+
+def test_two_people_keep_separate_ids():
+    tracker = PersonTracker()
+    for f in range(8):
+        tracker.update(f, np.stack([_person(100, 50), _person(400 - f, 50)]))
+    assert _ids(tracker) == [0, 1]
+    assert all(t.hits == 8 for t in tracker.tracks())
+
+
+def test_golfer_is_the_moving_person():
+    seq = [np.stack([_person(400, 50), _person(100, 50, wave=10.0 * (f % 4))]) for f in range(20)]
+    tracker = track_people(seq, keep_history=True)
+    golfer = tracker.golfer()
+    assert golfer.energy > 0
+    assert abs(float(golfer.kps[0, 0]) - 80.0) < 1e-3
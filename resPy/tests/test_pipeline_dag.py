@@ -0,0 +1,102 @@
+import threading
+
+import pytest
+
+from pipeline_dag import Stage, run_stage_graph
+
+
+def _recording_graph(log, fail=None):
+    """a → (b, c) → d, fail: 예외를 던질 stage 이름"""
+    lock = threading.Lock()
+
+    def make(name):
+        def fn(done):
+            with lock:
+                log.append((name, sorted(done)))
+            if name == fail:
+                raise RuntimeError(f'{name} failed')
+            return name.upper()
+        return fn
+
+    return [
+        Stage('a', make('a')),
+        Stage('b', make('b'), deps=('a',)),
+        Stage('c', make('c'), deps=('a',)),
+        Stage('d', make('d'), deps=('b', 'c')),
+    ]
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_stages_run_after_their_deps(workers):
+    log = []
+    results = run_stage_graph(_recording_graph(log), max_workers=workers)
+    assert results == {'a': 'A', 'b': 'B', 'c': 'C', 'd': 'D'}
+    seen = dict(log)
+    assert seen['a'] == []
+    assert 'a' in seen['b'] and 'a' in seen['c']
+    assert {'a', 'b', 'c'} <= set(seen['d'])
+    assert [name for name, _ in log][0] == 'a' and [name for name, _ in log][-1] == 'd'
+
+
+def test_independent_stages_run_concurrently():
+    both_started = threading.Barrier(2, timeout=5)
+
+    def fn(done):
+        both_started.wait()    # 순차 실행이면 timeout으로 BrokenBarrierError
+        return True
+
+    results = run_stage_graph([Stage('x', fn), Stage('y', fn)], max_workers=2)
+    assert results == {'x': True, 'y': True}
+
+
+def test_failure_propagates_first_error_and_events():
+    log, events = [], []
+    with pytest.raises(RuntimeError, match='b failed'):
+        run_stage_graph(_recording_graph(log, fail='b'), max_workers=1,
+                        on_event=lambda name, ev: events.append((name, ev)))
+    assert ('b', 'fail') in events
+    assert ('a', 'done') in events
+
+
+def test_dependents_of_failed_stage_are_skipped():
+    log = []
+    with pytest.raises(RuntimeError):
+        run_stage_graph(_recording_graph(log, fail='a'), max_workers=4)
+    assert [name for name, _ in log] == ['a']
+
+
+def test_running_sibling_finishes_before_error_is_raised():
+    release = threading.Event()
+    finished = []
+
+    def slow(done):
+        release.wait(5)
+        finished.append('slow')
+        return 'slow'
+
+    def boom(done):
+        release.set()
+        raise ValueError('boom')
+
+    with pytest.raises(ValueError, match='boom'):
+        run_stage_graph([Stage('slow', slow), Stage('boom', boom),
+                         Stage('after', lambda d: finished.append('after'), deps=('slow',))], max_workers=2)
+    # 실행 중이던 stage는 끝까지 기다리지만, 에러 뒤에 ready가 된 stage는 시작하지 않음
+    assert finished == ['slow']
+
+
+def test_callback_errors_do_not_fail_the_run():
+    def bad_callback(name, event):
+        raise RuntimeError('callback')
+
+    assert run_stage_graph([Stage('a', lambda d: 1)], on_event=bad_callback) == {'a': 1}
+
+
+@pytest.mark.parametrize('stages, message', [
+    ([Stage('a', None, deps=('b',)), Stage('b', None, deps=('a',))], 'cycle'),
+    ([Stage('a', None, deps=('missing',))], 'unknown'),
+    ([Stage('a', None), Stage('a', None)], 'duplicate'),
+])
+def test_invalid_graphs_are_rejected(stages, message):
+    with pytest.raises(ValueError, match=message):
+        run_stage_graph(stages)
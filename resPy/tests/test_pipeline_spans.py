@@ -0,0 +1,83 @@
+import json
+import time
+
+import pytest
+
+import pipeline_spans
+from pipeline_dag import Stage, run_stage_graph
+from pipeline_spans import SpanRecorder, recording, span
+
+
+@pytest.fixture(autouse=True)
+def metrics_file(tmp_path, monkeypatch):
+    path = tmp_path / 'metrics.jsonl'
+    monkeypatch.setenv('PIPELINE_METRICS_FILE', str(path))
+    return path
+
+
+def _busy(seconds):
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < seconds:
+        pass
+
+
+def test_concurrent_stage_cpu_is_not_shared():
+    recorder = SpanRecorder()
+
+    def busy(done):
+        with span('busy'):
+            _busy(0.3)
+
+    def idle(done):
+        with span('idle'):
+            time.sleep(0.3)
+
+    with recording(recorder):
+        run_stage_graph([Stage('busy', busy), Stage('idle', idle)], max_workers=2)
+    spans = {s['name']: s for s in recorder.summary()['spans']}
+    assert spans['busy']['cpu_s'] > 0.1
+    # 프로세스 CPU였다면 busy stage 몫이 idle stage에도 잡힘
+    assert spans['idle']['cpu_s'] < 0.05
+
+
+def test_process_usage_is_reported_once_per_run(metrics_file):
+    recorder = SpanRecorder(meta={'video': 'X.mp4'})
+    with recording(recorder):
+        with span('a'):
+            pass
+        with span('b'):
+            pass
+    summary = recorder.summary()
+    for s in summary['spans']:
+        assert not {'child_cpu_s', 'peak_rss_mb', 'child_peak_rss_mb'} & set(s)
+    assert set(summary['process']) == {'cpu_s', 'child_cpu_s', 'peak_rss_mb', 'child_peak_rss_mb'}
+
+    recorder.flush_metrics()
+    lines = [json.loads(line) for line in metrics_file.read_text(encoding='utf-8').splitlines()]
+    assert [r['name'] for r in lines] == ['a', 'b', 'process']
+    assert all(r['run_id'] == recorder.run_id and r['video'] == 'X.mp4' for r in lines)
+    assert 'process' in lines[-1] and 'process' not in lines[0]
+
+
+def test_span_nesting_and_errors():
+    recorder = SpanRecorder()
+    with recording(recorder):
+        with span('outer') as outer:
+            outer.frames = 10
+            with pytest.raises(KeyError):
+                with span('inner'):
+                    pipeline_spans.annotate(resumed=True)
+                    raise KeyError('x')
+    spans = {s['name']: s for s in recorder.summary()['spans']}
+    assert spans['inner']['parent'] == 'outer'
+    assert spans['inner']['status'] == 'error' and 'KeyError' in spans['inner']['error']
+    assert spans['inner']['extra'] == {'resumed': True}
+    assert spans['outer']['frames'] == 10 and spans['outer']['status'] == 'ok'
+
+
+def test_standalone_span_appends_to_metrics(metrics_file):
+    with span('cli'):
+        pass
+    rec = json.loads(metrics_file.read_text(encoding='utf-8').splitlines()[-1])
+    assert rec['name'] == 'cli' and rec['parent'] is None
+    assert 'pid' in rec and 'cpu_s' in rec['process']
@@ -0,0 +1,178 @@
+import os
+import threading
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import pose_chunks
+import result_cache
+from pose_chunks import (CHUNKS_PER_WORKER, ChunkCheckpoint, derive_key, plan_chunks, remember_source, run_chunked,
+                         source_key)
+
+
+@pytest.fixture(autouse=True)
+def checkpoint_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv('POSE_CHECKPOINT_DIR', str(tmp_path / 'ckpt'))
+
+
+class Runner:
+    """frame index를 값으로 갖는 (end - start, 1) 배열을 돌려주는 가짜 pose worker"""
+
+    def __init__(self, fail=()):
+        self.fail = dict.fromkeys(fail, 1)   # start → 남은 실패 횟수
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, start, end, slot, on_frames):
+        with self.lock:
+            self.calls.append(start)
+            failing = self.fail.get(start, 0) > 0
+            if failing:
+                self.fail[start] -= 1
+        on_frames((end - start) // 2)
+        if failing:
+            raise RuntimeError('OpenPose crashed')
+        return np.arange(start, end, dtype=np.float32)[:, None]
+
+
+def _frames(out):
+    return out[:, 0].astype(int).tolist()
+
+
+@pytest.mark.parametrize('n_frames', [1, 149, 150, 151, 299, 300, 1000, 1237])
+@pytest.mark.parametrize('workers', [1, 2, 3, 4])
+def test_plan_covers_all_frames_without_gaps(n_frames, workers):
+    chunks = plan_chunks(n_frames, workers=workers, min_frames=150)
+    assert chunks[0][0] == 0 and chunks[-1][1] == n_frames
+    assert all(a[1] == b[0] for a, b in zip(chunks, chunks[1:]))
+    assert all(end > start for start, end in chunks)
+    assert len(chunks) <= max(1, workers * CHUNKS_PER_WORKER if workers > 1 else 1)
+    if len(chunks) > 1:
+        assert min(end - start for start, end in chunks) >= 150
+
+
+def test_plan_single_worker_and_empty_video():
+    assert plan_chunks(1000, workers=1, min_frames=150) == [(0, 1000)]
+    assert plan_chunks(0, workers=4, min_frames=150) == [(0, 0)]
+
+
+def test_chunks_are_concatenated_in_frame_order():
+    chunks = plan_chunks(1000, workers=4, min_frames=100)
+    runner = Runner()
+    progress = []
+    out = run_chunked(runner, chunks, workers=4, on_progress=progress.append)
+    assert _frames(out) == list(range(1000))
+    assert sorted(runner.calls) == [s for s, _ in chunks]
+    assert progress[-1] == 1000
+
+
+def test_failed_chunk_is_retried_alone():
+    chunks = plan_chunks(800, workers=2, min_frames=100)
+    runner = Runner(fail=[chunks[1][0]])
+    checkpoint = ChunkCheckpoint('retry')
+    out = run_chunked(runner, chunks, workers=2, checkpoint=checkpoint)
+    assert _frames(out) == list(range(800))
+    # 실패한 chunk만 두 번, 나머지는 한 번
+    assert runner.calls.count(chunks[1][0]) == 2
+    assert all(runner.calls.count(s) == 1 for s, _ in chunks if s != chunks[1][0])
+
+
+def test_chunk_failing_every_attempt_raises():
+    chunks = plan_chunks(400, workers=2, min_frames=100)
+    runner = Runner()
+    runner.fail[chunks[0][0]] = 5
+    with pytest.raises(RuntimeError, match='failed after 2 attempts'):
+        run_chunked(runner, chunks, workers=2, retries=1)
+
+
+def test_resume_from_checkpoint_runs_only_missing_chunks():
+    chunks = plan_chunks(1000, workers=2, min_frames=100)
+    bad = chunks[2][0]
+    first = Runner()
+    first.fail[bad] = 2
+    with pytest.raises(RuntimeError):
+        run_chunked(first, chunks, workers=2, checkpoint=ChunkCheckpoint('resume'), retries=1)
+
+    # 나머지 chunk는 끝까지 실행되어 checkpoint에 남음
+    saved = [s for s, e in chunks if ChunkCheckpoint('resume').load(s, e) is not None]
+    assert saved == [s for s, _ in chunks if s != bad]
+
+    # 프로세스가 죽은 뒤 같은 key로 다시 실행 → 실패한 chunk만 실행
+    second = Runner()
+    out = run_chunked(second, chunks, workers=2, checkpoint=ChunkCheckpoint('resume'))
+    assert _frames(out) == list(range(1000))
+    assert second.calls == [bad]
+
+
+def test_last_chunk_may_be_shorter_than_planned():
+    # frame 수 추정이 넘친 경우: 마지막 chunk는 비디오 끝에서 멈춤
+    chunks = [(0, 100), (100, 200)]
+    checkpoint = ChunkCheckpoint('short')
+
+    def run_chunk(start, end, slot, on_frames):
+        end = min(end, 180)
+        return np.arange(start, end, dtype=np.float32)[:, None]
+
+    out = run_chunked(run_chunk, chunks, workers=2, checkpoint=checkpoint)
+    assert _frames(out) == list(range(180))
+    assert len(checkpoint.load(100, 200, exact=False)) == 80
+
+
+def test_short_middle_chunk_is_an_error():
+    def run_chunk(start, end, slot, on_frames):
+        return np.zeros((10, 1), dtype=np.float32)
+
+    with pytest.raises(RuntimeError, match='returned 10 frames'):
+        run_chunked(run_chunk, [(0, 100), (100, 200)], workers=1, retries=0)
+
+
+def test_truncated_checkpoint_is_ignored():
+    checkpoint = ChunkCheckpoint('truncated')
+    checkpoint.save(0, 100, np.zeros((40, 1), dtype=np.float32))
+    assert checkpoint.load(0, 100) is None
+    checkpoint.clear()
+    assert not checkpoint.dir.exists()
+
+
+def test_registered_source_is_not_hashed(tmp_path, monkeypatch):
+    video = tmp_path / 'X_reencoded.mp4'
+    video.write_bytes(b'reencoded' * 100)
+    key = derive_key('upload-digest', rendition='reencoded', preset='veryfast')
+    remember_source(video, key)
+
+    def no_hash(path, *args, **kwargs):
+        raise AssertionError(f'hashed {path}')
+    monkeypatch.setattr(result_cache, 'hash_file', no_hash)
+    assert source_key(video) == key
+    assert ChunkCheckpoint.for_video(video, {'phase': 'a'}).dir == ChunkCheckpoint.for_video(video, {'phase': 'a'}).dir
+    assert ChunkCheckpoint.for_video(video, {'phase': 'a'}).dir != ChunkCheckpoint.for_video(video, {'phase': 'b'}).dir
+
+
+def test_changed_or_unregistered_file_is_hashed(tmp_path):
+    video = tmp_path / 'X_crop.mp4'
+    video.write_bytes(b'crop')
+    assert source_key(video) is None
+    assert source_key(video, compute=True) == result_cache.hash_file(video)
+    remember_source(video, 'registered')
+    # 내용이 바뀌면 (size/mtime) 등록은 무시
+    video.write_bytes(b'crop, rewritten')
+    os.utime(video, ns=(1, 1))
+    assert source_key(video) is None
+
+
+def test_derive_key_depends_on_every_part():
+    assert derive_key('a', crop=[1, 2, 3, 4]) == derive_key('a', crop=[1, 2, 3, 4])
+    assert derive_key('a', crop=[1, 2, 3, 4]) != derive_key('a', crop=[1, 2, 3, 5])
+    assert derive_key('a', crop=None) != derive_key('b', crop=None)
+
+
+def test_registry_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(pose_chunks, '_source_keys', {})
+    for i in range(pose_chunks.SOURCE_KEYS_MAX + 5):
+        path = tmp_path / f'{i}.mp4'
+        path.write_bytes(b'x')
+        remember_source(path, str(i))
+    assert len(pose_chunks._source_keys) == pose_chunks.SOURCE_KEYS_MAX
+    assert source_key(tmp_path / '0.mp4') is None
+    assert source_key(tmp_path / f'{pose_chunks.SOURCE_KEYS_MAX + 4}.mp4') == str(pose_chunks.SOURCE_KEYS_MAX + 4)
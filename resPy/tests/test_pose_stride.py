@@ -0,0 +1,81 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from pose_stride import interpolate_keypoints, select_frames, stride_params
+
+
+def _samples(xs, conf=0.9):
+    """sample마다 관절 1개 (x, x + 100, conf)"""
+    kps = np.zeros((len(xs), 1, 3), dtype=np.float32)
+    kps[:, 0, 0] = xs
+    kps[:, 0, 1] = np.asarray(xs, dtype=np.float32) + 100
+    kps[:, 0, 2] = conf
+    return kps
+
+
+def test_linear_between_samples_and_exact_at_samples():
+    out = interpolate_keypoints(_samples([0, 10, 40]), [0, 10, 20], 21)
+    assert out.shape == (21, 1, 3)
+    assert out[:, 0, 0].tolist() == list(range(11)) + list(range(13, 41, 3))
+    assert (out[[0, 10, 20], 0, 0] == [0, 10, 40]).all()
+    assert (out[:, 0, 1] == out[:, 0, 0] + 100).all()
+
+
+def test_frames_after_last_sample_hold_last_value():
+    # 외삽하면 frame 29에서 x = 29
+    out = interpolate_keypoints(_samples([0, 10]), [0, 10], 30)
+    assert (out[10:, 0, 0] == 10).all()
+    assert (out[10:, 0, 2] == np.float32(0.9)).all()
+
+
+def test_frames_before_first_sample_hold_first_value():
+    out = interpolate_keypoints(_samples([5, 15]), [4, 14], 16)
+    assert (out[:5, 0, 0] == 5).all()
+    assert (out[14:, 0, 0] == 15).all()
+    assert out[9, 0, 0] == 10
+
+
+def test_single_sample_fills_every_frame():
+    out = interpolate_keypoints(_samples([7]), [3], 6)
+    assert (out[:, 0, 0] == 7).all()
+
+
+def test_joint_missing_on_one_side_uses_nearest_sample():
+    kps = _samples([0, 10, 20])
+    kps[1, 0] = 0                     # 가운데 sample에서 검출 안 됨
+    out = interpolate_keypoints(kps, [0, 10, 20], 21)
+    assert out[3, 0].tolist() == [0, 100, np.float32(0.9)]
+    assert (out[6:15, 0] == 0).all()
+    assert out[17, 0, 0] == 20
+
+
+def test_no_samples_is_all_missing():
+    out = interpolate_keypoints(np.zeros((0, 17, 3), dtype=np.float32), [], 5)
+    assert out.shape == (5, 17, 3) and not out.any()
+
+
+def test_select_frames_keeps_ends_and_dense_motion():
+    scores = np.zeros(100, dtype=np.float32)
+    scores[50:55] = 10.0
+    picks = select_frames(scores, min_stride=1, max_stride=4, quantile=0.95, pad=2)
+    assert picks[0] == 0 and picks[-1] == 99
+    assert (np.diff(picks) > 0).all()
+    assert set(range(49, 57)) <= set(picks.tolist())
+    assert np.diff(picks[:10]).tolist() == [4] * 9
+
+
+def test_select_frames_full_rate_when_max_stride_is_one():
+    assert select_frames(np.ones(7), max_stride=1).tolist() == list(range(7))
+    assert len(select_frames([])) == 0
+
+
+def test_stride_params_default_follows_fps(monkeypatch):
+    for name in ('POSE_STRIDE_MIN', 'POSE_STRIDE_MAX', 'POSE_STRIDE_QUANTILE'):
+        monkeypatch.delenv(name, raising=False)
+    assert stride_params(240) == (1, 8, 0.7)
+    assert stride_params(30) == (1, 1, 0.7)
+    monkeypatch.setenv('POSE_STRIDE_MIN', '3')
+    monkeypatch.setenv('POSE_STRIDE_MAX', '2')
+    monkeypatch.setenv('POSE_STRIDE_QUANTILE', '1.5')
+    assert stride_params(240) == (3, 3, 1.0)
@@ -0,0 +1,136 @@
+import json
+import os
+
+import pytest
+
+import result_cache
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    root = tmp_path / 'cache'
+    monkeypatch.setenv('RESULT_CACHE_DIR', str(root))
+    return root
+
+
+@pytest.fixture
+def run(tmp_path):
+    """한 번 실행한 파이프라인의 산출물 + result dict"""
+    work = tmp_path / 'run'
+    angle_dir = work / 'angle'
+    angle_dir.mkdir(parents=True)
+    crop = work / 'X_crop.mp4'
+    crop.write_bytes(b'crop-video' * 10)
+    kps = work / 'X_crop.kps.npy'
+    kps.write_bytes(b'keypoints')
+    (work / 'X_crop.kps.json').write_text('{"fps": 30}', encoding='utf-8')
+    (angle_dir / 'X_angles.json').write_text('{"angles": []}', encoding='utf-8')
+    result = {
+        'user_id': '7',
+        'status': 'success',
+        'mlp_result': {'pred': 1},
+        'crop_video': str(crop),
+        'crop_keypoints': str(kps),
+        'angle_json': 'X_angles.json',
+        'embedding_stgcn': str(work / 'missing.npy'),    # 없는 산출물은 건너뜀
+    }
+    return result, {'angle': angle_dir}, crop
+
+
+def _targets(root):
+    return {key: root / f'Y_{fname}' for key, fname in result_cache.ARTIFACTS.items()}
+
+
+def test_miss_for_unknown_key(cache_dir):
+    assert result_cache.lookup('ab' * 32) is None
+
+
+def test_hit_materializes_artifacts_under_new_names(cache_dir, run, tmp_path):
+    result, dirs, crop = run
+    key = result_cache.cache_key('video-digest', fingerprint='fp')
+    result_cache.store(key, result, dirs)
+
+    entry = result_cache.lookup(key)
+    assert entry is not None
+    assert set(entry['artifacts']) == {'crop_video', 'crop_keypoints', 'angle_json'}
+
+    out = tmp_path / 'second'
+    targets = _targets(out)
+    res = result_cache.materialize(entry, targets, user_id='9')
+    assert res['user_id'] == '9'
+    assert res['mlp_result'] == {'pred': 1}
+    assert res['crop_video'] == str(targets['crop_video'])
+    assert targets['crop_video'].read_bytes() == crop.read_bytes()
+    # angle_json은 파일명만, sidecar도 같이 link, 캐시에 없던 산출물은 None
+    assert res['angle_json'] == targets['angle_json'].name
+    assert json.loads(result_cache.SIDECARS['crop_keypoints'](targets['crop_keypoints']).read_text()) == {'fps': 30}
+    assert res['embedding_stgcn'] is None and res['overlay_track'] is None
+
+
+def test_store_is_idempotent(cache_dir, run):
+    result, dirs, _ = run
+    key = result_cache.cache_key('video-digest', fingerprint='fp')
+    result_cache.store(key, result, dirs)
+    result_cache.store(key, dict(result, status='other'), dirs)
+    assert result_cache.lookup(key)['result']['status'] == 'success'
+
+
+def test_evicts_entry_when_linked_artifact_is_rewritten(cache_dir, run):
+    result, dirs, crop = run
+    key = result_cache.cache_key('video-digest', fingerprint='fp')
+    result_cache.store(key, result, dirs)
+    entry_dir = result_cache._entry_dir(key)
+    # hardlink면 원본을 제자리에서 덮어쓰면 캐시 쪽 파일도 바뀜 (복사였다면 캐시 파일을 직접 바꿈)
+    cached = entry_dir / result_cache.ARTIFACTS['crop_video']
+    with open(cached, 'r+b') as f:
+        f.write(b'changed-and-longer' * 20)
+
+    assert result_cache.lookup(key) is None
+    assert not entry_dir.exists()
+
+
+def test_evicts_entry_when_only_mtime_changes(cache_dir, run):
+    result, dirs, _ = run
+    key = result_cache.cache_key('video-digest', fingerprint='fp')
+    result_cache.store(key, result, dirs)
+    entry_dir = result_cache._entry_dir(key)
+    cached = entry_dir / result_cache.ARTIFACTS['angle_json']
+    st = cached.stat()
+    os.utime(cached, ns=(st.st_atime_ns, st.st_mtime_ns + 5_000_000_000))
+
+    assert result_cache.lookup(key) is None
+    assert not entry_dir.exists()
+
+
+def test_missing_artifact_ignores_entry(cache_dir, run):
+    result, dirs, _ = run
+    key = result_cache.cache_key('video-digest', fingerprint='fp')
+    result_cache.store(key, result, dirs)
+    (result_cache._entry_dir(key) / result_cache.ARTIFACTS['crop_keypoints']).unlink()
+    assert result_cache.lookup(key) is None
+
+
+def test_cache_key_depends_on_video_fingerprint_and_options():
+    base = result_cache.cache_key('v', fingerprint='fp')
+    assert base == result_cache.cache_key('v', fingerprint='fp')
+    assert base != result_cache.cache_key('w', fingerprint='fp')
+    assert base != result_cache.cache_key('v', fingerprint='fp2')
+    assert base != result_cache.cache_key('v', fingerprint='fp', options={'overlay_mode': 'data'})
+
+
+def test_fingerprint_changes_with_pipeline_settings(cache_dir, monkeypatch):
+    monkeypatch.delenv('SWING_TRIM', raising=False)
+    before = result_cache.pipeline_fingerprint()
+    monkeypatch.setenv('SWING_TRIM', '0')
+    assert result_cache.pipeline_fingerprint() != before
+
+
+def test_file_digest_memo_tracks_content(cache_dir, tmp_path):
+    path = tmp_path / 'model.pth'
+    path.write_bytes(b'weights-v1')
+    first = result_cache.file_digest(path)
+    assert first == result_cache.hash_file(path)
+    assert (cache_dir / 'digests.json').exists()
+    path.write_bytes(b'weights-v2-longer')
+    assert result_cache.file_digest(path) == result_cache.hash_file(path) != first
+    assert result_cache.file_digest(tmp_path / 'absent.pth') is None
@@ -0,0 +1,122 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from stage_manifest import MANIFEST_VERSION, StageManifest, run_stage_cached
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    # fingerprint의 file_digest memo가 resPy/cache에 쓰지 않도록
+    monkeypatch.setenv('RESULT_CACHE_DIR', str(tmp_path / 'cache'))
+
+
+@pytest.fixture
+def artifact(tmp_path):
+    path = tmp_path / 'out' / 'X_crop.mp4'
+    path.parent.mkdir()
+    path.write_bytes(b'crop')
+    return path
+
+
+def _run(manifest, fingerprint, value, calls, outputs):
+    def fn():
+        calls.append(1)
+        return value
+    return run_stage_cached(manifest, 'openpose', fn, fingerprint, outputs_of=lambda v: outputs)
+
+
+def test_resume_from_a_new_manifest_instance_skips_stage(tmp_path, artifact):
+    path = tmp_path / 'manifest' / 'X.json'
+    calls = []
+    first = StageManifest(path)
+    fp = first.fingerprint(1, sources=['pipeline_dag.py'], inputs=[artifact], config={'stride': 2})
+    _run(first, fp, {'crop_video': str(artifact)}, calls, [artifact])
+    assert calls == [1]
+
+    # 프로세스가 죽은 뒤 다시 실행: 디스크의 manifest만으로 재개
+    second = StageManifest(path)
+    assert second.fingerprint(1, sources=['pipeline_dag.py'], inputs=[artifact], config={'stride': 2}) == fp
+    assert _run(second, fp, 'unused', calls, [artifact]) == {'crop_video': str(artifact)}
+    assert calls == [1]
+
+
+def test_path_values_round_trip_as_strings(tmp_path, artifact):
+    path = tmp_path / 'X.json'
+    value = {'crop_video': artifact, 'keypoints': [artifact.with_suffix('.kps.npy')], 'frames': 3, 'meta': None}
+    manifest = StageManifest(path)
+    manifest.record('openpose', 'fp', outputs=[artifact], value=value)
+
+    expected = {'crop_video': str(artifact), 'keypoints': [str(artifact.with_suffix('.kps.npy'))],
+                'frames': 3, 'meta': None}
+    for m in (manifest, StageManifest(path)):
+        hit, restored = m.lookup('openpose', 'fp')
+        assert hit
+        assert restored == expected
+        # 호출 측은 Path(...)로 다시 감싸서 씀
+        assert Path(restored['crop_video']) == artifact
+    assert json.loads(path.read_text(encoding='utf-8'))['stages']['openpose']['value'] == expected
+
+
+def test_changed_fingerprint_reruns(tmp_path, artifact):
+    manifest = StageManifest(tmp_path / 'X.json')
+    calls = []
+    fp1 = manifest.fingerprint(1, inputs=[artifact], config={'stride': 2})
+    _run(manifest, fp1, 'a', calls, [artifact])
+    fp2 = manifest.fingerprint(1, inputs=[artifact], config={'stride': 3})
+    assert fp2 != fp1
+    assert _run(manifest, fp2, 'b', calls, [artifact]) == 'b'
+    assert manifest.fingerprint(2, inputs=[artifact], config={'stride': 3}) != fp2
+    assert len(calls) == 2
+
+
+def test_changed_input_content_changes_fingerprint(tmp_path, artifact):
+    manifest = StageManifest(tmp_path / 'X.json')
+    before = manifest.fingerprint(1, inputs=[artifact])
+    artifact.write_bytes(b'different crop bytes')
+    assert manifest.fingerprint(1, inputs=[artifact]) != before
+
+
+@pytest.mark.parametrize('change', ['rewrite', 'delete'])
+def test_changed_or_missing_output_reruns(tmp_path, artifact, change):
+    manifest = StageManifest(tmp_path / 'X.json')
+    calls = []
+    _run(manifest, 'fp', 'a', calls, [artifact])
+    if change == 'rewrite':
+        artifact.write_bytes(b'crop, but re-encoded')
+    else:
+        artifact.unlink()
+    assert manifest.lookup('openpose', 'fp') == (False, None)
+    _run(manifest, 'fp', 'b', calls, [artifact])
+    assert len(calls) == 2
+
+
+def test_should_record_false_is_not_resumed(tmp_path):
+    manifest = StageManifest(tmp_path / 'X.json')
+    value = run_stage_cached(manifest, 'mlp', lambda: {'error': 'soft'}, 'fp',
+                             should_record=lambda v: not v.get('error'))
+    assert value == {'error': 'soft'}
+    assert manifest.lookup('mlp', 'fp') == (False, None)
+
+
+def test_invalidate_forgets_stage(tmp_path):
+    path = tmp_path / 'X.json'
+    manifest = StageManifest(path)
+    manifest.record('angles', 'fp', value=1)
+    manifest.invalidate('angles')
+    assert StageManifest(path).lookup('angles', 'fp') == (False, None)
+
+
+@pytest.mark.parametrize('content', ['not json', json.dumps({'version': MANIFEST_VERSION + 1, 'stages': {'a': {}}})])
+def test_unreadable_or_newer_manifest_starts_fresh(tmp_path, content):
+    path = tmp_path / 'X.json'
+    path.write_text(content, encoding='utf-8')
+    assert StageManifest(path).data['stages'] == {}
+
+
+def test_no_manifest_always_runs():
+    calls = []
+    assert run_stage_cached(None, 'a', lambda: calls.append(1) or 'v', 'fp') == 'v'
+    assert run_stage_cached(None, 'a', lambda: calls.append(1) or 'v', 'fp') == 'v'
+    assert len(calls) == 2
@@ -0,0 +1,79 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from keypoint_track import JOINT_INDEX
+from swing_window import detect_swing_window, window_indices
+
+R_WRIST, L_WRIST = JOINT_INDEX['RWrist'], JOINT_INDEX['LWrist']
+
+FPS = 30.0
+# 합성 스윙 (30fps, 어깨 y=100, 골반 y=200 → torso 100px, 손목 y가 100보다 작으면 어깨 위)
+ADDRESS_END = 150   # 0-149: 루틴/address (손 아래 정지), 150-: takeaway
+FINISH_START = 200  # 200-239: finish (손 위 정지), 240-269: 손 내림, 270-: 걸어 나감
+
+
+def _swing(n=300):
+    wx = np.full(n, 100.0)
+    wy = np.full(n, 180.0)
+    wy[150:180] = np.linspace(180, 40, 30)                                   # backswing
+    wy[180:186] = np.linspace(40, 180, 6); wx[180:186] = np.linspace(100, 140, 6)    # downswing (peak)
+    wy[186:200] = np.linspace(180, 30, 14); wx[186:200] = np.linspace(140, 120, 14)  # follow through
+    wy[200:240] = 30; wx[200:] = 120
+    wy[240:270] = np.linspace(30, 180, 30)
+    kps = np.zeros((n, 17, 3), dtype=np.float32)
+    for name, (x, y) in {'RShoulder': (80, 100), 'LShoulder': (120, 100), 'RHip': (85, 200), 'LHip': (115, 200)}.items():
+        kps[:, JOINT_INDEX[name]] = (x, y, 0.9)
+    for j in (R_WRIST, L_WRIST):
+        kps[:, j, 0], kps[:, j, 1], kps[:, j, 2] = wx, wy, 0.9
+    return kps
+
+
+def test_window_spans_address_to_finish():
+    start, end = detect_swing_window(_swing(), FPS, margin_s=0.0)
+    assert ADDRESS_END - 5 <= start <= ADDRESS_END + 2
+    # finish는 손이 위에서 HOLD_S(9 frame) 멈춘 시점까지
+    assert FINISH_START + 5 <= end <= FINISH_START + 15
+
+
+def test_margin_extends_both_sides():
+    bare = detect_swing_window(_swing(), FPS, margin_s=0.0)
+    padded = detect_swing_window(_swing(), FPS, margin_s=0.5)
+    assert padded == (bare[0] - 15, bare[1] + 15)
+
+
+def test_missed_wrist_frames_are_interpolated():
+    kps = _swing()
+    kps[1:140:2, [R_WRIST, L_WRIST], 2] = 0.0
+    kps[201:239:3, [R_WRIST, L_WRIST], 2] = 0.0
+    assert detect_swing_window(kps, FPS, margin_s=0.0) == detect_swing_window(_swing(), FPS, margin_s=0.0)
+
+
+def test_no_swing_returns_none():
+    kps = _swing()
+    kps[:, [R_WRIST, L_WRIST], 1] = 180.0
+    kps[:, [R_WRIST, L_WRIST], 0] = 100.0
+    assert detect_swing_window(kps, FPS) is None
+
+
+def test_fast_hands_below_shoulders_is_not_a_swing():
+    kps = _swing()
+    kps[:, [R_WRIST, L_WRIST], 1] = np.maximum(kps[:, [R_WRIST, L_WRIST], 1], 150.0)
+    assert detect_swing_window(kps, FPS) is None
+
+
+def test_wrists_mostly_missing_returns_none():
+    kps = _swing()
+    kps[:250, [R_WRIST, L_WRIST], 2] = 0.0
+    assert detect_swing_window(kps, FPS) is None
+
+
+def test_clip_already_trimmed_returns_none():
+    # 구간 + margin이 거의 전체면 trim 이득 없음
+    assert detect_swing_window(_swing()[140:215], FPS, margin_s=0.5) is None
+    assert detect_swing_window(_swing()[:5], FPS) is None
+
+
+def test_window_indices_keeps_first_and_last_frame():
+    out = window_indices([0, 100, 104, 108, 150, 200], (102, 160))
+    assert out.tolist() == [0, 2, 6, 48, 57]
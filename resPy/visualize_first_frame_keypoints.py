@@ -1,27 +1,19 @@
 import cv2
-import pandas as pd
 import numpy as np
 from pathlib import Path
+from keypoint_track import KeypointSequence
 
 video = Path(r"d:/golf_evaluation_system-web-/resPy/crop_video/1_20201124_General_037_DOS_A_M40_MS_038_crop_crop.mp4")
-csv = Path(r"d:/golf_evaluation_system-web-/resPy/crop_csv/1_20201124_General_037_DOS_A_M40_MS_038_crop_crop.csv")
+csv = Path(r"d:/golf_evaluation_system-web-/resPy/crop_csv/1_20201124_General_037_DOS_A_M40_MS_038_crop_crop.kps.npy")  # keypoint track 또는 crop_csv
 out = Path(r"d:/golf_evaluation_system-web-/resPy/skeleton_video/test_overlay_points.png")
 
 if not video.exists() or not csv.exists():
     print('missing source files')
     raise SystemExit(2)
 
-df = pd.read_csv(str(csv))
+seq = KeypointSequence.load(csv)
 # find first non-empty row
-x_cols = [c for c in df.columns if c.endswith('_x')]
-y_cols = [c for c in df.columns if c.endswith('_y')]
-first_idx = None
-for i in range(len(df)):
-    xv = df.loc[i, x_cols].astype(float).to_numpy()
-    yv = df.loc[i, y_cols].astype(float).to_numpy()
-    if np.nansum(xv) + np.nansum(yv) > 0:
-        first_idx = i
-        break
+first_idx = seq.first_valid_frame()
 if first_idx is None:
     print('no nonempty rows')
     raise SystemExit(3)
@@ -34,9 +26,9 @@ if not ret:
     raise SystemExit(4)
 
 h, w = frame.shape[:2]
-# assume CSV is in pixels (based on previous check)
-xv = df.loc[first_idx, x_cols].astype(float).to_numpy()
-yv = df.loc[first_idx, y_cols].astype(float).to_numpy()
+# NaN / (0,0) 점은 NaN
+xy = seq.to_pixel(w, h).masked_xy()[first_idx]
+xv, yv = xy[:, 0], xy[:, 1]
 
 # draw points and labels
 for k, (x, y) in enumerate(zip(xv, yv)):